@@ -5,9 +5,66 @@ Gestisce le impostazioni globali dell'applicazione utilizzando Pydantic
 per la validazione e il caricamento da variabili d'ambiente.
 """
 
-from pydantic_settings import BaseSettings
-from pydantic import ConfigDict
-from typing import List
+import json
+import os
+import socket
+import tempfile
+
+from pydantic_settings import BaseSettings, PydanticBaseSettingsSource
+from pydantic import ConfigDict, TypeAdapter
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+# Impostazioni che il comando di autotuning può scrivere (vedi app.services.autotune)
+AUTOTUNED_SETTINGS = [
+    "INFERENCE_TORCH_THREADS",
+    "WAV2VEC2_BATCH_MAX_SIZE",
+    "WHISPER_BATCH_MAX_SIZE",
+    "WAV2VEC2_CHUNK_LENGTH_S",
+]
+
+
+def get_autotune_path(autotune_file: Optional[str] = None) -> str:
+    """
+    Ottieni il percorso del file dei risultati dell'autotuning.
+
+    Args:
+        autotune_file: Percorso configurato. Se None, un file nella directory temporanea di sistema.
+
+    Returns:
+        Percorso del file JSON.
+    """
+    return autotune_file or os.path.join(tempfile.gettempdir(), "speech-to-text-autotune.json")
+
+
+def get_host_key() -> str:
+    """Chiave dell'host corrente nel file di autotuning (nome host e numero di core)."""
+    return f"{socket.gethostname()}-{os.cpu_count()}cpu"
+
+
+class AutotuneSettingsSource(PydanticBaseSettingsSource):
+    """
+    Sorgente delle impostazioni trovate dall'autotuning per l'host corrente.
+
+    Ha priorità inferiore a variabili d'ambiente e file .env, così un valore
+    impostato esplicitamente prevale sempre su quello misurato.
+    """
+
+    def get_field_value(self, field: Any, field_name: str) -> Tuple[Any, str, bool]:
+        # Valori letti tutti insieme in __call__
+        return None, field_name, False
+
+    def __call__(self) -> Dict[str, Any]:
+        # I valori delle sorgenti precedenti non sono ancora convertiti (es. "false")
+        if not TypeAdapter(bool).validate_python(self.current_state.get("AUTOTUNE_ENABLED", True)):
+            return {}
+        path = get_autotune_path(self.current_state.get("AUTOTUNE_FILE"))
+        try:
+            with open(path) as f:
+                host = json.load(f).get("hosts", {}).get(get_host_key(), {})
+        except (OSError, ValueError):
+            return {}
+        tuned = host.get("settings", {})
+        return {name: tuned[name] for name in AUTOTUNED_SETTINGS if name in tuned}
 
 
 class Settings(BaseSettings):
@@ -24,6 +81,8 @@ class Settings(BaseSettings):
     HOST: str = "127.0.0.1"
     PORT: int = 8000
     DEBUG: bool = True
+    WORKERS: int = 1  # con più worker il reload automatico è disattivato
+    PREFORK_ENABLED: bool = True  # con più worker carica i modelli una volta e crea i worker con fork()
     
     # CORS settings
     ALLOWED_ORIGINS: List[str] = [
@@ -32,7 +91,106 @@ class Settings(BaseSettings):
         "http://localhost:3001",
         "http://127.0.0.1:3001"
     ]
-    
+
+    # Audio decoding settings
+    AUDIO_DECODER_BACKEND: str = "auto"  # "auto", "pyav", "pipe" oppure "tempfile"
+
+    # Decoded audio cache settings (PCM 16kHz indicizzato per hash dei bytes)
+    AUDIO_CACHE_ENABLED: bool = True
+    AUDIO_CACHE_MEMORY_MB: float = 256.0
+    AUDIO_CACHE_DISK_MB: float = 2048.0
+    AUDIO_CACHE_DIR: Optional[str] = None  # None = cartella nella directory temporanea di sistema
+
+    # Transcription result cache settings
+    RESULT_CACHE_BACKEND: str = "memory"  # "memory", "sqlite" oppure "none"
+    RESULT_CACHE_MAX_ENTRIES: int = 1024
+    RESULT_CACHE_SQLITE_PATH: Optional[str] = None  # None = file nella directory temporanea di sistema
+
+    # Inference executor settings
+    INFERENCE_EXECUTOR: str = "thread"  # "thread", "process" oppure "workers" (processi dedicati per modello)
+    INFERENCE_WORKERS: int = 2
+    INFERENCE_TORCH_THREADS: Optional[int] = None  # None = default di torch
+    WAV2VEC2_MAX_CONCURRENCY: int = 1
+    WHISPER_MAX_CONCURRENCY: int = 1
+    WAV2VEC2_WORKER_PROCESSES: int = 1  # processi di inferenza dedicati con INFERENCE_EXECUTOR="workers"
+    WHISPER_WORKER_PROCESSES: int = 1
+    INFERENCE_SHM_RING_MB: float = 64.0  # ring buffer condiviso per l'audio inviato ai processi dedicati
+    CPU_SLOTS: int = 0  # 0 = disattivato; altrimenti i core sono divisi in slot fissi, un'inferenza per slot
+
+    # Wav2Vec2 model settings
+    WAV2VEC2_DEFAULT_MODEL: str = "facebook"  # modello all'avvio, anche variante (es. "facebook@onnx")
+    ONNX_GRAPH_OPTIMIZATION: str = "all"  # variante "onnx": "disable", "basic", "extended" o "all"
+
+    # Wav2Vec2 micro-batching settings
+    WAV2VEC2_BATCHING_ENABLED: bool = True
+    WAV2VEC2_BATCH_MAX_SIZE: int = 8
+    WAV2VEC2_BATCH_MAX_WAIT_MS: float = 20.0
+    WAV2VEC2_BATCH_BUCKET_RATIO: float = 1.5  # rapporto massimo tra durata più lunga e più corta in un bucket
+
+    # Wav2Vec2 chunked long-audio settings
+    WAV2VEC2_CHUNKING_ENABLED: bool = True
+    WAV2VEC2_CHUNKING_MIN_DURATION_S: float = 30.0  # audio più lunghi vengono elaborati a chunk
+    WAV2VEC2_CHUNK_LENGTH_S: float = 20.0
+    WAV2VEC2_STRIDE_LENGTH_S: float = 4.0  # contesto sovrapposto su ciascun lato del chunk
+
+    # Wav2Vec2 compiled execution settings (grafi per bucket di lunghezza, vedi app.models.model_compile)
+    WAV2VEC2_COMPILE_MODE: str = "none"  # "none", "torchscript" (torch.jit.trace) oppure "compile" (torch.compile)
+    WAV2VEC2_COMPILE_BUCKETS_S: List[float] = [2.0, 5.0, 10.0, 20.0, 30.0]  # input paddati al bucket successivo
+
+    # Wav2Vec2 streaming settings (WebSocket /wav2vec2/stream)
+    WAV2VEC2_STREAM_STEP_S: float = 1.0  # audio nuovo necessario per un nuovo passo di inferenza
+    WAV2VEC2_STREAM_LEFT_CONTEXT_S: float = 2.0  # contesto già confermato rielaborato a ogni passo
+    WAV2VEC2_STREAM_RIGHT_CONTEXT_S: float = 0.5  # coda della finestra ancora provvisoria
+
+    # Whisper model settings
+    WHISPER_DEFAULT_MODEL: str = "base"  # modello all'avvio, anche con precisione (es. "small@int8", "small@bf16")
+    WHISPER_ENGINE: str = "whisper"  # "whisper" (openai-whisper) oppure "faster-whisper" (CTranslate2)
+    FASTER_WHISPER_MODEL_DIR: Optional[str] = None  # modelli CTranslate2; None = cache di Hugging Face
+
+    # Whisper batched decoding settings
+    WHISPER_BATCHING_ENABLED: bool = True
+    WHISPER_BATCH_MAX_SIZE: int = 4
+    WHISPER_BATCH_MAX_WAIT_MS: float = 50.0
+    WHISPER_BEAM_SIZE: Optional[int] = None  # None = greedy decoding
+
+    # Whisper streaming settings (WebSocket /whisper/stream)
+    WHISPER_STREAM_STEP_S: float = 1.0  # audio nuovo necessario per ridecodificare il buffer
+    WHISPER_STREAM_BUFFER_TRIM_S: float = 15.0  # oltre questa durata il buffer viene tagliato a un confine di segmento confermato
+    WHISPER_STREAM_PROMPT_CHARS: int = 200  # testo confermato passato come prompt alla decodifica
+
+    # Model pool settings (modelli residenti nel ModelRegistry)
+    MODEL_MEMORY_BUDGET_MB: float = 8192.0  # oltre questa soglia i modelli inattivi meno usati vengono scaricati
+    MODEL_IDLE_TIMEOUT_S: float = 1800.0  # i modelli inattivi da più tempo vengono scaricati (0 = mai)
+    MODEL_IDLE_SWEEP_INTERVAL_S: float = 60.0  # intervallo del controllo periodico dei modelli inattivi
+    MODEL_SWAP_DRAIN_TIMEOUT_S: float = 300.0  # attesa massima delle richieste in corso sul modello sostituito
+
+    # Startup preload settings (readiness su /health/ready)
+    # Voci "motore" (modello attuale) o "motore:modello", es. ["wav2vec2", "whisper:small"]; [] = lazy loading
+    PRELOAD_MODELS: List[str] = ["wav2vec2", "whisper"]
+    WARMUP_DURATIONS_S: List[float] = [1.0, 5.0, 15.0]  # durate degli audio sintetici di warm-up
+
+    # Model snapshot settings (safetensors mappati in memoria, vedi app.models.model_snapshot)
+    MODEL_SNAPSHOTS_ENABLED: bool = True
+    MODEL_SNAPSHOT_AUTO_BUILD: bool = False  # crea lo snapshot in background dopo un caricamento dalla sorgente
+    MODEL_SNAPSHOT_DIR: Optional[str] = None  # None = cartella nella directory temporanea di sistema
+
+    # Autotuning settings (python -m app.services.autotune; le variabili d'ambiente prevalgono sui valori misurati)
+    AUTOTUNE_ENABLED: bool = True  # applica i valori misurati per questo host, se presenti
+    AUTOTUNE_ON_STARTUP: bool = False  # esegue l'autotuning all'avvio se l'host non ha ancora valori misurati
+    AUTOTUNE_FILE: Optional[str] = None  # None = file nella directory temporanea di sistema
+
+    @classmethod
+    def settings_customise_sources(
+        cls,
+        settings_cls: Type[BaseSettings],
+        init_settings: PydanticBaseSettingsSource,
+        env_settings: PydanticBaseSettingsSource,
+        dotenv_settings: PydanticBaseSettingsSource,
+        file_secret_settings: PydanticBaseSettingsSource
+    ) -> Tuple[PydanticBaseSettingsSource, ...]:
+        """Aggiungi i valori dell'autotuning con priorità inferiore a env e .env."""
+        return init_settings, env_settings, dotenv_settings, AutotuneSettingsSource(settings_cls), file_secret_settings
+
     def get_server_url(self) -> str:
         """
         Ottieni l'URL completo del server.
@@ -0,0 +1,74 @@
+"""
+Dipendenze FastAPI condivise dai router.
+
+I servizi di trascrizione sono istanziati una sola volta per processo e
+condivisi da tutti i router, così scheduler di batching, single-flight e handle
+dei modelli (dal ModelRegistry) non vengono duplicati. Il motore del servizio
+Whisper è scelto con WHISPER_ENGINE.
+"""
+
+from functools import lru_cache
+from typing import Optional
+
+from app.config import settings
+from app.models.model_manager import ASRModelManager
+from app.services.faster_whisper_service import FasterWhisperService
+from app.services.wav2vec_service import Wav2Vec2Service
+from app.services.whisper_service import WhisperService
+
+# Implementazioni del servizio Whisper per motore (WHISPER_ENGINE)
+WHISPER_ENGINES = {
+    WhisperService.ENGINE: WhisperService,
+    FasterWhisperService.ENGINE: FasterWhisperService
+}
+
+
+@lru_cache(maxsize=None)
+def get_wav2vec2_service() -> Wav2Vec2Service:
+    """
+    Ottieni il servizio Wav2Vec2 condiviso.
+
+    Returns:
+        L'istanza di Wav2Vec2Service del processo.
+    """
+    return Wav2Vec2Service()
+
+
+def create_whisper_service(engine: Optional[str] = None) -> WhisperService:
+    """
+    Crea un servizio Whisper del motore richiesto.
+
+    Args:
+        engine: "whisper" (openai-whisper) o "faster-whisper". Se None, usa WHISPER_ENGINE.
+
+    Returns:
+        Una nuova istanza del servizio.
+
+    Raises:
+        ValueError: Se il motore non è supportato.
+    """
+    engine = engine or settings.WHISPER_ENGINE
+    if engine not in WHISPER_ENGINES:
+        raise ValueError(f"Motore Whisper non supportato: '{engine}'")
+    return WHISPER_ENGINES[engine]()
+
+
+@lru_cache(maxsize=None)
+def get_whisper_service() -> WhisperService:
+    """
+    Ottieni il servizio Whisper condiviso.
+
+    Returns:
+        L'istanza del servizio Whisper del processo, del motore WHISPER_ENGINE.
+    """
+    return create_whisper_service()
+
+
+def get_model_manager() -> ASRModelManager:
+    """
+    Ottieni il manager dei modelli.
+
+    Returns:
+        Il singleton ASRModelManager.
+    """
+    return ASRModelManager()
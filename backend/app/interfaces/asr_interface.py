@@ -18,12 +18,13 @@ class ASRServiceInterface(ABC):
     """
 
     @abstractmethod
-    async def transcribe(self, audio_bytes: bytes) -> str:
+    async def transcribe(self, audio_bytes: bytes, model: Optional[str] = None) -> str:
         """
         Trascrivi audio bytes in testo.
 
         Args:
             audio_bytes: Array di bytes contenente l'audio da trascrivere.
+            model: Modello da usare per questa richiesta. Se None, usa quello attuale.
 
         Returns:
             Stringa contenente la trascrizione dell'audio.
@@ -37,7 +38,8 @@ class ASRServiceInterface(ABC):
     async def transcribe_with_metrics(
         self, 
         audio_bytes: bytes, 
-        reference_text: Optional[str] = None
+        reference_text: Optional[str] = None,
+        model: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Trascrivi audio bytes in testo e calcola metriche di valutazione.
@@ -45,6 +47,7 @@ class ASRServiceInterface(ABC):
         Args:
             audio_bytes: Array di bytes contenente l'audio da trascrivere.
             reference_text: Testo di riferimento per calcolo WER/CER (opzionale).
+            model: Modello da usare per questa richiesta. Se None, usa quello attuale.
 
         Returns:
             Dizionario contenente:
@@ -59,22 +62,26 @@ class ASRServiceInterface(ABC):
         pass
 
     @abstractmethod
-    def get_model_info(self) -> Dict[str, Any]:
+    def get_model_info(self, model: Optional[str] = None) -> Dict[str, Any]:
         """
         Ottieni informazioni sul modello attualmente in uso.
 
+        Args:
+            model: Modello di cui ottenere le informazioni. Se None, usa quello attuale.
+
         Returns:
             Dizionario contenente informazioni sul modello (nome, versione, ecc.).
         """
         pass
 
     @abstractmethod
-    async def update_model(self, model_name: str) -> bool:
+    async def update_model(self, model_name: str, wait: bool = False) -> bool:
         """
         Aggiorna il modello utilizzato dal servizio.
 
         Args:
             model_name: Nome del nuovo modello da utilizzare.
+            wait: Se True, attendi che il nuovo modello sia in uso.
 
         Returns:
             True se l'aggiornamento è riuscito, False altrimenti.
@@ -5,16 +5,48 @@ Questa applicazione fornisce API REST per la trascrizione di file audio
 utilizzando modelli di machine learning avanzati (Wav2Vec2 e Whisper).
 """
 
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import route_wav2vec2, route_whisper, route_models, health
 from app.config import settings
+from app.utils.inference_executor import InferenceExecutor
+from app.models.model_registry import ModelRegistry
+from app.services.startup import preload_models
+
+
+async def evict_idle_models_periodically() -> None:
+    """Scarica periodicamente i modelli inattivi da più di MODEL_IDLE_TIMEOUT_S secondi."""
+    registry = ModelRegistry()
+    while True:
+        await asyncio.sleep(settings.MODEL_IDLE_SWEEP_INTERVAL_S)
+        await asyncio.to_thread(registry.evict_idle)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Gestisce le risorse condivise per tutta la vita dell'applicazione."""
+    background_tasks = []
+    if settings.MODEL_IDLE_TIMEOUT_S > 0:
+        background_tasks.append(asyncio.create_task(evict_idle_models_periodically()))
+    # Precaricamento e warm-up in background: /health/ready risponde 503 finché non terminano
+    background_tasks.append(asyncio.create_task(preload_models()))
+    yield
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    # Arresto il pool di inferenza alla chiusura
+    InferenceExecutor().shutdown(wait=False)
+
 
 app = FastAPI(
     title="Speech-to-Text Backend", 
     description="API per la trascrizione automatica di audio in testo",
     version="1.0.0",
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    lifespan=lifespan
 )
 
 # Aggiungo CORS middleware per permettere connessioni dal frontend
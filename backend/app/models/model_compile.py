@@ -0,0 +1,307 @@
+"""
+Esecuzione compilata dei modelli Wav2Vec2 con bucket di lunghezza.
+
+Con WAV2VEC2_COMPILE_MODE="torchscript" (torch.jit.trace) oppure "compile"
+(torch.compile) il modello Wav2Vec2 viene eseguito da grafi compilati per
+forme fisse. Dato che ogni richiesta ha una lunghezza diversa, gli input
+vengono paddati con zeri (e attention mask a zero) fino al primo bucket di
+WAV2VEC2_COMPILE_BUCKETS_S che li contiene, e il numero di audio del batch
+fino alla prima potenza di due (al massimo WAV2VEC2_BATCH_MAX_SIZE): ogni
+combinazione (batch, bucket) ha il proprio grafo, compilato una volta (dal
+warm-up all'avvio o alla prima richiesta) e poi riusato. I logits vengono
+troncati alla lunghezza reale, quindi batching, chunking e streaming del
+servizio non cambiano. Gli audio più lunghi dell'ultimo bucket vengono
+eseguiti dal modello non compilato.
+
+Con l'attention mask i frame validi non dipendono dal padding; i modelli
+senza attention mask (group norm, es. wav2vec2-base) vedono il padding come
+già avviene nel micro-batching.
+
+Per ogni grafo vengono registrati tempo di compilazione, riusi e frazione di
+padding dei campioni elaborati (in /models/status e in /health/metrics).
+
+TorchScript compila in meno di un secondo per bucket ma è deprecato nelle
+versioni recenti di PyTorch; torch.compile genera kernel migliori ma richiede
+decine di secondi per grafo, quindi il numero di bucket va scelto insieme al
+tempo di avvio accettabile.
+"""
+
+import threading
+import time
+import warnings
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import torch
+
+from app.config import settings
+from app.models.model_onnx import LogitsOnly
+from app.utils.telemetry import TelemetryRegistry
+
+COMPILE_MODES = ("none", "torchscript", "compile")
+# Limiti dei bucket dell'istogramma della frazione di padding per forward pass
+PADDING_RATIO_BUCKETS = [0.05, 0.1, 0.25, 0.5, 0.75]
+
+# Chiave di un grafo compilato: (audio nel batch, campioni per audio)
+GraphKey = Tuple[int, int]
+
+
+def get_length_buckets() -> List[int]:
+    """Lunghezze dei bucket in campioni a 16kHz, in ordine crescente."""
+    return sorted({int(duration_s * 16000) for duration_s in settings.WAV2VEC2_COMPILE_BUCKETS_S})
+
+
+def get_batch_buckets() -> List[int]:
+    """Dimensioni di batch compilate: potenze di due fino alla dimensione massima del micro-batching."""
+    max_size = settings.WAV2VEC2_BATCH_MAX_SIZE if settings.WAV2VEC2_BATCHING_ENABLED else 1
+    sizes = []
+    size = 1
+    while size < max_size:
+        sizes.append(size)
+        size *= 2
+    return sizes + [max(1, max_size)]
+
+
+class BucketedWav2Vec2ForCTC(torch.nn.Module):
+    """
+    Wav2Vec2ForCTC eseguito da grafi compilati, uno per bucket di forma.
+
+    Espone l'interfaccia del modello originale usata dal servizio (chiamata con
+    input_values/attention_mask, .logits, config e _get_feat_extract_output_lengths);
+    i parametri restano quelli del modello originale, condivisi da tutti i grafi.
+    """
+
+    def __init__(self, model: torch.nn.Module, mode: str, use_attention_mask: bool):
+        """
+        Prepara l'esecuzione compilata; i grafi vengono creati in seguito.
+
+        Args:
+            model: Wav2Vec2ForCTC in modalità eval.
+            mode: "torchscript" oppure "compile".
+            use_attention_mask: Se il modello riceve l'attention mask (come il suo processor).
+
+        Raises:
+            ValueError: Se la modalità o i bucket non sono validi.
+        """
+        super().__init__()
+        if mode not in COMPILE_MODES[1:]:
+            raise ValueError(f"WAV2VEC2_COMPILE_MODE non valido: '{mode}'")
+        self.model = model
+        self.config = model.config
+        self.mode = mode
+        self.use_attention_mask = use_attention_mask
+        self.length_buckets = get_length_buckets()
+        self.batch_buckets = get_batch_buckets()
+        if not self.length_buckets or self.length_buckets[0] <= 0:
+            raise ValueError("WAV2VEC2_COMPILE_BUCKETS_S deve contenere durate positive")
+
+        self._graphs: Dict[GraphKey, Callable[..., torch.Tensor]] = {}
+        self._stats: Dict[GraphKey, Dict[str, Any]] = {}
+        self._fallbacks = 0
+        self._compiled_module: Optional[torch.nn.Module] = None
+        self._compile_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        telemetry = TelemetryRegistry()
+        self._hit_counter = telemetry.counter("wav2vec2_compiled_graph_hit")
+        self._compile_counter = telemetry.counter("wav2vec2_compiled_graph_compile")
+        self._fallback_counter = telemetry.counter("wav2vec2_compiled_fallback")
+        self._padding_hist = telemetry.histogram("wav2vec2_compiled_padding_ratio", PADDING_RATIO_BUCKETS)
+
+    def _select_bucket(self, batch_size: int, num_samples: int) -> Optional[GraphKey]:
+        """Bucket più piccolo che contiene l'input, oppure None se l'input è più grande di tutti."""
+        padded_batch = next((size for size in self.batch_buckets if size >= batch_size), None)
+        padded_samples = next((length for length in self.length_buckets if length >= num_samples), None)
+        if padded_batch is None or padded_samples is None:
+            return None
+        return padded_batch, padded_samples
+
+    def _example_inputs(self, key: GraphKey) -> List[torch.Tensor]:
+        """Input sintetici con la forma di un bucket, sul device del modello."""
+        device = next(self.model.parameters()).device
+        inputs = [torch.zeros(key, device=device)]
+        if self.use_attention_mask:
+            inputs.append(torch.ones(key, dtype=torch.long, device=device))
+        return inputs
+
+    def _compile(self, key: GraphKey) -> Callable[..., torch.Tensor]:
+        """
+        Compila ed esegui a vuoto il grafo di un bucket.
+
+        Args:
+            key: Bucket (audio nel batch, campioni per audio).
+
+        Returns:
+            Funzione che esegue il grafo e restituisce i logits.
+        """
+        inputs = self._example_inputs(key)
+        start = time.perf_counter()
+        with torch.no_grad():
+            if self.mode == "torchscript":
+                with warnings.catch_warnings():
+                    # Avvisi di tracing e di deprecazione di torch.jit, ripetuti per ogni bucket
+                    warnings.simplefilter("ignore", torch.jit.TracerWarning)
+                    warnings.simplefilter("ignore", FutureWarning)
+                    graph = torch.jit.trace(LogitsOnly(self.model).eval(), tuple(inputs), check_trace=False)
+                # L'executor di TorchScript ottimizza il grafo dopo le prime esecuzioni
+                for _ in range(2):
+                    graph(*inputs)
+            else:
+                if self._compiled_module is None:
+                    # Un grafo per bucket: torch.compile non deve passare a forme dinamiche né smettere di ricompilare
+                    torch._dynamo.config.recompile_limit = max(
+                        torch._dynamo.config.recompile_limit, len(self.batch_buckets) * len(self.length_buckets)
+                    )
+                    self._compiled_module = torch.compile(LogitsOnly(self.model).eval(), dynamic=False)
+                graph = self._compiled_module
+                graph(*inputs)
+        compile_s = time.perf_counter() - start
+
+        with self._stats_lock:
+            self._stats[key] = {"compile_s": compile_s, "hits": 0, "samples": 0, "padded_samples": 0}
+        self._compile_counter.inc()
+        print(f"Compiled wav2vec2 graph ({self.mode}) for batch {key[0]} x {key[1] / 16000:g}s in {compile_s:.2f}s")
+        return graph
+
+    def _get_graph(self, key: GraphKey) -> Tuple[Optional[Callable[..., torch.Tensor]], bool]:
+        """
+        Ottieni il grafo di un bucket, compilandolo se manca.
+
+        Un bucket la cui compilazione è fallita non viene ricompilato: i suoi
+        input vengono eseguiti dal modello non compilato.
+
+        Returns:
+            Tupla contenente (grafo, oppure None se la compilazione è fallita,
+            e True se il grafo è stato compilato da questa chiamata).
+        """
+        if key in self._graphs:
+            return self._graphs[key], False
+        with self._compile_lock:
+            if key in self._graphs:
+                return self._graphs[key], False
+            try:
+                graph = self._compile(key)
+            except Exception as e:
+                print(f"Compilation of wav2vec2 graph for batch {key[0]} x {key[1] / 16000:g}s failed, "
+                      f"running it uncompiled: {e}")
+                graph = None
+            self._graphs[key] = graph
+            return graph, graph is not None
+
+    def compile_buckets(self) -> float:
+        """
+        Compila i grafi di tutti i bucket non ancora compilati.
+
+        Returns:
+            Tempo di compilazione in secondi.
+        """
+        start = time.perf_counter()
+        for batch_size in self.batch_buckets:
+            for num_samples in self.length_buckets:
+                self._get_graph((batch_size, num_samples))
+        return time.perf_counter() - start
+
+    def forward(self, input_values: torch.Tensor, attention_mask: Optional[torch.Tensor] = None) -> Any:
+        """
+        Esegui il forward pass sul grafo del bucket dell'input.
+
+        Args:
+            input_values: Audio normalizzato (batch, campioni).
+            attention_mask: Maschera dei campioni validi, se il modello la supporta.
+
+        Returns:
+            CausalLMOutput con i logits (batch, frame, vocabolario) della lunghezza reale.
+        """
+        from transformers.modeling_outputs import CausalLMOutput
+
+        batch_size, num_samples = input_values.shape
+        key = self._select_bucket(batch_size, num_samples)
+        graph, compiled_now = self._get_graph(key) if key is not None else (None, False)
+        if graph is None:
+            with self._stats_lock:
+                self._fallbacks += 1
+            self._fallback_counter.inc()
+            return self.model(input_values, attention_mask=attention_mask)
+
+        inputs = [input_values.new_zeros(key)]
+        inputs[0][:batch_size, :num_samples] = input_values
+        if self.use_attention_mask:
+            mask = torch.zeros(key, dtype=torch.long, device=input_values.device)
+            mask[:batch_size, :num_samples] = attention_mask if attention_mask is not None else 1
+            inputs.append(mask)
+
+        logits = graph(*inputs)
+        frames = int(self._get_feat_extract_output_lengths(torch.tensor(num_samples)))
+
+        padded_samples = key[0] * key[1]
+        with self._stats_lock:
+            stats = self._stats[key]
+            stats["hits"] += 0 if compiled_now else 1
+            stats["samples"] += batch_size * num_samples
+            stats["padded_samples"] += padded_samples
+        if not compiled_now:
+            self._hit_counter.inc()
+        self._padding_hist.observe(1 - batch_size * num_samples / padded_samples)
+        return CausalLMOutput(logits=logits[:batch_size, :frames])
+
+    def _get_feat_extract_output_lengths(self, input_lengths: torch.Tensor) -> torch.Tensor:
+        """Numero di frame prodotti dall'estrattore convoluzionale, come nel modello originale."""
+        return self.model._get_feat_extract_output_lengths(input_lengths)
+
+    def compile_stats(self) -> Dict[str, Any]:
+        """
+        Ottieni le statistiche dei grafi compilati.
+
+        Returns:
+            Dizionario con modalità, esecuzioni non compilate (input oltre
+            l'ultimo bucket o compilazione fallita), tempo di compilazione
+            totale, frazione di padding complessiva e, per ogni grafo, bucket,
+            tempo di compilazione, riusi e frazione di padding.
+        """
+        with self._stats_lock:
+            stats = {key: dict(value) for key, value in self._stats.items()}
+            fallbacks = self._fallbacks
+        samples = sum(value["samples"] for value in stats.values())
+        padded_samples = sum(value["padded_samples"] for value in stats.values())
+        return {
+            "mode": self.mode,
+            "fallbacks": fallbacks,
+            "compile_s": round(sum(value["compile_s"] for value in stats.values()), 2),
+            "padding_waste": round(1 - samples / padded_samples, 4) if padded_samples else None,
+            "graphs": [
+                {
+                    "batch_size": batch_size,
+                    "bucket_s": num_samples / 16000,
+                    "compile_s": round(value["compile_s"], 2),
+                    "hits": value["hits"],
+                    "padding_waste": (
+                        round(1 - value["samples"] / value["padded_samples"], 4) if value["padded_samples"] else None
+                    )
+                }
+                for (batch_size, num_samples), value in sorted(stats.items())
+            ]
+        }
+
+
+def compile_wav2vec2_components(components: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Esegui il modello Wav2Vec2 dei componenti con i grafi compilati di WAV2VEC2_COMPILE_MODE.
+
+    I componenti caricati non vengono modificati (possono essere in corso di
+    salvataggio come snapshot). I modelli eseguiti fuori da PyTorch (es. la
+    variante "onnx") restano invariati.
+
+    Args:
+        components: Componenti del modello caricato ("processor" e "model").
+
+    Returns:
+        Componenti con il modello compilato, oppure gli stessi componenti.
+
+    Raises:
+        ValueError: Se WAV2VEC2_COMPILE_MODE non è valido.
+    """
+    mode = settings.WAV2VEC2_COMPILE_MODE
+    if mode not in COMPILE_MODES:
+        raise ValueError(f"WAV2VEC2_COMPILE_MODE non valido: '{mode}'")
+    if mode == "none" or not isinstance(components["model"], torch.nn.Module):
+        return components
+    use_attention_mask = components["processor"].feature_extractor.return_attention_mask
+    return {**components, "model": BucketedWav2Vec2ForCTC(components["model"], mode, use_attention_mask)}
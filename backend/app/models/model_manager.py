@@ -3,11 +3,26 @@ Manager centralizzato per la gestione dei modelli ASR.
 
 Questo modulo implementa il pattern Singleton per la gestione centralizzata
 dei modelli ASR, seguendo i principi SOLID.
+
+Ogni modello è selezionabile anche in una variante di precisione indicando
+la chiave seguita dalla precisione (es. "facebook@int8", "small@bf16"); la
+chiave senza suffisso indica il modello fp32. La variante "onnx" dei modelli
+Wav2Vec2 (es. "facebook@onnx") viene eseguita con ONNX Runtime.
 """
 
-from typing import Dict, Any, Optional
+import threading
+from typing import Dict, Any, Callable, Optional, Tuple
 from enum import Enum
 
+from app.config import settings
+from app.models.model_precision import (
+    DEFAULT_PRECISION, MODEL_PRECISIONS, build_precision_variant, get_variant_backend, get_variant_name,
+    prepare_precision_variant, split_variant_name
+)
+from app.models.model_onnx import ONNX_VARIANT, is_onnx_runtime_available, load_onnx_variant
+from app.models.model_registry import ModelHandle, ModelRegistry
+from app.models.model_snapshot import has_snapshot, load_snapshot, save_snapshot
+
 
 class ModelSize(Enum):
     """Enumerazione per le dimensioni dei modelli."""
@@ -23,7 +38,8 @@ class ASRModelManager:
     Manager singleton per la gestione centralizzata dei modelli ASR.
     
     Gestisce i modelli Wav2Vec2 e Whisper, permettendo il cambio dinamico
-    e la configurazione centralizzata.
+    e la configurazione centralizzata. I modelli caricati sono condivisi tramite
+    il ModelRegistry del processo, così ogni checkpoint è in memoria una volta sola.
     """
     
     _instance = None
@@ -39,8 +55,11 @@ class ASRModelManager:
         if not self._initialized:
             self._wav2vec2_models = self._initialize_wav2vec2_models()
             self._whisper_models = self._initialize_whisper_models()
-            self._current_wav2vec2_model = "facebook"
-            self._current_whisper_model = ModelSize.BASE
+            self._current_wav2vec2_model = settings.WAV2VEC2_DEFAULT_MODEL
+            self._current_whisper_model, self._current_whisper_precision = self.split_whisper_checkpoint(
+                settings.WHISPER_DEFAULT_MODEL
+            )
+            self._registry = ModelRegistry()
             ASRModelManager._initialized = True
 
     def _initialize_wav2vec2_models(self) -> Dict[str, Dict[str, Any]]:
@@ -112,48 +131,111 @@ class ASRModelManager:
             }
         }
 
+    def _split_wav2vec2_key(self, model_key: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Separa la chiave di un modello Wav2Vec2 nella chiave base e nella precisione.
+
+        Args:
+            model_key: Chiave del modello, eventualmente con precisione (es. "facebook@int8").
+                Se None, usa quello attuale.
+
+        Returns:
+            Tupla contenente (chiave base, precisione).
+
+        Raises:
+            KeyError: Se il modello non esiste o la precisione non è supportata.
+        """
+        key = model_key or self._current_wav2vec2_model
+        base_key, precision = split_variant_name(key)
+        if base_key not in self._wav2vec2_models:
+            raise KeyError(f"Modello Wav2Vec2 '{key}' non trovato")
+        if precision not in MODEL_PRECISIONS["wav2vec2"]:
+            raise KeyError(f"Precisione '{precision}' non supportata per il modello Wav2Vec2 '{base_key}'")
+        if precision == ONNX_VARIANT and not is_onnx_runtime_available():
+            raise KeyError("Variante 'onnx' non disponibile: ONNX Runtime non installato")
+        return base_key, precision
+
     def get_wav2vec2_model_info(self, model_key: Optional[str] = None) -> Dict[str, Any]:
         """
         Ottieni informazioni su un modello Wav2Vec2.
 
         Args:
-            model_key: Chiave del modello. Se None, usa quello attuale.
+            model_key: Chiave del modello, eventualmente con precisione. Se None, usa quello attuale.
 
         Returns:
-            Dizionario con le informazioni del modello.
+            Dizionario con le informazioni del modello, inclusi precisione,
+            runtime ed esecuzione compilata (WAV2VEC2_COMPILE_MODE, solo con PyTorch).
 
         Raises:
             KeyError: Se il modello non esiste.
         """
-        key = model_key or self._current_wav2vec2_model
-        if key not in self._wav2vec2_models:
-            raise KeyError(f"Modello Wav2Vec2 '{key}' non trovato")
-        return self._wav2vec2_models[key]
+        base_key, precision = self._split_wav2vec2_key(model_key)
+        backend = get_variant_backend(precision)
+        return {
+            **self._wav2vec2_models[base_key],
+            "precision": precision,
+            "backend": backend,
+            "compile_mode": settings.WAV2VEC2_COMPILE_MODE if backend == "torch" else "none",
+            "available_precisions": list(MODEL_PRECISIONS["wav2vec2"])
+        }
 
-    def get_whisper_model_info(self, model_size: Optional[ModelSize] = None) -> Dict[str, Any]:
+    def get_whisper_model_info(
+        self,
+        model_size: Optional[ModelSize] = None,
+        precision: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Ottieni informazioni su un modello Whisper.
 
         Args:
             model_size: Dimensione del modello. Se None, usa quello attuale.
+            precision: Precisione del modello. Se None, quella del modello
+                attuale oppure fp32 se è indicata una dimensione.
 
         Returns:
-            Dizionario con le informazioni del modello.
+            Dizionario con le informazioni del modello, inclusa la precisione.
 
         Raises:
-            KeyError: Se il modello non esiste.
+            KeyError: Se il modello non esiste o la precisione non è supportata.
         """
         size = model_size or self._current_whisper_model
         if size not in self._whisper_models:
             raise KeyError(f"Modello Whisper '{size}' non trovato")
-        return self._whisper_models[size]
+        if precision is None:
+            precision = self._current_whisper_precision if model_size is None else DEFAULT_PRECISION
+        if precision not in MODEL_PRECISIONS["whisper"]:
+            raise KeyError(f"Precisione '{precision}' non supportata per il modello Whisper '{size.value}'")
+        return {
+            **self._whisper_models[size],
+            "precision": precision,
+            "backend": get_variant_backend(precision),
+            "available_precisions": list(MODEL_PRECISIONS["whisper"])
+        }
+
+    def split_whisper_checkpoint(self, checkpoint: str) -> Tuple[ModelSize, str]:
+        """
+        Separa un checkpoint Whisper nella dimensione e nella precisione.
+
+        Args:
+            checkpoint: Dimensione del modello, eventualmente con precisione (es. "small@bf16").
+
+        Returns:
+            Tupla contenente (dimensione, precisione).
+
+        Raises:
+            ValueError: Se la dimensione o la precisione non sono supportate.
+        """
+        size, precision = split_variant_name(checkpoint.lower())
+        if precision not in MODEL_PRECISIONS["whisper"]:
+            raise ValueError(f"Precisione '{precision}' non supportata per il modello Whisper '{size}'")
+        return ModelSize(size), precision
 
     def set_wav2vec2_model(self, model_key: str) -> bool:
         """
         Imposta il modello Wav2Vec2 di default.
 
         Args:
-            model_key: Chiave del modello da impostare.
+            model_key: Chiave del modello da impostare, eventualmente con precisione (es. "facebook@int8").
 
         Returns:
             True se l'operazione è riuscita.
@@ -161,17 +243,17 @@ class ASRModelManager:
         Raises:
             KeyError: Se il modello non esiste.
         """
-        if model_key not in self._wav2vec2_models:
-            raise KeyError(f"Modello Wav2Vec2 '{model_key}' non trovato")
+        self._split_wav2vec2_key(model_key)
         self._current_wav2vec2_model = model_key
         return True
 
-    def set_whisper_model(self, model_size: ModelSize) -> bool:
+    def set_whisper_model(self, model_size: ModelSize, precision: str = DEFAULT_PRECISION) -> bool:
         """
         Imposta il modello Whisper di default.
 
         Args:
             model_size: Dimensione del modello da impostare.
+            precision: Precisione del modello ("fp32", "int8" o "bf16").
 
         Returns:
             True se l'operazione è riuscita.
@@ -181,7 +263,10 @@ class ASRModelManager:
         """
         if model_size not in self._whisper_models:
             raise KeyError(f"Modello Whisper '{model_size}' non trovato")
+        if precision not in MODEL_PRECISIONS["whisper"]:
+            raise KeyError(f"Precisione '{precision}' non supportata per il modello Whisper '{model_size.value}'")
         self._current_whisper_model = model_size
+        self._current_whisper_precision = precision
         return True
 
     def get_current_wav2vec2_model(self) -> str:
@@ -202,30 +287,49 @@ class ASRModelManager:
         """
         return self._current_whisper_model
 
+    def get_current_whisper_precision(self) -> str:
+        """
+        Ottieni la precisione del modello Whisper attualmente attivo.
+
+        Returns:
+            Precisione del modello attuale ("fp32", "int8" o "bf16").
+        """
+        return self._current_whisper_precision
+
+    def get_current_whisper_checkpoint(self) -> str:
+        """
+        Ottieni il checkpoint Whisper attualmente attivo, con la precisione se diversa da fp32.
+
+        Returns:
+            Checkpoint del modello attuale (es. "base" o "small@int8").
+        """
+        return get_variant_name(self._current_whisper_model.value, self._current_whisper_precision)
+
     def get_all_wav2vec2_models(self) -> Dict[str, Dict[str, Any]]:
         """
         Ottieni tutti i modelli Wav2Vec2 disponibili.
 
         Returns:
-            Dizionario con tutti i modelli Wav2Vec2.
+            Dizionario con tutti i modelli Wav2Vec2 (in fp32, con le precisioni disponibili).
         """
-        return self._wav2vec2_models.copy()
+        return {key: self.get_wav2vec2_model_info(key) for key in self._wav2vec2_models}
 
     def get_all_whisper_models(self) -> Dict[str, Dict[str, Any]]:
         """
         Ottieni tutti i modelli Whisper disponibili.
 
         Returns:
-            Dizionario con tutti i modelli Whisper (convertito da enum).
+            Dizionario con tutti i modelli Whisper (convertito da enum, in fp32
+            con le precisioni disponibili).
         """
-        return {size.value: info for size, info in self._whisper_models.items()}
+        return {size.value: self.get_whisper_model_info(size) for size in self._whisper_models}
 
     def get_wav2vec2_model_name(self, model_key: Optional[str] = None) -> str:
         """
         Ottieni il nome Hugging Face di un modello Wav2Vec2.
 
         Args:
-            model_key: Chiave del modello. Se None, usa quello attuale.
+            model_key: Chiave del modello, eventualmente con precisione. Se None, usa quello attuale.
 
         Returns:
             Nome del modello per Hugging Face.
@@ -235,6 +339,25 @@ class ASRModelManager:
         """
         return self.get_wav2vec2_model_info(model_key)["name"]
 
+    def get_wav2vec2_variant_name(self, model_key: Optional[str] = None) -> str:
+        """
+        Ottieni il nome della variante di un modello Wav2Vec2 nella sua precisione.
+
+        È il nome con cui la variante è condivisa nel registro dei modelli e
+        salvata come snapshot.
+
+        Args:
+            model_key: Chiave del modello, eventualmente con precisione. Se None, usa quello attuale.
+
+        Returns:
+            Nome Hugging Face in fp32, altrimenti "nome@precisione".
+
+        Raises:
+            KeyError: Se il modello non esiste.
+        """
+        info = self.get_wav2vec2_model_info(model_key)
+        return get_variant_name(info["name"], info["precision"])
+
     def get_whisper_model_name(self, model_size: Optional[ModelSize] = None) -> str:
         """
         Ottieni il nome di un modello Whisper.
@@ -248,4 +371,148 @@ class ASRModelManager:
         Raises:
             KeyError: Se il modello non esiste.
         """
-        return self.get_whisper_model_info(model_size)["name"]
\ No newline at end of file
+        return self.get_whisper_model_info(model_size)["name"]
+
+    def get_whisper_variant_name(
+        self,
+        model_size: Optional[ModelSize] = None,
+        precision: Optional[str] = None
+    ) -> str:
+        """
+        Ottieni il nome della variante di un modello Whisper nella sua precisione.
+
+        Args:
+            model_size: Dimensione del modello. Se None, usa quello attuale.
+            precision: Precisione del modello. Se None, come in get_whisper_model_info.
+
+        Returns:
+            Nome del modello in fp32, altrimenti "nome@precisione".
+
+        Raises:
+            KeyError: Se il modello non esiste o la precisione non è supportata.
+        """
+        info = self.get_whisper_model_info(model_size, precision)
+        return get_variant_name(info["name"], info["precision"])
+
+    def acquire_model(self, engine: str, model_name: str, loader: Callable[[], Dict[str, Any]]) -> ModelHandle:
+        """
+        Ottieni un handle condiviso a un modello caricato.
+
+        Args:
+            engine: Motore ASR ("wav2vec2" o "whisper").
+            model_name: Nome del checkpoint.
+            loader: Funzione che carica il modello se non è già in memoria.
+
+        Returns:
+            Handle con conteggio dei riferimenti; va rilasciato quando non serve più.
+
+        Raises:
+            Exception: Se il caricamento del modello fallisce.
+        """
+        return self._registry.acquire(engine, model_name, loader)
+
+    def get_loaded_models_status(self) -> Dict[str, Any]:
+        """
+        Ottieni i modelli in memoria con la loro memoria residente.
+
+        Returns:
+            Stato del registro dei modelli.
+        """
+        return self._registry.status()
+
+    def load_model_components(
+        self,
+        engine: str,
+        model_name: str,
+        device: str,
+        loader: Callable[[str], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Carica un modello dal suo snapshot, se disponibile, altrimenti dalla sorgente.
+
+        Gli snapshot si creano con la CLI di app.models.model_snapshot; con
+        MODEL_SNAPSHOT_AUTO_BUILD attivo lo snapshot viene creato anche dopo un
+        caricamento dalla sorgente, in un thread in background, così la
+        richiesta che ha causato il caricamento non attende la scrittura su
+        disco. Uno snapshot non valido non blocca il caricamento.
+
+        Una variante di precisione (es. "nome@int8") viene costruita dal
+        modello fp32 e, con gli snapshot attivi, salvata sempre: la conversione
+        avviene una volta sola e i caricamenti successivi non passano dal fp32.
+        La variante "onnx" viene esportata dal modello fp32 alla prima
+        richiesta e poi caricata dall'export (app.models.model_onnx).
+
+        Args:
+            engine: Motore ASR ("wav2vec2" o "whisper").
+            model_name: Nome del checkpoint, eventualmente con precisione.
+            device: Device di destinazione del modello.
+            loader: Funzione che carica dalla sorgente originale il modello fp32 con il nome dato.
+
+        Returns:
+            Componenti del modello caricato.
+
+        Raises:
+            Exception: Se il caricamento dalla sorgente fallisce.
+        """
+        base_name, precision = split_variant_name(model_name)
+        if precision == ONNX_VARIANT:
+            # L'export ONNX è la cache su disco della variante, anche con gli snapshot disattivati
+            return load_onnx_variant(
+                model_name, lambda: self._load_snapshot(engine, base_name, device) or loader(base_name)
+            )
+
+        components = self._load_snapshot(engine, model_name, device)
+        if components is not None:
+            return components
+
+        if base_name != model_name:
+            # Il modello fp32 viene convertito sul posto: niente snapshot in background del fp32
+            components = self._load_snapshot(engine, base_name, device) or loader(base_name)
+            print(f"Building {precision} variant of {engine} model '{base_name}'")
+            components = build_precision_variant(engine, components, precision)
+            build_snapshot = settings.MODEL_SNAPSHOTS_ENABLED
+        else:
+            components = loader(model_name)
+            build_snapshot = settings.MODEL_SNAPSHOTS_ENABLED and settings.MODEL_SNAPSHOT_AUTO_BUILD
+        if build_snapshot:
+            threading.Thread(
+                target=self._save_snapshot_in_background,
+                args=(engine, model_name, components),
+                name=f"snapshot-{engine}",
+                daemon=True
+            ).start()
+        return components
+
+    def _load_snapshot(self, engine: str, model_name: str, device: str) -> Optional[Dict[str, Any]]:
+        """
+        Carica un modello dal suo snapshot, se gli snapshot sono attivi e lo snapshot esiste.
+
+        Args:
+            engine: Motore ASR.
+            model_name: Nome del checkpoint.
+            device: Device di destinazione del modello.
+
+        Returns:
+            Componenti del modello, oppure None se lo snapshot manca o non è valido.
+        """
+        if settings.MODEL_SNAPSHOTS_ENABLED and has_snapshot(engine, model_name):
+            try:
+                components = load_snapshot(engine, model_name, device)
+                return prepare_precision_variant(engine, components, split_variant_name(model_name)[1])
+            except Exception as e:
+                print(f"Snapshot load failed for {engine} model '{model_name}', falling back: {e}")
+        return None
+
+    def _save_snapshot_in_background(self, engine: str, model_name: str, components: Dict[str, Any]) -> None:
+        """
+        Crea lo snapshot di un modello appena caricato dalla sorgente.
+
+        Args:
+            engine: Motore ASR.
+            model_name: Nome del checkpoint.
+            components: Componenti del modello caricato.
+        """
+        try:
+            save_snapshot(engine, model_name, components)
+        except Exception as e:
+            print(f"Snapshot save failed for {engine} model '{model_name}': {e}")
\ No newline at end of file
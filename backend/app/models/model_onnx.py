@@ -0,0 +1,265 @@
+"""
+Esecuzione dei modelli Wav2Vec2 con ONNX Runtime.
+
+La variante "onnx" di un modello Wav2Vec2 (es. "facebook@onnx") viene
+esportata in ONNX una volta sola, a partire dal modello fp32, con assi
+dinamici per batch e numero di campioni; l'export è salvato su disco nella
+cartella degli snapshot insieme a configurazione e processor, così i
+caricamenti successivi non passano da PyTorch. Al caricamento ONNX Runtime
+applica le ottimizzazioni del grafo (fusione di operatori, eliminazione dei
+nodi costanti, kernel specifici per la CPU) secondo ONNX_GRAPH_OPTIMIZATION.
+
+Il modello eseguito da ONNX Runtime espone la stessa interfaccia usata dal
+servizio Wav2Vec2 (chiamata con input_values/attention_mask, .logits, config
+e _get_feat_extract_output_lengths): batching, chunking, streaming e cache
+funzionano senza modifiche. L'esecuzione avviene sempre su CPU.
+
+ONNX Runtime (e il pacchetto onnx, usato dall'export) sono dipendenze
+opzionali: senza, la variante "onnx" non è disponibile.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import torch
+
+from app.config import settings
+from app.models.model_snapshot import get_snapshot_dir
+
+try:
+    import onnxruntime as ort
+except ImportError:  # ONNX Runtime è opzionale: senza, la variante "onnx" non è disponibile
+    ort = None
+
+ONNX_VARIANT = "onnx"
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_OPSET_VERSION = 17
+# Durata dell'audio sintetico usato per tracciare il grafo (gli assi restano dinamici)
+EXPORT_SAMPLE_S = 1.0
+
+
+def is_onnx_runtime_available() -> bool:
+    """True se ONNX Runtime è installato."""
+    return ort is not None
+
+
+def _graph_optimization_level() -> Any:
+    """
+    Converti ONNX_GRAPH_OPTIMIZATION nel livello di ottimizzazione di ONNX Runtime.
+
+    Raises:
+        ValueError: Se il livello configurato non è valido.
+    """
+    levels = {
+        "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+        "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    }
+    if settings.ONNX_GRAPH_OPTIMIZATION not in levels:
+        raise ValueError(f"ONNX_GRAPH_OPTIMIZATION non valido: '{settings.ONNX_GRAPH_OPTIMIZATION}'")
+    return levels[settings.ONNX_GRAPH_OPTIMIZATION]
+
+
+class LogitsOnly(torch.nn.Module):
+    """Wav2Vec2ForCTC che restituisce solo i logits, come tensore, per export e compilazione."""
+
+    def __init__(self, model: torch.nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_values: torch.Tensor, attention_mask: Optional[torch.Tensor] = None) -> torch.Tensor:
+        return self.model(input_values, attention_mask=attention_mask).logits
+
+
+class OnnxWav2Vec2ForCTC:
+    """
+    Wav2Vec2ForCTC eseguito da una sessione ONNX Runtime.
+
+    Riceve e restituisce tensori torch come il modello originale; la sessione
+    usa i thread di torch del processo al momento del caricamento (quindi
+    INFERENCE_TORCH_THREADS, l'autotuning e gli slot CPU).
+    """
+
+    def __init__(self, model_path: Path, config: Any):
+        """
+        Crea la sessione di inferenza.
+
+        Args:
+            model_path: File ONNX esportato.
+            config: Wav2Vec2Config del modello.
+        """
+        options = ort.SessionOptions()
+        options.graph_optimization_level = _graph_optimization_level()
+        options.intra_op_num_threads = torch.get_num_threads()
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self.config = config
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        # Stima della memoria per il ModelRegistry: i pesi del grafo
+        self.memory_bytes = model_path.stat().st_size
+
+    def __call__(self, input_values: torch.Tensor, attention_mask: Optional[torch.Tensor] = None) -> Any:
+        """
+        Esegui il forward pass.
+
+        Args:
+            input_values: Audio normalizzato (batch, campioni).
+            attention_mask: Maschera dei campioni validi, se il modello la supporta.
+
+        Returns:
+            CausalLMOutput con i logits (batch, frame, vocabolario) su CPU.
+        """
+        from transformers.modeling_outputs import CausalLMOutput
+
+        feeds = {"input_values": input_values.detach().cpu().numpy().astype(np.float32)}
+        if "attention_mask" in self.input_names:
+            if attention_mask is None:
+                attention_mask = torch.ones(input_values.shape, dtype=torch.long)
+            feeds["attention_mask"] = attention_mask.detach().cpu().numpy().astype(np.int64)
+        logits = self.session.run(["logits"], feeds)[0]
+        return CausalLMOutput(logits=torch.from_numpy(logits))
+
+    def _get_feat_extract_output_lengths(self, input_lengths: torch.Tensor) -> torch.Tensor:
+        """
+        Calcola il numero di frame prodotti dall'estrattore convoluzionale.
+
+        Args:
+            input_lengths: Lunghezze degli audio in campioni.
+
+        Returns:
+            Lunghezze in frame dei logits.
+        """
+        for kernel, stride in zip(self.config.conv_kernel, self.config.conv_stride):
+            input_lengths = torch.div(input_lengths - kernel, stride, rounding_mode="floor") + 1
+        return input_lengths
+
+
+def get_onnx_export_dir(model_name: str) -> Path:
+    """
+    Ottieni la cartella dell'export ONNX di un modello Wav2Vec2.
+
+    Args:
+        model_name: Nome della variante (es. "facebook/wav2vec2-large-xlsr-53-italian@onnx").
+
+    Returns:
+        Percorso della cartella, accanto agli snapshot.
+    """
+    return get_snapshot_dir("wav2vec2", model_name)
+
+
+def has_onnx_export(model_name: str) -> bool:
+    """
+    Verifica se esiste l'export ONNX di un modello Wav2Vec2.
+
+    Args:
+        model_name: Nome della variante.
+
+    Returns:
+        True se il file ONNX esiste.
+    """
+    return (get_onnx_export_dir(model_name) / ONNX_MODEL_FILE).is_file()
+
+
+def export_wav2vec2_onnx(components: Dict[str, Any], export_dir: Path) -> Path:
+    """
+    Esporta un modello Wav2Vec2 fp32 in ONNX con assi dinamici.
+
+    Il grafo viene scritto in una cartella temporanea e spostato al suo posto
+    solo a scrittura completata, come gli snapshot. L'attention mask è un
+    input del grafo solo se il processor la restituisce.
+
+    Args:
+        components: Componenti del modello fp32 ("processor" e "model").
+        export_dir: Cartella di destinazione.
+
+    Returns:
+        Cartella dell'export.
+
+    Raises:
+        Exception: Se l'export fallisce.
+    """
+    start = time.perf_counter()
+    model, processor = components["model"], components["processor"]
+    device = next(model.parameters()).device
+    inputs = {"input_values": torch.zeros(1, int(EXPORT_SAMPLE_S * 16000), device=device)}
+    if processor.feature_extractor.return_attention_mask:
+        inputs["attention_mask"] = torch.ones(1, int(EXPORT_SAMPLE_S * 16000), dtype=torch.long, device=device)
+    dynamic_axes = {name: {0: "batch", 1: "samples"} for name in inputs}
+    dynamic_axes["logits"] = {0: "batch", 1: "frames"}
+
+    export_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f".{export_dir.name}.", dir=export_dir.parent))
+    try:
+        tmp_dir.chmod(0o755)
+        with torch.no_grad():
+            torch.onnx.export(
+                LogitsOnly(model).eval(),
+                tuple(inputs.values()),
+                str(tmp_dir / ONNX_MODEL_FILE),
+                input_names=list(inputs),
+                output_names=["logits"],
+                dynamic_axes=dynamic_axes,
+                opset_version=ONNX_OPSET_VERSION,
+                dynamo=False
+            )
+        model.config.save_pretrained(str(tmp_dir))
+        processor.save_pretrained(str(tmp_dir))
+
+        if export_dir.exists():
+            shutil.rmtree(export_dir)
+        os.replace(tmp_dir, export_dir)
+    except Exception as e:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise Exception(f"Errore nell'export ONNX del modello Wav2Vec2: {str(e)}")
+    print(f"Exported wav2vec2 model to ONNX in {export_dir} in {time.perf_counter() - start:.2f}s")
+    return export_dir
+
+
+def load_onnx_components(export_dir: Path) -> Dict[str, Any]:
+    """
+    Carica processor e modello ONNX da un export.
+
+    Args:
+        export_dir: Cartella dell'export.
+
+    Returns:
+        Dizionario con "processor" e "model", nel formato del caricamento originale.
+    """
+    from transformers import Wav2Vec2Config, Wav2Vec2Processor
+
+    start = time.perf_counter()
+    components = {
+        "processor": Wav2Vec2Processor.from_pretrained(str(export_dir)),
+        "model": OnnxWav2Vec2ForCTC(export_dir / ONNX_MODEL_FILE, Wav2Vec2Config.from_pretrained(str(export_dir)))
+    }
+    print(f"Loaded ONNX Runtime session from {export_dir} in {time.perf_counter() - start:.2f}s")
+    return components
+
+
+def load_onnx_variant(model_name: str, load_base: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Carica la variante ONNX di un modello Wav2Vec2, esportandola se manca.
+
+    Args:
+        model_name: Nome della variante (es. "facebook/wav2vec2-large-xlsr-53-italian@onnx").
+        load_base: Funzione che carica i componenti del modello fp32, usata solo per l'export.
+
+    Returns:
+        Componenti della variante.
+
+    Raises:
+        RuntimeError: Se ONNX Runtime non è installato.
+    """
+    if not is_onnx_runtime_available():
+        raise RuntimeError("ONNX Runtime non installato: pip install onnxruntime onnx")
+    export_dir = get_onnx_export_dir(model_name)
+    if not has_onnx_export(model_name):
+        print(f"Exporting wav2vec2 model '{model_name}' to ONNX")
+        export_wav2vec2_onnx(load_base(), export_dir)
+    return load_onnx_components(export_dir)
@@ -0,0 +1,195 @@
+"""
+Varianti di precisione dei modelli ASR.
+
+Una variante è identificata dal nome del checkpoint seguito dalla precisione
+(es. "facebook/wav2vec2-large-xlsr-53-italian@int8"); senza suffisso il modello
+è in fp32. Le varianti vengono costruite a partire dal modello fp32 e, come
+ogni modello, condivise dal ModelRegistry e salvate come snapshot
+(app.models.model_snapshot), così la conversione avviene una volta sola.
+
+Precisioni supportate:
+    - "fp32": modello originale.
+    - "int8": quantizzazione dinamica int8 dei layer lineari (solo CPU): i
+      pesi sono salvati in int8, le attivazioni vengono quantizzate a ogni
+      forward pass.
+    - "bf16" (solo Whisper): pesi e attivazioni in bfloat16, con i LayerNorm
+      in fp32. Il decoding di Whisper lavora comunque con fp16=False: encoder
+      e decoder convertono in bfloat16 i propri input e l'encoder restituisce
+      le feature in fp32, come si aspetta whisper.decoding.
+    - "onnx" (solo Wav2Vec2): modello fp32 esportato in ONNX ed eseguito con
+      ONNX Runtime (app.models.model_onnx). Non è una precisione ma un
+      runtime: l'export sostituisce lo snapshot.
+"""
+
+from typing import Any, Dict, Tuple
+
+import torch
+
+DEFAULT_PRECISION = "fp32"
+VARIANT_SEPARATOR = "@"
+
+# Precisioni disponibili per motore
+MODEL_PRECISIONS = {
+    "wav2vec2": ("fp32", "int8", "onnx"),
+    "whisper": ("fp32", "int8", "bf16")
+}
+
+# Varianti eseguite fuori da PyTorch: variante -> runtime
+RUNTIME_VARIANTS = {
+    "onnx": "onnxruntime"
+}
+
+
+def get_variant_backend(precision: str) -> str:
+    """
+    Ottieni il runtime che esegue una variante.
+
+    Args:
+        precision: Precisione della variante (es. "int8", "onnx").
+
+    Returns:
+        "torch", oppure il runtime della variante (es. "onnxruntime").
+    """
+    return RUNTIME_VARIANTS.get(precision, "torch")
+
+
+def split_variant_name(name: str) -> Tuple[str, str]:
+    """
+    Separa il nome di una variante nel nome base e nella precisione.
+
+    Args:
+        name: Nome della variante (es. "facebook@int8") o del modello base.
+
+    Returns:
+        Tupla contenente (nome base, precisione).
+    """
+    base, separator, precision = name.rpartition(VARIANT_SEPARATOR)
+    if not separator:
+        return name, DEFAULT_PRECISION
+    return base, precision
+
+
+def get_variant_name(name: str, precision: str) -> str:
+    """
+    Costruisci il nome della variante di un modello.
+
+    Args:
+        name: Nome del modello base.
+        precision: Precisione della variante.
+
+    Returns:
+        Il nome base in fp32, altrimenti "nome@precisione".
+    """
+    return name if precision == DEFAULT_PRECISION else f"{name}{VARIANT_SEPARATOR}{precision}"
+
+
+def quantize_dynamic_int8(model: torch.nn.Module) -> torch.nn.Module:
+    """
+    Quantizza dinamicamente in int8 i layer lineari di un modello.
+
+    La conversione avviene sul posto: il modello fp32 non è più utilizzabile.
+
+    Args:
+        model: Modello fp32 su CPU.
+
+    Returns:
+        Il modello con i torch.nn.Linear sostituiti dalle versioni quantizzate.
+
+    Raises:
+        ValueError: Se il modello non è su CPU.
+    """
+    if next(model.parameters()).device.type != "cpu":
+        raise ValueError("La quantizzazione dinamica int8 è supportata solo su CPU")
+    for module in model.modules():
+        # quantize_dynamic converte solo i torch.nn.Linear esatti (es. non whisper.model.Linear,
+        # che in fp32 si comporta allo stesso modo)
+        if isinstance(module, torch.nn.Linear) and type(module) is not torch.nn.Linear:
+            module.__class__ = torch.nn.Linear
+    quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    quantized.eval()
+    return quantized
+
+
+def _inputs_to_bfloat16(module: torch.nn.Module, args: Tuple[Any, ...]) -> Tuple[Any, ...]:
+    """Forward pre-hook: converte in bfloat16 gli input in virgola mobile del modulo."""
+    return tuple(
+        arg.to(torch.bfloat16) if torch.is_tensor(arg) and arg.is_floating_point() else arg
+        for arg in args
+    )
+
+
+def _output_to_float32(module: torch.nn.Module, args: Tuple[Any, ...], output: torch.Tensor) -> torch.Tensor:
+    """Forward hook: restituisce l'output del modulo in fp32."""
+    return output.float()
+
+
+def convert_whisper_to_bfloat16(model: torch.nn.Module) -> torch.nn.Module:
+    """
+    Converti un modello Whisper in bfloat16, sul posto.
+
+    I layer di Whisper eseguono i calcoli nel dtype dell'input: senza
+    conversione degli input i pesi bfloat16 verrebbero riconvertiti in fp32 a
+    ogni chiamata. I LayerNorm restano in fp32 (calcolano già in fp32 e su CPU
+    non accettano parametri bfloat16 con input fp32).
+
+    Args:
+        model: Modello Whisper fp32.
+
+    Returns:
+        Il modello convertito.
+    """
+    model.to(torch.bfloat16)
+    for module in model.modules():
+        if isinstance(module, torch.nn.LayerNorm):
+            module.float()
+    prepare_precision_variant("whisper", {"model": model}, "bf16")
+    return model
+
+
+def prepare_precision_variant(engine: str, components: Dict[str, Any], precision: str) -> Dict[str, Any]:
+    """
+    Prepara all'inferenza una variante caricata, ripristinando lo stato non salvato negli snapshot.
+
+    Gli hook di conversione degli input dei modelli Whisper in bfloat16 non
+    fanno parte dei tensori del modello e vanno registrati a ogni caricamento.
+
+    Args:
+        engine: Motore ASR ("wav2vec2" o "whisper").
+        components: Componenti della variante.
+        precision: Precisione della variante.
+
+    Returns:
+        Gli stessi componenti.
+    """
+    if engine == "whisper" and precision == "bf16":
+        model = components["model"]
+        model.encoder.register_forward_pre_hook(_inputs_to_bfloat16)
+        model.encoder.register_forward_hook(_output_to_float32)
+        model.decoder.register_forward_pre_hook(_inputs_to_bfloat16)
+    return components
+
+
+def build_precision_variant(engine: str, components: Dict[str, Any], precision: str) -> Dict[str, Any]:
+    """
+    Converti i componenti di un modello fp32 nella precisione richiesta.
+
+    Args:
+        engine: Motore ASR ("wav2vec2" o "whisper").
+        components: Componenti del modello fp32 ("model" ed eventualmente "processor").
+        precision: Precisione della variante.
+
+    Returns:
+        Componenti della variante (il modello fp32 viene convertito sul posto).
+
+    Raises:
+        ValueError: Se la precisione non è supportata dal motore o è una variante di runtime.
+    """
+    if precision not in MODEL_PRECISIONS.get(engine, ()):
+        raise ValueError(f"Precisione '{precision}' non supportata per {engine}")
+    if precision in RUNTIME_VARIANTS:
+        raise ValueError(f"La variante '{precision}' non si costruisce in PyTorch")
+    if precision == "int8":
+        components = {**components, "model": quantize_dynamic_int8(components["model"])}
+    elif precision == "bf16":
+        components = {**components, "model": convert_whisper_to_bfloat16(components["model"])}
+    return components
@@ -0,0 +1,415 @@
+"""
+Registro dei modelli caricati, condiviso da tutto il processo.
+
+Ogni coppia (motore, checkpoint) viene caricata una sola volta: i servizi
+ottengono un handle con conteggio dei riferimenti e lo rilasciano quando non
+serve più. Un modello senza riferimenti resta residente (inattivo) finché non
+viene scaricato per rispettare il budget di memoria MODEL_MEMORY_BUDGET_MB
+(prima i meno usati di recente) oppure perché inattivo da più di
+MODEL_IDLE_TIMEOUT_S secondi. I modelli con riferimenti attivi non vengono mai
+scaricati.
+"""
+
+import gc
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import torch
+from torch.ao.nn.quantized.dynamic import Linear as DynamicQuantizedLinear
+
+from app.config import settings
+from app.utils.telemetry import TelemetryRegistry
+
+# Componenti di un modello caricato (es. {"model": ..., "processor": ...})
+ModelComponents = Dict[str, Any]
+ModelKey = Tuple[str, str]
+
+
+def estimate_model_memory(components: ModelComponents) -> int:
+    """
+    Stima la memoria residente di un modello dai tensori di parametri e buffer.
+
+    I tensori condivisi tra più moduli (es. pesi legati) vengono contati una
+    volta; dei tensori sparsi (es. alignment_heads di Whisper) si contano
+    indici e valori, dei layer lineari quantizzati i pesi int8 e il bias. I
+    componenti eseguiti fuori da PyTorch (es. sessioni ONNX Runtime) dichiarano
+    la propria memoria in memory_bytes.
+
+    Args:
+        components: Componenti del modello caricato.
+
+    Returns:
+        Numero di bytes occupati dai tensori.
+    """
+    seen = set()
+    total = 0
+    for component in components.values():
+        if not isinstance(component, torch.nn.Module):
+            total += getattr(component, "memory_bytes", 0)
+            continue
+        for tensor in list(component.parameters()) + list(component.buffers()):
+            if tensor.is_sparse:
+                for part in (tensor._indices(), tensor._values()):
+                    total += part.numel() * part.element_size()
+                continue
+            storage = tensor.untyped_storage()
+            if storage.data_ptr() in seen:
+                continue
+            seen.add(storage.data_ptr())
+            total += storage.nbytes()
+        # I pesi dei layer quantizzati dinamicamente non sono parametri né buffer
+        for module in component.modules():
+            if isinstance(module, DynamicQuantizedLinear):
+                weight, bias = module._weight_bias()
+                total += weight.numel() * weight.element_size()
+                total += bias.numel() * bias.element_size() if bias is not None else 0
+    return total
+
+
+def get_process_rss() -> Optional[int]:
+    """
+    Leggi la memoria residente (RSS) del processo corrente.
+
+    Returns:
+        RSS in bytes, oppure None se non disponibile sulla piattaforma.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _RegistryEntry:
+    """Modello caricato nel registro con il suo conteggio dei riferimenti."""
+
+    def __init__(self, engine: str, name: str):
+        self.engine = engine
+        self.name = name
+        self.components: Optional[ModelComponents] = None
+        self.refcount = 0
+        # Inferenze in corso sul modello (gli handle tenuti dai servizi non contano)
+        self.inflight = 0
+        self.memory_bytes = 0
+        self.load_time = 0.0
+        self.loaded_at = 0.0
+        self.last_used = 0.0
+        # Serializza il caricamento dello stesso modello senza bloccare gli altri
+        self.load_lock = threading.Lock()
+
+
+class ModelHandle:
+    """
+    Riferimento a un modello del registro.
+
+    I componenti sono accessibili come attributi (handle.model,
+    handle.processor). L'handle va rilasciato con release(), oppure usato come
+    context manager.
+    """
+
+    def __init__(self, registry: "ModelRegistry", entry: _RegistryEntry):
+        self._registry = registry
+        self._entry = entry
+        self._released = False
+
+    @property
+    def engine(self) -> str:
+        """Motore ASR del modello."""
+        return self._entry.engine
+
+    @property
+    def name(self) -> str:
+        """Nome del checkpoint."""
+        return self._entry.name
+
+    def __getattr__(self, component: str) -> Any:
+        components = self._entry.components or {}
+        if component not in components:
+            raise AttributeError(component)
+        return components[component]
+
+    @contextmanager
+    def inference(self) -> Iterator["ModelHandle"]:
+        """
+        Segna il modello come in uso da un'inferenza per la durata del blocco.
+
+        A differenza del conteggio dei riferimenti, il numero di inferenze in
+        corso non include gli handle tenuti a lungo dai servizi (modello
+        attuale), ed è quello atteso durante il drain di un cambio di modello.
+
+        Yields:
+            L'handle stesso.
+        """
+        self._registry._begin_inference(self._entry)
+        try:
+            yield self
+        finally:
+            self._registry._end_inference(self._entry)
+
+    def release(self) -> None:
+        """Rilascia il riferimento (le chiamate successive sono ignorate)."""
+        if not self._released:
+            self._released = True
+            self._registry._release(self._entry)
+
+    def __enter__(self) -> "ModelHandle":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.release()
+
+
+class ModelRegistry:
+    """
+    Registro singleton dei modelli caricati nel processo.
+
+    Le metriche "model_registry_load" e "model_registry_reuse" contano i
+    caricamenti reali e le acquisizioni servite da un modello già in memoria;
+    "model_registry_eviction_budget" e "model_registry_eviction_idle" contano i
+    modelli scaricati per il budget di memoria e per inattività.
+    """
+
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ModelRegistry, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        """Inizializza il registro (solo una volta)."""
+        if not self._initialized:
+            self._entries: Dict[ModelKey, _RegistryEntry] = {}
+            self._lock = threading.Lock()
+            telemetry = TelemetryRegistry()
+            self._loads = telemetry.counter("model_registry_load")
+            self._reuses = telemetry.counter("model_registry_reuse")
+            self._budget_evictions = telemetry.counter("model_registry_eviction_budget")
+            self._idle_evictions = telemetry.counter("model_registry_eviction_idle")
+            ModelRegistry._initialized = True
+
+    def acquire(self, engine: str, name: str, loader: Callable[[], ModelComponents]) -> ModelHandle:
+        """
+        Ottieni un handle al modello, caricandolo se non è già in memoria.
+
+        Args:
+            engine: Motore ASR ("wav2vec2" o "whisper").
+            name: Nome del checkpoint.
+            loader: Funzione che carica il modello e ne restituisce i componenti.
+
+        Returns:
+            Handle al modello; va rilasciato quando non serve più.
+
+        Raises:
+            Exception: Se il caricamento del modello fallisce.
+        """
+        self.evict_idle()
+
+        key = (engine, name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _RegistryEntry(engine, name)
+                self._entries[key] = entry
+            # Il riferimento impedisce lo scaricamento durante il caricamento
+            entry.refcount += 1
+            entry.last_used = time.time()
+
+        try:
+            with entry.load_lock:
+                if entry.components is None:
+                    start = time.perf_counter()
+                    components = loader()
+                    entry.load_time = time.perf_counter() - start
+                    entry.memory_bytes = estimate_model_memory(components)
+                    entry.loaded_at = time.time()
+                    entry.components = components
+                    self._loads.inc()
+                    print(f"Registered {engine} model '{name}' "
+                          f"({entry.memory_bytes / 1024 ** 2:.1f} MB, {entry.load_time:.1f}s)")
+                else:
+                    self._reuses.inc()
+        except Exception:
+            self._release(entry)
+            raise
+
+        self._enforce_budget()
+        return ModelHandle(self, entry)
+
+    def _release(self, entry: _RegistryEntry) -> None:
+        """
+        Decrementa il conteggio dei riferimenti del modello.
+
+        Il modello senza riferimenti resta residente; se il caricamento era
+        fallito la voce viene rimossa.
+
+        Args:
+            entry: Voce del registro da rilasciare.
+        """
+        with self._lock:
+            entry.refcount -= 1
+            entry.last_used = time.time()
+            if entry.refcount > 0:
+                return
+            if entry.components is None and self._entries.get((entry.engine, entry.name)) is entry:
+                del self._entries[(entry.engine, entry.name)]
+        self._enforce_budget()
+
+    def _begin_inference(self, entry: _RegistryEntry) -> None:
+        """Incrementa il numero di inferenze in corso sul modello."""
+        with self._lock:
+            entry.inflight += 1
+
+    def _end_inference(self, entry: _RegistryEntry) -> None:
+        """Decrementa il numero di inferenze in corso sul modello."""
+        with self._lock:
+            entry.inflight -= 1
+            entry.last_used = time.time()
+
+    def _unload(self, entries: List[_RegistryEntry], reason: str) -> None:
+        """
+        Libera la memoria dei modelli già rimossi dal registro.
+
+        Args:
+            entries: Voci rimosse dal registro.
+            reason: Motivo dello scaricamento, per il log.
+        """
+        if not entries:
+            return
+        for entry in entries:
+            entry.components = None
+            print(f"Unloaded {entry.engine} model '{entry.name}' ({reason})")
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def _enforce_budget(self) -> None:
+        """Scarica i modelli inattivi meno usati finché la memoria non rientra nel budget."""
+        budget = settings.MODEL_MEMORY_BUDGET_MB * 1024 ** 2
+        evicted = []
+        with self._lock:
+            loaded = [entry for entry in self._entries.values() if entry.components is not None]
+            total = sum(entry.memory_bytes for entry in loaded)
+            idle = sorted((entry for entry in loaded if entry.refcount == 0), key=lambda entry: entry.last_used)
+            for entry in idle:
+                if total <= budget:
+                    break
+                del self._entries[(entry.engine, entry.name)]
+                total -= entry.memory_bytes
+                evicted.append(entry)
+            if total > budget:
+                print(f"Model memory {total / 1024 ** 2:.1f} MB exceeds budget "
+                      f"({settings.MODEL_MEMORY_BUDGET_MB:.1f} MB) with all models in use")
+        self._budget_evictions.inc(len(evicted))
+        self._unload(evicted, "memory budget")
+
+    def evict_idle(self) -> List[str]:
+        """
+        Scarica i modelli inattivi da più di MODEL_IDLE_TIMEOUT_S secondi.
+
+        Returns:
+            Nomi dei modelli scaricati.
+        """
+        if settings.MODEL_IDLE_TIMEOUT_S <= 0:
+            return []
+        deadline = time.time() - settings.MODEL_IDLE_TIMEOUT_S
+        with self._lock:
+            evicted = [
+                entry for entry in self._entries.values()
+                if entry.components is not None and entry.refcount == 0 and entry.last_used < deadline
+            ]
+            for entry in evicted:
+                del self._entries[(entry.engine, entry.name)]
+        self._idle_evictions.inc(len(evicted))
+        self._unload(evicted, "idle")
+        return [entry.name for entry in evicted]
+
+    def is_loaded(self, engine: str, name: str) -> bool:
+        """
+        Verifica se un modello è in memoria.
+
+        Args:
+            engine: Motore ASR.
+            name: Nome del checkpoint.
+
+        Returns:
+            True se il modello è caricato.
+        """
+        with self._lock:
+            entry = self._entries.get((engine, name))
+            return entry is not None and entry.components is not None
+
+    def get_refcount(self, engine: str, name: str) -> int:
+        """
+        Ottieni il numero di riferimenti attivi a un modello.
+
+        Args:
+            engine: Motore ASR.
+            name: Nome del checkpoint.
+
+        Returns:
+            Numero di handle non rilasciati (0 se il modello non è nel registro).
+        """
+        with self._lock:
+            entry = self._entries.get((engine, name))
+            return entry.refcount if entry is not None else 0
+
+    def get_inflight(self, engine: str, name: str) -> int:
+        """
+        Ottieni il numero di inferenze in corso su un modello.
+
+        Args:
+            engine: Motore ASR.
+            name: Nome del checkpoint.
+
+        Returns:
+            Numero di inferenze in corso (0 se il modello non è nel registro).
+        """
+        with self._lock:
+            entry = self._entries.get((engine, name))
+            return entry.inflight if entry is not None else 0
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Ottieni lo stato dei modelli in memoria.
+
+        Returns:
+            Dizionario con i modelli caricati (riferimenti, memoria residente
+            stimata in MB, ultimo utilizzo, statistiche dei grafi compilati per i
+            modelli eseguiti con WAV2VEC2_COMPILE_MODE), il totale, il budget e la
+            RSS del processo.
+        """
+        with self._lock:
+            entries = [entry for entry in self._entries.values() if entry.components is not None]
+            models: List[Dict[str, Any]] = [
+                {
+                    "engine": entry.engine,
+                    "name": entry.name,
+                    "refcount": entry.refcount,
+                    "inflight": entry.inflight,
+                    "idle": entry.refcount == 0,
+                    "memory_mb": round(entry.memory_bytes / 1024 ** 2, 1),
+                    "load_time_s": round(entry.load_time, 2),
+                    "loaded_at": entry.loaded_at,
+                    "last_used": entry.last_used
+                }
+                for entry in entries
+            ]
+        for model, entry in zip(models, entries):
+            # Il modello può essere stato scaricato nel frattempo
+            compile_stats = getattr((entry.components or {}).get("model"), "compile_stats", None)
+            if compile_stats is not None:
+                model["compiled"] = compile_stats()
+        rss = get_process_rss()
+        return {
+            "models": models,
+            "total_memory_mb": round(sum(entry.memory_bytes for entry in entries) / 1024 ** 2, 1),
+            "memory_budget_mb": settings.MODEL_MEMORY_BUDGET_MB,
+            "idle_timeout_s": settings.MODEL_IDLE_TIMEOUT_S,
+            "process_rss_mb": round(rss / 1024 ** 2, 1) if rss is not None else None
+        }
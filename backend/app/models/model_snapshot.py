@@ -0,0 +1,476 @@
+"""
+Snapshot dei modelli per avvii a freddo rapidi.
+
+Wav2Vec2ForCTC.from_pretrained e whisper.load_model ricostruiscono il modello,
+ne inizializzano i pesi e poi li sovrascrivono copiandoli dal checkpoint a ogni
+avvio del processo. Uno snapshot salva una volta sola i tensori del modello in
+formato safetensors (più la configurazione necessaria a ricostruirlo): al
+caricamento il modello viene creato con i parametri sul device "meta" (senza
+allocazioni né inizializzazione) e i tensori del file, mappati in memoria,
+vengono assegnati direttamente ai moduli. Le pagine vengono lette dal disco solo
+al primo utilizzo e, tra più worker, condivise tramite la page cache del sistema.
+
+Anche le varianti quantizzate (app.models.model_precision) hanno il proprio
+snapshot: dei layer lineari quantizzati dinamicamente vengono salvati i pesi
+int8 con scala e zero point, e al caricamento i moduli vengono ricreati già
+quantizzati senza passare dal modello fp32.
+
+Uso da riga di comando (dalla cartella backend):
+
+    python -m app.models.model_snapshot build wav2vec2 whisper:small
+    python -m app.models.model_snapshot build wav2vec2:facebook@onnx  # export ONNX
+    python -m app.models.model_snapshot list
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import torch
+from safetensors import safe_open
+from safetensors.torch import load_file, save_file
+
+from app.config import settings
+from app.models.model_precision import build_precision_variant, split_variant_name
+
+SNAPSHOT_FORMAT_VERSION = "1"
+SNAPSHOT_WEIGHTS_FILE = "model.safetensors"
+# Prefisso dei buffer non persistenti (esclusi da state_dict) salvati nello snapshot
+BUFFER_PREFIX = "__buffer__."
+# Prefisso dei pesi dei layer lineari quantizzati dinamicamente
+QUANTIZED_PREFIX = "__qlinear__."
+
+
+def get_snapshot_root() -> Path:
+    """
+    Ottieni la cartella radice degli snapshot.
+
+    Returns:
+        MODEL_SNAPSHOT_DIR, oppure una cartella nella directory temporanea di sistema.
+    """
+    return Path(settings.MODEL_SNAPSHOT_DIR or os.path.join(tempfile.gettempdir(), "speech-to-text-snapshots"))
+
+
+def get_snapshot_dir(engine: str, model_name: str) -> Path:
+    """
+    Ottieni la cartella dello snapshot di un modello.
+
+    Args:
+        engine: Motore ASR ("wav2vec2" o "whisper").
+        model_name: Nome del checkpoint (es. "facebook/wav2vec2-large-xlsr-53-italian").
+
+    Returns:
+        Percorso della cartella dello snapshot.
+    """
+    safe_name = model_name.strip("/").replace("/", "--")
+    return get_snapshot_root() / engine / safe_name
+
+
+def has_snapshot(engine: str, model_name: str) -> bool:
+    """
+    Verifica se esiste uno snapshot completo e compatibile per il modello.
+
+    Args:
+        engine: Motore ASR.
+        model_name: Nome del checkpoint.
+
+    Returns:
+        True se lo snapshot può essere caricato.
+    """
+    path = get_snapshot_dir(engine, model_name) / SNAPSHOT_WEIGHTS_FILE
+    if not path.is_file():
+        return False
+    try:
+        return read_snapshot_metadata(engine, model_name).get("format_version") == SNAPSHOT_FORMAT_VERSION
+    except Exception:
+        return False
+
+
+def read_snapshot_metadata(engine: str, model_name: str) -> Dict[str, str]:
+    """
+    Leggi i metadati di uno snapshot senza caricarne i tensori.
+
+    Args:
+        engine: Motore ASR.
+        model_name: Nome del checkpoint.
+
+    Returns:
+        Metadati salvati nell'intestazione del file safetensors.
+    """
+    path = get_snapshot_dir(engine, model_name) / SNAPSHOT_WEIGHTS_FILE
+    with safe_open(str(path), framework="pt") as f:
+        return f.metadata() or {}
+
+
+# Stato dei thread che stanno costruendo un modello vuoto (vedi _empty_parameters)
+_empty_init = threading.local()
+_empty_init_lock = threading.Lock()
+_empty_init_users = 0
+_register_parameter = torch.nn.Module.register_parameter
+
+
+def _register_parameter_maybe_empty(module: torch.nn.Module, name: str, param: Optional[torch.nn.Parameter]) -> None:
+    """register_parameter che sposta il parametro su "meta" solo nei thread dentro _empty_parameters."""
+    if param is not None and getattr(_empty_init, "active", False):
+        param = torch.nn.Parameter(param.to("meta"), requires_grad=param.requires_grad)
+    _register_parameter(module, name, param)
+
+
+@contextmanager
+def _empty_parameters() -> Iterator[None]:
+    """
+    Crea i parametri dei moduli sul device "meta", solo nel thread corrente.
+
+    L'inizializzazione casuale dei pesi diventa una no-op; i buffer (es.
+    maschere e embedding posizionali calcolati) vengono creati normalmente.
+    torch.nn.Module.register_parameter viene sostituito finché almeno un
+    thread costruisce un modello vuoto, ma il comportamento cambia solo per
+    i thread che hanno attivato il contesto: un caricamento dalla sorgente
+    concorrente in un altro thread crea i parametri normalmente.
+    """
+    global _empty_init_users
+    with _empty_init_lock:
+        if _empty_init_users == 0:
+            torch.nn.Module.register_parameter = _register_parameter_maybe_empty
+        _empty_init_users += 1
+    _empty_init.active = True
+    try:
+        yield
+    finally:
+        _empty_init.active = False
+        with _empty_init_lock:
+            _empty_init_users -= 1
+            if _empty_init_users == 0:
+                torch.nn.Module.register_parameter = _register_parameter
+
+
+def _collect_tensors(model: torch.nn.Module) -> Dict[str, Any]:
+    """
+    Raccogli i tensori da salvare: state_dict più i buffer non persistenti.
+
+    Args:
+        model: Modello da salvare.
+
+    Returns:
+        Dizionario con "tensors" (nome -> tensore contiguo su CPU), "aliases"
+        (nome -> nome del tensore con la stessa memoria), "sparse" (buffer da
+        riconvertire in formato sparso al caricamento) e "quantized" (nomi dei
+        layer lineari quantizzati dinamicamente).
+    """
+    quantized = _collect_quantized_linears(model)
+    # I parametri impacchettati dei layer quantizzati non sono tensori: sono sostituiti dai pesi int8
+    quantized_prefixes = tuple(f"{name}." for name in quantized["modules"])
+    state_dict = {
+        name: tensor for name, tensor in model.state_dict().items()
+        if not name.startswith(quantized_prefixes)
+    }
+    state_dict.update(quantized["tensors"])
+    for name, buffer in model.named_buffers():
+        if name not in state_dict:
+            state_dict[BUFFER_PREFIX + name] = buffer
+
+    tensors: Dict[str, torch.Tensor] = {}
+    aliases: Dict[str, str] = {}
+    sparse: List[str] = []
+    seen: Dict[Any, str] = {}
+    for name, tensor in state_dict.items():
+        if tensor.is_sparse:
+            sparse.append(name)
+            tensor = tensor.to_dense()
+        # safetensors non ammette tensori che condividono la memoria (pesi legati)
+        identity = (tensor.data_ptr(), tensor.dtype, tuple(tensor.shape), tuple(tensor.stride()))
+        if tensor.data_ptr() and identity in seen:
+            aliases[name] = seen[identity]
+            continue
+        seen[identity] = name
+        tensors[name] = tensor.detach().to("cpu").contiguous()
+    return {"tensors": tensors, "aliases": aliases, "sparse": sparse, "quantized": quantized["modules"]}
+
+
+def _collect_quantized_linears(model: torch.nn.Module) -> Dict[str, Any]:
+    """
+    Estrai pesi int8, scala, zero point e bias dei layer lineari quantizzati dinamicamente.
+
+    Args:
+        model: Modello da salvare.
+
+    Returns:
+        Dizionario con "modules" (nomi dei layer quantizzati) e "tensors"
+        (nome -> tensore, con prefisso QUANTIZED_PREFIX).
+
+    Raises:
+        ValueError: Se un layer usa una quantizzazione per canale, non supportata.
+    """
+    from torch.ao.nn.quantized.dynamic import Linear as DynamicQuantizedLinear
+
+    modules: List[str] = []
+    tensors: Dict[str, torch.Tensor] = {}
+    for name, module in model.named_modules():
+        if not isinstance(module, DynamicQuantizedLinear):
+            continue
+        weight, bias = module._weight_bias()
+        if weight.qscheme() != torch.per_tensor_affine:
+            raise ValueError(f"Quantizzazione {weight.qscheme()} non supportata negli snapshot ('{name}')")
+        prefix = f"{QUANTIZED_PREFIX}{name}."
+        tensors[prefix + "weight"] = weight.int_repr()
+        tensors[prefix + "scale"] = torch.tensor(weight.q_scale(), dtype=torch.float64)
+        tensors[prefix + "zero_point"] = torch.tensor(weight.q_zero_point(), dtype=torch.int64)
+        if bias is not None:
+            tensors[prefix + "bias"] = bias
+        modules.append(name)
+    return {"modules": modules, "tensors": tensors}
+
+
+def _restore_quantized_linears(model: torch.nn.Module, tensors: Dict[str, torch.Tensor], modules: List[str]) -> None:
+    """
+    Sostituisci i layer lineari vuoti con le versioni quantizzate salvate nello snapshot.
+
+    Args:
+        model: Modello creato sul device "meta".
+        tensors: Tensori dei layer quantizzati (con prefisso QUANTIZED_PREFIX).
+        modules: Nomi dei layer lineari quantizzati.
+    """
+    from torch.ao.nn.quantized.dynamic import Linear as DynamicQuantizedLinear
+
+    for name in modules:
+        prefix = f"{QUANTIZED_PREFIX}{name}."
+        parent_name, _, child_name = name.rpartition(".")
+        parent = model.get_submodule(parent_name)
+        linear = getattr(parent, child_name)
+        quantized = DynamicQuantizedLinear(
+            linear.in_features, linear.out_features, bias_=linear.bias is not None, dtype=torch.qint8
+        )
+        weight = torch._make_per_tensor_quantized_tensor(
+            tensors.pop(prefix + "weight"),
+            tensors.pop(prefix + "scale").item(),
+            tensors.pop(prefix + "zero_point").item()
+        )
+        quantized.set_weight_bias(weight, tensors.pop(prefix + "bias", None))
+        setattr(parent, child_name, quantized)
+
+
+def _build_wav2vec2(snapshot_dir: Path, metadata: Dict[str, str]) -> torch.nn.Module:
+    """Crea un Wav2Vec2ForCTC vuoto dalla configurazione dello snapshot."""
+    from transformers import Wav2Vec2Config, Wav2Vec2ForCTC
+
+    config = Wav2Vec2Config.from_pretrained(str(snapshot_dir))
+    return Wav2Vec2ForCTC(config)
+
+
+def _build_whisper(snapshot_dir: Path, metadata: Dict[str, str]) -> torch.nn.Module:
+    """Crea un modello Whisper vuoto dalle dimensioni salvate nei metadati."""
+    from whisper.model import ModelDimensions, Whisper
+
+    return Whisper(ModelDimensions(**json.loads(metadata["dims"])))
+
+
+# Costruttori dei moduli vuoti per motore
+MODEL_BUILDERS = {
+    "wav2vec2": _build_wav2vec2,
+    "whisper": _build_whisper
+}
+
+
+def save_snapshot(engine: str, model_name: str, components: Dict[str, Any]) -> Path:
+    """
+    Salva lo snapshot di un modello caricato.
+
+    Il file viene scritto in una cartella temporanea e spostato al suo posto solo
+    a scrittura completata, così un processo concorrente non legge mai uno
+    snapshot parziale.
+
+    Args:
+        engine: Motore ASR ("wav2vec2" o "whisper").
+        model_name: Nome del checkpoint.
+        components: Componenti del modello caricato ("model" ed eventualmente "processor").
+
+    Returns:
+        Cartella dello snapshot.
+
+    Raises:
+        ValueError: Se il motore non è supportato.
+    """
+    if engine not in MODEL_BUILDERS:
+        raise ValueError(f"Motore non supportato per gli snapshot: '{engine}'")
+
+    model = components["model"]
+    snapshot_dir = get_snapshot_dir(engine, model_name)
+    snapshot_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f".{snapshot_dir.name}.", dir=snapshot_dir.parent))
+    try:
+        # mkdtemp crea la cartella privata: lo snapshot deve essere leggibile da tutti i worker
+        tmp_dir.chmod(0o755)
+        collected = _collect_tensors(model)
+        metadata = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "engine": engine,
+            "model_name": model_name,
+            "dtype": str(next(model.parameters()).dtype),
+            "created_at": str(time.time()),
+            "aliases": json.dumps(collected["aliases"]),
+            "sparse": json.dumps(collected["sparse"]),
+            "quantized": json.dumps(collected["quantized"])
+        }
+        if engine == "wav2vec2":
+            model.config.save_pretrained(str(tmp_dir))
+            if components.get("processor") is not None:
+                components["processor"].save_pretrained(str(tmp_dir))
+        else:
+            metadata["dims"] = json.dumps(asdict(model.dims))
+        save_file(collected["tensors"], str(tmp_dir / SNAPSHOT_WEIGHTS_FILE), metadata=metadata)
+
+        if snapshot_dir.exists():
+            shutil.rmtree(snapshot_dir)
+        os.replace(tmp_dir, snapshot_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    print(f"Saved {engine} snapshot '{model_name}' to {snapshot_dir}")
+    return snapshot_dir
+
+
+def load_snapshot(engine: str, model_name: str, device: str = "cpu") -> Dict[str, Any]:
+    """
+    Carica un modello dal suo snapshot con i tensori mappati in memoria.
+
+    Args:
+        engine: Motore ASR ("wav2vec2" o "whisper").
+        model_name: Nome del checkpoint.
+        device: Device di destinazione; su CPU i pesi restano mappati dal file.
+
+    Returns:
+        Componenti del modello, nello stesso formato del caricamento originale.
+
+    Raises:
+        Exception: Se lo snapshot manca o non è valido.
+    """
+    start = time.perf_counter()
+    snapshot_dir = get_snapshot_dir(engine, model_name)
+    metadata = read_snapshot_metadata(engine, model_name)
+    if metadata.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        raise Exception(f"Versione dello snapshot non supportata in {snapshot_dir}")
+
+    tensors = load_file(str(snapshot_dir / SNAPSHOT_WEIGHTS_FILE))
+    for name, target in json.loads(metadata["aliases"]).items():
+        tensors[name] = tensors[target]
+    for name in json.loads(metadata["sparse"]):
+        tensors[name] = tensors[name].to_sparse()
+
+    with _empty_parameters():
+        model = MODEL_BUILDERS[engine](snapshot_dir, metadata)
+    buffers = {name: tensors.pop(name) for name in list(tensors) if name.startswith(BUFFER_PREFIX)}
+    quantized = json.loads(metadata.get("quantized", "[]"))
+    if quantized:
+        linears = {name: tensors.pop(name) for name in list(tensors) if name.startswith(QUANTIZED_PREFIX)}
+        # I layer quantizzati restano vuoti e vengono sostituiti subito dopo
+        result = model.load_state_dict(tensors, strict=False, assign=True)
+        expected = {f"{name}.{param}" for name in quantized for param in ("weight", "bias")}
+        if set(result.missing_keys) - expected or result.unexpected_keys:
+            raise Exception(f"Snapshot non compatibile con il modello in {snapshot_dir}")
+        _restore_quantized_linears(model, linears, quantized)
+    else:
+        model.load_state_dict(tensors, strict=True, assign=True)
+    for name, buffer in buffers.items():
+        module_name, _, buffer_name = name[len(BUFFER_PREFIX):].rpartition(".")
+        model.get_submodule(module_name).register_buffer(buffer_name, buffer, persistent=False)
+    model = model.to(device)
+    model.eval()
+
+    components: Dict[str, Any] = {"model": model}
+    if engine == "wav2vec2":
+        from transformers import Wav2Vec2Processor
+
+        components["processor"] = Wav2Vec2Processor.from_pretrained(str(snapshot_dir))
+    print(f"Loaded {engine} snapshot '{model_name}' in {time.perf_counter() - start:.2f}s")
+    return components
+
+
+def _model_names(entry: str) -> List[Tuple[str, str]]:
+    """
+    Risolvi una voce della CLI nei nomi dei checkpoint.
+
+    Args:
+        entry: "motore" (modello attuale), "motore:modello" (anche con precisione,
+            es. "wav2vec2:facebook@int8", "whisper:small@bf16") o "motore:all".
+
+    Returns:
+        Lista di tuple (motore, nome del checkpoint).
+    """
+    from app.models.model_manager import ASRModelManager
+
+    manager = ASRModelManager()
+    engine, _, model = entry.strip().partition(":")
+    engine = engine.lower()
+    if engine == "wav2vec2":
+        keys = list(manager.get_all_wav2vec2_models()) if model == "all" else [model or None]
+        return [(engine, manager.get_wav2vec2_variant_name(key)) for key in keys]
+    if engine == "whisper":
+        if model == "all":
+            return [(engine, name) for name in manager.get_all_whisper_models()]
+        if model:
+            return [(engine, manager.get_whisper_variant_name(*manager.split_whisper_checkpoint(model)))]
+        return [(engine, manager.get_whisper_variant_name())]
+    raise ValueError(f"Motore non supportato: '{entry}'")
+
+
+def main() -> None:
+    """Entry point della CLI per creare ed elencare gli snapshot."""
+    parser = argparse.ArgumentParser(description="Gestione degli snapshot dei modelli ASR")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Crea gli snapshot dei modelli")
+    build_parser.add_argument(
+        "models", nargs="+",
+        help='Modelli: "wav2vec2", "whisper", "motore:modello" (es. whisper:small, whisper:small@int8, '
+             'wav2vec2:facebook@onnx) o "motore:all"'
+    )
+    build_parser.add_argument("--force", action="store_true", help="Ricrea gli snapshot già esistenti")
+    subparsers.add_parser("list", help="Elenca gli snapshot disponibili")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        root = get_snapshot_root()
+        print(f"📁 Snapshot in {root}")
+        from app.models.model_onnx import ONNX_MODEL_FILE
+
+        paths = list(root.glob(f"*/*/{SNAPSHOT_WEIGHTS_FILE}")) + list(root.glob(f"*/*/{ONNX_MODEL_FILE}"))
+        for path in sorted(paths):
+            size_mb = path.stat().st_size / 1024 ** 2
+            print(f"  {path.parent.parent.name:<9} {path.parent.name:<60} {size_mb:>9.1f} MB")
+        return
+
+    # Import differito: i servizi caricano i modelli dalla sorgente originale
+    from app.dependencies import create_whisper_service, get_wav2vec2_service
+    from app.models.model_onnx import ONNX_VARIANT, export_wav2vec2_onnx, get_onnx_export_dir, has_onnx_export
+
+    # Gli snapshot riguardano solo i modelli PyTorch, qualunque sia WHISPER_ENGINE
+    services = {"wav2vec2": get_wav2vec2_service, "whisper": lambda: create_whisper_service("whisper")}
+    for entry in args.models:
+        for engine, model_name in _model_names(entry):
+            base_name, precision = split_variant_name(model_name)
+            # La variante ONNX ha come snapshot il proprio export
+            is_onnx = precision == ONNX_VARIANT
+            exists = has_onnx_export(model_name) if is_onnx else has_snapshot(engine, model_name)
+            if exists and not args.force:
+                print(f"⏭️  {engine} '{model_name}': snapshot già presente")
+                continue
+            print(f"📦 {engine} '{model_name}': caricamento dalla sorgente...")
+            components = services[engine]()._load_pretrained_components(base_name)
+            if is_onnx:
+                export_wav2vec2_onnx(components, get_onnx_export_dir(model_name))
+            else:
+                components = build_precision_variant(engine, components, precision)
+                save_snapshot(engine, model_name, components)
+            print(f"✅ {engine} '{model_name}': snapshot creato")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Cambio di modello in background senza interruzioni (double buffering).
+
+Il nuovo checkpoint viene caricato e riscaldato mentre il servizio continua a
+rispondere con il modello attuale; poi il modello attuale viene sostituito in
+modo atomico: le nuove richieste usano il nuovo modello, mentre quelle già in
+corso terminano sul vecchio, che viene rilasciato solo quando non ha più
+inferenze in corso (o allo scadere di MODEL_SWAP_DRAIN_TIMEOUT_S).
+
+Con i processi di inferenza dedicati (INFERENCE_EXECUTOR="workers") il
+processo API non carica il modello: il caricamento avviene nei processi
+dedicati e il cambio aggiorna solo il modello attuale di ASRModelManager.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.config import settings
+from app.models.model_registry import ModelHandle, ModelRegistry
+from app.utils.telemetry import TelemetryRegistry
+
+# Fasi di un cambio di modello, nell'ordine
+SWAP_STAGES = ["loading", "warming_up", "switching", "draining", "completed"]
+SWAP_FAILED = "failed"
+# Intervallo di controllo delle richieste ancora attive sul vecchio modello
+DRAIN_POLL_INTERVAL_S = 0.05
+
+
+class ModelSwap:
+    """Stato e avanzamento di un cambio di modello."""
+
+    def __init__(self, engine: str, previous: str, target: str, metrics_prefix: Optional[str] = None):
+        """
+        Inizializza lo stato del cambio.
+
+        Args:
+            engine: Motore ASR ("wav2vec2" o "whisper").
+            previous: Chiave del modello in uso all'avvio del cambio.
+            target: Chiave del nuovo modello.
+            metrics_prefix: Prefisso delle metriche del cambio. Se None, il motore.
+        """
+        self.engine = engine
+        self.metrics_prefix = metrics_prefix or engine
+        self.previous = previous
+        self.target = target
+        self.stage = SWAP_STAGES[0]
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.stage_durations: Dict[str, float] = {}
+        self._stage_started = time.perf_counter()
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def done(self) -> bool:
+        """True se il cambio è terminato (con successo o meno)."""
+        return self.stage in ("completed", SWAP_FAILED)
+
+    def set_stage(self, stage: str) -> None:
+        """
+        Passa alla fase successiva registrando la durata di quella corrente.
+
+        Args:
+            stage: Nuova fase.
+        """
+        now = time.perf_counter()
+        self.stage_durations[self.stage] = round(now - self._stage_started, 3)
+        self._stage_started = now
+        self.stage = stage
+        if self.done:
+            self.finished_at = time.time()
+        print(f"Model swap {self.engine} {self.previous} -> {self.target}: {stage}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Rappresentazione serializzabile del cambio.
+
+        Returns:
+            Dizionario con modelli, fase, errore e durate delle fasi.
+        """
+        return {
+            "engine": self.engine,
+            "previous_model": self.previous,
+            "target_model": self.target,
+            "stage": self.stage,
+            "error": self.error,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "stage_durations_s": dict(self.stage_durations)
+        }
+
+
+def start_model_swap(
+    swap: ModelSwap,
+    acquire: Callable[[], Awaitable[Optional[ModelHandle]]],
+    warm_up: Callable[[], Awaitable[Any]],
+    switch: Callable[[Optional[ModelHandle]], Optional[ModelHandle]]
+) -> asyncio.Task:
+    """
+    Avvia un cambio di modello in un task in background.
+
+    Gli argomenti sono quelli di run_model_swap. Un eventuale errore resta
+    nello stato del cambio e nel task.
+
+    Returns:
+        Il task del cambio, salvato anche in swap.task.
+    """
+    swap.task = asyncio.create_task(run_model_swap(swap, acquire, warm_up, switch))
+    # L'errore è già registrato nello stato: evita l'avviso di eccezione non letta
+    swap.task.add_done_callback(lambda task: task.cancelled() or task.exception())
+    return swap.task
+
+
+async def run_model_swap(
+    swap: ModelSwap,
+    acquire: Callable[[], Awaitable[Optional[ModelHandle]]],
+    warm_up: Callable[[], Awaitable[Any]],
+    switch: Callable[[Optional[ModelHandle]], Optional[ModelHandle]]
+) -> None:
+    """
+    Esegui le fasi di un cambio di modello.
+
+    Args:
+        swap: Stato del cambio, aggiornato a ogni fase.
+        acquire: Coroutine che carica il nuovo modello fuori dall'event loop e ne
+            restituisce un handle, oppure None se il modello è caricato nei
+            processi di inferenza dedicati.
+        warm_up: Coroutine che esegue un'inferenza sintetica con il nuovo modello.
+        switch: Funzione che rende attuale il nuovo modello in modo atomico e
+            restituisce l'handle del modello sostituito (None se non ce n'è uno).
+
+    Raises:
+        Exception: Se il caricamento o il riscaldamento falliscono (il modello
+            attuale resta invariato).
+    """
+    handle: Optional[ModelHandle] = None
+    start = time.perf_counter()
+    try:
+        handle = await acquire()
+        swap.set_stage("warming_up")
+        await warm_up()
+        swap.set_stage("switching")
+        previous_handle = switch(handle)
+        handle = None
+    except Exception as e:
+        swap.error = str(e)
+        swap.set_stage(SWAP_FAILED)
+        TelemetryRegistry().counter(f"{swap.metrics_prefix}_model_swap_failed").inc()
+        if handle is not None:
+            handle.release()
+        raise
+
+    swap.set_stage("draining")
+    if previous_handle is not None:
+        await drain(previous_handle)
+        previous_handle.release()
+    swap.set_stage("completed")
+    TelemetryRegistry().counter(f"{swap.metrics_prefix}_model_swap_completed").inc()
+    print(f"Model swap {swap.engine} completed in {time.perf_counter() - start:.1f}s")
+
+
+async def drain(handle: ModelHandle) -> None:
+    """
+    Attendi che le richieste in corso su un modello terminino.
+
+    Il modello è libero quando non ha più inferenze in corso: gli altri
+    riferimenti (es. handle di modelli precaricati) non prolungano l'attesa.
+
+    Args:
+        handle: Handle del modello sostituito.
+    """
+    registry = ModelRegistry()
+    deadline = time.perf_counter() + settings.MODEL_SWAP_DRAIN_TIMEOUT_S
+    while registry.get_inflight(handle.engine, handle.name) > 0:
+        if time.perf_counter() > deadline:
+            print(f"Drain timeout for {handle.engine} model '{handle.name}', releasing anyway")
+            return
+        await asyncio.sleep(DRAIN_POLL_INTERVAL_S)
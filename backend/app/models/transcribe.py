@@ -6,6 +6,7 @@ class TranscriptionResponse(BaseModel):
     inference_time: Optional[float] = None  # Tempo di inferenza in secondi
     metrics: Optional[Dict[str, Any]] = None  # Metriche WER, CER, ecc.
     model_info: Optional[Dict[str, Any]] = None  # Informazioni sul modello utilizzato
+    cache_status: Optional[str] = None  # "hit", "miss", "coalesced" o "disabled" (cache dei risultati)
 
 class TranscriptionWithReferenceRequest(BaseModel):
     """Richiesta di trascrizione con testo di riferimento per calcolo metriche."""
@@ -1,5 +1,8 @@
 # backend/app/routers/health.py
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.services.startup import ReadinessState
+from app.utils.telemetry import TelemetryRegistry
 
 router = APIRouter()
 
@@ -14,3 +17,19 @@ async def status():
         "service": "Speech-to-Text Backend",
         "version": "1.0.0"
     }
+
+@router.get("/metrics")
+async def metrics():
+    """
+    Metriche di runtime (contatori e istogrammi) per il tuning del backend.
+    """
+    return TelemetryRegistry().snapshot()
+
+@router.get("/ready")
+async def ready():
+    """
+    Readiness per il load balancer: 200 solo dopo precaricamento e warm-up dei modelli,
+    503 finché sono in corso o se sono falliti.
+    """
+    state = ReadinessState()
+    return JSONResponse(status_code=200 if state.ready else 503, content=state.to_dict())
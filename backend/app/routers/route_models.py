@@ -5,23 +5,23 @@ Fornisce endpoint per visualizzare, cambiare e gestire i modelli
 Wav2Vec2 e Whisper utilizzati dall'applicazione.
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import Dict, Any
 
 from app.services.wav2vec_service import Wav2Vec2Service
 from app.services.whisper_service import WhisperService
 from app.models.model_manager import ASRModelManager
+from app.dependencies import get_wav2vec2_service, get_whisper_service
 
 router = APIRouter()
 model_manager = ASRModelManager()
-wav2vec2_service = Wav2Vec2Service()
-whisper_service = WhisperService()
 
 
 class ModelUpdateRequest(BaseModel):
     """Schema per la richiesta di aggiornamento modello."""
     model_name: str
+    wait: bool = False  # se True la risposta arriva a cambio completato
 
 
 class ModelResponse(BaseModel):
@@ -57,32 +57,47 @@ async def get_current_wav2vec2_model():
 
 
 @router.post("/wav2vec2/update")
-async def update_wav2vec2_model(request: ModelUpdateRequest):
+async def update_wav2vec2_model(
+    request: ModelUpdateRequest,
+    wav2vec2_service: Wav2Vec2Service = Depends(get_wav2vec2_service)
+):
     """
     Aggiorna il modello Wav2Vec2 di default.
 
     Args:
-        request: Richiesta contenente il nome del nuovo modello.
+        request: Richiesta contenente il nome del nuovo modello (es. "facebook",
+            "facebook@int8" o "facebook@onnx" per ONNX Runtime).
+        wav2vec2_service: Servizio condiviso con i router di trascrizione.
+
+    Il nuovo modello viene caricato in background mentre le richieste
+    continuano a usare quello attuale; l'avanzamento è in /models/status.
 
     Returns:
-        Messaggio di conferma con informazioni sul nuovo modello.
+        Messaggio di conferma con informazioni sul nuovo modello e stato del cambio.
 
     Raises:
-        HTTPException: Se il modello non è supportato o si verifica un errore.
+        HTTPException: Se il modello non è supportato, se un cambio è già in
+            corso o si verifica un errore.
     """
     try:
-        success = await wav2vec2_service.update_model(request.model_name)
+        success = await wav2vec2_service.update_model(request.model_name, request.wait)
         if success:
-            new_model_info = model_manager.get_wav2vec2_model_info()
+            new_model_info = wav2vec2_service.get_model_info(request.model_name)
             return {
-                "message": f"Modello Wav2Vec2 aggiornato con successo",
+                "message": (
+                    f"Modello Wav2Vec2 aggiornato con successo" if request.wait
+                    else f"Aggiornamento del modello Wav2Vec2 avviato"
+                ),
                 "new_model": request.model_name,
-                "model_info": new_model_info
+                "model_info": new_model_info,
+                "swap": wav2vec2_service.get_swap_status()
             }
         else:
             raise HTTPException(status_code=400, detail="Aggiornamento del modello fallito")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Errore nell'aggiornamento del modello: {str(e)}")
 
@@ -99,7 +114,7 @@ async def get_current_whisper_model():
         HTTPException: Se si verifica un errore nel recupero delle informazioni.
     """
     try:
-        current_model = model_manager.get_current_whisper_model().value
+        current_model = model_manager.get_current_whisper_checkpoint()
         model_info = model_manager.get_whisper_model_info()
         available_models = model_manager.get_all_whisper_models()
         
@@ -113,43 +128,67 @@ async def get_current_whisper_model():
 
 
 @router.post("/whisper/update")
-async def update_whisper_model(request: ModelUpdateRequest):
+async def update_whisper_model(
+    request: ModelUpdateRequest,
+    whisper_service: WhisperService = Depends(get_whisper_service)
+):
     """
     Aggiorna il modello Whisper di default.
 
     Args:
-        request: Richiesta contenente il nome del nuovo modello (tiny, base, small, medium, large).
+        request: Richiesta contenente il nome del nuovo modello (tiny, base, small, medium, large),
+            eventualmente con precisione (es. "small@int8", "small@bf16").
+        whisper_service: Servizio condiviso con i router di trascrizione.
+
+    Il nuovo modello viene caricato in background mentre le richieste
+    continuano a usare quello attuale; l'avanzamento è in /models/status.
 
     Returns:
-        Messaggio di conferma con informazioni sul nuovo modello.
+        Messaggio di conferma con informazioni sul nuovo modello e stato del cambio.
 
     Raises:
-        HTTPException: Se il modello non è supportato o si verifica un errore.
+        HTTPException: Se il modello non è supportato, se un cambio è già in
+            corso o si verifica un errore.
     """
     try:
-        success = await whisper_service.update_model(request.model_name)
+        success = await whisper_service.update_model(request.model_name, request.wait)
         if success:
-            new_model_info = model_manager.get_whisper_model_info()
+            new_model_info = whisper_service.get_model_info(request.model_name.lower())
             return {
-                "message": f"Modello Whisper aggiornato con successo",
+                "message": (
+                    f"Modello Whisper aggiornato con successo" if request.wait
+                    else f"Aggiornamento del modello Whisper avviato"
+                ),
                 "new_model": request.model_name,
-                "model_info": new_model_info
+                "model_info": new_model_info,
+                "swap": whisper_service.get_swap_status()
             }
         else:
             raise HTTPException(status_code=400, detail="Aggiornamento del modello fallito")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Errore nell'aggiornamento del modello: {str(e)}")
 
 
 @router.get("/status")
-async def get_models_status():
+async def get_models_status(
+    wav2vec2_service: Wav2Vec2Service = Depends(get_wav2vec2_service),
+    whisper_service: WhisperService = Depends(get_whisper_service)
+):
     """
     Ottieni lo stato di tutti i modelli ASR.
 
+    Args:
+        wav2vec2_service: Servizio condiviso con i router di trascrizione.
+        whisper_service: Servizio condiviso con i router di trascrizione.
+
     Returns:
-        Stato completo di tutti i modelli Wav2Vec2 e Whisper.
+        Stato completo di tutti i modelli Wav2Vec2 e Whisper (incluso l'ultimo
+        cambio di modello), con i modelli effettivamente in memoria e la loro
+        memoria residente.
 
     Raises:
         HTTPException: Se si verifica un errore nel recupero dello stato.
@@ -159,13 +198,16 @@ async def get_models_status():
             "wav2vec2": {
                 "current_model": model_manager.get_current_wav2vec2_model(),
                 "model_info": model_manager.get_wav2vec2_model_info(),
-                "available_models": model_manager.get_all_wav2vec2_models()
+                "available_models": model_manager.get_all_wav2vec2_models(),
+                "swap": wav2vec2_service.get_swap_status()
             },
             "whisper": {
-                "current_model": model_manager.get_current_whisper_model().value,
+                "current_model": model_manager.get_current_whisper_checkpoint(),
                 "model_info": model_manager.get_whisper_model_info(),
-                "available_models": model_manager.get_all_whisper_models()
-            }
+                "available_models": model_manager.get_all_whisper_models(),
+                "swap": whisper_service.get_swap_status()
+            },
+            "loaded_models": model_manager.get_loaded_models_status()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Errore nel recupero dello stato: {str(e)}")
\ No newline at end of file
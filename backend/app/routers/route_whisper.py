@@ -1,33 +1,46 @@
 """
 Router per la trascrizione audio utilizzando modelli Whisper.
 
-Fornisce endpoint per la trascrizione di file audio e per ottenere
-informazioni sui formati supportati.
+Fornisce endpoint per la trascrizione di file audio, per la trascrizione in
+streaming via WebSocket e per ottenere informazioni sui formati supportati.
 """
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, WebSocket, Response, Depends
 from typing import Optional
 from app.services.whisper_service import WhisperService
+from app.dependencies import get_whisper_service
+from app.services.whisper_streaming import WhisperStreamingSession
 from app.models import TranscriptionResponse
 from app.utils.audio_utils import get_supported_audio_formats
+from app.utils.streaming import serve_streaming_session
+from app.utils.result_cache import cache_status_var
 
 router = APIRouter()
-whisper_service = WhisperService()
 
 
 @router.post("/transcribe", response_model=TranscriptionResponse)
-async def transcribe_audio(file: UploadFile = File(...)):
+async def transcribe_audio(
+    response: Response,
+    file: UploadFile = File(...),
+    model: Optional[str] = Form(None),
+    whisper_service: WhisperService = Depends(get_whisper_service)
+):
     """
     Trascrivi un file audio utilizzando modelli Whisper.
 
     Args:
+        response: Risposta HTTP, usata per l'header X-Cache.
         file: File audio caricato dall'utente.
+        model: Modello da usare per questa richiesta ("tiny", "base", ..., anche con
+            precisione come "small@int8" o "small@bf16"); se assente usa il modello attuale.
+        whisper_service: Servizio condiviso (iniettato da FastAPI).
 
     Returns:
-        Oggetto TranscriptionResponse contenente il testo trascritto.
+        Oggetto TranscriptionResponse contenente il testo trascritto e lo stato della cache.
 
     Raises:
-        HTTPException: Se il file è vuoto o si verifica un errore durante la trascrizione.
+        HTTPException: Se il file è vuoto, il modello non è supportato o si verifica
+            un errore durante la trascrizione.
     """
     print(f"Received file: {file.filename}, content_type: {file.content_type}, size: {file.size}")
     
@@ -45,37 +58,50 @@ async def transcribe_audio(file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail="File audio vuoto")
     
     try:
-        text = await whisper_service.transcribe(audio_bytes)
+        text = await whisper_service.transcribe(audio_bytes, model)
         print(f"Service returned text: '{text}' (length: {len(text)})")
         
-        response = TranscriptionResponse(text=text)
-        print(f"Returning response: {response}")
-        return response
+        cache_status = cache_status_var.get()
+        if cache_status:
+            response.headers["X-Cache"] = cache_status
+        result = TranscriptionResponse(text=text, cache_status=cache_status)
+        print(f"Returning response: {result}")
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Errore durante la trascrizione: {str(e)}")
 
 
 @router.post("/transcribe-with-metrics")
 async def transcribe_audio_with_metrics(
+    response: Response,
     file: UploadFile = File(...),
-    reference_text: Optional[str] = Form(None)
+    reference_text: Optional[str] = Form(None),
+    model: Optional[str] = Form(None),
+    whisper_service: WhisperService = Depends(get_whisper_service)
 ):
     """
     Trascrivi un file audio utilizzando Whisper e calcola metriche di valutazione.
 
     Args:
+        response: Risposta HTTP, usata per l'header X-Cache.
         file: File audio caricato dall'utente.
         reference_text: Testo di riferimento per calcolo WER/CER (opzionale).
+        model: Modello da usare per questa richiesta; se assente usa il modello attuale.
+        whisper_service: Servizio condiviso (iniettato da FastAPI).
 
     Returns:
         Dizionario contenente:
         - text: Trascrizione dell'audio
         - inference_time: Tempo di inferenza in secondi
+        - cache_status: Stato della cache dei risultati (anche nell'header X-Cache)
         - metrics: Metriche WER, CER se reference_text è fornito
         - model_info: Informazioni sul modello utilizzato
 
     Raises:
-        HTTPException: Se il file è vuoto o si verifica un errore durante la trascrizione.
+        HTTPException: Se il file è vuoto, il modello non è supportato o si verifica
+            un errore durante la trascrizione.
     """
     print(f"Received file: {file.filename}, content_type: {file.content_type}, size: {file.size}")
     if reference_text:
@@ -94,13 +120,34 @@ async def transcribe_audio_with_metrics(
         raise HTTPException(status_code=400, detail="File audio vuoto")
     
     try:
-        result = await whisper_service.transcribe_with_metrics(audio_bytes, reference_text)
+        result = await whisper_service.transcribe_with_metrics(audio_bytes, reference_text, model)
+        if result.get("cache_status"):
+            response.headers["X-Cache"] = result["cache_status"]
         print(f"Service returned: text='{result['text'][:50]}...', time={result['inference_time']:.3f}s")
         return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Errore durante la trascrizione: {str(e)}")
 
 
+@router.websocket("/stream")
+async def stream_audio(websocket: WebSocket, whisper_service: WhisperService = Depends(get_whisper_service)):
+    """
+    Trascrivi audio in streaming con Whisper, confermando il testo per accordo locale.
+
+    Il protocollo dei messaggi è descritto in app.utils.streaming.
+
+    Args:
+        websocket: Connessione WebSocket con il client.
+        whisper_service: Servizio condiviso (iniettato da FastAPI).
+    """
+    await serve_streaming_session(
+        websocket,
+        lambda **kwargs: WhisperStreamingSession(whisper_service, **kwargs)
+    )
+
+
 @router.get("/supported-formats")
 async def get_supported_formats():
     """
@@ -113,10 +160,13 @@ async def get_supported_formats():
 
 
 @router.get("/model-info")
-async def get_model_info():
+async def get_model_info(whisper_service: WhisperService = Depends(get_whisper_service)):
     """
     Ottieni informazioni sul modello Whisper attualmente utilizzato.
 
+    Args:
+        whisper_service: Servizio condiviso (iniettato da FastAPI).
+
     Returns:
         Dizionario con le informazioni del modello attuale.
     """
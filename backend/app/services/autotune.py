@@ -0,0 +1,364 @@
+"""
+Autotuning di batch size, thread di torch e lunghezza dei chunk per l'host corrente.
+
+La configurazione più veloce dipende dalla CPU: invece di regolare ogni
+macchina a mano, questo modulo misura Wav2Vec2Service e WhisperService su
+audio sintetico lungo una griglia di parametri e salva i valori migliori nel
+file AUTOTUNE_FILE, sotto la chiave dell'host. Settings li legge all'avvio
+(vedi AutotuneSettingsSource in app.config), con priorità inferiore alle
+variabili d'ambiente.
+
+Per ogni numero di thread vengono misurati i batch size di entrambi i motori
+(throughput in secondi di audio per secondo sul percorso batch); il numero di
+thread scelto massimizza la media geometrica dei throughput migliori dei due
+motori, dato che INFERENCE_TORCH_THREADS è condiviso. La lunghezza dei chunk di
+Wav2Vec2 viene poi misurata sul percorso degli audio lunghi con i thread scelti.
+Con CPU_SLOTS > 0 i thread per inferenza sono fissati dagli slot.
+
+Con --random-models i servizi usano modelli piccoli inizializzati a caso, così
+il comando può essere provato senza scaricare i checkpoint. Uso:
+    python -m app.services.autotune
+    python -m app.services.autotune --engines wav2vec2 --threads 1 2 4 --batch-sizes 1 4 8
+    python -m app.services.autotune --random-models --no-save
+"""
+
+import argparse
+import json
+import math
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import torch
+
+from app.config import AUTOTUNED_SETTINGS, get_autotune_path, get_host_key, settings
+
+ENGINES = ["wav2vec2", "whisper"]
+DEFAULT_BATCH_SIZES = [1, 2, 4, 8]
+DEFAULT_CHUNK_LENGTHS_S = [10.0, 15.0, 20.0, 30.0]
+
+
+def default_thread_grid() -> List[int]:
+    """Numeri di thread da provare: potenze di due fino al numero di core, più il numero di core."""
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    grid = {cores}
+    threads = 1
+    while threads < cores:
+        grid.add(threads)
+        threads *= 2
+    return sorted(grid)
+
+
+def build_random_components(engine: str) -> Dict[str, Any]:
+    """
+    Crea un modello piccolo inizializzato a caso, con la stessa interfaccia di quelli reali.
+
+    Args:
+        engine: "wav2vec2" oppure "whisper".
+
+    Returns:
+        Componenti nel formato di _load_components del servizio.
+    """
+    torch.manual_seed(0)
+    if engine == "whisper":
+        from whisper.model import ModelDimensions, Whisper
+
+        dims = ModelDimensions(
+            n_mels=80, n_audio_ctx=1500, n_audio_state=64, n_audio_head=2, n_audio_layer=2,
+            n_vocab=51865, n_text_ctx=448, n_text_state=64, n_text_head=2, n_text_layer=2
+        )
+        return {"model": Whisper(dims).eval()}
+
+    from transformers import (
+        Wav2Vec2Config, Wav2Vec2CTCTokenizer, Wav2Vec2FeatureExtractor, Wav2Vec2ForCTC, Wav2Vec2Processor
+    )
+
+    vocab = {"<pad>": 0, "<s>": 1, "</s>": 2, "<unk>": 3, "|": 4}
+    for index, char in enumerate("abcdefghilmnopqrstuvz"):
+        vocab[char] = 5 + index
+    with tempfile.TemporaryDirectory() as tmp:
+        vocab_path = os.path.join(tmp, "vocab.json")
+        with open(vocab_path, "w") as f:
+            json.dump(vocab, f)
+        tokenizer = Wav2Vec2CTCTokenizer(vocab_path)
+    feature_extractor = Wav2Vec2FeatureExtractor(
+        feature_size=1, sampling_rate=16000, padding_value=0.0, do_normalize=True, return_attention_mask=True
+    )
+    config = Wav2Vec2Config(
+        vocab_size=len(vocab), hidden_size=64, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=128, conv_dim=(64,) * 7, feat_extract_norm="layer", do_stable_layer_norm=True,
+        num_conv_pos_embeddings=16, num_conv_pos_embedding_groups=2
+    )
+    return {
+        "processor": Wav2Vec2Processor(feature_extractor=feature_extractor, tokenizer=tokenizer),
+        "model": Wav2Vec2ForCTC(config).eval()
+    }
+
+
+class Autotuner:
+    """Misura i servizi ASR su una griglia di parametri e sceglie la configurazione più veloce."""
+
+    def __init__(
+        self,
+        engines: Optional[List[str]] = None,
+        threads: Optional[List[int]] = None,
+        batch_sizes: Optional[List[int]] = None,
+        chunk_lengths_s: Optional[List[float]] = None,
+        clip_duration_s: float = 5.0,
+        long_audio_s: float = 60.0,
+        repeats: int = 3,
+        random_models: bool = False
+    ):
+        """
+        Inizializza l'autotuner.
+
+        Args:
+            engines: Motori da misurare (default: entrambi).
+            threads: Numeri di thread di torch da provare (default: potenze di due fino ai core).
+            batch_sizes: Batch size da provare.
+            chunk_lengths_s: Lunghezze dei chunk di Wav2Vec2 da provare, in secondi.
+            clip_duration_s: Durata degli audio sintetici del percorso batch.
+            long_audio_s: Durata dell'audio sintetico del percorso a chunk.
+            repeats: Ripetizioni misurate per punto della griglia (si usa la mediana).
+            random_models: Se True, usa modelli piccoli inizializzati a caso.
+        """
+        self.engines = engines or list(ENGINES)
+        self.threads = threads or default_thread_grid()
+        self.batch_sizes = batch_sizes or list(DEFAULT_BATCH_SIZES)
+        self.chunk_lengths_s = chunk_lengths_s or list(DEFAULT_CHUNK_LENGTHS_S)
+        self.clip_duration_s = clip_duration_s
+        self.long_audio_s = long_audio_s
+        self.repeats = max(1, repeats)
+        self.random_models = random_models
+        self._rng = np.random.default_rng(0)
+
+    def _get_service(self, engine: str):
+        """Crea il servizio del motore, con un modello casuale se richiesto."""
+        from app.services.wav2vec_service import Wav2Vec2Service
+        from app.services.whisper_service import WhisperService
+
+        service = Wav2Vec2Service() if engine == "wav2vec2" else WhisperService()
+        if self.random_models:
+            components = build_random_components(engine)
+            service._load_components = lambda model_name: components
+        return service
+
+    def _synthetic_audio(self, duration_s: float) -> np.ndarray:
+        """Rumore a bassa ampiezza: durata e forma dell'input contano più del contenuto."""
+        return (0.05 * self._rng.standard_normal(int(duration_s * 16000))).astype(np.float32)
+
+    def _median_time(self, func: Callable[[], Any]) -> float:
+        """Esegui func una volta a vuoto e restituisci la mediana delle ripetizioni misurate."""
+        func()
+        times = []
+        for _ in range(self.repeats):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        return statistics.median(times)
+
+    def _measure_batches(self, engine: str, service) -> List[Dict[str, Any]]:
+        """Throughput del percorso batch per ogni batch size, con i thread attuali."""
+        method = service._forward_batch_sync if engine == "wav2vec2" else service._decode_batch_sync
+        rows = []
+        for batch_size in self.batch_sizes:
+            pcms = [self._synthetic_audio(self.clip_duration_s) for _ in range(batch_size)]
+            elapsed = self._median_time(lambda: method(pcms))
+            rows.append({
+                "engine": engine,
+                "threads": torch.get_num_threads(),
+                "batch_size": batch_size,
+                "seconds": elapsed,
+                "audio_s_per_s": batch_size * self.clip_duration_s / elapsed
+            })
+            print(f"  {engine} threads={rows[-1]['threads']} batch={batch_size}: "
+                  f"{rows[-1]['audio_s_per_s']:.1f}s audio/s")
+        return rows
+
+    def _measure_chunks(self, service) -> List[Dict[str, Any]]:
+        """Fattore di tempo reale del percorso a chunk di Wav2Vec2 per ogni lunghezza."""
+        pcm = self._synthetic_audio(self.long_audio_s)
+        original = settings.WAV2VEC2_CHUNK_LENGTH_S
+        rows = []
+        try:
+            for chunk_length_s in self.chunk_lengths_s:
+                if chunk_length_s <= 2 * settings.WAV2VEC2_STRIDE_LENGTH_S:
+                    print(f"  wav2vec2 chunk={chunk_length_s:g}s: ignorato (non supera due volte lo stride)")
+                    continue
+                settings.WAV2VEC2_CHUNK_LENGTH_S = chunk_length_s
+                elapsed = self._median_time(lambda: service._transcribe_chunked_sync(pcm))
+                rows.append({"chunk_length_s": chunk_length_s, "seconds": elapsed, "rtf": elapsed / self.long_audio_s})
+                print(f"  wav2vec2 chunk={chunk_length_s:g}s: RTF {rows[-1]['rtf']:.3f}")
+        finally:
+            settings.WAV2VEC2_CHUNK_LENGTH_S = original
+        return rows
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Esegui tutte le misure.
+
+        Returns:
+            Dizionario con le impostazioni scelte ("settings") e tutte le misure ("measurements").
+        """
+        services = {engine: self._get_service(engine) for engine in self.engines}
+        original_threads = torch.get_num_threads()
+        batch_rows: List[Dict[str, Any]] = []
+        chunk_rows: List[Dict[str, Any]] = []
+        try:
+            for threads in self.threads:
+                torch.set_num_threads(threads)
+                for engine, service in services.items():
+                    batch_rows.extend(self._measure_batches(engine, service))
+
+            # Thread condivisi dai due motori: media geometrica dei throughput migliori
+            def score(threads: int) -> float:
+                best = [
+                    max(row["audio_s_per_s"] for row in batch_rows if row["engine"] == engine and row["threads"] == threads)
+                    for engine in services
+                ]
+                return math.exp(sum(math.log(value) for value in best) / len(best))
+
+            best_threads = max(self.threads, key=score)
+            tuned: Dict[str, Any] = {"INFERENCE_TORCH_THREADS": best_threads}
+            for engine in services:
+                candidates = [row for row in batch_rows if row["engine"] == engine and row["threads"] == best_threads]
+                best = max(candidates, key=lambda row: row["audio_s_per_s"])
+                tuned[f"{engine.upper()}_BATCH_MAX_SIZE"] = best["batch_size"]
+
+            if "wav2vec2" in services:
+                torch.set_num_threads(best_threads)
+                chunk_rows = self._measure_chunks(services["wav2vec2"])
+                if chunk_rows:
+                    tuned["WAV2VEC2_CHUNK_LENGTH_S"] = min(chunk_rows, key=lambda row: row["rtf"])["chunk_length_s"]
+        finally:
+            torch.set_num_threads(original_threads)
+
+        return {
+            "settings": tuned,
+            "measurements": {"batches": batch_rows, "chunks": chunk_rows},
+            "random_models": self.random_models,
+            "measured_at": time.time()
+        }
+
+
+def save_autotune_result(result: Dict[str, Any], path: Optional[str] = None) -> str:
+    """
+    Salva il risultato dell'autotuning per l'host corrente, mantenendo quelli degli altri host.
+
+    Args:
+        result: Risultato di Autotuner.run().
+        path: File di destinazione. Se None, AUTOTUNE_FILE.
+
+    Returns:
+        Percorso del file scritto.
+    """
+    path = get_autotune_path(path or settings.AUTOTUNE_FILE)
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    data.setdefault("hosts", {})[get_host_key()] = result
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Scrittura atomica: Settings potrebbe leggere il file in un altro processo
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_autotune_result(path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Leggi il risultato dell'autotuning dell'host corrente.
+
+    Args:
+        path: File da leggere. Se None, AUTOTUNE_FILE.
+
+    Returns:
+        Il risultato salvato, oppure None se l'host non è ancora stato misurato.
+    """
+    try:
+        with open(get_autotune_path(path or settings.AUTOTUNE_FILE)) as f:
+            return json.load(f).get("hosts", {}).get(get_host_key())
+    except (OSError, ValueError):
+        return None
+
+
+def apply_autotune_settings(tuned: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Applica i valori misurati alle impostazioni del processo corrente.
+
+    I valori impostati con variabili d'ambiente prevalgono, come all'avvio.
+
+    Args:
+        tuned: Impostazioni trovate dall'autotuning.
+
+    Returns:
+        Le impostazioni effettivamente applicate.
+    """
+    applied = {}
+    for name in AUTOTUNED_SETTINGS:
+        if name in tuned and name not in os.environ:
+            setattr(settings, name, tuned[name])
+            applied[name] = tuned[name]
+    return applied
+
+
+def run_startup_autotune() -> Optional[Dict[str, Any]]:
+    """
+    Esegui l'autotuning all'avvio se AUTOTUNE_ON_STARTUP è attivo e l'host non ha valori misurati.
+
+    Va eseguito prima che il pool di inferenza e gli scheduler di batching
+    vengano creati, così partono già con i valori scelti.
+
+    Returns:
+        Le impostazioni applicate, oppure None se l'autotuning non è stato eseguito.
+    """
+    if not settings.AUTOTUNE_ON_STARTUP or load_autotune_result() is not None:
+        return None
+    print("Autotuning inference settings for this host...")
+    start = time.perf_counter()
+    result = Autotuner().run()
+    path = save_autotune_result(result)
+    applied = apply_autotune_settings(result["settings"])
+    print(f"Autotuning completed in {time.perf_counter() - start:.1f}s: {applied} (saved to {path})")
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Autotuning delle impostazioni di inferenza per questo host")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=ENGINES)
+    parser.add_argument("--threads", type=int, nargs="+", help="Numeri di thread di torch da provare")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=DEFAULT_BATCH_SIZES)
+    parser.add_argument("--chunk-lengths", type=float, nargs="+", default=DEFAULT_CHUNK_LENGTHS_S,
+                        help="Lunghezze dei chunk di Wav2Vec2 da provare (s)")
+    parser.add_argument("--clip-duration", type=float, default=5.0, help="Durata degli audio del percorso batch (s)")
+    parser.add_argument("--long-audio", type=float, default=60.0, help="Durata dell'audio del percorso a chunk (s)")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--random-models", action="store_true", help="Usa modelli piccoli inizializzati a caso (offline)")
+    parser.add_argument("--output", help="File dei risultati (default: AUTOTUNE_FILE)")
+    parser.add_argument("--no-save", action="store_true", help="Stampa i risultati senza salvarli")
+    args = parser.parse_args()
+
+    result = Autotuner(
+        engines=args.engines,
+        threads=args.threads,
+        batch_sizes=args.batch_sizes,
+        chunk_lengths_s=args.chunk_lengths,
+        clip_duration_s=args.clip_duration,
+        long_audio_s=args.long_audio,
+        repeats=args.repeats,
+        random_models=args.random_models
+    ).run()
+    print(f"🏁 Configurazione migliore per {get_host_key()}: {result['settings']}")
+    if not args.no_save:
+        print(f"💾 Risultati salvati in: {save_autotune_result(result, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Scheduler di micro-batching dinamico per i modelli ASR.
+
+Raccoglie le richieste di trascrizione concorrenti per al massimo max_wait_ms
+millisecondi (o fino a max_batch_size richieste), le raggruppa in bucket di
+durata simile per limitare il padding ed esegue un'unica chiamata batch per
+bucket. Usato sia da Wav2Vec2 (forward pass CTC) sia da Whisper (encoder e
+decoding condivisi).
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.utils.telemetry import TelemetryRegistry
+
+# Limiti dei bucket degli istogrammi esposti su /health/metrics
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64]
+QUEUE_WAIT_MS_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 250, 500, 1000]
+
+
+@dataclass
+class _PendingRequest:
+    """Richiesta in attesa di essere inclusa in un batch."""
+    pcm: np.ndarray
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class MicroBatchScheduler:
+    """
+    Coda di richieste davanti all'inferenza batch di un modello.
+
+    Ogni chiamante invia il proprio audio (float32 mono a 16kHz) con submit() e
+    riceve il risultato relativo al solo proprio audio, mentre l'inferenza
+    viene condivisa con le altre richieste dello stesso bucket.
+    """
+
+    def __init__(
+        self,
+        forward_batch: Callable[[List[np.ndarray]], Awaitable[List[Any]]],
+        max_batch_size: int,
+        max_wait_ms: float,
+        bucket_ratio: float,
+        metrics_prefix: str
+    ):
+        """
+        Inizializza lo scheduler.
+
+        Args:
+            forward_batch: Coroutine che esegue l'inferenza su una lista di audio
+                e restituisce un risultato per ciascuno, nello stesso ordine.
+            max_batch_size: Numero massimo di richieste per batch.
+            max_wait_ms: Attesa massima della prima richiesta prima di avviare il batch.
+            bucket_ratio: Rapporto massimo tra audio più lungo e più corto nello stesso bucket.
+            metrics_prefix: Prefisso dei nomi delle metriche.
+        """
+        self._forward_batch = forward_batch
+        self._max_batch_size = max(1, max_batch_size)
+        self._max_wait = max(0.0, max_wait_ms) / 1000
+        self._bucket_ratio = max(1.0, bucket_ratio)
+        self._queue: "asyncio.Queue[_PendingRequest]" = asyncio.Queue()
+        self._collector: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+        telemetry = TelemetryRegistry()
+        self._batch_size_hist = telemetry.histogram(f"{metrics_prefix}_batch_size", BATCH_SIZE_BUCKETS)
+        self._queue_wait_hist = telemetry.histogram(f"{metrics_prefix}_queue_wait_ms", QUEUE_WAIT_MS_BUCKETS)
+
+    async def submit(self, pcm: np.ndarray) -> Any:
+        """
+        Accoda un audio e attendi il suo risultato.
+
+        Args:
+            pcm: Audio float32 mono a 16kHz.
+
+        Returns:
+            Risultato dell'inferenza relativo al solo audio inviato.
+        """
+        result, _ = await self.submit_with_timing(pcm)
+        return result
+
+    async def submit_with_timing(self, pcm: np.ndarray) -> Tuple[Any, float]:
+        """
+        Accoda un audio e attendi il suo risultato, con il tempo passato in coda.
+
+        Args:
+            pcm: Audio float32 mono a 16kHz.
+
+        Returns:
+            Tupla contenente (risultato, attesa in coda in millisecondi).
+        """
+        self._ensure_collector()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_PendingRequest(pcm=pcm, future=future))
+        return await future
+
+    def _ensure_collector(self) -> None:
+        """Avvia il task di raccolta al primo utilizzo, nel loop corrente."""
+        if self._collector is None or self._collector.done():
+            self._collector = asyncio.get_running_loop().create_task(self._collect_forever())
+
+    async def _collect_forever(self) -> None:
+        """Raccoglie continuamente batch dalla coda e li invia all'esecuzione."""
+        while True:
+            first = await self._queue.get()
+            batch = [first]
+            deadline = first.enqueued_at + self._max_wait
+
+            while len(batch) < self._max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    # Prendi comunque ciò che è già in coda senza attendere
+                    try:
+                        batch.append(self._queue.get_nowait())
+                        continue
+                    except asyncio.QueueEmpty:
+                        break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            for bucket in self._bucketize(batch):
+                task = asyncio.create_task(self._execute(bucket))
+                # Mantieni un riferimento finché il task non termina
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+    def _bucketize(self, batch: List[_PendingRequest]) -> List[List[_PendingRequest]]:
+        """
+        Raggruppa le richieste in bucket di durata simile.
+
+        Args:
+            batch: Richieste raccolte.
+
+        Returns:
+            Lista di bucket, ciascuno con durate entro bucket_ratio.
+        """
+        ordered = sorted(batch, key=lambda request: len(request.pcm))
+        buckets: List[List[_PendingRequest]] = []
+        for request in ordered:
+            if buckets and len(request.pcm) <= max(1, len(buckets[-1][0].pcm)) * self._bucket_ratio:
+                buckets[-1].append(request)
+            else:
+                buckets.append([request])
+        return buckets
+
+    async def _execute(self, bucket: List[_PendingRequest]) -> None:
+        """
+        Esegui un forward pass per un bucket e consegna i risultati.
+
+        Args:
+            bucket: Richieste da elaborare insieme.
+        """
+        started_at = time.perf_counter()
+        self._batch_size_hist.observe(len(bucket))
+        queue_waits = [(started_at - request.enqueued_at) * 1000 for request in bucket]
+        for queue_wait in queue_waits:
+            self._queue_wait_hist.observe(queue_wait)
+
+        try:
+            results = await self._forward_batch([request.pcm for request in bucket])
+        except Exception as e:
+            for request in bucket:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+
+        for request, result, queue_wait in zip(bucket, results, queue_waits):
+            if not request.future.done():
+                request.future.set_result((result, queue_wait))
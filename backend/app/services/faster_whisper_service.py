@@ -0,0 +1,265 @@
+"""
+Servizio Whisper eseguito con faster-whisper (CTranslate2).
+
+Alternativa a WhisperService selezionabile con WHISPER_ENGINE="faster-whisper":
+gli stessi modelli (tiny, base, ...) vengono eseguiti da CTranslate2, con
+kernel ottimizzati per CPU e quantizzazione dei pesi al caricamento. La
+precisione del checkpoint sceglie il compute type di CTranslate2 (es.
+"small@int8" = pesi int8), quindi con WHISPER_DEFAULT_MODEL="base@int8" il
+servizio usa l'inferenza int8.
+
+Il servizio eredita da WhisperService l'intero flusso delle richieste (cache
+dei risultati, single-flight, micro-batching, streaming, cambio di modello a
+caldo, processi di inferenza) e le risposte hanno lo stesso schema; cambiano
+solo il caricamento del modello e le primitive di decoding. I modelli non
+passano dagli snapshot: CTranslate2 carica già i pesi convertiti dalla cache di
+faster-whisper.
+
+faster-whisper è una dipendenza opzionale: senza, il motore non è disponibile.
+"""
+
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import torch
+from whisper.decoding import DecodingResult
+
+from app.config import settings
+from app.models.model_precision import split_variant_name
+from app.models.model_registry import get_process_rss
+from app.services.whisper_service import WhisperService
+
+try:
+    import faster_whisper
+    from faster_whisper.audio import pad_or_trim
+    from faster_whisper.tokenizer import Tokenizer
+    from faster_whisper.transcribe import get_compression_ratio, get_suppressed_tokens
+except ImportError:  # faster-whisper è opzionale: senza, il motore "faster-whisper" non è disponibile
+    faster_whisper = None
+
+# Compute type di CTranslate2 per precisione del checkpoint
+COMPUTE_TYPES = {
+    "fp32": "float32",
+    "int8": "int8",
+    "bf16": "bfloat16"
+}
+# Primo timestamp ammesso in secondi, come in faster_whisper.WhisperModel.transcribe
+MAX_INITIAL_TIMESTAMP_S = 1.0
+
+
+class FasterWhisperService(WhisperService):
+    """
+    Servizio di trascrizione Whisper basato su faster-whisper.
+
+    Ridefinisce caricamento, trascrizione singola, decoding batch e streaming
+    di WhisperService; il resto dell'interfaccia ASRServiceInterface è ereditato.
+    """
+
+    ENGINE = "faster-whisper"
+    METRICS_PREFIX = "whisper_faster"
+
+    def _load_components(self, model_name: str) -> Dict[str, Any]:
+        """
+        Carica un modello faster-whisper (senza snapshot).
+
+        Args:
+            model_name: Nome del modello, eventualmente con precisione (es. "small@int8").
+
+        Returns:
+            Dizionario con "model".
+        """
+        return self._load_pretrained_components(model_name)
+
+    def _load_pretrained_components(self, model_name: str) -> Dict[str, Any]:
+        """
+        Carica un modello CTranslate2 nel compute type della sua precisione.
+
+        La sessione usa i thread di torch del processo (INFERENCE_TORCH_THREADS,
+        autotuning, slot CPU) e un worker CTranslate2 per ogni inferenza
+        concorrente ammessa da WHISPER_MAX_CONCURRENCY.
+
+        Args:
+            model_name: Nome del modello (tiny, base, ...), eventualmente con precisione.
+
+        Returns:
+            Dizionario con "model" (faster_whisper.WhisperModel).
+
+        Raises:
+            RuntimeError: Se faster-whisper non è installato.
+            ValueError: Se la precisione non è supportata.
+        """
+        if faster_whisper is None:
+            raise RuntimeError("faster-whisper non installato: pip install faster-whisper")
+        size, precision = split_variant_name(model_name)
+        if precision not in COMPUTE_TYPES:
+            raise ValueError(f"Precisione '{precision}' non supportata da faster-whisper")
+
+        print(f"Loading faster-whisper model: {size} ({COMPUTE_TYPES[precision]})")
+        rss_before = get_process_rss()
+        model = faster_whisper.WhisperModel(
+            size,
+            device=self.device,
+            compute_type=COMPUTE_TYPES[precision],
+            cpu_threads=torch.get_num_threads(),
+            num_workers=settings.WHISPER_MAX_CONCURRENCY,
+            download_root=settings.FASTER_WHISPER_MODEL_DIR
+        )
+        # I pesi sono allocati da CTranslate2, fuori da PyTorch: stima per il ModelRegistry
+        rss_after = get_process_rss()
+        model.memory_bytes = max(0, rss_after - rss_before) if rss_before is not None and rss_after is not None else 0
+        print("faster-whisper model loaded successfully!")
+        return {"model": model}
+
+    def _transcribe_pcm_sync(self, pcm: np.ndarray, checkpoint: Optional[str] = None) -> str:
+        """
+        Trascrivi un singolo audio con il percorso standard di faster-whisper.
+
+        Args:
+            pcm: Audio float32 mono a 16kHz.
+            checkpoint: Dimensione del modello. Se None, usa quello attuale.
+
+        Returns:
+            Trascrizione dell'audio.
+        """
+        with self._use_model(checkpoint) as handle:
+            # Senza WHISPER_BEAM_SIZE decoding greedy, come openai-whisper
+            segments, _ = handle.model.transcribe(pcm, beam_size=settings.WHISPER_BEAM_SIZE or 1)
+            return "".join(segment.text for segment in segments).strip()
+
+    def _decode_batch_sync(
+        self,
+        pcms: List[np.ndarray],
+        checkpoint: Optional[str] = None
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Trascrivi più audio brevi (massimo 30 secondi) con un solo encoder e un solo generate.
+
+        Le feature delle richieste vengono impilate: l'encoder e il rilevamento
+        della lingua vengono eseguiti una volta per batch, e il decoding usa un
+        prompt per audio con la lingua rilevata. Le regole di transcribe() per
+        una singola finestra sono le stesse di WhisperService.
+
+        Args:
+            pcms: Lista di audio float32 mono a 16kHz, ciascuno di al massimo 30 secondi.
+            checkpoint: Dimensione del modello. Se None, usa quello attuale.
+
+        Returns:
+            Per ogni audio un dizionario con "text" e "timings" (millisecondi),
+            oppure None se l'audio richiede il percorso per singola richiesta.
+        """
+        with self._use_model(checkpoint) as handle:
+            model = handle.model
+
+            mel_start = time.perf_counter()
+            features, content_frames = [], []
+            for pcm in pcms:
+                # Stessa preparazione di transcribe(): l'ultimo frame non fa parte del contenuto
+                mel = model.feature_extractor(pcm)
+                frames = mel.shape[-1] - 1
+                features.append(pad_or_trim(mel[:, :frames]))
+                content_frames.append(frames)
+            mel_ms = (time.perf_counter() - mel_start) * 1000
+
+            # Il tempo di rilevamento della lingua include l'encoder, condiviso con il decoding
+            language_start = time.perf_counter()
+            encoder_output = model.encode(np.stack(features))
+            if model.model.is_multilingual:
+                languages = [probs[0][0][2:-2] for probs in model.model.detect_language(encoder_output)]
+            else:
+                languages = ["en"] * len(pcms)
+            language_ms = (time.perf_counter() - language_start) * 1000
+
+            decode_start = time.perf_counter()
+            tokenizers = {
+                language: Tokenizer(model.hf_tokenizer, model.model.is_multilingual, task="transcribe", language=language)
+                for language in dict.fromkeys(languages)
+            }
+            results = model.model.generate(
+                encoder_output,
+                [model.get_prompt(tokenizers[language], previous_tokens=[]) for language in languages],
+                beam_size=settings.WHISPER_BEAM_SIZE or 1,
+                max_length=model.max_length,
+                return_scores=True,
+                return_no_speech_prob=True,
+                suppress_blank=True,
+                suppress_tokens=get_suppressed_tokens(tokenizers[languages[0]], [-1]),
+                max_initial_timestamp_index=int(round(MAX_INITIAL_TIMESTAMP_S / model.time_precision))
+            )
+            outcomes: List[Optional[Dict[str, Any]]] = [None] * len(pcms)
+            for i, (language, result) in enumerate(zip(languages, results)):
+                tokenizer = tokenizers[language]
+                tokens = result.sequences_ids[0]
+                text = tokenizer.decode(tokens).strip()
+                decoding = DecodingResult(
+                    audio_features=None,
+                    language=language,
+                    tokens=tokens,
+                    text=text,
+                    # Lo score di CTranslate2 è la log-probabilità normalizzata per la lunghezza
+                    avg_logprob=result.scores[0] * len(tokens) / (len(tokens) + 1),
+                    no_speech_prob=result.no_speech_prob,
+                    compression_ratio=get_compression_ratio(text)
+                )
+                text = self._single_window_text(decoding, content_frames[i], tokenizer)
+                if text is not None:
+                    outcomes[i] = {"text": text}
+            decode_ms = (time.perf_counter() - decode_start) * 1000
+
+            for outcome in outcomes:
+                if outcome is not None:
+                    outcome["timings"] = {
+                        "batch_size": len(pcms),
+                        "mel_ms": mel_ms,
+                        "language_detection_ms": language_ms,
+                        "decode_ms": decode_ms
+                    }
+            return outcomes
+
+    def _stream_decode_sync(self, pcm: np.ndarray, prompt: str, language: Optional[str]) -> Dict[str, Any]:
+        """
+        Decodifica il buffer di una sessione di streaming con timestamp per parola.
+
+        Args:
+            pcm: Audio float32 mono a 16kHz del buffer (al massimo circa 30 secondi).
+            prompt: Testo già confermato, usato come contesto per la decodifica.
+            language: Lingua della sessione, o None per rilevarla.
+
+        Returns:
+            Dizionario con "words" (lista di (inizio, fine, parola) in secondi
+            relativi al buffer), "segment_ends" (fine di ogni segmento) e "language".
+        """
+        with self._use_model() as handle:
+            segments, info = handle.model.transcribe(
+                pcm,
+                language=language,
+                initial_prompt=prompt or None,
+                condition_on_previous_text=False,
+                word_timestamps=True,
+                beam_size=settings.WHISPER_BEAM_SIZE or 1
+            )
+            segments = list(segments)
+            words = [
+                (float(word.start), float(word.end), word.word)
+                for segment in segments
+                for word in segment.words or []
+            ]
+            return {
+                "words": words,
+                "segment_ends": [float(segment.end) for segment in segments],
+                "language": info.language
+            }
+
+    def get_model_info(self, model: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Ottieni informazioni sul modello attualmente in uso.
+
+        Args:
+            model: Dimensione del modello, eventualmente con precisione. Se None, usa quello attuale.
+
+        Returns:
+            Dizionario contenente informazioni sul modello, inclusi precisione,
+            motore e compute type di CTranslate2.
+        """
+        info = super().get_model_info(model)
+        return {**info, "backend": "ctranslate2", "compute_type": COMPUTE_TYPES.get(info["precision"])}
@@ -0,0 +1,154 @@
+"""
+Precaricamento e warm-up dei modelli all'avvio dell'applicazione.
+
+All'avvio vengono caricati i modelli di PRELOAD_MODELS ed eseguite inferenze
+sintetiche delle durate WARMUP_DURATIONS_S, così la prima richiesta reale non
+paga caricamento, allocazioni e inizializzazione dei kernel. Lo stato di
+avanzamento determina la readiness esposta su /health/ready: il replica è
+pronto solo quando il warm-up è terminato.
+
+Con AUTOTUNE_ON_STARTUP, se l'host non ha ancora valori misurati, l'autotuning
+(app.services.autotune) viene eseguito prima del precaricamento.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.dependencies import get_wav2vec2_service, get_whisper_service
+from app.services.autotune import run_startup_autotune
+from app.utils.inference_executor import InferenceExecutor
+
+SERVICE_GETTERS = {
+    "wav2vec2": get_wav2vec2_service,
+    "whisper": get_whisper_service
+}
+
+
+def parse_preload_entry(entry: str) -> Tuple[str, Optional[str]]:
+    """
+    Interpreta una voce di PRELOAD_MODELS.
+
+    Args:
+        entry: "motore" oppure "motore:modello" (es. "whisper:small").
+
+    Returns:
+        Tupla contenente (motore, modello o None per il modello attuale).
+
+    Raises:
+        ValueError: Se il motore non è supportato.
+    """
+    engine, _, model = entry.strip().partition(":")
+    engine = engine.lower()
+    if engine not in SERVICE_GETTERS:
+        raise ValueError(f"Motore non supportato in PRELOAD_MODELS: '{entry}'")
+    return engine, model or None
+
+
+class ReadinessState:
+    """
+    Stato singleton del precaricamento dei modelli.
+
+    Fasi: "pending" (non avviato), "warming_up", "ready" oppure "failed".
+    """
+
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ReadinessState, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        """Inizializza lo stato (solo una volta)."""
+        if not self._initialized:
+            self.stage = "pending"
+            self.error: Optional[str] = None
+            self.models: List[Dict[str, Any]] = []
+            self.started_at: Optional[float] = None
+            self.finished_at: Optional[float] = None
+            ReadinessState._initialized = True
+
+    @property
+    def ready(self) -> bool:
+        """True quando tutti i modelli configurati sono caricati e riscaldati."""
+        return self.stage == "ready"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Rappresentazione serializzabile dello stato.
+
+        Returns:
+            Dizionario con fase, errore, modelli precaricati e tempi.
+        """
+        return {
+            "stage": self.stage,
+            "ready": self.ready,
+            "error": self.error,
+            "models": list(self.models),
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+async def preload_models() -> None:
+    """
+    Precarica e riscalda i modelli configurati, aggiornando ReadinessState.
+
+    Un errore lascia il replica non pronto (fase "failed") senza interrompere
+    l'applicazione: i modelli restano caricabili alla prima richiesta.
+    """
+    state = ReadinessState()
+    state.stage = "warming_up"
+    state.started_at = time.time()
+    try:
+        await asyncio.to_thread(run_startup_autotune)
+        for entry in settings.PRELOAD_MODELS:
+            engine, model = parse_preload_entry(entry)
+            service = SERVICE_GETTERS[engine]()
+            result = await service.preload(model, settings.WARMUP_DURATIONS_S)
+            state.models.append({"engine": engine, **result})
+    except Exception as e:
+        state.error = str(e)
+        state.stage = "failed"
+        print(f"Model preload failed: {e}")
+    else:
+        state.stage = "ready"
+        print(f"Models ready in {time.time() - state.started_at:.1f}s")
+    finally:
+        state.finished_at = time.time()
+
+
+def load_models_before_fork() -> List[Dict[str, Any]]:
+    """
+    Carica nel processo corrente, senza warm-up, i modelli di PRELOAD_MODELS.
+
+    Usato dal launcher pre-fork: i worker ereditano i modelli già caricati
+    (pagine condivise copy-on-write) e nel proprio lifespan eseguono solo il
+    warm-up. Nessuna inferenza viene eseguita prima del fork, così i pool di
+    thread di torch vengono creati direttamente nei worker.
+
+    Con INFERENCE_EXECUTOR="workers" i modelli vivono nei processi di
+    inferenza dedicati di ogni worker e non vengono caricati prima del fork.
+    Nemmeno i modelli eseguiti fuori da PyTorch (es. la variante "onnx"):
+    il runtime crea i propri thread al caricamento e dopo il fork non
+    esisterebbero più; ogni worker li carica nel proprio warm-up.
+
+    Returns:
+        Lista dei modelli caricati con il relativo tempo di caricamento.
+    """
+    # I worker ereditano le impostazioni scelte dall'autotuning
+    run_startup_autotune()
+    loaded = []
+    for entry in settings.PRELOAD_MODELS:
+        engine, model = parse_preload_entry(entry)
+        if InferenceExecutor().uses_model_workers(engine):
+            continue
+        service = SERVICE_GETTERS[engine]()
+        if service.get_model_info(model)["backend"] != "torch":
+            continue
+        result = asyncio.run(service.preload(model))
+        loaded.append({"engine": engine, **result})
+    return loaded
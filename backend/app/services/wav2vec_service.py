@@ -5,17 +5,28 @@ Implementa l'interfaccia ASRServiceInterface per fornire servizi di trascrizione
 utilizzando modelli Wav2Vec2 di Hugging Face.
 """
 
+import asyncio
 import torch
-import torchaudio
+import threading
 import time
-from transformers import Wav2Vec2ForCTC, Wav2Vec2Processor
+from contextlib import contextmanager
+from functools import partial
+from transformers import Wav2Vec2FeatureExtractor, Wav2Vec2ForCTC, Wav2Vec2Processor
 import numpy as np
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 
 from app.interfaces.asr_interface import ASRServiceInterface
-from app.utils.audio_utils import decode_bytes_to_float32
+from app.utils.audio_utils import decode_audio_to_16k, resample_audio
+from app.models.model_compile import BucketedWav2Vec2ForCTC, compile_wav2vec2_components, get_length_buckets
 from app.models.model_manager import ASRModelManager
+from app.models.model_registry import ModelHandle
+from app.models.model_swap import ModelSwap, start_model_swap
 from app.utils.metrics import calculate_detailed_metrics
+from app.utils.inference_executor import InferenceExecutor
+from app.utils.result_cache import TranscriptionResultCache, cache_status_var
+from app.utils.single_flight import SingleFlight
+from app.services.batch_scheduler import MicroBatchScheduler
+from app.config import settings
 
 
 class Wav2Vec2Service(ASRServiceInterface):
@@ -33,29 +44,142 @@ class Wav2Vec2Service(ASRServiceInterface):
         self.model = None
         self.model_manager = ASRModelManager()
         self._current_model_name = None
+        self._model_handle: Optional[ModelHandle] = None
+        self._swap: Optional[ModelSwap] = None
+        self._load_lock = threading.Lock()
+        self._batch_schedulers: Dict[str, MicroBatchScheduler] = {}
+        self._single_flight = SingleFlight("wav2vec2")
+        self._attention_mask_flags: Dict[str, bool] = {}
 
     def _load_model(self, force_reload: bool = False) -> None:
         """
         Carica il modello solo quando necessario (lazy loading).
 
+        Il modello viene ottenuto dal registro condiviso del processo: se un
+        altro servizio lo ha già caricato viene riutilizzato, e l'handle del
+        modello precedente viene rilasciato.
+
         Args:
-            force_reload: Se True, forza il ricaricamento anche se già caricato.
+            force_reload: Se True, riacquisisce il modello dal registro anche se già caricato.
 
         Raises:
             Exception: Se il caricamento del modello fallisce.
         """
-        model_name = self.model_manager.get_wav2vec2_model_name()
-        
-        if self.model is None or force_reload or self._current_model_name != model_name:
-            try:
-                print(f"Loading Wav2Vec2 model: {model_name}")
-                self.processor = Wav2Vec2Processor.from_pretrained(model_name)
-                self.model = Wav2Vec2ForCTC.from_pretrained(model_name).to(self.device)
-                self.model.eval()
+        # I thread del pool di inferenza possono richiedere il modello in parallelo
+        with self._load_lock:
+            model_name = self.model_manager.get_wav2vec2_variant_name()
+
+            if self.model is None or force_reload or self._current_model_name != model_name:
+                try:
+                    handle = self.model_manager.acquire_model(
+                        "wav2vec2", model_name, lambda: self._load_components(model_name)
+                    )
+                except Exception as e:
+                    raise Exception(f"Errore nel caricamento del modello Wav2Vec2: {str(e)}")
+
+                previous_handle = self._model_handle
+                self._model_handle = handle
+                self.processor = handle.processor
+                self.model = handle.model
                 self._current_model_name = model_name
-                print("Wav2Vec2 model loaded successfully!")
-            except Exception as e:
-                raise Exception(f"Errore nel caricamento del modello Wav2Vec2: {str(e)}")
+                if previous_handle is not None:
+                    previous_handle.release()
+
+    def _load_components(self, model_name: str) -> Dict[str, Any]:
+        """
+        Carica un modello Wav2Vec2, dallo snapshot se disponibile.
+
+        Con WAV2VEC2_COMPILE_MODE il modello viene eseguito da grafi compilati
+        per bucket di lunghezza (app.models.model_compile).
+
+        Args:
+            model_name: Nome del modello, eventualmente con precisione (es. "...@int8").
+
+        Returns:
+            Dizionario con "processor" e "model".
+        """
+        return compile_wav2vec2_components(self.model_manager.load_model_components(
+            "wav2vec2", model_name, self.device, self._load_pretrained_components
+        ))
+
+    def _load_pretrained_components(self, model_name: str) -> Dict[str, Any]:
+        """
+        Carica processor e modello Wav2Vec2 da Hugging Face.
+
+        Args:
+            model_name: Nome del modello Hugging Face.
+
+        Returns:
+            Dizionario con "processor" e "model".
+        """
+        print(f"Loading Wav2Vec2 model: {model_name}")
+        processor = Wav2Vec2Processor.from_pretrained(model_name)
+        model = Wav2Vec2ForCTC.from_pretrained(model_name).to(self.device)
+        model.eval()
+        print("Wav2Vec2 model loaded successfully!")
+        return {"processor": processor, "model": model}
+
+    def _resolve_checkpoint(self, model: Optional[str] = None) -> str:
+        """
+        Risolvi il modello richiesto nella chiave del model manager.
+
+        Args:
+            model: Chiave del modello (es. "facebook", "facebook@int8" o "facebook@onnx"). Se None, usa quello attuale.
+
+        Returns:
+            Chiave del modello.
+
+        Raises:
+            ValueError: Se il modello specificato non è supportato.
+        """
+        if model is None:
+            return self.model_manager.get_current_wav2vec2_model()
+        try:
+            self.model_manager.get_wav2vec2_model_info(model)
+        except KeyError as e:
+            raise ValueError(f"Modello non supportato: {str(e)}")
+        return model
+
+    def _acquire_checkpoint(self, checkpoint: str) -> ModelHandle:
+        """
+        Ottieni dal registro un handle a un modello, caricandolo se necessario.
+
+        Args:
+            checkpoint: Chiave del modello (es. "facebook").
+
+        Returns:
+            Handle al modello; va rilasciato quando non serve più.
+        """
+        model_name = self.model_manager.get_wav2vec2_variant_name(checkpoint)
+        return self.model_manager.acquire_model(
+            "wav2vec2", model_name, lambda: self._load_components(model_name)
+        )
+
+    @contextmanager
+    def _use_model(self, checkpoint: Optional[str] = None) -> Iterator[ModelHandle]:
+        """
+        Ottieni dal registro il modello da usare per una singola inferenza.
+
+        Il modello attuale resta sempre residente (il servizio ne mantiene un
+        handle); gli altri restano nel pool del registro finché non vengono
+        scaricati per budget di memoria o inattività.
+
+        Args:
+            checkpoint: Chiave del modello (es. "facebook"). Se None, usa quello attuale.
+
+        Yields:
+            Handle con "model" e "processor", rilasciato al termine e conteggiato
+            come inferenza in corso.
+        """
+        current = self.model_manager.get_current_wav2vec2_model()
+        if checkpoint is None or checkpoint == current:
+            self._load_model()
+        try:
+            handle = self._acquire_checkpoint(checkpoint or current)
+        except Exception as e:
+            raise Exception(f"Errore nel caricamento del modello Wav2Vec2: {str(e)}")
+        with handle, handle.inference():
+            yield handle
 
     def _normalize_audio(self, pcm: np.ndarray) -> np.ndarray:
         """
@@ -84,11 +208,7 @@ class Wav2Vec2Service(ASRServiceInterface):
         Returns:
             Array audio ricampionato.
         """
-        if original_sr != target_sr:
-            pcm_tensor = torch.tensor(pcm, dtype=torch.float32)
-            pcm = torchaudio.functional.resample(pcm_tensor, original_sr, target_sr).numpy()
-            print(f"Resampled from {original_sr}Hz to {target_sr}Hz: {len(pcm)} samples")
-        return pcm
+        return resample_audio(pcm, original_sr, target_sr)
 
     def _postprocess_transcription(self, raw_transcription: str) -> str:
         """
@@ -118,50 +238,491 @@ class Wav2Vec2Service(ASRServiceInterface):
         
         return result
 
-    async def transcribe(self, audio_bytes: bytes) -> str:
+    def _prepare_audio_sync(self, audio_bytes: bytes) -> np.ndarray:
         """
-        Trascrivi audio bytes in testo utilizzando Wav2Vec2.
+        Decodifica, normalizza e ricampiona l'audio a 16kHz.
 
         Args:
             audio_bytes: Array di bytes contenente l'audio da trascrivere.
 
         Returns:
-            Stringa contenente la trascrizione dell'audio.
+            Array audio float32 mono a 16kHz pronto per il modello.
+        """
+        print(f"Processing {len(audio_bytes)} bytes of audio data")
+        # Decodifica e resample a 16kHz (con cache per hash dei bytes)
+        pcm = decode_audio_to_16k(audio_bytes)
 
-        Raises:
-            Exception: Se si verifica un errore durante la trascrizione.
+        # Normalizza l'audio
+        return self._normalize_audio(pcm)
+
+    def _forward_batch_sync(self, pcms: List[np.ndarray], checkpoint: Optional[str] = None) -> List[str]:
         """
-        try:
-            self._load_model()
-            
-            print(f"Processing {len(audio_bytes)} bytes of audio data")
-            pcm, sr = decode_bytes_to_float32(audio_bytes)
-            print(f"Decoded audio: {len(pcm)} samples at {sr}Hz")
-            
-            # Normalizza l'audio
-            pcm = self._normalize_audio(pcm)
-            
-            # Resample a 16kHz se necessario
-            pcm = self._resample_audio(pcm, sr)
+        Esegui un unico forward pass su più audio e decodifica ciascuno con CTC.
+
+        Gli audio vengono paddati alla lunghezza massima; se il modello lo
+        supporta viene passata l'attention mask, e i logits di ogni audio
+        vengono troncati alla sua lunghezza reale prima della decodifica.
+
+        Args:
+            pcms: Lista di audio float32 mono a 16kHz.
+            checkpoint: Chiave del modello (es. "facebook"). Se None, usa quello attuale.
+
+        Returns:
+            Lista delle trascrizioni post-processate, nello stesso ordine.
+        """
+        with self._use_model(checkpoint) as handle:
+            model, processor = handle.model, handle.processor
 
-            # Processa con il modello
-            inputs = self.processor(
-                pcm, 
+            inputs = processor(
+                pcms, 
                 sampling_rate=16000, 
                 return_tensors="pt", 
                 padding=True,
+                do_normalize=True,
+                return_attention_mask=True
+            )
+            model_inputs = {"input_values": inputs["input_values"].to(self.device)}
+            # I modelli con group norm (es. wav2vec2-base) non supportano l'attention mask
+            if processor.feature_extractor.return_attention_mask:
+                model_inputs["attention_mask"] = inputs["attention_mask"].to(self.device)
+
+            with torch.no_grad():
+                logits = model(**model_inputs).logits
+
+            predicted_ids = torch.argmax(logits, dim=-1)
+            output_lengths = model._get_feat_extract_output_lengths(
+                torch.tensor([len(pcm) for pcm in pcms])
+            )
+
+            return [
+                self._postprocess_transcription(processor.decode(ids[:int(length)]))
+                for ids, length in zip(predicted_ids, output_lengths)
+            ]
+
+    def _transcribe_chunked_sync(self, pcm: np.ndarray, checkpoint: Optional[str] = None) -> str:
+        """
+        Trascrivi un audio lungo a chunk sovrapposti, con memoria limitata.
+
+        L'audio viene diviso in chunk di WAV2VEC2_CHUNK_LENGTH_S secondi che si
+        sovrappongono di WAV2VEC2_STRIDE_LENGTH_S secondi su ciascun lato. Di ogni
+        chunk si conservano solo gli id CTC della parte centrale (i frame di
+        contesto ai bordi vengono scartati), così le parti conservate sono
+        contigue e la decodifica CTC sulla sequenza concatenata unisce
+        correttamente i token a cavallo dei bordi. Attivazioni e logits esistono
+        solo per un chunk alla volta.
+
+        Args:
+            pcm: Audio float32 mono a 16kHz.
+            checkpoint: Chiave del modello (es. "facebook"). Se None, usa quello attuale.
+
+        Returns:
+            Trascrizione post-processata dell'intero audio.
+
+        Raises:
+            ValueError: Se lo stride non lascia una parte centrale al chunk.
+        """
+        with self._use_model(checkpoint) as handle:
+            model, processor = handle.model, handle.processor
+
+            chunk_len = int(settings.WAV2VEC2_CHUNK_LENGTH_S * 16000)
+            stride_len = int(settings.WAV2VEC2_STRIDE_LENGTH_S * 16000)
+            step = chunk_len - 2 * stride_len
+            if stride_len <= 0 or step <= 0:
+                raise ValueError("WAV2VEC2_STRIDE_LENGTH_S deve essere positivo e minore di metà del chunk")
+
+            # Campioni audio per frame di logits (prodotto degli stride convoluzionali)
+            samples_per_frame = int(np.prod(model.config.conv_stride))
+            stride_frames = int(round(stride_len / samples_per_frame))
+
+            kept_ids = []
+            for chunk_start in range(0, len(pcm), step):
+                chunk_end = min(chunk_start + chunk_len, len(pcm))
+                is_first = chunk_start == 0
+                is_last = chunk_end >= len(pcm)
+
+                inputs = processor(
+                    pcm[chunk_start:chunk_end],
+                    sampling_rate=16000,
+                    return_tensors="pt",
+                    padding=True,
+                    do_normalize=True
+                )
+                inputs = {k: v.to(self.device) for k, v in inputs.items()}
+
+                with torch.no_grad():
+                    logits = model(**inputs).logits
+
+                ids = torch.argmax(logits, dim=-1)[0].cpu()
+                del logits
+
+                left = 0 if is_first else stride_frames
+                right = 0 if is_last else stride_frames
+                kept_ids.append(ids[left:len(ids) - right])
+
+                if is_last:
+                    break
+
+            print(f"Chunked inference: {len(kept_ids)} chunks of {settings.WAV2VEC2_CHUNK_LENGTH_S}s")
+            transcription = processor.decode(torch.cat(kept_ids))
+            return self._postprocess_transcription(transcription)
+
+    def _ctc_continuation_text(self, processor: Wav2Vec2Processor, ids: List[int], previous_id: Optional[int]) -> str:
+        """
+        Decodifica con CTC gli id che seguono una sequenza già decodificata.
+
+        Come processor.decode, ma senza rimuovere gli spazi ai bordi: gli id
+        uguali all'ultimo id precedente vengono uniti a esso e i delimitatori
+        di parola diventano spazi, così i testi di sequenze consecutive si
+        possono concatenare.
+
+        Args:
+            processor: Processor del modello.
+            ids: Id CTC da decodificare.
+            previous_id: Ultimo id della sequenza precedente, o None all'inizio.
+
+        Returns:
+            Testo grezzo (da post-processare) degli id.
+        """
+        tokenizer = processor.tokenizer
+        chars = []
+        for token_id in ids:
+            if token_id != previous_id and token_id != tokenizer.pad_token_id:
+                token = tokenizer.convert_ids_to_tokens(token_id)
+                chars.append(tokenizer.replace_word_delimiter_char if token == tokenizer.word_delimiter_token else token)
+            previous_id = token_id
+        text = "".join(chars)
+        return text.lower() if tokenizer.do_lower_case else text
+
+    def _stream_step_sync(
+        self,
+        window: np.ndarray,
+        commit_from: int,
+        commit_to: int,
+        last_committed_id: Optional[int]
+    ) -> Tuple[Optional[int], str, str]:
+        """
+        Esegui un passo di inferenza in streaming su una finestra dell'audio.
+
+        La finestra contiene il contesto sinistro già confermato, l'audio da
+        confermare e una coda provvisoria: gli id CTC del contesto sinistro
+        vengono scartati, quelli fino a commit_to diventano definitivi e i
+        restanti sono provvisori. Il testo degli id definitivi continua quello
+        dei passi precedenti a partire dall'ultimo id confermato, così la
+        decodifica CTC unisce correttamente i token a cavallo delle finestre
+        senza ridecodificare l'intera sessione.
+
+        Args:
+            window: Audio float32 mono a 16kHz della finestra.
+            commit_from: Campione (relativo alla finestra) da cui iniziano gli id nuovi.
+            commit_to: Campione (relativo alla finestra) fino a cui gli id sono definitivi.
+            last_committed_id: Ultimo id definitivo dei passi precedenti, o None.
+
+        Returns:
+            Tupla contenente (ultimo id definitivo, testo grezzo dei nuovi id
+            definitivi, testo grezzo della coda provvisoria), da concatenare al
+            testo grezzo già confermato e post-processare.
+        """
+        with self._use_model() as handle:
+            model, processor = handle.model, handle.processor
+
+            inputs = processor(
+                window,
+                sampling_rate=16000,
+                return_tensors="pt",
+                padding=True,
                 do_normalize=True
             )
             inputs = {k: v.to(self.device) for k, v in inputs.items()}
 
             with torch.no_grad():
-                logits = self.model(**inputs).logits
+                logits = model(**inputs).logits
 
-            predicted_ids = torch.argmax(logits, dim=-1)
-            transcription = self.processor.decode(predicted_ids[0])
-            
-            # Post-processing
-            result = self._postprocess_transcription(transcription)
+            ids = torch.argmax(logits, dim=-1)[0].cpu().tolist()
+            samples_per_frame = int(np.prod(model.config.conv_stride))
+            start = int(round(commit_from / samples_per_frame))
+            end = int(round(commit_to / samples_per_frame))
+
+            new_committed = ids[start:end]
+            committed_text = self._ctc_continuation_text(processor, new_committed, last_committed_id)
+            if new_committed:
+                last_committed_id = new_committed[-1]
+            tail_text = self._ctc_continuation_text(processor, ids[end:], last_committed_id)
+            return last_committed_id, committed_text, tail_text
+
+    def _warm_up_sync(self, checkpoint: Optional[str] = None, duration_s: float = 1.0) -> None:
+        """
+        Esegui un'inferenza sintetica per preparare allocazioni e kernel del modello.
+
+        Con l'esecuzione compilata vengono prima compilati i grafi di tutti i
+        bucket non ancora compilati, così nessuna richiesta paga la compilazione.
+
+        Args:
+            checkpoint: Chiave del modello (es. "facebook"). Se None, usa quello attuale.
+            duration_s: Durata dell'audio sintetico in secondi.
+        """
+        with self._use_model(checkpoint) as handle:
+            if isinstance(handle.model, BucketedWav2Vec2ForCTC):
+                handle.model.compile_buckets()
+        pcm = (0.01 * np.random.default_rng(0).standard_normal(int(duration_s * 16000))).astype(np.float32)
+        # Stesso percorso delle richieste reali della stessa durata
+        if settings.WAV2VEC2_CHUNKING_ENABLED and duration_s > settings.WAV2VEC2_CHUNKING_MIN_DURATION_S:
+            self._transcribe_chunked_sync(pcm, checkpoint)
+        else:
+            self._forward_batch_sync([pcm], checkpoint)
+
+    async def _load_for_swap(self, checkpoint: str) -> Optional[ModelHandle]:
+        """
+        Carica il nuovo modello di un cambio fuori dall'event loop.
+
+        Con i processi di inferenza dedicati il modello viene caricato (e
+        riscaldato brevemente) in ognuno di essi, non nel processo API.
+
+        Args:
+            checkpoint: Chiave del nuovo modello.
+
+        Returns:
+            L'handle del modello caricato, oppure None con i processi dedicati.
+        """
+        if InferenceExecutor().uses_model_workers("wav2vec2"):
+            await self._warm_up(checkpoint, 0.1)
+            return None
+        return await asyncio.to_thread(self._acquire_checkpoint, checkpoint)
+
+    def _switch_model(self, checkpoint: str, handle: Optional[ModelHandle]) -> Optional[ModelHandle]:
+        """
+        Rendi attuale un modello già caricato, in modo atomico rispetto alle richieste.
+
+        Args:
+            checkpoint: Chiave del modello (es. "facebook").
+            handle: Handle al nuovo modello, che il servizio mantiene residente;
+                None se il modello è caricato nei processi di inferenza dedicati.
+
+        Returns:
+            L'handle del modello sostituito, oppure None.
+        """
+        with self._load_lock:
+            self.model_manager.set_wav2vec2_model(checkpoint)
+            if handle is None:
+                # Nessuna copia del modello nel processo API
+                return None
+            previous_handle = self._model_handle
+            self._model_handle = handle
+            self.processor = handle.processor
+            self.model = handle.model
+            self._current_model_name = handle.name
+        return previous_handle
+
+    async def _run_sync(self, model_key: str, method_name: str, *args: Any) -> Any:
+        """
+        Esegui un metodo sincrono del servizio sul pool di inferenza condiviso.
+
+        Args:
+            model_key: Chiave usata per il limite di concorrenza ("audio" o "wav2vec2").
+            method_name: Nome del metodo da eseguire.
+            *args: Argomenti del metodo.
+
+        Returns:
+            Il valore restituito dal metodo.
+        """
+        executor = InferenceExecutor()
+        if executor.uses_model_workers(model_key):
+            checkpoint = self.model_manager.get_current_wav2vec2_model()
+            return await executor.run_in_model_worker(model_key, _run_in_worker_process, checkpoint, method_name, *args)
+        if executor.is_process_pool:
+            checkpoint = self.model_manager.get_current_wav2vec2_model()
+            return await executor.run(model_key, _run_in_worker_process, checkpoint, method_name, *args)
+        return await executor.run(model_key, getattr(self, method_name), *args)
+
+    async def _warm_up(self, checkpoint: str, duration_s: float = 1.0) -> None:
+        """
+        Riscalda un modello con un'inferenza sintetica.
+
+        Con i processi di inferenza dedicati il warm-up viene eseguito in
+        ognuno di essi, dato che ogni processo carica la propria copia del modello.
+
+        Args:
+            checkpoint: Chiave del modello da riscaldare.
+            duration_s: Durata in secondi dell'audio sintetico.
+        """
+        executor = InferenceExecutor()
+        if executor.uses_model_workers("wav2vec2"):
+            current = self.model_manager.get_current_wav2vec2_model()
+            await executor.broadcast_to_model_workers(
+                "wav2vec2", _run_in_worker_process, current, "_warm_up_sync", checkpoint, duration_s
+            )
+        else:
+            await self._run_sync("wav2vec2", "_warm_up_sync", checkpoint, duration_s)
+
+    async def _forward_batch(self, pcms: List[np.ndarray], checkpoint: Optional[str] = None) -> List[str]:
+        """
+        Esegui il forward pass di un batch sul pool di inferenza.
+
+        Args:
+            pcms: Lista di audio float32 mono a 16kHz.
+            checkpoint: Chiave del modello. Se None, usa quello attuale.
+
+        Returns:
+            Lista delle trascrizioni, nello stesso ordine.
+        """
+        return await self._run_sync("wav2vec2", "_forward_batch_sync", pcms, checkpoint)
+
+    def _get_batch_scheduler(self, checkpoint: str) -> MicroBatchScheduler:
+        """
+        Ottieni lo scheduler di micro-batching di un modello (creato al primo utilizzo).
+
+        Ogni modello ha il proprio scheduler, così un batch contiene solo
+        richieste per lo stesso modello.
+
+        Args:
+            checkpoint: Chiave del modello.
+
+        Returns:
+            Lo scheduler associato al modello.
+        """
+        if checkpoint not in self._batch_schedulers:
+            self._batch_schedulers[checkpoint] = MicroBatchScheduler(
+                partial(self._forward_batch, checkpoint=checkpoint),
+                max_batch_size=settings.WAV2VEC2_BATCH_MAX_SIZE,
+                max_wait_ms=settings.WAV2VEC2_BATCH_MAX_WAIT_MS,
+                bucket_ratio=settings.WAV2VEC2_BATCH_BUCKET_RATIO,
+                metrics_prefix="wav2vec2"
+            )
+        return self._batch_schedulers[checkpoint]
+
+    def _uses_attention_mask(self, checkpoint: str) -> bool:
+        """
+        Indica se il processor del modello restituisce l'attention mask.
+
+        Letto dalla configurazione del feature extractor (senza caricare il
+        modello, che con i processi dedicati non è nel processo API) e
+        memorizzato per modello. Se la configurazione non è leggibile si
+        assume che l'attention mask non venga usata.
+
+        Args:
+            checkpoint: Chiave del modello.
+
+        Returns:
+            True se il modello riceve l'attention mask.
+        """
+        model_name = self.model_manager.get_wav2vec2_model_name(checkpoint)
+        if model_name not in self._attention_mask_flags:
+            try:
+                feature_extractor = Wav2Vec2FeatureExtractor.from_pretrained(model_name)
+                self._attention_mask_flags[model_name] = bool(feature_extractor.return_attention_mask)
+            except Exception as e:
+                print(f"Could not read feature extractor config of {model_name}: {e}")
+                return False
+        return self._attention_mask_flags[model_name]
+
+    def _cache_key(self, audio_bytes: bytes, checkpoint: str) -> str:
+        """
+        Costruisci la chiave della cache dei risultati per un audio.
+
+        Args:
+            audio_bytes: Array di bytes contenente l'audio da trascrivere.
+            checkpoint: Chiave del modello usato.
+
+        Returns:
+            Chiave che combina audio, modello e parametri di inferenza.
+        """
+        params = {
+            "chunking": settings.WAV2VEC2_CHUNKING_ENABLED,
+            "chunking_min_duration_s": settings.WAV2VEC2_CHUNKING_MIN_DURATION_S,
+            "chunk_length_s": settings.WAV2VEC2_CHUNK_LENGTH_S,
+            "stride_length_s": settings.WAV2VEC2_STRIDE_LENGTH_S,
+            "compile_mode": self.model_manager.get_wav2vec2_model_info(checkpoint)["compile_mode"]
+        }
+        if params["compile_mode"] != "none" and not self._uses_attention_mask(checkpoint):
+            # Senza attention mask il padding al bucket compilato influenza la trascrizione
+            params["compile_buckets"] = get_length_buckets()
+        model_name = self.model_manager.get_wav2vec2_variant_name(checkpoint)
+        return TranscriptionResultCache.build_key(audio_bytes, "wav2vec2", model_name, params)
+
+    async def _run_transcription(self, audio_bytes: bytes, checkpoint: str) -> Tuple[str, float]:
+        """
+        Restituisci la trascrizione dalla cache dei risultati o eseguila.
+
+        In caso di hit vengono restituiti il testo e il tempo di inferenza
+        dell'esecuzione originale. Le richieste identiche concorrenti condividono
+        una sola inferenza (single-flight). Lo stato della richiesta ("hit",
+        "miss", "coalesced" o "disabled") è in cache_status_var.
+
+        Args:
+            audio_bytes: Array di bytes contenente l'audio da trascrivere.
+            checkpoint: Chiave del modello da usare.
+
+        Returns:
+            Tupla contenente (trascrizione, tempo di inferenza in secondi).
+        """
+        cache = TranscriptionResultCache()
+        # Hash dell'intero audio: fuori dall'event loop come la lettura della cache
+        key = await asyncio.to_thread(self._cache_key, audio_bytes, checkpoint)
+        cached = await cache.get(key, "wav2vec2")
+        if cached is not None:
+            return cached["text"], cached["inference_time"]
+
+        async def infer_and_store() -> Tuple[str, float]:
+            outcome = await self._infer(audio_bytes, checkpoint)
+            await cache.set(key, {"text": outcome[0], "inference_time": outcome[1]})
+            return outcome
+
+        (result, inference_time), coalesced = await self._single_flight.do(key, infer_and_store)
+        if coalesced:
+            cache_status_var.set("coalesced")
+        return result, inference_time
+
+    async def _infer(self, audio_bytes: bytes, checkpoint: str) -> Tuple[str, float]:
+        """
+        Decodifica l'audio ed esegui l'inferenza sul pool di inferenza.
+
+        Gli audio più lunghi di WAV2VEC2_CHUNKING_MIN_DURATION_S vengono elaborati
+        a chunk; con WAV2VEC2_BATCHING_ENABLED gli altri passano dallo scheduler
+        di micro-batching e condividono il forward pass con le richieste concorrenti.
+
+        Args:
+            audio_bytes: Array di bytes contenente l'audio da trascrivere.
+            checkpoint: Chiave del modello da usare.
+
+        Returns:
+            Tupla contenente (trascrizione, tempo di inferenza in secondi).
+        """
+        # Misura il tempo di inferenza
+        start_time = time.perf_counter()
+
+        pcm = await self._run_sync("audio", "_prepare_audio_sync", audio_bytes)
+
+        is_long_audio = len(pcm) > settings.WAV2VEC2_CHUNKING_MIN_DURATION_S * 16000
+        if settings.WAV2VEC2_CHUNKING_ENABLED and is_long_audio:
+            result = await self._run_sync("wav2vec2", "_transcribe_chunked_sync", pcm, checkpoint)
+        elif settings.WAV2VEC2_BATCHING_ENABLED:
+            result = await self._get_batch_scheduler(checkpoint).submit(pcm)
+        else:
+            result = (await self._forward_batch([pcm], checkpoint))[0]
+
+        # Fine misurazione tempo
+        inference_time = time.perf_counter() - start_time
+
+        return result, inference_time
+
+    async def transcribe(self, audio_bytes: bytes, model: Optional[str] = None) -> str:
+        """
+        Trascrivi audio bytes in testo utilizzando Wav2Vec2.
+
+        Args:
+            audio_bytes: Array di bytes contenente l'audio da trascrivere.
+            model: Chiave del modello da usare per questa richiesta (es. "jonatas").
+                Se None, usa il modello attuale.
+
+        Returns:
+            Stringa contenente la trascrizione dell'audio.
+
+        Raises:
+            ValueError: Se il modello specificato non è supportato.
+            Exception: Se si verifica un errore durante la trascrizione.
+        """
+        checkpoint = self._resolve_checkpoint(model)
+        try:
+            result, _ = await self._run_transcription(audio_bytes, checkpoint)
             
             print(f"Transcription completed: '{result}'")
             
@@ -178,7 +739,8 @@ class Wav2Vec2Service(ASRServiceInterface):
     async def transcribe_with_metrics(
         self, 
         audio_bytes: bytes, 
-        reference_text: Optional[str] = None
+        reference_text: Optional[str] = None,
+        model: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Trascrivi audio bytes in testo e calcola metriche di valutazione.
@@ -186,56 +748,24 @@ class Wav2Vec2Service(ASRServiceInterface):
         Args:
             audio_bytes: Array di bytes contenente l'audio da trascrivere.
             reference_text: Testo di riferimento per calcolo WER/CER (opzionale).
+            model: Chiave del modello da usare per questa richiesta. Se None,
+                usa il modello attuale.
 
         Returns:
             Dizionario contenente:
             - text: Trascrizione dell'audio
             - inference_time: Tempo di inferenza in secondi
+            - cache_status: "hit", "miss", "coalesced" o "disabled" (cache dei risultati)
             - metrics: Metriche WER, CER se reference_text è fornito
             - model_info: Informazioni sul modello utilizzato
 
         Raises:
+            ValueError: Se il modello specificato non è supportato.
             Exception: Se si verifica un errore durante la trascrizione.
         """
+        checkpoint = self._resolve_checkpoint(model)
         try:
-            self._load_model()
-            
-            print(f"Processing {len(audio_bytes)} bytes of audio data")
-            
-            # Misura il tempo di inferenza
-            start_time = time.perf_counter()
-            
-            pcm, sr = decode_bytes_to_float32(audio_bytes)
-            print(f"Decoded audio: {len(pcm)} samples at {sr}Hz")
-            
-            # Normalizza l'audio
-            pcm = self._normalize_audio(pcm)
-            
-            # Resample a 16kHz se necessario
-            pcm = self._resample_audio(pcm, sr)
-
-            # Processa con il modello
-            inputs = self.processor(
-                pcm, 
-                sampling_rate=16000, 
-                return_tensors="pt", 
-                padding=True,
-                do_normalize=True
-            )
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-
-            with torch.no_grad():
-                logits = self.model(**inputs).logits
-
-            predicted_ids = torch.argmax(logits, dim=-1)
-            transcription = self.processor.decode(predicted_ids[0])
-            
-            # Post-processing
-            result = self._postprocess_transcription(transcription)
-            
-            # Fine misurazione tempo
-            end_time = time.perf_counter()
-            inference_time = end_time - start_time
+            result, inference_time = await self._run_transcription(audio_bytes, checkpoint)
             
             print(f"Transcription completed in {inference_time:.3f}s: '{result}'")
             
@@ -248,7 +778,8 @@ class Wav2Vec2Service(ASRServiceInterface):
             response = {
                 "text": result,
                 "inference_time": inference_time,
-                "model_info": self.get_model_info()
+                "cache_status": cache_status_var.get(),
+                "model_info": self.get_model_info(checkpoint)
             }
             
             # Calcola metriche se fornito il testo di riferimento
@@ -263,34 +794,111 @@ class Wav2Vec2Service(ASRServiceInterface):
             print(f"Transcription error: {e}")
             raise Exception(f"Errore durante la trascrizione: {str(e)}")
 
-    def get_model_info(self) -> Dict[str, Any]:
+    def get_model_info(self, model: Optional[str] = None) -> Dict[str, Any]:
         """
         Ottieni informazioni sul modello attualmente in uso.
 
+        Args:
+            model: Chiave del modello. Se None, usa quello attuale.
+
         Returns:
             Dizionario contenente informazioni sul modello.
         """
-        return self.model_manager.get_wav2vec2_model_info()
+        return self.model_manager.get_wav2vec2_model_info(model)
 
-    async def update_model(self, model_name: str) -> bool:
+    async def update_model(self, model_name: str, wait: bool = False) -> bool:
         """
-        Aggiorna il modello utilizzato dal servizio.
+        Aggiorna il modello utilizzato dal servizio senza interrompere le richieste.
+
+        Il nuovo modello viene caricato e riscaldato in background mentre le
+        richieste continuano a usare quello attuale; poi diventa il modello
+        attuale e il precedente viene rilasciato quando le richieste in corso
+        su di esso sono terminate. L'avanzamento è in get_swap_status().
 
         Args:
             model_name: Nome del nuovo modello da utilizzare.
+            wait: Se True, attendi il completamento del cambio.
 
         Returns:
-            True se l'aggiornamento è riuscito.
+            True se il cambio è stato avviato (o completato, con wait=True).
 
         Raises:
-            KeyError: Se il modello specificato non è supportato.
+            ValueError: Se il modello specificato non è supportato.
+            RuntimeError: Se un altro cambio di modello è già in corso.
+            Exception: Se il caricamento del nuovo modello fallisce (solo con wait=True).
         """
-        try:
-            self.model_manager.set_wav2vec2_model(model_name)
-            self._load_model(force_reload=True)
+        checkpoint = self._resolve_checkpoint(model_name)
+        if self._swap is not None and not self._swap.done:
+            raise RuntimeError(f"Cambio di modello già in corso verso '{self._swap.target}'")
+
+        current = self.model_manager.get_current_wav2vec2_model()
+        uses_workers = InferenceExecutor().uses_model_workers("wav2vec2")
+        if checkpoint == current and (uses_workers or self._model_handle is not None):
             return True
-        except KeyError as e:
-            raise ValueError(f"Modello non supportato: {str(e)}")
+
+        self._swap = ModelSwap("wav2vec2", current, checkpoint)
+        task = start_model_swap(
+            self._swap,
+            lambda: self._load_for_swap(checkpoint),
+            lambda: self._warm_up(checkpoint),
+            lambda handle: self._switch_model(checkpoint, handle)
+        )
+        if wait:
+            await asyncio.shield(task)
+        return True
+
+    async def preload(self, model: Optional[str] = None, warmup_durations_s: Optional[List[float]] = None) -> Dict[str, Any]:
+        """
+        Carica un modello e riscaldalo con inferenze sintetiche.
+
+        Il modello attuale viene caricato come tale; gli altri restano nel pool
+        del registro per le richieste che li selezionano, soggetti come ogni
+        modello inattivo al budget di memoria e al timeout di inattività.
+
+        Args:
+            model: Modello da precaricare (es. "jonatas"). Se None, usa quello attuale.
+            warmup_durations_s: Durate in secondi degli audio sintetici di warm-up.
+
+        Returns:
+            Dizionario con modello, tempo di caricamento e tempi di warm-up per durata.
+
+        Raises:
+            ValueError: Se il modello specificato non è supportato.
+            Exception: Se il caricamento o il warm-up falliscono.
+        """
+        checkpoint = self._resolve_checkpoint(model)
+        load_start = time.perf_counter()
+        handle: Optional[ModelHandle] = None
+        if InferenceExecutor().uses_model_workers("wav2vec2"):
+            # Il modello viene caricato nei processi di inferenza dedicati, non nel processo API
+            await self._warm_up(checkpoint, 0.1)
+        elif checkpoint == self.model_manager.get_current_wav2vec2_model():
+            await asyncio.to_thread(self._load_model)
+        else:
+            # Tiene il modello residente fino al termine del warm-up
+            handle = await asyncio.to_thread(self._acquire_checkpoint, checkpoint)
+        load_s = time.perf_counter() - load_start
+
+        warmup_ms: Dict[str, float] = {}
+        try:
+            for duration_s in warmup_durations_s or []:
+                start = time.perf_counter()
+                await self._warm_up(checkpoint, duration_s)
+                warmup_ms[f"{duration_s:g}s"] = round((time.perf_counter() - start) * 1000, 1)
+        finally:
+            if handle is not None:
+                handle.release()
+        print(f"Preloaded wav2vec2 model '{checkpoint}' in {load_s:.1f}s, warm-up: {warmup_ms}")
+        return {"model": checkpoint, "load_time_s": round(load_s, 2), "warmup_ms": warmup_ms}
+
+    def get_swap_status(self) -> Optional[Dict[str, Any]]:
+        """
+        Ottieni lo stato dell'ultimo cambio di modello.
+
+        Returns:
+            Dizionario con fase e durate del cambio, oppure None se non ce ne sono stati.
+        """
+        return self._swap.to_dict() if self._swap is not None else None
 
     def get_supported_models(self) -> Dict[str, Dict[str, Any]]:
         """
@@ -300,3 +908,29 @@ class Wav2Vec2Service(ASRServiceInterface):
             Dizionario con i modelli supportati e le loro informazioni.
         """
         return self.model_manager.get_all_wav2vec2_models()
+
+
+# Istanza del servizio usata dai processi di inferenza con INFERENCE_EXECUTOR="process" o "workers"
+_worker_service: Optional[Wav2Vec2Service] = None
+
+
+def _run_in_worker_process(model_key: str, method_name: str, *args: Any) -> Any:
+    """
+    Esegui un metodo sincrono del servizio in un processo del pool di inferenza.
+
+    Ogni processo mantiene la propria istanza del servizio (e quindi del modello),
+    caricata alla prima richiesta.
+
+    Args:
+        model_key: Chiave del modello Wav2Vec2 da utilizzare.
+        method_name: Nome del metodo sincrono da eseguire.
+        *args: Argomenti del metodo.
+
+    Returns:
+        Il valore restituito dal metodo.
+    """
+    global _worker_service
+    if _worker_service is None:
+        _worker_service = Wav2Vec2Service()
+    _worker_service.model_manager.set_wav2vec2_model(model_key)
+    return getattr(_worker_service, method_name)(*args)
@@ -0,0 +1,172 @@
+"""
+Sessione di trascrizione in streaming con Wav2Vec2.
+
+L'audio arriva a pezzi (PCM o WebM dal browser) e viene accumulato in un buffer
+scorrevole. Ogni WAV2VEC2_STREAM_STEP_S secondi di audio nuovo viene eseguita
+l'inferenza CTC su una finestra che comprende un contesto sinistro già
+confermato e una coda provvisoria (contesto destro): gli id CTC della parte
+centrale diventano definitivi, quelli della coda restano provvisori e vengono
+ricalcolati al passo successivo con più contesto. Il buffer conserva solo il
+contesto sinistro necessario, quindi la memoria non cresce con la durata.
+"""
+
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.services.wav2vec_service import Wav2Vec2Service
+from app.utils.audio_utils import StreamingAudioDecoder
+from app.utils.telemetry import TelemetryRegistry
+
+SAMPLE_RATE = 16000
+# Finestra minima elaborabile dagli strati convoluzionali di Wav2Vec2
+MIN_WINDOW_SAMPLES = 400
+LATENCY_MS_BUCKETS = [50, 100, 250, 500, 1000, 2000, 5000]
+
+
+class Wav2Vec2StreamingSession:
+    """
+    Stato di una singola connessione di streaming.
+
+    Produce ipotesi "partial" (testo stabile + coda provvisoria) durante lo
+    stream e un'ipotesi "final" alla chiusura.
+    """
+
+    def __init__(self, service: Wav2Vec2Service, audio_format: str = "pcm16", sample_rate: int = SAMPLE_RATE):
+        """
+        Inizializza la sessione.
+
+        Args:
+            service: Servizio Wav2Vec2 usato per l'inferenza.
+            audio_format: Formato dei chunk ("pcm16", "f32", "webm", ...).
+            sample_rate: Frequenza di campionamento dell'audio raw PCM.
+        """
+        self._service = service
+        self._decoder = StreamingAudioDecoder(audio_format, sample_rate)
+        self._step = int(settings.WAV2VEC2_STREAM_STEP_S * SAMPLE_RATE)
+        self._left_context = int(settings.WAV2VEC2_STREAM_LEFT_CONTEXT_S * SAMPLE_RATE)
+        self._right_context = int(settings.WAV2VEC2_STREAM_RIGHT_CONTEXT_S * SAMPLE_RATE)
+
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._buffer_start = 0  # campione assoluto corrispondente a self._buffer[0]
+        self._committed_until = 0  # campione assoluto fino a cui gli id sono definitivi
+        self._last_committed_id: Optional[int] = None  # ultimo id CTC definitivo, per unire i token tra i passi
+        self._committed_text = ""  # testo grezzo degli id definitivi, cresce solo in coda
+        self._stable_text = ""
+        self._text = ""
+
+        self._started_at = time.perf_counter()
+        self.time_to_first_word_ms: Optional[float] = None
+
+    @property
+    def _total_samples(self) -> int:
+        """Numero di campioni ricevuti dall'inizio dello stream."""
+        return self._buffer_start + len(self._buffer)
+
+    def _append(self, samples: np.ndarray, sr: int) -> None:
+        """
+        Aggiungi campioni decodificati al buffer, ricampionandoli a 16kHz.
+
+        Args:
+            samples: Campioni float32 mono.
+            sr: Frequenza di campionamento dei campioni.
+        """
+        if len(samples) == 0:
+            return
+        if sr != SAMPLE_RATE:
+            samples = self._service._resample_audio(samples, sr)
+        self._buffer = np.concatenate([self._buffer, samples.astype(np.float32)])
+
+    async def push(self, chunk: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Aggiungi un chunk audio ed esegui un passo di inferenza se c'è abbastanza audio nuovo.
+
+        Args:
+            chunk: Bytes audio ricevuti dal client.
+
+        Returns:
+            Messaggio "partial" da inviare al client, oppure None.
+        """
+        self._append(*await self._decoder.feed_async(chunk))
+        if self._total_samples - self._committed_until < self._step + self._right_context:
+            return None
+        return await self._advance(final=False)
+
+    async def finish(self) -> Dict[str, Any]:
+        """
+        Chiudi lo stream confermando tutto l'audio rimanente.
+
+        Returns:
+            Messaggio "final" con la trascrizione completa.
+        """
+        self._append(*await self._decoder.flush_async())
+        if self._total_samples > self._committed_until:
+            return await self._advance(final=True)
+        return self._message("final")
+
+    def close(self) -> None:
+        """Rilascia le risorse della sessione (decoder dell'audio)."""
+        self._decoder.close()
+
+    async def _advance(self, final: bool) -> Dict[str, Any]:
+        """
+        Esegui l'inferenza sulla finestra corrente e aggiorna lo stato.
+
+        Args:
+            final: Se True conferma anche la coda della finestra.
+
+        Returns:
+            Messaggio "partial" o "final".
+        """
+        total = self._total_samples
+        window_start = max(self._buffer_start, self._committed_until - self._left_context)
+        commit_to = total if final else total - self._right_context
+        window = self._buffer[window_start - self._buffer_start:]
+
+        if len(window) >= MIN_WINDOW_SAMPLES:
+            start = time.perf_counter()
+            self._last_committed_id, committed_text, tail_text = await self._service._run_sync(
+                "wav2vec2",
+                "_stream_step_sync",
+                window,
+                self._committed_until - window_start,
+                commit_to - window_start,
+                self._last_committed_id
+            )
+            step_ms = (time.perf_counter() - start) * 1000
+            TelemetryRegistry().histogram("wav2vec2_stream_step_ms", LATENCY_MS_BUCKETS).observe(step_ms)
+            self._committed_text += committed_text
+            self._stable_text = self._service._postprocess_transcription(self._committed_text)
+            self._text = self._service._postprocess_transcription(self._committed_text + tail_text)
+        self._committed_until = commit_to
+
+        # Conserva solo il contesto sinistro necessario al passo successivo
+        keep_from = max(self._buffer_start, self._committed_until - self._left_context)
+        self._buffer = self._buffer[keep_from - self._buffer_start:]
+        self._buffer_start = keep_from
+
+        if self.time_to_first_word_ms is None and self._text:
+            self.time_to_first_word_ms = (time.perf_counter() - self._started_at) * 1000
+            TelemetryRegistry().histogram("wav2vec2_stream_ttfw_ms", LATENCY_MS_BUCKETS).observe(self.time_to_first_word_ms)
+
+        return self._message("final" if final else "partial")
+
+    def _message(self, message_type: str) -> Dict[str, Any]:
+        """
+        Costruisci il messaggio da inviare al client.
+
+        Args:
+            message_type: "partial" oppure "final".
+
+        Returns:
+            Dizionario serializzabile in JSON.
+        """
+        return {
+            "type": message_type,
+            "text": self._stable_text if message_type == "final" else self._text,
+            "stable_text": self._stable_text,
+            "audio_duration": self._total_samples / SAMPLE_RATE,
+            "time_to_first_word_ms": self.time_to_first_word_ms
+        }
@@ -5,17 +5,38 @@ Implementa l'interfaccia ASRServiceInterface per fornire servizi di trascrizione
 utilizzando modelli Whisper di OpenAI.
 """
 
+import asyncio
 import torch
 import whisper
-import torchaudio
+from whisper.audio import N_FRAMES, N_SAMPLES
+from whisper.decoding import DecodingOptions, DecodingResult
+from whisper.tokenizer import get_tokenizer
 import numpy as np
+import threading
 import time
-from typing import Dict, Any, Optional
+from contextlib import contextmanager
+from functools import partial
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 
 from app.interfaces.asr_interface import ASRServiceInterface
-from app.utils.audio_utils import decode_bytes_to_float32
-from app.models.model_manager import ASRModelManager, ModelSize
+from app.utils.audio_utils import decode_audio_to_16k, resample_audio
+from app.models.model_manager import ASRModelManager
+from app.models.model_precision import get_variant_name
+from app.models.model_registry import ModelHandle
+from app.models.model_swap import ModelSwap, start_model_swap
 from app.utils.metrics import calculate_detailed_metrics
+from app.utils.inference_executor import InferenceExecutor
+from app.utils.result_cache import TranscriptionResultCache, cache_status_var
+from app.utils.single_flight import SingleFlight
+from app.services.batch_scheduler import MicroBatchScheduler
+from app.config import settings
+
+# Soglie di default di whisper.transcribe(), replicate dal decoding batch
+WHISPER_COMPRESSION_RATIO_THRESHOLD = 2.4
+WHISPER_LOGPROB_THRESHOLD = -1.0
+WHISPER_NO_SPEECH_THRESHOLD = 0.6
+# Frame mel per token di output dell'encoder
+WHISPER_INPUT_STRIDE = 2
 
 
 class WhisperService(ASRServiceInterface):
@@ -26,33 +47,149 @@ class WhisperService(ASRServiceInterface):
     dinamico dei modelli Whisper per la trascrizione multilingua.
     """
 
+    # Motore del servizio (WHISPER_ENGINE): chiave dei modelli nel registro e nella cache dei risultati
+    ENGINE = "whisper"
+    # Prefisso delle metriche su /health/metrics, distinto per motore
+    METRICS_PREFIX = "whisper"
+
     def __init__(self):
         """Inizializza il servizio Whisper."""
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.model = None
         self.model_manager = ASRModelManager()
         self._current_model_name = None
+        self._model_handle: Optional[ModelHandle] = None
+        self._swap: Optional[ModelSwap] = None
+        self._load_lock = threading.Lock()
+        self._batch_schedulers: Dict[str, MicroBatchScheduler] = {}
+        self._single_flight = SingleFlight(self.METRICS_PREFIX)
 
     def _load_model(self, force_reload: bool = False) -> None:
         """
         Carica il modello solo quando necessario (lazy loading).
 
+        Il modello viene ottenuto dal registro condiviso del processo: se un
+        altro servizio lo ha già caricato viene riutilizzato, e l'handle del
+        modello precedente viene rilasciato.
+
         Args:
-            force_reload: Se True, forza il ricaricamento anche se già caricato.
+            force_reload: Se True, riacquisisce il modello dal registro anche se già caricato.
 
         Raises:
             Exception: Se il caricamento del modello fallisce.
         """
-        model_name = self.model_manager.get_whisper_model_name()
-        
-        if self.model is None or force_reload or self._current_model_name != model_name:
-            try:
-                print(f"Loading Whisper model: {model_name}")
-                self.model = whisper.load_model(model_name, device=self.device)
+        # I thread del pool di inferenza possono richiedere il modello in parallelo
+        with self._load_lock:
+            model_name = self.model_manager.get_whisper_variant_name()
+
+            if self.model is None or force_reload or self._current_model_name != model_name:
+                try:
+                    handle = self.model_manager.acquire_model(
+                        self.ENGINE, model_name, lambda: self._load_components(model_name)
+                    )
+                except Exception as e:
+                    raise Exception(f"Errore nel caricamento del modello Whisper: {str(e)}")
+
+                previous_handle = self._model_handle
+                self._model_handle = handle
+                self.model = handle.model
                 self._current_model_name = model_name
-                print("Whisper model loaded successfully!")
-            except Exception as e:
-                raise Exception(f"Errore nel caricamento del modello Whisper: {str(e)}")
+                if previous_handle is not None:
+                    previous_handle.release()
+
+    def _load_components(self, model_name: str) -> Dict[str, Any]:
+        """
+        Carica un modello Whisper, dallo snapshot se disponibile.
+
+        Args:
+            model_name: Nome del modello, eventualmente con precisione (es. "small@int8").
+
+        Returns:
+            Dizionario con "model".
+        """
+        return self.model_manager.load_model_components(
+            "whisper", model_name, self.device, self._load_pretrained_components
+        )
+
+    def _load_pretrained_components(self, model_name: str) -> Dict[str, Any]:
+        """
+        Carica un modello Whisper.
+
+        Args:
+            model_name: Nome del modello Whisper (tiny, base, ...).
+
+        Returns:
+            Dizionario con "model".
+        """
+        print(f"Loading Whisper model: {model_name}")
+        model = whisper.load_model(model_name, device=self.device)
+        print("Whisper model loaded successfully!")
+        return {"model": model}
+
+    def _resolve_checkpoint(self, model: Optional[str] = None) -> str:
+        """
+        Risolvi il modello richiesto nella dimensione del modello Whisper.
+
+        Args:
+            model: Dimensione del modello (tiny, base, ...), eventualmente con
+                precisione (es. "small@int8"). Se None, usa quello attuale.
+
+        Returns:
+            Dimensione del modello, con la precisione se diversa da fp32.
+
+        Raises:
+            ValueError: Se il modello specificato non è supportato.
+        """
+        if model is None:
+            return self.model_manager.get_current_whisper_checkpoint()
+        try:
+            model_size, precision = self.model_manager.split_whisper_checkpoint(model)
+        except ValueError as e:
+            raise ValueError(f"Modello non supportato: {str(e)}")
+        return get_variant_name(model_size.value, precision)
+
+    def _acquire_checkpoint(self, checkpoint: str) -> ModelHandle:
+        """
+        Ottieni dal registro un handle a un modello, caricandolo se necessario.
+
+        Args:
+            checkpoint: Dimensione del modello (tiny, base, ...).
+
+        Returns:
+            Handle al modello; va rilasciato quando non serve più.
+        """
+        model_name = self.model_manager.get_whisper_variant_name(
+            *self.model_manager.split_whisper_checkpoint(checkpoint)
+        )
+        return self.model_manager.acquire_model(
+            self.ENGINE, model_name, lambda: self._load_components(model_name)
+        )
+
+    @contextmanager
+    def _use_model(self, checkpoint: Optional[str] = None) -> Iterator[ModelHandle]:
+        """
+        Ottieni dal registro il modello da usare per una singola inferenza.
+
+        Il modello attuale resta sempre residente (il servizio ne mantiene un
+        handle); gli altri restano nel pool del registro finché non vengono
+        scaricati per budget di memoria o inattività.
+
+        Args:
+            checkpoint: Dimensione del modello (tiny, base, ...). Se None, usa quello attuale.
+
+        Yields:
+            Handle con "model", rilasciato al termine e conteggiato
+            come inferenza in corso.
+        """
+        current = self.model_manager.get_current_whisper_checkpoint()
+        if checkpoint is None or checkpoint == current:
+            self._load_model()
+        try:
+            handle = self._acquire_checkpoint(checkpoint or current)
+        except Exception as e:
+            raise Exception(f"Errore nel caricamento del modello Whisper: {str(e)}")
+        with handle, handle.inference():
+            yield handle
 
     def _resample_audio(self, pcm: np.ndarray, original_sr: int, target_sr: int = 16000) -> np.ndarray:
         """
@@ -66,37 +203,475 @@ class WhisperService(ASRServiceInterface):
         Returns:
             Array audio ricampionato.
         """
-        if original_sr != target_sr:
-            pcm = torchaudio.functional.resample(torch.tensor(pcm), original_sr, target_sr).numpy()
-            print(f"Resampled from {original_sr}Hz to {target_sr}Hz: {len(pcm)} samples")
-        return pcm
+        return resample_audio(pcm, original_sr, target_sr)
+
+    def _prepare_audio_sync(self, audio_bytes: bytes) -> np.ndarray:
+        """
+        Decodifica l'audio e lo ricampiona a 16kHz.
+
+        Args:
+            audio_bytes: Array di bytes contenente l'audio da trascrivere.
+
+        Returns:
+            Array audio float32 mono a 16kHz.
+        """
+        print(f"Processing {len(audio_bytes)} bytes of audio data")
+        # Decodifica e resample a 16kHz (con cache per hash dei bytes)
+        return decode_audio_to_16k(audio_bytes)
+
+    def _transcribe_pcm_sync(self, pcm: np.ndarray, checkpoint: Optional[str] = None) -> str:
+        """
+        Trascrivi un singolo audio con il percorso standard di Whisper.
+
+        Args:
+            pcm: Audio float32 mono a 16kHz.
+            checkpoint: Dimensione del modello. Se None, usa quello attuale.
+
+        Returns:
+            Trascrizione dell'audio.
+        """
+        with self._use_model(checkpoint) as handle:
+            model = handle.model
+
+            # Whisper richiede float32 numpy mono
+            result = model.transcribe(pcm, fp16=False, beam_size=settings.WHISPER_BEAM_SIZE)
+            return result["text"].strip()
+
+    def _single_window_text(self, result: DecodingResult, content_frames: int, tokenizer: Any) -> Optional[str]:
+        """
+        Ricostruisci il testo che model.transcribe produrrebbe da una sola finestra.
+
+        Replica le regole di transcribe() per una finestra di 30 secondi decodificata
+        a temperatura 0: fallback di temperatura, salto delle finestre senza voce,
+        suddivisione in segmenti sui timestamp ed eliminazione dei segmenti vuoti.
+
+        Args:
+            result: Risultato del decoding della finestra.
+            content_frames: Numero di frame mel effettivi dell'audio.
+            tokenizer: Tokenizer Whisper usato per il decoding.
+
+        Returns:
+            Il testo della trascrizione, oppure None se transcribe() avrebbe
+            eseguito altri passi (fallback di temperatura o una seconda finestra)
+            e serve quindi il percorso per singola richiesta.
+        """
+        needs_fallback = (
+            result.compression_ratio > WHISPER_COMPRESSION_RATIO_THRESHOLD
+            or result.avg_logprob < WHISPER_LOGPROB_THRESHOLD
+        )
+        is_silence = (
+            result.no_speech_prob > WHISPER_NO_SPEECH_THRESHOLD
+            and result.avg_logprob < WHISPER_LOGPROB_THRESHOLD
+        )
+        if is_silence:
+            # transcribe() salta la finestra: nessun testo
+            return ""
+        if needs_fallback:
+            return None
+
+        tokens = torch.tensor(result.tokens)
+        timestamp_tokens = tokens.ge(tokenizer.timestamp_begin)
+        single_timestamp_ending = timestamp_tokens[-2:].tolist() == [False, True]
+        consecutive = (torch.where(timestamp_tokens[:-1] & timestamp_tokens[1:])[0] + 1).tolist()
+
+        segments = []  # (inizio, fine, token) con posizioni in unità di timestamp
+        if consecutive:
+            slices = consecutive + ([len(tokens)] if single_timestamp_ending else [])
+            last_slice = 0
+            for current_slice in slices:
+                sliced = tokens[last_slice:current_slice]
+                segments.append((
+                    sliced[0].item() - tokenizer.timestamp_begin,
+                    sliced[-1].item() - tokenizer.timestamp_begin,
+                    sliced.tolist()
+                ))
+                last_slice = current_slice
+            if not single_timestamp_ending:
+                # transcribe() riprenderebbe dall'ultimo timestamp: serve un'altra finestra
+                last_timestamp_pos = tokens[last_slice - 1].item() - tokenizer.timestamp_begin
+                if last_timestamp_pos * WHISPER_INPUT_STRIDE < content_frames:
+                    return None
+        else:
+            end = min(N_FRAMES, content_frames) / WHISPER_INPUT_STRIDE
+            timestamps = tokens[timestamp_tokens.nonzero().flatten()]
+            if len(timestamps) > 0 and timestamps[-1].item() != tokenizer.timestamp_begin:
+                end = timestamps[-1].item() - tokenizer.timestamp_begin
+            segments.append((0, end, tokens.tolist()))
+
+        all_tokens = []
+        for start, end, segment_tokens in segments:
+            text = tokenizer.decode([token for token in segment_tokens if token < tokenizer.eot])
+            # transcribe() svuota i segmenti istantanei o senza testo
+            if start != end and text.strip() != "":
+                all_tokens.extend(segment_tokens)
+        return tokenizer.decode(all_tokens).strip()
+
+    def _decode_batch_sync(
+        self,
+        pcms: List[np.ndarray],
+        checkpoint: Optional[str] = None
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Trascrivi più audio brevi (massimo 30 secondi) con encoder e decoding condivisi.
+
+        I log-mel delle richieste vengono impilati in un unico tensore: il
+        rilevamento della lingua e il decoding (greedy o beam search, come nel
+        percorso per singola richiesta) vengono eseguiti una volta per batch,
+        raggruppando le richieste per lingua rilevata.
+
+        Args:
+            pcms: Lista di audio float32 mono a 16kHz, ciascuno di al massimo 30 secondi.
+            checkpoint: Dimensione del modello. Se None, usa quello attuale.
+
+        Returns:
+            Per ogni audio un dizionario con "text" e "timings" (millisecondi),
+            oppure None se l'audio richiede il percorso per singola richiesta.
+        """
+        with self._use_model(checkpoint) as handle:
+            model = handle.model
+
+            mel_start = time.perf_counter()
+            detection_mels, segment_mels, content_frames = [], [], []
+            for pcm in pcms:
+                # Stessa preparazione di transcribe(): 30 secondi di silenzio in coda
+                mel = whisper.log_mel_spectrogram(pcm, model.dims.n_mels, padding=N_SAMPLES)
+                frames = mel.shape[-1] - N_FRAMES
+                detection_mels.append(whisper.pad_or_trim(mel, N_FRAMES))
+                segment_mels.append(whisper.pad_or_trim(mel[:, :frames], N_FRAMES))
+                content_frames.append(frames)
+            mel_ms = (time.perf_counter() - mel_start) * 1000
+
+            language_start = time.perf_counter()
+            if model.is_multilingual:
+                _, probs = model.detect_language(torch.stack(detection_mels).to(model.device))
+                languages = [max(p, key=p.get) for p in probs]
+            else:
+                languages = ["en"] * len(pcms)
+            language_ms = (time.perf_counter() - language_start) * 1000
+
+            decode_start = time.perf_counter()
+            outcomes: List[Optional[Dict[str, Any]]] = [None] * len(pcms)
+            for language in dict.fromkeys(languages):
+                indices = [i for i, lang in enumerate(languages) if lang == language]
+                options = DecodingOptions(
+                    language=language,
+                    temperature=0.0,
+                    beam_size=settings.WHISPER_BEAM_SIZE,
+                    fp16=False
+                )
+                results = model.decode(torch.stack([segment_mels[i] for i in indices]).to(model.device), options)
+                tokenizer = get_tokenizer(
+                    model.is_multilingual,
+                    num_languages=model.num_languages,
+                    language=language,
+                    task=options.task
+                )
+                for i, result in zip(indices, results):
+                    text = self._single_window_text(result, content_frames[i], tokenizer)
+                    if text is not None:
+                        outcomes[i] = {"text": text}
+            decode_ms = (time.perf_counter() - decode_start) * 1000
+
+            for outcome in outcomes:
+                if outcome is not None:
+                    outcome["timings"] = {
+                        "batch_size": len(pcms),
+                        "mel_ms": mel_ms,
+                        "language_detection_ms": language_ms,
+                        "decode_ms": decode_ms
+                    }
+            return outcomes
+
+    def _stream_decode_sync(self, pcm: np.ndarray, prompt: str, language: Optional[str]) -> Dict[str, Any]:
+        """
+        Decodifica il buffer di una sessione di streaming con timestamp per parola.
+
+        Args:
+            pcm: Audio float32 mono a 16kHz del buffer (al massimo circa 30 secondi).
+            prompt: Testo già confermato, usato come contesto per la decodifica.
+            language: Lingua della sessione, o None per rilevarla.
+
+        Returns:
+            Dizionario con "words" (lista di (inizio, fine, parola) in secondi
+            relativi al buffer), "segment_ends" (fine di ogni segmento) e "language".
+        """
+        with self._use_model() as handle:
+            model = handle.model
+
+            result = model.transcribe(
+                pcm,
+                fp16=False,
+                language=language,
+                initial_prompt=prompt or None,
+                condition_on_previous_text=False,
+                word_timestamps=True,
+                beam_size=settings.WHISPER_BEAM_SIZE
+            )
+            words = [
+                (float(word["start"]), float(word["end"]), word["word"])
+                for segment in result["segments"]
+                for word in segment.get("words", [])
+            ]
+            return {
+                "words": words,
+                "segment_ends": [float(segment["end"]) for segment in result["segments"]],
+                "language": result["language"]
+            }
+
+    def _warm_up_sync(self, checkpoint: Optional[str] = None, duration_s: float = 1.0) -> None:
+        """
+        Esegui un'inferenza sintetica per preparare allocazioni e kernel del modello.
+
+        Args:
+            checkpoint: Dimensione del modello (tiny, base, ...). Se None, usa quello attuale.
+            duration_s: Durata dell'audio sintetico in secondi.
+        """
+        pcm = (0.01 * np.random.default_rng(0).standard_normal(int(duration_s * 16000))).astype(np.float32)
+        # Stesso percorso delle richieste reali della stessa durata
+        if settings.WHISPER_BATCHING_ENABLED and len(pcm) <= N_SAMPLES:
+            self._decode_batch_sync([pcm], checkpoint)
+        else:
+            self._transcribe_pcm_sync(pcm, checkpoint)
+
+    async def _load_for_swap(self, checkpoint: str) -> Optional[ModelHandle]:
+        """
+        Carica il nuovo modello di un cambio fuori dall'event loop.
+
+        Con i processi di inferenza dedicati il modello viene caricato (e
+        riscaldato brevemente) in ognuno di essi, non nel processo API.
+
+        Args:
+            checkpoint: Chiave del nuovo modello.
+
+        Returns:
+            L'handle del modello caricato, oppure None con i processi dedicati.
+        """
+        if InferenceExecutor().uses_model_workers("whisper"):
+            await self._warm_up(checkpoint, 0.1)
+            return None
+        return await asyncio.to_thread(self._acquire_checkpoint, checkpoint)
+
+    def _switch_model(self, checkpoint: str, handle: Optional[ModelHandle]) -> Optional[ModelHandle]:
+        """
+        Rendi attuale un modello già caricato, in modo atomico rispetto alle richieste.
+
+        Args:
+            checkpoint: Dimensione del modello (tiny, base, ...).
+            handle: Handle al nuovo modello, che il servizio mantiene residente;
+                None se il modello è caricato nei processi di inferenza dedicati.
+
+        Returns:
+            L'handle del modello sostituito, oppure None.
+        """
+        with self._load_lock:
+            self.model_manager.set_whisper_model(*self.model_manager.split_whisper_checkpoint(checkpoint))
+            if handle is None:
+                # Nessuna copia del modello nel processo API
+                return None
+            previous_handle = self._model_handle
+            self._model_handle = handle
+            self.model = handle.model
+            self._current_model_name = handle.name
+        return previous_handle
+
+    async def _run_sync(self, model_key: str, method_name: str, *args: Any) -> Any:
+        """
+        Esegui un metodo sincrono del servizio sul pool di inferenza condiviso.
+
+        Args:
+            model_key: Chiave usata per il limite di concorrenza ("audio" o "whisper").
+            method_name: Nome del metodo da eseguire.
+            *args: Argomenti del metodo.
+
+        Returns:
+            Il valore restituito dal metodo.
+        """
+        executor = InferenceExecutor()
+        if executor.uses_model_workers(model_key):
+            model_size = self.model_manager.get_current_whisper_checkpoint()
+            return await executor.run_in_model_worker(
+                model_key, _run_in_worker_process, self.ENGINE, model_size, method_name, *args
+            )
+        if executor.is_process_pool:
+            model_size = self.model_manager.get_current_whisper_checkpoint()
+            return await executor.run(model_key, _run_in_worker_process, self.ENGINE, model_size, method_name, *args)
+        return await executor.run(model_key, getattr(self, method_name), *args)
+
+    async def _warm_up(self, checkpoint: str, duration_s: float = 1.0) -> None:
+        """
+        Riscalda un modello con un'inferenza sintetica.
+
+        Con i processi di inferenza dedicati il warm-up viene eseguito in
+        ognuno di essi, dato che ogni processo carica la propria copia del modello.
+
+        Args:
+            checkpoint: Chiave del modello da riscaldare.
+            duration_s: Durata in secondi dell'audio sintetico.
+        """
+        executor = InferenceExecutor()
+        if executor.uses_model_workers("whisper"):
+            current = self.model_manager.get_current_whisper_checkpoint()
+            await executor.broadcast_to_model_workers(
+                "whisper", _run_in_worker_process, self.ENGINE, current, "_warm_up_sync", checkpoint, duration_s
+            )
+        else:
+            await self._run_sync("whisper", "_warm_up_sync", checkpoint, duration_s)
+
+    async def _decode_batch(
+        self,
+        pcms: List[np.ndarray],
+        checkpoint: Optional[str] = None
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Esegui il decoding batch sul pool di inferenza.
+
+        Args:
+            pcms: Lista di audio float32 mono a 16kHz.
+            checkpoint: Dimensione del modello. Se None, usa quello attuale.
+
+        Returns:
+            Risultati per audio, nello stesso ordine (None = serve il percorso singolo).
+        """
+        return await self._run_sync("whisper", "_decode_batch_sync", pcms, checkpoint)
+
+    def _get_batch_scheduler(self, checkpoint: str) -> MicroBatchScheduler:
+        """
+        Ottieni lo scheduler di batching di un modello (creato al primo utilizzo).
+
+        Ogni modello ha il proprio scheduler, così un batch contiene solo
+        richieste per lo stesso modello.
+
+        Args:
+            checkpoint: Dimensione del modello.
+
+        Returns:
+            Lo scheduler associato al modello.
+        """
+        if checkpoint not in self._batch_schedulers:
+            self._batch_schedulers[checkpoint] = MicroBatchScheduler(
+                partial(self._decode_batch, checkpoint=checkpoint),
+                max_batch_size=settings.WHISPER_BATCH_MAX_SIZE,
+                max_wait_ms=settings.WHISPER_BATCH_MAX_WAIT_MS,
+                # Ogni audio viene comunque portato a una finestra di 30 secondi
+                bucket_ratio=float("inf"),
+                metrics_prefix=self.METRICS_PREFIX
+            )
+        return self._batch_schedulers[checkpoint]
+
+    def _cache_key(self, audio_bytes: bytes, checkpoint: str) -> str:
+        """
+        Costruisci la chiave della cache dei risultati per un audio.
+
+        Args:
+            audio_bytes: Array di bytes contenente l'audio da trascrivere.
+            checkpoint: Dimensione del modello usato.
+
+        Returns:
+            Chiave che combina audio, modello e parametri di decoding.
+        """
+        params = {"beam_size": settings.WHISPER_BEAM_SIZE}
+        model_name = self.model_manager.get_whisper_variant_name(
+            *self.model_manager.split_whisper_checkpoint(checkpoint)
+        )
+        return TranscriptionResultCache.build_key(audio_bytes, self.ENGINE, model_name, params)
+
+    async def _run_transcription(self, audio_bytes: bytes, checkpoint: str) -> Tuple[str, float, Dict[str, Any]]:
+        """
+        Restituisci la trascrizione dalla cache dei risultati o eseguila.
+
+        In caso di hit vengono restituiti testo, tempo di inferenza e dettaglio
+        delle latenze dell'esecuzione originale. Le richieste identiche
+        concorrenti condividono una sola inferenza (single-flight). Lo stato
+        della richiesta ("hit", "miss", "coalesced" o "disabled") è in
+        cache_status_var.
+
+        Args:
+            audio_bytes: Array di bytes contenente l'audio da trascrivere.
+            checkpoint: Dimensione del modello da usare.
+
+        Returns:
+            Tupla contenente (trascrizione, tempo di inferenza in secondi,
+            dettaglio delle latenze in millisecondi).
+        """
+        cache = TranscriptionResultCache()
+        # Hash dell'intero audio: fuori dall'event loop come la lettura della cache
+        key = await asyncio.to_thread(self._cache_key, audio_bytes, checkpoint)
+        cached = await cache.get(key, self.METRICS_PREFIX)
+        if cached is not None:
+            return cached["text"], cached["inference_time"], cached["latency_breakdown"]
+
+        async def infer_and_store() -> Tuple[str, float, Dict[str, Any]]:
+            outcome = await self._infer(audio_bytes, checkpoint)
+            await cache.set(key, {"text": outcome[0], "inference_time": outcome[1], "latency_breakdown": outcome[2]})
+            return outcome
+
+        (text, inference_time, breakdown), coalesced = await self._single_flight.do(key, infer_and_store)
+        if coalesced:
+            cache_status_var.set("coalesced")
+        return text, inference_time, breakdown
+
+    async def _infer(self, audio_bytes: bytes, checkpoint: str) -> Tuple[str, float, Dict[str, Any]]:
+        """
+        Decodifica l'audio ed esegui l'inferenza sul pool di inferenza.
+
+        Gli audio fino a 30 secondi passano dal decoding batch condiviso con le
+        richieste concorrenti; gli audio più lunghi, o quelli per cui transcribe()
+        farebbe altri passi, usano il percorso per singola richiesta.
+
+        Args:
+            audio_bytes: Array di bytes contenente l'audio da trascrivere.
+            checkpoint: Dimensione del modello da usare.
+
+        Returns:
+            Tupla contenente (trascrizione, tempo di inferenza in secondi,
+            dettaglio delle latenze in millisecondi).
+        """
+        # Misura il tempo di inferenza
+        start_time = time.perf_counter()
+
+        pcm = await self._run_sync("audio", "_prepare_audio_sync", audio_bytes)
+        breakdown: Dict[str, Any] = {"audio_decode_ms": (time.perf_counter() - start_time) * 1000}
+
+        text = None
+        if settings.WHISPER_BATCHING_ENABLED and 0 < len(pcm) <= N_SAMPLES:
+            outcome, queue_wait_ms = await self._get_batch_scheduler(checkpoint).submit_with_timing(pcm)
+            breakdown["queue_wait_ms"] = queue_wait_ms
+            if outcome is not None:
+                text = outcome["text"]
+                breakdown.update(outcome["timings"])
+                breakdown["path"] = "batched"
 
-    async def transcribe(self, audio_bytes: bytes) -> str:
+        if text is None:
+            single_start = time.perf_counter()
+            text = await self._run_sync("whisper", "_transcribe_pcm_sync", pcm, checkpoint)
+            breakdown["single_request_ms"] = (time.perf_counter() - single_start) * 1000
+            breakdown["path"] = "single"
+
+        # Fine misurazione tempo
+        inference_time = time.perf_counter() - start_time
+        breakdown["total_ms"] = inference_time * 1000
+
+        return text, inference_time, breakdown
+
+    async def transcribe(self, audio_bytes: bytes, model: Optional[str] = None) -> str:
         """
         Trascrivi audio bytes in testo utilizzando Whisper.
 
         Args:
             audio_bytes: Array di bytes contenente l'audio da trascrivere.
+            model: Dimensione del modello da usare per questa richiesta (tiny,
+                base, ...). Se None, usa il modello attuale.
 
         Returns:
             Stringa contenente la trascrizione dell'audio.
 
         Raises:
+            ValueError: Se il modello specificato non è supportato.
             Exception: Se si verifica un errore durante la trascrizione.
         """
+        checkpoint = self._resolve_checkpoint(model)
         try:
-            self._load_model()
-            
-            print(f"Processing {len(audio_bytes)} bytes of audio data")
-            pcm, sr = decode_bytes_to_float32(audio_bytes)
-            print(f"Decoded audio: {len(pcm)} samples at {sr}Hz")
-            
-            # Resample a 16kHz se necessario
-            pcm = self._resample_audio(pcm, sr)
-
-            # Whisper richiede float32 numpy mono
-            result = self.model.transcribe(pcm, fp16=False)
-            text = result["text"].strip()
+            text, _, _ = await self._run_transcription(audio_bytes, checkpoint)
             print(f"Transcription completed: '{text}'")
             
             # Verifica che ci sia effettivamente del testo
@@ -112,7 +687,8 @@ class WhisperService(ASRServiceInterface):
     async def transcribe_with_metrics(
         self, 
         audio_bytes: bytes, 
-        reference_text: Optional[str] = None
+        reference_text: Optional[str] = None,
+        model: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Trascrivi audio bytes in testo e calcola metriche di valutazione.
@@ -120,38 +696,25 @@ class WhisperService(ASRServiceInterface):
         Args:
             audio_bytes: Array di bytes contenente l'audio da trascrivere.
             reference_text: Testo di riferimento per calcolo WER/CER (opzionale).
+            model: Dimensione del modello da usare per questa richiesta. Se
+                None, usa il modello attuale.
 
         Returns:
             Dizionario contenente:
             - text: Trascrizione dell'audio
             - inference_time: Tempo di inferenza in secondi
+            - latency_breakdown: Dettaglio delle latenze (coda, mel, decoding) in millisecondi
+            - cache_status: "hit", "miss", "coalesced" o "disabled" (cache dei risultati)
             - metrics: Metriche WER, CER se reference_text è fornito
             - model_info: Informazioni sul modello utilizzato
 
         Raises:
+            ValueError: Se il modello specificato non è supportato.
             Exception: Se si verifica un errore durante la trascrizione.
         """
+        checkpoint = self._resolve_checkpoint(model)
         try:
-            self._load_model()
-            
-            print(f"Processing {len(audio_bytes)} bytes of audio data")
-            
-            # Misura il tempo di inferenza
-            start_time = time.perf_counter()
-            
-            pcm, sr = decode_bytes_to_float32(audio_bytes)
-            print(f"Decoded audio: {len(pcm)} samples at {sr}Hz")
-            
-            # Resample a 16kHz se necessario
-            pcm = self._resample_audio(pcm, sr)
-
-            # Whisper richiede float32 numpy mono
-            result = self.model.transcribe(pcm, fp16=False)
-            text = result["text"].strip()
-            
-            # Fine misurazione tempo
-            end_time = time.perf_counter()
-            inference_time = end_time - start_time
+            text, inference_time, latency_breakdown = await self._run_transcription(audio_bytes, checkpoint)
             
             print(f"Transcription completed in {inference_time:.3f}s: '{text}'")
             
@@ -164,7 +727,9 @@ class WhisperService(ASRServiceInterface):
             response = {
                 "text": text,
                 "inference_time": inference_time,
-                "model_info": self.get_model_info()
+                "latency_breakdown": latency_breakdown,
+                "cache_status": cache_status_var.get(),
+                "model_info": self.get_model_info(checkpoint)
             }
             
             # Calcola metriche se fornito il testo di riferimento
@@ -179,36 +744,115 @@ class WhisperService(ASRServiceInterface):
             print(f"Transcription error: {e}")
             raise Exception(f"Errore durante la trascrizione: {str(e)}")
 
-    def get_model_info(self) -> Dict[str, Any]:
+    def get_model_info(self, model: Optional[str] = None) -> Dict[str, Any]:
         """
         Ottieni informazioni sul modello attualmente in uso.
 
+        Args:
+            model: Dimensione del modello, eventualmente con precisione. Se None, usa quello attuale.
+
         Returns:
-            Dizionario contenente informazioni sul modello.
+            Dizionario contenente informazioni sul modello, inclusi precisione e motore.
         """
-        return self.model_manager.get_whisper_model_info()
+        if model is None:
+            info = self.model_manager.get_whisper_model_info()
+        else:
+            info = self.model_manager.get_whisper_model_info(*self.model_manager.split_whisper_checkpoint(model))
+        return {**info, "engine": self.ENGINE}
 
-    async def update_model(self, model_name: str) -> bool:
+    async def update_model(self, model_name: str, wait: bool = False) -> bool:
         """
-        Aggiorna il modello utilizzato dal servizio.
+        Aggiorna il modello utilizzato dal servizio senza interrompere le richieste.
+
+        Il nuovo modello viene caricato e riscaldato in background mentre le
+        richieste continuano a usare quello attuale; poi diventa il modello
+        attuale e il precedente viene rilasciato quando le richieste in corso
+        su di esso sono terminate. L'avanzamento è in get_swap_status().
 
         Args:
             model_name: Nome del nuovo modello da utilizzare (tiny, base, small, medium, large).
+            wait: Se True, attendi il completamento del cambio.
 
         Returns:
-            True se l'aggiornamento è riuscito.
+            True se il cambio è stato avviato (o completato, con wait=True).
 
         Raises:
             ValueError: Se il modello specificato non è supportato.
+            RuntimeError: Se un altro cambio di modello è già in corso.
+            Exception: Se il caricamento del nuovo modello fallisce (solo con wait=True).
         """
-        try:
-            # Converti string in enum
-            model_size = ModelSize(model_name.lower())
-            self.model_manager.set_whisper_model(model_size)
-            self._load_model(force_reload=True)
+        checkpoint = self._resolve_checkpoint(model_name)
+        if self._swap is not None and not self._swap.done:
+            raise RuntimeError(f"Cambio di modello già in corso verso '{self._swap.target}'")
+
+        current = self.model_manager.get_current_whisper_checkpoint()
+        uses_workers = InferenceExecutor().uses_model_workers("whisper")
+        if checkpoint == current and (uses_workers or self._model_handle is not None):
             return True
-        except (ValueError, KeyError) as e:
-            raise ValueError(f"Modello non supportato: {str(e)}")
+
+        self._swap = ModelSwap("whisper", current, checkpoint, metrics_prefix=self.METRICS_PREFIX)
+        task = start_model_swap(
+            self._swap,
+            lambda: self._load_for_swap(checkpoint),
+            lambda: self._warm_up(checkpoint),
+            lambda handle: self._switch_model(checkpoint, handle)
+        )
+        if wait:
+            await asyncio.shield(task)
+        return True
+
+    async def preload(self, model: Optional[str] = None, warmup_durations_s: Optional[List[float]] = None) -> Dict[str, Any]:
+        """
+        Carica un modello e riscaldalo con inferenze sintetiche.
+
+        Il modello attuale viene caricato come tale; gli altri restano nel pool
+        del registro per le richieste che li selezionano, soggetti come ogni
+        modello inattivo al budget di memoria e al timeout di inattività.
+
+        Args:
+            model: Modello da precaricare (es. "small"). Se None, usa quello attuale.
+            warmup_durations_s: Durate in secondi degli audio sintetici di warm-up.
+
+        Returns:
+            Dizionario con modello, tempo di caricamento e tempi di warm-up per durata.
+
+        Raises:
+            ValueError: Se il modello specificato non è supportato.
+            Exception: Se il caricamento o il warm-up falliscono.
+        """
+        checkpoint = self._resolve_checkpoint(model)
+        load_start = time.perf_counter()
+        handle: Optional[ModelHandle] = None
+        if InferenceExecutor().uses_model_workers("whisper"):
+            # Il modello viene caricato nei processi di inferenza dedicati, non nel processo API
+            await self._warm_up(checkpoint, 0.1)
+        elif checkpoint == self.model_manager.get_current_whisper_checkpoint():
+            await asyncio.to_thread(self._load_model)
+        else:
+            # Tiene il modello residente fino al termine del warm-up
+            handle = await asyncio.to_thread(self._acquire_checkpoint, checkpoint)
+        load_s = time.perf_counter() - load_start
+
+        warmup_ms: Dict[str, float] = {}
+        try:
+            for duration_s in warmup_durations_s or []:
+                start = time.perf_counter()
+                await self._warm_up(checkpoint, duration_s)
+                warmup_ms[f"{duration_s:g}s"] = round((time.perf_counter() - start) * 1000, 1)
+        finally:
+            if handle is not None:
+                handle.release()
+        print(f"Preloaded whisper model '{checkpoint}' in {load_s:.1f}s, warm-up: {warmup_ms}")
+        return {"model": checkpoint, "load_time_s": round(load_s, 2), "warmup_ms": warmup_ms}
+
+    def get_swap_status(self) -> Optional[Dict[str, Any]]:
+        """
+        Ottieni lo stato dell'ultimo cambio di modello.
+
+        Returns:
+            Dizionario con fase e durate del cambio, oppure None se non ce ne sono stati.
+        """
+        return self._swap.to_dict() if self._swap is not None else None
 
     def get_supported_models(self) -> Dict[str, Dict[str, Any]]:
         """
@@ -218,3 +862,34 @@ class WhisperService(ASRServiceInterface):
             Dizionario con i modelli supportati e le loro informazioni.
         """
         return self.model_manager.get_all_whisper_models()
+
+
+# Istanze del servizio per motore usate dai processi di inferenza con INFERENCE_EXECUTOR="process" o "workers"
+_worker_services: Dict[str, WhisperService] = {}
+
+
+def _run_in_worker_process(engine: str, model_size: str, method_name: str, *args: Any) -> Any:
+    """
+    Esegui un metodo sincrono del servizio in un processo del pool di inferenza.
+
+    Ogni processo mantiene la propria istanza del servizio (e quindi del modello),
+    caricata alla prima richiesta.
+
+    Args:
+        engine: Motore Whisper del servizio ("whisper" o "faster-whisper").
+        model_size: Checkpoint Whisper da utilizzare (tiny, base, ..., eventualmente con precisione).
+        method_name: Nome del metodo sincrono da eseguire.
+        *args: Argomenti del metodo.
+
+    Returns:
+        Il valore restituito dal metodo.
+    """
+    if engine not in _worker_services:
+        # Import differito: dependencies importa questo modulo
+        from app.dependencies import create_whisper_service
+
+        _worker_services[engine] = create_whisper_service(engine)
+    service = _worker_services[engine]
+    manager = service.model_manager
+    manager.set_whisper_model(*manager.split_whisper_checkpoint(model_size))
+    return getattr(service, method_name)(*args)
@@ -0,0 +1,268 @@
+"""
+Sessione di trascrizione in streaming con Whisper (politica di accordo locale).
+
+Whisper non è un modello in streaming: a ogni passo (WHISPER_STREAM_STEP_S
+secondi di audio nuovo) l'intero buffer viene ridecodificato con timestamp per
+parola. Vengono confermate solo le parole su cui concordano due ipotesi
+consecutive (LocalAgreement-2): il prefisso comune è stabile, il resto resta
+provvisorio. Quando il buffer supera WHISPER_STREAM_BUFFER_TRIM_S secondi viene
+tagliato alla fine dell'ultimo segmento interamente confermato, così il costo
+di ogni passo resta limitato; il testo confermato viene passato come prompt
+per mantenere il contesto.
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from whisper.audio import N_SAMPLES
+
+from app.config import settings
+from app.services.whisper_service import WhisperService
+from app.utils.audio_utils import StreamingAudioDecoder
+from app.utils.telemetry import TelemetryRegistry
+
+SAMPLE_RATE = 16000
+LATENCY_MS_BUCKETS = [50, 100, 250, 500, 1000, 2000, 5000]
+# Tolleranza sui timestamp per considerare una parola già confermata
+TIMESTAMP_TOLERANCE_S = 0.1
+# Lunghezza massima degli n-grammi ripetuti a cavallo del confine confermato
+MAX_OVERLAP_NGRAM = 5
+
+Word = Tuple[float, float, str]
+
+
+def _normalize(word: str) -> str:
+    """Normalizza una parola per il confronto tra ipotesi."""
+    return "".join(ch for ch in word.lower() if ch.isalnum())
+
+
+class WhisperStreamingSession:
+    """
+    Stato di una singola connessione di streaming Whisper.
+
+    Produce ipotesi "partial" (testo confermato + ipotesi corrente) durante lo
+    stream e un'ipotesi "final" alla chiusura.
+    """
+
+    def __init__(self, service: WhisperService, audio_format: str = "pcm16", sample_rate: int = SAMPLE_RATE):
+        """
+        Inizializza la sessione.
+
+        Args:
+            service: Servizio Whisper usato per l'inferenza.
+            audio_format: Formato dei chunk ("pcm16", "f32", "webm", ...).
+            sample_rate: Frequenza di campionamento dell'audio raw PCM.
+        """
+        self._service = service
+        self._decoder = StreamingAudioDecoder(audio_format, sample_rate)
+        self._step = int(settings.WHISPER_STREAM_STEP_S * SAMPLE_RATE)
+        self._trim_after = int(settings.WHISPER_STREAM_BUFFER_TRIM_S * SAMPLE_RATE)
+
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._buffer_start = 0  # campione assoluto corrispondente a self._buffer[0]
+        self._decoded_until = 0  # campione assoluto fino a cui il buffer è stato decodificato
+        self._committed: List[Word] = []
+        self._hypothesis: List[Word] = []
+        self._language: Optional[str] = None
+
+        self._started_at = time.perf_counter()
+        self.time_to_first_word_ms: Optional[float] = None
+
+    @property
+    def _total_samples(self) -> int:
+        """Numero di campioni ricevuti dall'inizio dello stream."""
+        return self._buffer_start + len(self._buffer)
+
+    @property
+    def _committed_end(self) -> float:
+        """Istante (in secondi assoluti) di fine dell'ultima parola confermata."""
+        return self._committed[-1][1] if self._committed else 0.0
+
+    def _append(self, samples: np.ndarray, sr: int) -> None:
+        """
+        Aggiungi campioni decodificati al buffer, ricampionandoli a 16kHz.
+
+        Args:
+            samples: Campioni float32 mono.
+            sr: Frequenza di campionamento dei campioni.
+        """
+        if len(samples) == 0:
+            return
+        if sr != SAMPLE_RATE:
+            samples = self._service._resample_audio(samples, sr)
+        self._buffer = np.concatenate([self._buffer, samples.astype(np.float32)])
+
+    async def push(self, chunk: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Aggiungi un chunk audio e ridecodifica il buffer se c'è abbastanza audio nuovo.
+
+        Args:
+            chunk: Bytes audio ricevuti dal client.
+
+        Returns:
+            Messaggio "partial" da inviare al client, oppure None.
+        """
+        self._append(*await self._decoder.feed_async(chunk))
+        if self._total_samples - self._decoded_until < self._step:
+            return None
+        return await self._advance(final=False)
+
+    async def finish(self) -> Dict[str, Any]:
+        """
+        Chiudi lo stream confermando l'ultima ipotesi.
+
+        Returns:
+            Messaggio "final" con la trascrizione completa.
+        """
+        self._append(*await self._decoder.flush_async())
+        if self._total_samples > self._decoded_until:
+            return await self._advance(final=True)
+        self._committed.extend(self._hypothesis)
+        self._hypothesis = []
+        return self._message("final")
+
+    def close(self) -> None:
+        """Rilascia le risorse della sessione (decoder dell'audio)."""
+        self._decoder.close()
+
+    async def _decode_buffer(self) -> Tuple[List[Word], List[float]]:
+        """
+        Ridecodifica il buffer corrente.
+
+        Returns:
+            Tupla contenente (parole con timestamp assoluti, fine dei segmenti
+            in secondi assoluti).
+        """
+        offset = self._buffer_start / SAMPLE_RATE
+        prompt = "".join(word for _, _, word in self._committed)[-settings.WHISPER_STREAM_PROMPT_CHARS:]
+
+        start = time.perf_counter()
+        result = await self._service._run_sync(
+            "whisper",
+            "_stream_decode_sync",
+            self._buffer,
+            prompt,
+            self._language
+        )
+        step_ms = (time.perf_counter() - start) * 1000
+        TelemetryRegistry().histogram(
+            f"{self._service.METRICS_PREFIX}_stream_step_ms", LATENCY_MS_BUCKETS
+        ).observe(step_ms)
+
+        if self._language is None and result["words"]:
+            # Fissa la lingua rilevata per evitare cambi tra un passo e l'altro
+            self._language = result["language"]
+
+        words = [(start_s + offset, end_s + offset, word) for start_s, end_s, word in result["words"]]
+        return words, [end_s + offset for end_s in result["segment_ends"]]
+
+    def _new_words(self, words: List[Word]) -> List[Word]:
+        """
+        Scarta le parole già confermate da un'ipotesi.
+
+        Args:
+            words: Parole dell'ipotesi con timestamp assoluti.
+
+        Returns:
+            Le parole successive al testo confermato.
+        """
+        committed_end = self._committed_end
+        words = [w for w in words if w[0] > committed_end - TIMESTAMP_TOLERANCE_S]
+
+        # Whisper può ripetere le ultime parole confermate all'inizio del buffer
+        if words and self._committed and abs(words[0][0] - committed_end) < 1.0:
+            for n in range(min(MAX_OVERLAP_NGRAM, len(self._committed), len(words)), 0, -1):
+                tail = [_normalize(w[2]) for w in self._committed[-n:]]
+                head = [_normalize(w[2]) for w in words[:n]]
+                if tail == head:
+                    return words[n:]
+        return words
+
+    async def _advance(self, final: bool) -> Dict[str, Any]:
+        """
+        Ridecodifica il buffer, conferma il prefisso concordato e taglia il buffer.
+
+        Args:
+            final: Se True conferma l'intera ipotesi corrente.
+
+        Returns:
+            Messaggio "partial" o "final".
+        """
+        self._decoded_until = self._total_samples
+        words, segment_ends = await self._decode_buffer()
+        words = self._new_words(words)
+
+        if final:
+            agreed = len(words)
+        else:
+            agreed = 0
+            for previous, current in zip(self._hypothesis, words):
+                if _normalize(previous[2]) != _normalize(current[2]):
+                    break
+                agreed += 1
+        self._committed.extend(words[:agreed])
+        self._hypothesis = words[agreed:]
+
+        self._trim_buffer(segment_ends)
+
+        if self.time_to_first_word_ms is None and (self._committed or self._hypothesis):
+            self.time_to_first_word_ms = (time.perf_counter() - self._started_at) * 1000
+            ttfw_hist = TelemetryRegistry().histogram(
+                f"{self._service.METRICS_PREFIX}_stream_ttfw_ms", LATENCY_MS_BUCKETS
+            )
+            ttfw_hist.observe(self.time_to_first_word_ms)
+
+        return self._message("final" if final else "partial")
+
+    def _trim_buffer(self, segment_ends: List[float]) -> None:
+        """
+        Taglia il buffer alla fine dell'ultimo segmento interamente confermato.
+
+        Se il buffer si avvicina alla finestra di 30 secondi di Whisper senza un
+        confine di segmento utilizzabile, le parole provvisorie più vecchie
+        vengono confermate d'ufficio e il buffer viene tagliato dopo di esse.
+
+        Args:
+            segment_ends: Fine dei segmenti dell'ultima decodifica, in secondi assoluti.
+        """
+        if len(self._buffer) <= self._trim_after:
+            return
+
+        committed_end = self._committed_end
+        boundaries = [end for end in segment_ends if end <= committed_end + TIMESTAMP_TOLERANCE_S]
+        if boundaries:
+            cut = max(boundaries)
+        elif len(self._buffer) > N_SAMPLES - self._step:
+            limit = (self._total_samples - self._trim_after) / SAMPLE_RATE
+            forced = [word for word in self._hypothesis if word[1] <= limit]
+            self._committed.extend(forced)
+            self._hypothesis = self._hypothesis[len(forced):]
+            cut = max(self._committed_end, limit)
+        else:
+            return
+
+        cut_sample = min(int(cut * SAMPLE_RATE), self._total_samples)
+        if cut_sample > self._buffer_start:
+            self._buffer = self._buffer[cut_sample - self._buffer_start:]
+            self._buffer_start = cut_sample
+
+    def _message(self, message_type: str) -> Dict[str, Any]:
+        """
+        Costruisci il messaggio da inviare al client.
+
+        Args:
+            message_type: "partial" oppure "final".
+
+        Returns:
+            Dizionario serializzabile in JSON.
+        """
+        stable_text = "".join(word for _, _, word in self._committed).strip()
+        text = "".join(word for _, _, word in self._committed + self._hypothesis).strip()
+        return {
+            "type": message_type,
+            "text": text,
+            "stable_text": stable_text,
+            "audio_duration": self._total_samples / SAMPLE_RATE,
+            "time_to_first_word_ms": self.time_to_first_word_ms
+        }
@@ -3,15 +3,39 @@ Utilities per il processamento e la conversione di file audio.
 
 Questo modulo fornisce funzioni per la decodifica, conversione e gestione
 di file audio in vari formati, utilizzando librerie come soundfile e FFmpeg.
+Il formato viene rilevato dai magic bytes e ogni container va direttamente al
+decoder più adatto: soundfile per i formati di libsndfile, PyAV (se
+installato) o una pipe stdin/stdout di FFmpeg per gli altri, con la
+conversione tramite file temporanei come ultimo fallback. L'audio decodificato
+e ricampionato a 16kHz viene memorizzato in una cache indicizzata per hash dei
+bytes, così le richieste ripetute sullo stesso file non lo ridecodificano.
 """
 
+import asyncio
 import io
+import time
+import hashlib
+import threading
+from collections import OrderedDict, deque
 import numpy as np
 import soundfile as sf
 import ffmpeg
 import tempfile
 import os
-from typing import Tuple, Optional
+import torch
+import torchaudio
+from typing import Callable, Dict, List, Tuple, Optional
+
+from app.config import settings
+from app.utils.inference_executor import InferenceExecutor
+from app.utils.telemetry import TelemetryRegistry
+
+try:
+    import av
+except ImportError:  # PyAV è opzionale: senza, si usa la pipe FFmpeg
+    av = None
+
+TARGET_SAMPLE_RATE = 16000
 
 
 def detect_audio_format(audio_bytes: bytes) -> Optional[str]:
@@ -22,7 +46,8 @@ def detect_audio_format(audio_bytes: bytes) -> Optional[str]:
         audio_bytes: Array di bytes contenente l'audio.
 
     Returns:
-        Stringa con il formato rilevato (wav, mp3, ogg, etc.) o None se non riconosciuto.
+        Stringa con il formato rilevato (wav, mp3, ogg, opus, webm, mp4, 3gp,
+        flac, aac, amr) o None se non riconosciuto.
     """
     if len(audio_bytes) < 12:
         return None
@@ -33,13 +58,18 @@ def detect_audio_format(audio_bytes: bytes) -> Optional[str]:
     elif audio_bytes.startswith(b'ID3') or audio_bytes.startswith(b'\xff\xfb') or audio_bytes.startswith(b'\xff\xf3') or audio_bytes.startswith(b'\xff\xf2'):
         return 'mp3'
     elif audio_bytes.startswith(b'OggS'):
-        return 'ogg'
+        # Il primo pacchetto Ogg identifica il codec (OpusHead, \x01vorbis, ...)
+        return 'opus' if b'OpusHead' in audio_bytes[:64] else 'ogg'
     elif audio_bytes.startswith(b'\x1a\x45\xdf\xa3'):  # WebM/Matroska header
         return 'webm'
-    elif b'ftyp' in audio_bytes[:12]:  # MP4/M4A container
-        return 'mp4'
+    elif audio_bytes[4:8] == b'ftyp':  # Container ISO BMFF: il brand distingue 3GPP da MP4/M4A
+        return '3gp' if audio_bytes[8:11] in (b'3gp', b'3g2') else 'mp4'
     elif audio_bytes.startswith(b'fLaC'):
         return 'flac'
+    elif audio_bytes.startswith(b'#!AMR'):  # AMR-NB e AMR-WB
+        return 'amr'
+    elif audio_bytes[0] == 0xFF and (audio_bytes[1] & 0xF6) == 0xF0:  # Sync word ADTS (layer 0)
+        return 'aac'
     
     return None
 
@@ -108,17 +138,196 @@ def convert_audio_with_ffmpeg(audio_bytes: bytes, input_format: Optional[str] =
         except:
             pass
 
-def decode_bytes_to_float32(audio_bytes: bytes) -> Tuple[np.ndarray, int]:
+def decode_audio_with_ffmpeg_pipe(audio_bytes: bytes, input_format: Optional[str] = None) -> Tuple[np.ndarray, int]:
+    """
+    Decodifica audio con FFmpeg tramite pipe, senza file temporanei.
+
+    I bytes vengono passati su stdin e FFmpeg scrive direttamente su stdout
+    campioni float32 mono a 16kHz, letti senza ulteriori parsing.
+
+    Args:
+        audio_bytes: Array di bytes contenente l'audio da convertire.
+        input_format: Formato dell'audio di input (opzionale).
+
+    Returns:
+        Tupla contenente (array_audio, sample_rate).
+
+    Raises:
+        Exception: Se la decodifica FFmpeg fallisce o non produce campioni.
+    """
+    try:
+        input_args = {"format": input_format} if input_format in ("mp3", "ogg", "webm", "flac", "wav") else {}
+        out, _ = (
+            ffmpeg
+            .input("pipe:0", **input_args)
+            .output("pipe:1", format="f32le", acodec="pcm_f32le", ac=1, ar=TARGET_SAMPLE_RATE)
+            .run(input=audio_bytes, capture_stdout=True, capture_stderr=True, quiet=True)
+        )
+    except Exception as e:
+        raise Exception(f"Errore durante la decodifica FFmpeg via pipe: {str(e)}")
+
+    data = np.frombuffer(out, dtype=np.float32)
+    if len(data) == 0:
+        # Es. MP4 con l'atomo moov in coda: non leggibile da uno stream non seekable
+        raise Exception("Errore durante la decodifica FFmpeg via pipe: nessun campione prodotto")
+    return data.copy(), TARGET_SAMPLE_RATE
+
+
+def decode_audio_with_pyav(audio_bytes: bytes, input_format: Optional[str] = None) -> Tuple[np.ndarray, int]:
+    """
+    Decodifica audio in-process con PyAV (binding di libav), senza file temporanei.
+
+    Args:
+        audio_bytes: Array di bytes contenente l'audio da convertire.
+        input_format: Formato dell'audio di input (non usato: libav lo rileva dal contenuto).
+
+    Returns:
+        Tupla contenente (array_audio float32 mono a 16kHz, sample_rate).
+
+    Raises:
+        Exception: Se PyAV non è installato o la decodifica fallisce.
+    """
+    if av is None:
+        raise Exception("PyAV non è installato")
+
+    try:
+        with av.open(io.BytesIO(audio_bytes), mode="r") as container:
+            stream = container.streams.audio[0]
+            resampler = av.AudioResampler(format="flt", layout="mono", rate=TARGET_SAMPLE_RATE)
+            chunks = []
+            for frame in container.decode(stream):
+                for resampled in resampler.resample(frame):
+                    chunks.append(resampled.to_ndarray().reshape(-1))
+            for resampled in resampler.resample(None):
+                chunks.append(resampled.to_ndarray().reshape(-1))
+    except Exception as e:
+        raise Exception(f"Errore durante la decodifica PyAV: {str(e)}")
+
+    if not chunks:
+        raise Exception("Errore durante la decodifica PyAV: nessun campione prodotto")
+    return np.concatenate(chunks).astype(np.float32, copy=False), TARGET_SAMPLE_RATE
+
+
+# Backend di decodifica per i formati non gestiti da soundfile, dal più veloce al più lento
+AUDIO_DECODER_BACKENDS: Dict[str, Callable[[bytes, Optional[str]], Tuple[np.ndarray, int]]] = {
+    "pyav": decode_audio_with_pyav,
+    "pipe": decode_audio_with_ffmpeg_pipe,
+    "tempfile": convert_audio_with_ffmpeg,
+}
+
+
+def get_decoder_backend_order(backend: Optional[str] = None) -> List[str]:
+    """
+    Ottieni l'ordine in cui provare i backend di decodifica.
+
+    Args:
+        backend: Backend preferito ("auto", "pyav", "pipe" o "tempfile").
+            Se None usa settings.AUDIO_DECODER_BACKEND.
+
+    Returns:
+        Lista dei nomi dei backend, con "tempfile" sempre come ultimo fallback.
+
+    Raises:
+        ValueError: Se il backend non è supportato.
+    """
+    backend = (backend or settings.AUDIO_DECODER_BACKEND).lower()
+    if backend == "auto":
+        order = (["pyav"] if av is not None else []) + ["pipe"]
+    elif backend in AUDIO_DECODER_BACKENDS:
+        order = [backend]
+    else:
+        raise ValueError(f"Backend di decodifica non supportato: '{backend}'")
+    if "tempfile" not in order:
+        order.append("tempfile")
+    return order
+
+
+def decode_audio_with_soundfile(audio_bytes: bytes, input_format: Optional[str] = None) -> Tuple[np.ndarray, int]:
+    """
+    Decodifica audio con soundfile (libsndfile) alla frequenza originale.
+
+    Args:
+        audio_bytes: Array di bytes contenente l'audio da decodificare.
+        input_format: Formato dell'audio di input (non usato: libsndfile lo rileva dal contenuto).
+
+    Returns:
+        Tupla contenente (array_audio float32 mono, sample_rate).
+    """
+    bio = io.BytesIO(audio_bytes)
+    data, sr = sf.read(bio, dtype="float32")
+    if data.ndim > 1:
+        data = data.mean(axis=1)  # stereo to mono
+    return data, sr
+
+
+def decode_raw_pcm16(audio_bytes: bytes, input_format: Optional[str] = None) -> Tuple[np.ndarray, int]:
+    """
+    Interpreta i bytes come raw PCM16 little endian mono a 16kHz.
+
+    Args:
+        audio_bytes: Array di bytes contenente l'audio.
+        input_format: Non usato.
+
+    Returns:
+        Tupla contenente (array_audio, sample_rate).
+    """
+    # Assicurati che la dimensione del buffer sia un multiplo di 2 (per int16)
+    if len(audio_bytes) % 2 != 0:
+        print(f"Buffer size {len(audio_bytes)} not multiple of 2, truncating")
+        audio_bytes = audio_bytes[:-1]  # Rimuovi l'ultimo byte
+    return np.frombuffer(audio_bytes, dtype=np.int16).astype(np.float32) / 32768.0, TARGET_SAMPLE_RATE
+
+
+# Tutti i decoder disponibili, indicizzati per nome
+AUDIO_DECODERS: Dict[str, Callable[[bytes, Optional[str]], Tuple[np.ndarray, int]]] = {
+    "soundfile": decode_audio_with_soundfile,
+    **AUDIO_DECODER_BACKENDS,
+    "raw_pcm": decode_raw_pcm16,
+}
+
+# Formati letti direttamente da libsndfile; gli altri container vanno alla
+# catena FFmpeg/PyAV configurata con AUDIO_DECODER_BACKEND
+SOUNDFILE_FORMATS = {"wav", "flac", "ogg", "mp3"}
+FFMPEG_FORMATS = {"opus", "webm", "mp4", "3gp", "aac", "amr"}
+
+DECODE_MS_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 250, 500, 1000]
+
+
+def get_decoder_chain(audio_format: Optional[str], allow_raw_pcm: bool = True) -> List[str]:
+    """
+    Ottieni i decoder da provare, in ordine, per un formato rilevato.
+
+    Args:
+        audio_format: Formato restituito da detect_audio_format (None se sconosciuto).
+        allow_raw_pcm: Se True, per i formati sconosciuti aggiunge il raw PCM come ultima opzione.
+
+    Returns:
+        Lista dei nomi dei decoder.
+    """
+    ffmpeg_chain = get_decoder_backend_order()
+    if audio_format in FFMPEG_FORMATS:
+        return ffmpeg_chain
+    chain = ["soundfile"] + ffmpeg_chain
+    if audio_format is None and allow_raw_pcm:
+        chain.append("raw_pcm")
+    return chain
+
+
+def decode_bytes_to_float32(audio_bytes: bytes, allow_raw_pcm: bool = True) -> Tuple[np.ndarray, int]:
     """
     Decodifica bytes audio in array numpy float32 mono.
 
-    Supporta vari formati attraverso multiple strategie di decodifica:
-    1. Soundfile per formati standard
-    2. FFmpeg per formati complessi
-    3. Raw PCM come fallback
+    Il formato viene rilevato dai magic bytes e l'audio va direttamente al
+    decoder più adatto: soundfile per WAV/FLAC/Ogg Vorbis/MP3, PyAV o FFmpeg
+    per WebM, Opus, MP4/M4A, 3GPP, AAC e AMR. Gli altri decoder della catena
+    restano come fallback; i dati non riconosciuti vengono infine interpretati
+    come raw PCM. Successi, fallimenti e latenza di ogni decoder vengono
+    registrati nelle metriche di telemetria.
 
     Args:
         audio_bytes: Array di bytes contenente l'audio da decodificare.
+        allow_raw_pcm: Se False, non interpreta i bytes come raw PCM quando gli
+            altri decoder falliscono (utile per container ancora incompleti).
 
     Returns:
         Tupla contenente (array_audio, sample_rate).
@@ -126,43 +335,560 @@ def decode_bytes_to_float32(audio_bytes: bytes) -> Tuple[np.ndarray, int]:
     Raises:
         Exception: Se tutti i metodi di decodifica falliscono.
     """
-    try:
-        # Prova prima con soundfile per file audio standard (WAV, MP3, etc.)
-        bio = io.BytesIO(audio_bytes)
-        data, sr = sf.read(bio, dtype="float32")
-        if data.ndim > 1:
-            data = data.mean(axis=1)  # stereo to mono
-        print(f"Soundfile decode successful: {len(data)} samples at {sr}Hz")
+    telemetry = TelemetryRegistry()
+    detected_format = detect_audio_format(audio_bytes)
+    format_label = detected_format or "unknown"
+    chain = get_decoder_chain(detected_format, allow_raw_pcm)
+    print(f"Detected audio format: {detected_format}, decoders: {chain}")
+
+    errors = []
+    for name in chain:
+        start = time.perf_counter()
+        try:
+            data, sr = AUDIO_DECODERS[name](audio_bytes, detected_format)
+        except Exception as e:
+            telemetry.counter(f"audio_decoder_{name}_{format_label}_failure").inc()
+            print(f"Decoder '{name}' failed: {e}")
+            errors.append(f"{name} error: {e}")
+            continue
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        telemetry.counter(f"audio_decoder_{name}_{format_label}_success").inc()
+        telemetry.histogram(f"audio_decoder_{name}_ms", DECODE_MS_BUCKETS).observe(elapsed_ms)
+        print(f"Decoder '{name}' successful: {len(data)} samples at {sr}Hz in {elapsed_ms:.1f}ms")
         return data, sr
-    except Exception as e:
-        print(f"Soundfile decode failed: {e}, trying FFmpeg conversion...")
-        
-        # Rileva il formato audio
-        detected_format = detect_audio_format(audio_bytes)
-        print(f"Detected audio format: {detected_format}")
-        
+
+    raise Exception(f"Cannot decode audio data: {', '.join(errors)}")
+
+
+def resample_audio(pcm: np.ndarray, original_sr: int, target_sr: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """
+    Ricampiona l'audio alla frequenza target.
+
+    Args:
+        pcm: Array audio da ricampionare.
+        original_sr: Frequenza di campionamento originale.
+        target_sr: Frequenza di campionamento target.
+
+    Returns:
+        Array audio ricampionato.
+    """
+    if original_sr != target_sr:
+        pcm_tensor = torch.tensor(pcm, dtype=torch.float32)
+        pcm = torchaudio.functional.resample(pcm_tensor, original_sr, target_sr).numpy()
+        print(f"Resampled from {original_sr}Hz to {target_sr}Hz: {len(pcm)} samples")
+    return pcm
+
+
+class DecodedAudioCache:
+    """
+    Cache singleton dell'audio decodificato, indicizzata per hash dei bytes.
+
+    Conserva il PCM float32 mono a 16kHz: le voci più recenti restano in
+    memoria, quelle espulse dalla memoria vengono salvate come file .npy e
+    restituite come memory map in sola lettura. Entrambi i livelli sono limitati in dimensione
+    ed espellono le voci usate meno di recente (LRU).
+    """
+
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(DecodedAudioCache, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        """Inizializza la cache (solo una volta)."""
+        if not self._initialized:
+            self._memory_limit = int(settings.AUDIO_CACHE_MEMORY_MB * 1024 * 1024)
+            self._disk_limit = int(settings.AUDIO_CACHE_DISK_MB * 1024 * 1024)
+            self._directory = settings.AUDIO_CACHE_DIR or os.path.join(tempfile.gettempdir(), "speech-to-text-audio-cache")
+            self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+            self._memory_bytes = 0
+            self._disk: "OrderedDict[str, int]" = OrderedDict()
+            self._disk_bytes = 0
+            self._lock = threading.Lock()
+            self._load_disk_index()
+            DecodedAudioCache._initialized = True
+
+    @staticmethod
+    def key_for(audio_bytes: bytes) -> str:
+        """
+        Calcola la chiave di cache dei bytes audio.
+
+        Args:
+            audio_bytes: Bytes audio originali.
+
+        Returns:
+            Digest SHA-256 esadecimale.
+        """
+        return hashlib.sha256(audio_bytes).hexdigest()
+
+    def _path_for(self, key: str) -> str:
+        """Percorso del file .npy di una voce."""
+        return os.path.join(self._directory, f"{key}.npy")
+
+    def _load_disk_index(self) -> None:
+        """Ricostruisci l'indice del livello su disco dai file esistenti (dal più vecchio)."""
+        os.makedirs(self._directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(self._directory):
+            if name.endswith(".npy"):
+                path = os.path.join(self._directory, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._remove_files(self._pop_disk_overflow())
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Cerca l'audio decodificato di una chiave.
+
+        Le voci su disco vengono restituite come memory map in sola lettura,
+        senza copiarle in memoria: le pagine vengono lette solo quando usate.
+
+        Args:
+            key: Chiave calcolata con key_for.
+
+        Returns:
+            Il PCM a 16kHz (di sola lettura se dal disco), oppure None se non presente.
+        """
+        telemetry = TelemetryRegistry()
+        with self._lock:
+            pcm = self._memory.get(key)
+            if pcm is not None:
+                self._memory.move_to_end(key)
+                telemetry.counter("audio_cache_memory_hit").inc()
+                return pcm
+
+        path = self._path_for(key)
         try:
-            # Prova con FFmpeg per convertire il formato
-            data, sr = convert_audio_with_ffmpeg(audio_bytes, detected_format)
-            print(f"FFmpeg conversion successful: {len(data)} samples at {sr}Hz")
-            return data, sr
-        except Exception as e2:
-            print(f"FFmpeg conversion failed: {e2}, trying raw PCM...")
-            
-            # Fallback: assume raw PCM16 LE mono 16kHz
+            # Il file può essere stato scritto da un altro processo worker
+            pcm = np.load(path, mmap_mode="r")
+        except (FileNotFoundError, ValueError, OSError):
+            telemetry.counter("audio_cache_miss").inc()
+            return None
+
+        telemetry.counter("audio_cache_disk_hit").inc()
+        with self._lock:
+            if key in self._disk:
+                self._disk.move_to_end(key)
+        return pcm
+
+    def put(self, key: str, pcm: np.ndarray) -> None:
+        """
+        Memorizza l'audio decodificato di una chiave.
+
+        Le voci che finiscono su disco vengono scritte fuori dal lock, così le
+        altre richieste non attendono l'I/O.
+
+        Args:
+            key: Chiave calcolata con key_for.
+            pcm: PCM float32 mono a 16kHz.
+        """
+        pcm = np.ascontiguousarray(pcm, dtype=np.float32)
+        with self._lock:
+            if pcm.nbytes > self._memory_limit:
+                # Troppo grande per la memoria: direttamente su disco
+                to_spill = [(key, pcm)]
+            else:
+                to_spill = self._store_in_memory(key, pcm)
+        for spill_key, spill_pcm in to_spill:
+            self._spill(spill_key, spill_pcm)
+
+    def _store_in_memory(self, key: str, pcm: np.ndarray) -> List[Tuple[str, np.ndarray]]:
+        """
+        Inserisci una voce nel livello in memoria (con il lock acquisito).
+
+        Returns:
+            Voci più vecchie espulse dalla memoria, da spostare su disco.
+        """
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return []
+        self._memory[key] = pcm
+        self._memory_bytes += pcm.nbytes
+        evicted = []
+        while self._memory_bytes > self._memory_limit and self._memory:
+            old_key, old_pcm = self._memory.popitem(last=False)
+            self._memory_bytes -= old_pcm.nbytes
+            evicted.append((old_key, old_pcm))
+        return evicted
+
+    def _spill(self, key: str, pcm: np.ndarray) -> None:
+        """Salva una voce nel livello su disco (se non già presente), scrivendo il file fuori dal lock."""
+        with self._lock:
+            if key in self._disk:
+                self._disk.move_to_end(key)
+                return
+        if pcm.nbytes > self._disk_limit:
+            return
+        path = self._path_for(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, pcm)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"Audio cache spill failed: {e}")
+            return
+        with self._lock:
+            if key in self._disk:
+                # Scritto nel frattempo da un'altra richiesta: il file è lo stesso
+                self._disk.move_to_end(key)
+                return
+            self._disk[key] = size
+            self._disk_bytes += size
+            evicted = self._pop_disk_overflow()
+        TelemetryRegistry().counter("audio_cache_spill").inc()
+        self._remove_files(evicted)
+
+    def _pop_disk_overflow(self) -> List[str]:
+        """
+        Rimuovi dall'indice i file meno usati finché il livello su disco rientra nel limite.
+
+        Returns:
+            Chiavi rimosse, i cui file vanno eliminati con _remove_files.
+        """
+        evicted = []
+        while self._disk_bytes > self._disk_limit and self._disk:
+            old_key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            evicted.append(old_key)
+        return evicted
+
+    def _remove_files(self, keys: List[str]) -> None:
+        """Elimina i file delle voci rimosse dal livello su disco."""
+        for key in keys:
             try:
-                # Assicurati che la dimensione del buffer sia un multiplo di 2 (per int16)
-                if len(audio_bytes) % 2 != 0:
-                    print(f"Buffer size {len(audio_bytes)} not multiple of 2, truncating")
-                    audio_bytes = audio_bytes[:-1]  # Rimuovi l'ultimo byte
-                
-                arr = np.frombuffer(audio_bytes, dtype=np.int16).astype(np.float32) / 32768.0
-                sr = 16000
-                print(f"Raw PCM decode successful: {len(arr)} samples at {sr}Hz")
-                return arr, sr
-            except Exception as e3:
-                print(f"Raw PCM decode also failed: {e3}")
-                raise Exception(f"Cannot decode audio data: soundfile error: {e}, FFmpeg error: {e2}, raw PCM error: {e3}")
+                os.unlink(self._path_for(key))
+            except OSError:
+                pass
+            TelemetryRegistry().counter("audio_cache_disk_eviction").inc()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Ottieni l'occupazione corrente della cache.
+
+        Returns:
+            Dizionario con numero di voci e bytes per livello.
+        """
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes
+            }
+
+
+def decode_audio_to_16k(audio_bytes: bytes) -> np.ndarray:
+    """
+    Decodifica bytes audio in float32 mono a 16kHz, usando la cache se abilitata.
+
+    Args:
+        audio_bytes: Array di bytes contenente l'audio da decodificare.
+
+    Returns:
+        Array audio float32 mono a 16kHz. L'array può essere condiviso con la
+        cache (o essere una memory map in sola lettura) e non deve essere
+        modificato in place.
+
+    Raises:
+        Exception: Se tutti i metodi di decodifica falliscono.
+    """
+    cache = DecodedAudioCache() if settings.AUDIO_CACHE_ENABLED else None
+    key = DecodedAudioCache.key_for(audio_bytes) if cache else None
+    if cache:
+        pcm = cache.get(key)
+        if pcm is not None:
+            print(f"Decoded audio cache hit: {len(pcm)} samples at {TARGET_SAMPLE_RATE}Hz")
+            return pcm
+
+    pcm, sr = decode_bytes_to_float32(audio_bytes)
+    print(f"Decoded audio: {len(pcm)} samples at {sr}Hz")
+    pcm = resample_audio(pcm, sr)
+
+    if cache:
+        cache.put(key, pcm)
+    return pcm
+
+
+class _ChunkStream(io.RawIOBase):
+    """
+    Stream di sola lettura alimentato a chunk da un altro thread.
+
+    read() si blocca finché non arrivano nuovi bytes o l'input non viene
+    chiuso; i bytes letti vengono scartati, così la memoria resta limitata ai
+    chunk non ancora consumati dal decoder.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: "deque[bytes]" = deque()
+        self._condition = threading.Condition()
+        self._ended = False
+        self._reader_waiting = False
+        self._reader_done = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        with self._condition:
+            while not self._chunks and not self._ended:
+                self._reader_waiting = True
+                self._condition.notify_all()
+                self._condition.wait()
+            self._reader_waiting = False
+            if not self._chunks:
+                return 0
+            chunk = self._chunks[0]
+            size = min(len(buffer), len(chunk))
+            buffer[:size] = chunk[:size]
+            if size < len(chunk):
+                self._chunks[0] = chunk[size:]
+            else:
+                self._chunks.popleft()
+            return size
+
+    def put(self, chunk: bytes) -> None:
+        """Aggiungi un chunk (ignorato se il decoder ha già terminato)."""
+        with self._condition:
+            if not self._reader_done and not self._ended:
+                self._chunks.append(chunk)
+                self._condition.notify_all()
+
+    def end(self) -> None:
+        """Segnala la fine dell'input: il decoder riceverà EOF."""
+        with self._condition:
+            self._ended = True
+            self._condition.notify_all()
+
+    def reader_done(self) -> None:
+        """Segnala che il decoder ha terminato e scarta i chunk residui."""
+        with self._condition:
+            self._reader_done = True
+            self._chunks.clear()
+            self._condition.notify_all()
+
+    def wait_drained(self, timeout: float) -> None:
+        """Attendi che il decoder abbia consumato tutti i chunk e sia in attesa di altri."""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._reader_done or (not self._chunks and self._reader_waiting),
+                timeout=timeout
+            )
+
+
+class StreamingAudioDecoder:
+    """
+    Decoder incrementale per audio ricevuto a pezzi (es. tramite WebSocket).
+
+    Supporta raw PCM (int16 o float32 little endian, mono) e container
+    (WebM/Opus, Ogg, WAV, ...) inviati come sequenza di chunk, come quelli
+    prodotti da MediaRecorder nel browser. I chunk di un container non sono
+    decodificabili da soli: vengono passati a un decoder persistente (PyAV in
+    un thread dedicato, oppure un processo FFmpeg con pipe) che li decodifica
+    una sola volta man mano che arrivano, producendo float32 mono a 16kHz. La
+    memoria e il costo per chunk non crescono con la durata dello stream.
+
+    Con i container feed() e flush() si bloccano in attesa del decoder: nelle
+    coroutine vanno usati feed_async() e flush_async(), che li eseguono sul
+    pool di inferenza (slot "audio") senza bloccare l'event loop.
+    """
+
+    RAW_FORMATS = {"pcm16": np.int16, "f32": np.float32}
+    # Attesa massima del decoder per ogni chunk e alla chiusura dello stream
+    FEED_TIMEOUT_S = 1.0
+    FLUSH_TIMEOUT_S = 30.0
+
+    def __init__(self, audio_format: str = "pcm16", sample_rate: int = 16000):
+        """
+        Inizializza il decoder.
+
+        Args:
+            audio_format: "pcm16", "f32" oppure il nome del container (es. "webm").
+            sample_rate: Frequenza di campionamento dell'audio raw PCM.
+        """
+        self.audio_format = audio_format.lower()
+        self.sample_rate = sample_rate
+        self._pending = b""
+        self._samples: List[np.ndarray] = []
+        self._samples_lock = threading.Lock()
+        self._input: Optional[_ChunkStream] = None
+        self._process = None
+        self._thread: Optional[threading.Thread] = None
+        if not self.is_raw:
+            self.sample_rate = TARGET_SAMPLE_RATE
+            self._start_container_decoder()
+
+    @property
+    def is_raw(self) -> bool:
+        """True se l'audio è raw PCM senza container."""
+        return self.audio_format in self.RAW_FORMATS
+
+    def _start_container_decoder(self) -> None:
+        """Avvia il decoder persistente del container (PyAV se disponibile, altrimenti FFmpeg)."""
+        if av is not None:
+            self._input = _ChunkStream()
+            target = self._decode_with_pyav
+        else:
+            # probesize/analyzeduration minimi: FFmpeg inizia a decodificare dal primo chunk
+            input_args = {"probesize": 32, "analyzeduration": 0, "fflags": "nobuffer"}
+            if self.audio_format in ("ogg", "webm", "wav"):
+                input_args["format"] = self.audio_format
+            self._process = (
+                ffmpeg
+                .input("pipe:0", **input_args)
+                .output(
+                    "pipe:1", format="f32le", acodec="pcm_f32le", ac=1, ar=TARGET_SAMPLE_RATE, flush_packets=1
+                )
+                .global_args("-loglevel", "error")
+                .run_async(pipe_stdin=True, pipe_stdout=True)
+            )
+            target = self._read_ffmpeg_output
+        self._thread = threading.Thread(target=target, name="stream-decoder", daemon=True)
+        self._thread.start()
+
+    def _emit(self, samples: np.ndarray) -> None:
+        """Accoda campioni decodificati, letti poi da feed() e flush()."""
+        if len(samples):
+            with self._samples_lock:
+                self._samples.append(samples)
+
+    def _take_samples(self) -> np.ndarray:
+        """Restituisci e rimuovi i campioni decodificati finora."""
+        with self._samples_lock:
+            samples, self._samples = self._samples, []
+        if not samples:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(samples)
+
+    def _decode_with_pyav(self) -> None:
+        """Thread di decodifica PyAV: legge i chunk dallo stream finché non riceve EOF."""
+        container_format = self.audio_format if self.audio_format in av.formats_available else None
+        try:
+            # probesize/analyzeduration minimi: i primi campioni arrivano con il primo chunk
+            with av.open(
+                self._input, mode="r", format=container_format,
+                options={"probesize": "32", "analyzeduration": "0"}
+            ) as container:
+                resampler = av.AudioResampler(format="flt", layout="mono", rate=TARGET_SAMPLE_RATE)
+                for frame in container.decode(audio=0):
+                    for out in resampler.resample(frame):
+                        self._emit(out.to_ndarray().reshape(-1).copy())
+                for out in resampler.resample(None):
+                    self._emit(out.to_ndarray().reshape(-1).copy())
+        except Exception as e:
+            print(f"Streaming decode failed: {e}")
+        finally:
+            self._input.reader_done()
+
+    def _read_ffmpeg_output(self) -> None:
+        """Thread di lettura dello stdout di FFmpeg (float32 mono a 16kHz)."""
+        itemsize = np.dtype(np.float32).itemsize
+        pending = b""
+        while True:
+            data = self._process.stdout.read1(65536)
+            if not data:
+                break
+            data = pending + data
+            usable = len(data) - len(data) % itemsize
+            pending = data[usable:]
+            self._emit(np.frombuffer(data[:usable], dtype=np.float32).copy())
+
+    def feed(self, chunk: bytes) -> Tuple[np.ndarray, int]:
+        """
+        Aggiungi un chunk e ottieni i nuovi campioni decodificati.
+
+        Args:
+            chunk: Bytes ricevuti dal client.
+
+        Returns:
+            Tupla contenente (nuovi campioni float32 mono, sample_rate).
+        """
+        if self.is_raw:
+            dtype = self.RAW_FORMATS[self.audio_format]
+            itemsize = np.dtype(dtype).itemsize
+            data = self._pending + chunk
+            usable = len(data) - len(data) % itemsize
+            self._pending = data[usable:]
+            samples = np.frombuffer(data[:usable], dtype=dtype).astype(np.float32)
+            if dtype == np.int16:
+                samples /= 32768.0
+            return samples, self.sample_rate
+
+        if self._input is not None:
+            self._input.put(chunk)
+            self._input.wait_drained(self.FEED_TIMEOUT_S)
+        else:
+            try:
+                self._process.stdin.write(chunk)
+                self._process.stdin.flush()
+            except (BrokenPipeError, ValueError) as e:
+                print(f"Streaming decode failed: {e}")
+        return self._take_samples(), self.sample_rate
+
+    def flush(self) -> Tuple[np.ndarray, int]:
+        """
+        Ottieni gli ultimi campioni al termine dello stream.
+
+        Returns:
+            Tupla contenente (campioni rimanenti, sample_rate).
+        """
+        if self.is_raw:
+            self._pending = b""
+            return np.zeros(0, dtype=np.float32), self.sample_rate
+        self._end_input()
+        self._thread.join(self.FLUSH_TIMEOUT_S)
+        if self._process is not None:
+            self._process.wait()
+        return self._take_samples(), self.sample_rate
+
+    async def feed_async(self, chunk: bytes) -> Tuple[np.ndarray, int]:
+        """Come feed(), eseguito fuori dall'event loop per i container."""
+        if self.is_raw:
+            return self.feed(chunk)
+        return await self._run_blocking(self.feed, chunk)
+
+    async def flush_async(self) -> Tuple[np.ndarray, int]:
+        """Come flush(), eseguito fuori dall'event loop per i container."""
+        if self.is_raw:
+            return self.flush()
+        return await self._run_blocking(self.flush)
+
+    @staticmethod
+    async def _run_blocking(func: Callable, *args) -> Tuple[np.ndarray, int]:
+        """
+        Esegui una chiamata bloccante del decoder sul pool di inferenza.
+
+        Il decoder vive in questo processo: con il pool di processi la chiamata
+        viene eseguita in un thread separato.
+        """
+        executor = InferenceExecutor()
+        if executor.is_process_pool:
+            return await asyncio.to_thread(func, *args)
+        return await executor.run("audio", func, *args)
+
+    def _end_input(self) -> None:
+        """Chiudi l'input del decoder del container."""
+        if self._input is not None:
+            self._input.end()
+        elif self._process is not None and not self._process.stdin.closed:
+            self._process.stdin.close()
+
+    def close(self) -> None:
+        """Rilascia il decoder (es. alla disconnessione del client) senza attendere i campioni."""
+        if self.is_raw:
+            return
+        self._end_input()
+        if self._process is not None and self._process.poll() is None:
+            self._process.kill()
 
 
 def get_supported_audio_formats() -> list[str]:
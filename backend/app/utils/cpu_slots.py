@@ -0,0 +1,94 @@
+"""
+Suddivisione dei core della CPU in slot fissi per l'inferenza.
+
+Con il numero di thread di default ogni inferenza di torch usa tutti i core:
+più richieste concorrenti (o più processi) si contendono gli stessi core e il
+throughput scende sotto quello di una richiesta alla volta. Con CPU_SLOTS > 0 i
+core disponibili al processo vengono divisi in CPU_SLOTS gruppi contigui di
+dimensione uguale: ogni slot esegue un'inferenza alla volta, con affinità
+limitata ai propri core e torch.set_num_threads pari alla dimensione dello slot.
+
+L'affinità si applica ai processi di inferenza (INFERENCE_EXECUTOR "process" e
+"workers"). In modalità "thread" il numero di thread di torch è globale al
+processo: gli slot fissano solo il numero di inferenze concorrenti e i thread
+per inferenza, senza affinità.
+"""
+
+import os
+from typing import List, Optional
+
+
+def get_available_cores() -> List[int]:
+    """
+    Ottieni i core utilizzabili dal processo corrente.
+
+    Returns:
+        Lista ordinata degli indici dei core (affinità attuale se disponibile).
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def partition_cores(slots: int, cores: Optional[List[int]] = None) -> List[List[int]]:
+    """
+    Dividi i core in slot contigui di dimensione (quasi) uguale.
+
+    Con più slot che core ogni slot riceve un core, assegnati a rotazione.
+
+    Args:
+        slots: Numero di slot.
+        cores: Core da dividere. Se None, quelli disponibili al processo.
+
+    Returns:
+        Lista dei core di ciascuno slot.
+
+    Raises:
+        ValueError: Se slots non è positivo.
+    """
+    if slots < 1:
+        raise ValueError(f"Numero di slot CPU non valido: {slots}")
+    cores = list(cores) if cores is not None else get_available_cores()
+    if slots >= len(cores):
+        return [[cores[i % len(cores)]] for i in range(slots)]
+    size, remainder = divmod(len(cores), slots)
+    partition, start = [], 0
+    for index in range(slots):
+        end = start + size + (1 if index < remainder else 0)
+        partition.append(cores[start:end])
+        start = end
+    return partition
+
+
+def pin_to_slot(cores: List[int]) -> None:
+    """
+    Limita il processo corrente ai core di uno slot e adegua i thread di torch.
+
+    Va chiamata nel processo di inferenza prima del primo forward pass.
+
+    Args:
+        cores: Core dello slot.
+    """
+    import torch
+
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(len(cores))
+    try:
+        # Un'inferenza per slot: il parallelismo inter-op non serve
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Già impostato o parallelismo già avviato nel processo
+        pass
+
+
+def init_slot_process(slot_queue) -> None:
+    """
+    Initializer dei processi di un ProcessPoolExecutor: prende uno slot libero e vi si lega.
+
+    Args:
+        slot_queue: Coda multiprocessing con i core di ciascuno slot, uno per processo.
+    """
+    cores = slot_queue.get()
+    pin_to_slot(cores)
+    print(f"Inference process {os.getpid()} pinned to cores {cores}")
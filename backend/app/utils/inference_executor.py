@@ -0,0 +1,263 @@
+"""
+Executor dedicato all'inferenza dei modelli ASR.
+
+Il decoding audio e il forward pass dei modelli sono operazioni CPU-bound e
+sincrone: eseguirle direttamente nelle coroutine bloccherebbe l'event loop di
+FastAPI (e con esso anche endpoint leggeri come /health/status). Questo modulo
+fornisce un pool di thread o di processi, dimensionato da Settings, a cui tutti
+i servizi ASR inviano il proprio lavoro, con un limite di concorrenza per
+modello per evitare l'oversubscription dei thread di torch.
+
+Con INFERENCE_EXECUTOR="workers" il pool di thread esegue solo il decoding
+audio, mentre l'inferenza di ogni modello passa ai processi dedicati di
+app.utils.inference_workers, alimentati tramite memoria condivisa.
+
+Con CPU_SLOTS > 0 i core vengono divisi in slot fissi (app.utils.cpu_slots):
+il pool esegue un'inferenza per slot e ogni processo di inferenza è legato ai
+core del proprio slot, con un numero di thread di torch pari alla sua dimensione.
+"""
+
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.utils.cpu_slots import init_slot_process, partition_cores
+
+
+def _configure_torch_threads(num_threads: Optional[int]) -> None:
+    """
+    Imposta il numero di thread intra-op di torch.
+
+    Args:
+        num_threads: Numero di thread. Se None, lascia il default di torch.
+    """
+    if num_threads:
+        import torch
+        torch.set_num_threads(num_threads)
+
+
+class InferenceExecutor:
+    """
+    Executor singleton per l'inferenza dei modelli ASR.
+
+    Inoltra le funzioni sincrone di decoding+inferenza a un pool di thread
+    (default) o di processi, e applica un semaforo per ogni modello così che
+    il numero di inferenze concorrenti sullo stesso modello resti limitato.
+    """
+
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(InferenceExecutor, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        """Inizializza l'executor (solo una volta)."""
+        if not self._initialized:
+            self._kind = settings.INFERENCE_EXECUTOR.lower()
+            if self._kind not in ("thread", "process", "workers"):
+                raise ValueError(f"Tipo di executor non supportato: '{settings.INFERENCE_EXECUTOR}'")
+            self._slots: List[List[int]] = partition_cores(settings.CPU_SLOTS) if settings.CPU_SLOTS > 0 else []
+            self._next_slot = 0
+            self._max_workers = max(1, settings.INFERENCE_WORKERS)
+            if self._slots and self._kind != "workers":
+                # Un'inferenza per slot; in modalità "workers" il pool esegue solo il decoding
+                self._max_workers = len(self._slots)
+            self._limits: Dict[str, int] = {
+                # Il decoding audio non usa i modelli: può occupare tutto il pool
+                "audio": self._max_workers,
+                # Con gli slot CPU ogni modello può occupare tutti gli slot liberi
+                "wav2vec2": self._max_workers if self._slots else max(1, settings.WAV2VEC2_MAX_CONCURRENCY),
+                "whisper": self._max_workers if self._slots else max(1, settings.WHISPER_MAX_CONCURRENCY),
+            }
+            self._worker_processes: Dict[str, int] = {
+                "wav2vec2": settings.WAV2VEC2_WORKER_PROCESSES,
+                "whisper": settings.WHISPER_WORKER_PROCESSES,
+            }
+            self._executor: Optional[Executor] = None
+            self._semaphores: Dict[str, asyncio.Semaphore] = {}
+            self._worker_pools: Dict[str, Any] = {}
+            InferenceExecutor._initialized = True
+
+    @property
+    def is_process_pool(self) -> bool:
+        """True se l'inferenza viene eseguita in processi separati."""
+        return self._kind == "process"
+
+    def uses_model_workers(self, model_key: str) -> bool:
+        """
+        Indica se l'inferenza di un modello passa ai processi dedicati.
+
+        Args:
+            model_key: Chiave del modello (es. "audio", "wav2vec2", "whisper").
+
+        Returns:
+            True con INFERENCE_EXECUTOR="workers" per i modelli ASR.
+        """
+        return self._kind == "workers" and model_key in self._worker_processes
+
+    def _get_executor(self) -> Executor:
+        """
+        Crea il pool alla prima richiesta (lazy initialization).
+
+        Returns:
+            Il pool di thread o di processi configurato.
+        """
+        if self._executor is None:
+            if self.is_process_pool and self._slots:
+                # Ogni processo del pool prende uno slot diverso all'avvio
+                slot_queue = multiprocessing.Queue()
+                for cores in self._slots:
+                    slot_queue.put(cores)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._max_workers,
+                    initializer=init_slot_process,
+                    initargs=(slot_queue,)
+                )
+            elif self.is_process_pool:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._max_workers,
+                    initializer=_configure_torch_threads,
+                    initargs=(settings.INFERENCE_TORCH_THREADS,)
+                )
+            else:
+                # In modalità thread il numero di thread di torch è globale al processo
+                if self._slots and self._kind == "thread":
+                    _configure_torch_threads(len(self._slots[0]))
+                else:
+                    _configure_torch_threads(settings.INFERENCE_TORCH_THREADS)
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers,
+                    thread_name_prefix="inference"
+                )
+            print(f"Inference executor started: {self._kind} pool with {self._max_workers} workers")
+        return self._executor
+
+    def _get_semaphore(self, model_key: str) -> asyncio.Semaphore:
+        """
+        Ottieni il semaforo che limita la concorrenza di un modello.
+
+        Args:
+            model_key: Chiave del modello (es. "wav2vec2", "whisper").
+
+        Returns:
+            Semaforo associato al modello.
+        """
+        if model_key not in self._semaphores:
+            limit = min(self._limits.get(model_key, 1), self._max_workers)
+            self._semaphores[model_key] = asyncio.Semaphore(limit)
+        return self._semaphores[model_key]
+
+    async def run(self, model_key: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Esegui una funzione sincrona sul pool di inferenza.
+
+        Args:
+            model_key: Chiave del modello, usata per il limite di concorrenza.
+            func: Funzione sincrona da eseguire. In modalità processo deve essere picklable.
+            *args: Argomenti posizionali per la funzione.
+            **kwargs: Argomenti keyword per la funzione.
+
+        Returns:
+            Il valore restituito dalla funzione.
+        """
+        async with self._get_semaphore(model_key):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(),
+                functools.partial(func, *args, **kwargs)
+            )
+
+    def _get_worker_pool(self, model_key: str):
+        """
+        Avvia i processi dedicati di un modello alla prima richiesta.
+
+        Args:
+            model_key: Chiave del modello ("wav2vec2" o "whisper").
+
+        Returns:
+            L'InferenceWorkerPool del modello.
+        """
+        if model_key not in self._worker_pools:
+            from app.utils.inference_workers import InferenceWorkerPool
+
+            processes = self._worker_processes[model_key]
+            slots = None
+            if self._slots:
+                # Slot assegnati a rotazione tra i processi di tutti i modelli
+                slots = [self._slots[(self._next_slot + i) % len(self._slots)] for i in range(processes)]
+                self._next_slot += processes
+            self._worker_pools[model_key] = InferenceWorkerPool(
+                model_key,
+                processes,
+                settings.INFERENCE_SHM_RING_MB,
+                settings.INFERENCE_TORCH_THREADS,
+                slots
+            )
+        return self._worker_pools[model_key]
+
+    async def run_in_model_worker(
+        self,
+        model_key: str,
+        target: Callable[..., Any],
+        checkpoint: Any,
+        method_name: str,
+        *args: Any
+    ) -> Any:
+        """
+        Esegui un metodo del servizio in un processo dedicato del modello.
+
+        Args:
+            model_key: Chiave del modello ("wav2vec2" o "whisper").
+            target: Funzione di modulo eseguita nel processo come target(checkpoint, method_name, *args).
+            checkpoint: Modello da usare nel processo.
+            method_name: Nome del metodo sincrono del servizio.
+            *args: Argomenti del metodo; gli audio float32 passano dalla memoria condivisa.
+
+        Returns:
+            Il valore restituito dal metodo.
+        """
+        return await self._get_worker_pool(model_key).run(target, checkpoint, method_name, *args)
+
+    async def broadcast_to_model_workers(
+        self,
+        model_key: str,
+        target: Callable[..., Any],
+        checkpoint: Any,
+        method_name: str,
+        *args: Any
+    ) -> List[Any]:
+        """
+        Esegui un metodo del servizio in tutti i processi dedicati del modello (es. warm-up).
+
+        Args:
+            model_key: Chiave del modello ("wav2vec2" o "whisper").
+            target: Funzione di modulo eseguita nei processi.
+            checkpoint: Modello da usare nei processi.
+            method_name: Nome del metodo sincrono del servizio.
+            *args: Argomenti del metodo.
+
+        Returns:
+            I valori restituiti da ciascun processo.
+        """
+        return await self._get_worker_pool(model_key).broadcast(target, checkpoint, method_name, *args)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Arresta il pool di inferenza.
+
+        Args:
+            wait: Se True, attende il completamento dei job in corso.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+            self._semaphores.clear()
+        for pool in self._worker_pools.values():
+            pool.shutdown()
+        self._worker_pools.clear()
@@ -0,0 +1,456 @@
+"""
+Processi di inferenza dedicati per modello, alimentati tramite memoria condivisa.
+
+Con INFERENCE_EXECUTOR="workers" il processo FastAPI si limita a ricevere gli
+upload e a decodificare l'audio; il forward pass dei modelli viene eseguito da
+processi dedicati (WAV2VEC2_WORKER_PROCESSES / WHISPER_WORKER_PROCESSES per
+modello), ognuno con la propria copia del servizio e del modello.
+
+Il PCM float32 non viene serializzato con pickle: il processo API lo copia in
+un ring buffer in multiprocessing.shared_memory e invia al worker solo
+(segmento, offset, lunghezza); il worker legge i campioni direttamente dalla
+memoria condivisa senza copie. Le aree del ring vengono liberate al termine
+del job. Gli audio più grandi dello spazio libero usano un segmento dedicato
+creato e rimosso per il solo job.
+
+Ogni worker comunica con il processo API su una Pipe: riceve un job alla volta
+e restituisce il risultato (testo o strutture piccole) e il tempo di calcolo.
+Un worker terminato in modo inatteso viene ricreato automaticamente: il job in
+corso fallisce, i successivi vengono eseguiti dal nuovo processo.
+"""
+
+import asyncio
+import multiprocessing
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Awaitable, Callable, Deque, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.utils.telemetry import TelemetryRegistry
+
+# Limiti dei bucket degli istogrammi esposti su /health/metrics
+WORKER_MS_BUCKETS = [1, 5, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+SAMPLE_BYTES = np.dtype(np.float32).itemsize
+
+
+@dataclass(frozen=True)
+class SharedArray:
+    """Riferimento a un array float32 in memoria condivisa, inviato al worker al posto dei dati."""
+    segment: Optional[str]  # None = ring buffer del pool, altrimenti segmento dedicato
+    offset: int  # in campioni
+    length: int  # in campioni
+
+
+class SharedAudioRing:
+    """
+    Ring buffer di campioni float32 in un segmento di memoria condivisa.
+
+    Le aree vengono allocate in ordine circolare e liberate in qualsiasi
+    ordine; lo spazio torna disponibile quando si libera l'area più vecchia
+    ancora in uso. Allocazioni e rilasci avvengono solo nel processo API.
+    """
+
+    def __init__(self, capacity_samples: int):
+        """
+        Crea il segmento condiviso.
+
+        Args:
+            capacity_samples: Capacità del ring in campioni float32.
+        """
+        self.capacity = max(1, capacity_samples)
+        self._shm = SharedMemory(create=True, size=self.capacity * SAMPLE_BYTES)
+        self._samples = np.ndarray((self.capacity,), dtype=np.float32, buffer=self._shm.buf)
+        self._head = 0
+        self._live: Deque[List[int]] = deque()  # [offset, lunghezza, rilasciata] in ordine di allocazione
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        """Nome del segmento, usato dai worker per collegarsi."""
+        return self._shm.name
+
+    def write(self, pcm: np.ndarray) -> Optional[int]:
+        """
+        Copia un audio nel ring.
+
+        Args:
+            pcm: Audio float32 monodimensionale.
+
+        Returns:
+            Offset in campioni dell'area allocata, oppure None se non c'è spazio contiguo.
+        """
+        length = len(pcm)
+        with self._lock:
+            offset = self._allocate(length)
+            if offset is None:
+                return None
+            self._live.append([offset, length, False])
+        self._samples[offset:offset + length] = pcm
+        return offset
+
+    def _allocate(self, length: int) -> Optional[int]:
+        """Trova un'area contigua libera di length campioni (da chiamare con il lock)."""
+        if not self._live:
+            self._head = 0
+        tail = self._live[0][0] if self._live else 0
+        if not self._live or self._head > tail:
+            # Aree occupate tra tail e head: spazio libero in coda e in testa al segmento
+            if length <= self.capacity - self._head:
+                offset = self._head
+            elif length <= tail:
+                offset = 0
+            else:
+                return None
+        elif length <= tail - self._head:
+            offset = self._head
+        else:
+            return None
+        self._head = offset + length
+        return offset
+
+    def release(self, offset: int) -> None:
+        """
+        Libera un'area allocata con write().
+
+        Args:
+            offset: Offset restituito da write().
+        """
+        with self._lock:
+            for area in self._live:
+                if area[0] == offset and not area[2]:
+                    area[2] = True
+                    break
+            while self._live and self._live[0][2]:
+                self._live.popleft()
+
+    def close(self) -> None:
+        """Rilascia e rimuove il segmento condiviso."""
+        del self._samples
+        self._shm.close()
+        self._shm.unlink()
+
+
+def _attach_array(ref: SharedArray, ring: SharedMemory) -> np.ndarray:
+    """Ricostruisci nel worker l'array indicato da un SharedArray."""
+    if ref.segment is None:
+        return np.ndarray((ref.length,), dtype=np.float32, buffer=ring.buf, offset=ref.offset * SAMPLE_BYTES)
+    # Segmento dedicato: i dati vengono copiati così il segmento può essere chiuso subito
+    shm = SharedMemory(name=ref.segment)
+    try:
+        return np.ndarray((ref.length,), dtype=np.float32, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+
+
+def _decode_args(args: Tuple[Any, ...], ring: SharedMemory) -> List[Any]:
+    """Sostituisci i SharedArray (anche dentro le liste) con gli array corrispondenti."""
+    decoded = []
+    for arg in args:
+        if isinstance(arg, SharedArray):
+            arg = _attach_array(arg, ring)
+        elif isinstance(arg, list) and any(isinstance(item, SharedArray) for item in arg):
+            arg = [_attach_array(item, ring) if isinstance(item, SharedArray) else item for item in arg]
+        decoded.append(arg)
+    return decoded
+
+
+def _worker_main(conn, ring_name: str, torch_threads: Optional[int], cores: Optional[List[int]] = None) -> None:
+    """
+    Ciclo principale di un processo di inferenza.
+
+    Args:
+        conn: Estremità della Pipe verso il processo API.
+        ring_name: Nome del segmento del ring buffer.
+        torch_threads: Thread intra-op di torch per questo processo.
+        cores: Core dello slot CPU assegnato (vedi app.utils.cpu_slots). Se
+            indicato, sostituisce torch_threads.
+    """
+    from app.utils.cpu_slots import pin_to_slot
+    from app.utils.inference_executor import _configure_torch_threads
+
+    # L'arresto è gestito dal processo API, che chiude la Pipe
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if cores:
+        pin_to_slot(cores)
+    else:
+        _configure_torch_threads(torch_threads)
+    ring = SharedMemory(name=ring_name)
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+
+        target, checkpoint, method_name, args = message
+        start = time.perf_counter()
+        try:
+            reply = ("ok", target(checkpoint, method_name, *_decode_args(args, ring)))
+        except Exception as e:
+            reply = ("error", e)
+        compute_ms = (time.perf_counter() - start) * 1000
+        try:
+            conn.send((*reply, compute_ms))
+        except Exception as e:
+            # Risultato o eccezione non serializzabile
+            error = reply[1] if reply[0] == "error" else e
+            conn.send(("error", Exception(f"{type(error).__name__}: {error}"), compute_ms))
+
+
+class _WorkerProcess:
+    """Processo di inferenza con la propria Pipe."""
+
+    def __init__(self, context, name: str, ring_name: str, torch_threads: Optional[int], cores: Optional[List[int]]):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, ring_name, torch_threads, cores),
+            name=name,
+            daemon=True
+        )
+        self.process.start()
+        # Il padre chiude la propria copia: se il figlio termina, recv() solleva EOFError
+        child_conn.close()
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def call(self, message: Tuple[Any, ...]) -> Tuple[Any, ...]:
+        """Invia un job e attendi la risposta (bloccante, eseguito in un thread)."""
+        self.conn.send(message)
+        return self.conn.recv()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Chiedi al processo di terminare e attendi, forzando l'arresto se necessario."""
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout)
+        self.conn.close()
+
+
+class InferenceWorkerPool:
+    """
+    Pool di processi di inferenza dedicati a un modello.
+
+    Ogni job occupa un processo libero; i job in eccesso attendono nel
+    processo API. I processi terminati vengono ricreati automaticamente.
+    """
+
+    def __init__(
+        self,
+        model_key: str,
+        processes: int,
+        ring_mb: float,
+        torch_threads: Optional[int] = None,
+        slots: Optional[List[List[int]]] = None
+    ):
+        """
+        Avvia i processi del pool.
+
+        Args:
+            model_key: Chiave del modello (es. "wav2vec2", "whisper"), usata per nomi e metriche.
+            processes: Numero di processi di inferenza.
+            ring_mb: Dimensione del ring buffer condiviso in MB.
+            torch_threads: Thread intra-op di torch per processo. Se None, il default di torch.
+            slots: Core dello slot CPU di ciascun processo (uno per processo). Se None, nessuna affinità.
+        """
+        self.model_key = model_key
+        self._size = max(1, processes)
+        self._torch_threads = torch_threads
+        self._slots = slots
+        # spawn: i processi non ereditano i thread di torch e l'event loop del processo API
+        self._context = multiprocessing.get_context("spawn")
+        self._ring = SharedAudioRing(int(ring_mb * 1024 ** 2) // SAMPLE_BYTES)
+        self._segments: Set[str] = set()  # segmenti dedicati dei job in corso
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._workers: List[_WorkerProcess] = []
+        # Un thread per processo attende le risposte sulle Pipe
+        self._io = ThreadPoolExecutor(max_workers=self._size, thread_name_prefix=f"{model_key}-worker-io")
+        self._restarts = TelemetryRegistry().counter(f"{model_key}_worker_restarts_total")
+        for index in range(self._size):
+            worker = self._spawn(index)
+            self._workers.append(worker)
+            self._idle.put_nowait(worker)
+        print(f"Started {self._size} {model_key} inference worker processes "
+              f"(shared ring {self._ring.capacity * SAMPLE_BYTES / 1024 ** 2:.0f} MB)")
+
+    @property
+    def size(self) -> int:
+        """Numero di processi del pool."""
+        return self._size
+
+    def _spawn(self, index: int) -> _WorkerProcess:
+        """Avvia il processo di indice index."""
+        cores = self._slots[index] if self._slots else None
+        return _WorkerProcess(
+            self._context, f"{self.model_key}-worker-{index}", self._ring.name, self._torch_threads, cores
+        )
+
+    def _replace(self, worker: _WorkerProcess) -> _WorkerProcess:
+        """Sostituisci un processo terminato con uno nuovo."""
+        index = self._workers.index(worker)
+        worker.conn.close()
+        worker.process.join(1.0)
+        print(f"{self.model_key} inference worker {index} (pid {worker.process.pid}) exited "
+              f"with code {worker.process.exitcode}, restarting")
+        replacement = self._spawn(index)
+        self._workers[index] = replacement
+        self._restarts.inc()
+        return replacement
+
+    def _encode(self, value: Any, refs: List[SharedArray]) -> Any:
+        """Copia un array float32 in memoria condivisa e restituisci il riferimento."""
+        pcm = np.ascontiguousarray(value, dtype=np.float32)
+        offset = self._ring.write(pcm)
+        if offset is not None:
+            ref = SharedArray(None, offset, len(pcm))
+        else:
+            # Nessuno spazio contiguo nel ring: segmento dedicato per questo job
+            shm = SharedMemory(create=True, size=max(1, pcm.nbytes))
+            np.ndarray(pcm.shape, dtype=np.float32, buffer=shm.buf)[:] = pcm
+            shm.close()
+            self._segments.add(shm.name)
+            ref = SharedArray(shm.name, 0, len(pcm))
+        refs.append(ref)
+        return ref
+
+    def _encode_args(self, args: Tuple[Any, ...], refs: List[SharedArray]) -> Tuple[Any, ...]:
+        """Sostituisci gli audio float32 (anche dentro le liste) con riferimenti in memoria condivisa."""
+        def is_pcm(value: Any) -> bool:
+            return isinstance(value, np.ndarray) and value.ndim == 1 and value.dtype == np.float32
+
+        encoded = []
+        for arg in args:
+            if is_pcm(arg):
+                arg = self._encode(arg, refs)
+            elif isinstance(arg, list) and any(is_pcm(item) for item in arg):
+                arg = [self._encode(item, refs) if is_pcm(item) else item for item in arg]
+            encoded.append(arg)
+        return tuple(encoded)
+
+    def _release(self, refs: List[SharedArray]) -> None:
+        """Libera le aree del ring e rimuovi i segmenti dedicati di un job."""
+        for ref in refs:
+            if ref.segment is None:
+                self._ring.release(ref.offset)
+            else:
+                self._unlink_segment(ref.segment)
+
+    def _unlink_segment(self, name: str) -> None:
+        """Rimuovi un segmento dedicato."""
+        self._segments.discard(name)
+        try:
+            shm = SharedMemory(name=name)
+            shm.close()
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    async def run(self, target: Callable[..., Any], checkpoint: Any, method_name: str, *args: Any) -> Any:
+        """
+        Esegui un metodo del servizio in un processo libero del pool.
+
+        Args:
+            target: Funzione di modulo eseguita nel worker come target(checkpoint, method_name, *args).
+            checkpoint: Modello da usare nel worker.
+            method_name: Nome del metodo sincrono del servizio.
+            *args: Argomenti del metodo; gli audio float32 passano dalla memoria condivisa.
+
+        Returns:
+            Il valore restituito dal metodo.
+
+        Raises:
+            Exception: Se il metodo fallisce o il processo termina durante il job.
+        """
+        return await self._shielded(self._execute(target, checkpoint, method_name, args))
+
+    async def broadcast(self, target: Callable[..., Any], checkpoint: Any, method_name: str, *args: Any) -> List[Any]:
+        """
+        Esegui lo stesso job su ogni processo del pool (es. warm-up del modello).
+
+        Args:
+            target: Funzione di modulo eseguita nel worker.
+            checkpoint: Modello da usare nel worker.
+            method_name: Nome del metodo sincrono del servizio.
+            *args: Argomenti del metodo.
+
+        Returns:
+            I risultati dei singoli processi.
+        """
+        return await self._shielded(self._broadcast(target, checkpoint, method_name, args))
+
+    @staticmethod
+    async def _shielded(coro: Awaitable[Any]) -> Any:
+        """
+        Esegui un job in un task separato, protetto dalla cancellazione del chiamante.
+
+        Se il chiamante viene cancellato il job prosegue, così il processo
+        torna libero solo dopo averne consumato la risposta.
+        """
+        task = asyncio.ensure_future(coro)
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return await asyncio.shield(task)
+
+    async def _execute(self, target: Callable[..., Any], checkpoint: Any, method_name: str, args: Tuple[Any, ...]) -> Any:
+        """Attendi un processo libero ed eseguici il job."""
+        wait_start = time.perf_counter()
+        worker = await self._idle.get()
+        TelemetryRegistry().histogram(f"{self.model_key}_worker_queue_ms", WORKER_MS_BUCKETS).observe(
+            (time.perf_counter() - wait_start) * 1000
+        )
+        return await self._call(worker, target, checkpoint, method_name, args)
+
+    async def _broadcast(self, target: Callable[..., Any], checkpoint: Any, method_name: str, args: Tuple[Any, ...]) -> List[Any]:
+        """Occupa tutti i processi e esegui il job su ciascuno."""
+        workers = [await self._idle.get() for _ in range(self._size)]
+        return await asyncio.gather(*(self._call(worker, target, checkpoint, method_name, args) for worker in workers))
+
+    async def _call(
+        self,
+        worker: _WorkerProcess,
+        target: Callable[..., Any],
+        checkpoint: Any,
+        method_name: str,
+        args: Tuple[Any, ...]
+    ) -> Any:
+        """Esegui un job su un processo già occupato e rimettilo tra quelli liberi."""
+        refs: List[SharedArray] = []
+        try:
+            if not worker.is_alive():
+                worker = self._replace(worker)
+            message = (target, checkpoint, method_name, self._encode_args(args, refs))
+            loop = asyncio.get_running_loop()
+            try:
+                status, value, compute_ms = await loop.run_in_executor(self._io, worker.call, message)
+            except (EOFError, OSError) as e:
+                worker = self._replace(worker)
+                raise Exception(f"Il processo di inferenza {self.model_key} è terminato durante il job") from e
+            TelemetryRegistry().histogram(f"{self.model_key}_worker_compute_ms", WORKER_MS_BUCKETS).observe(compute_ms)
+            if status == "error":
+                raise value
+            return value
+        finally:
+            self._release(refs)
+            self._idle.put_nowait(worker)
+
+    def shutdown(self) -> None:
+        """Arresta i processi e rimuovi il ring buffer condiviso."""
+        for worker in self._workers:
+            worker.stop()
+        self._io.shutdown(wait=False)
+        for name in list(self._segments):
+            self._unlink_segment(name)
+        self._ring.close()
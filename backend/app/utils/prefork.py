@@ -0,0 +1,140 @@
+"""
+Launcher pre-fork per più worker uvicorn con modelli condivisi.
+
+Con uvicorn --workers ogni worker è un processo avviato da zero che carica la
+propria copia dei modelli: la memoria cresce linearmente con il numero di
+worker. Il launcher pre-fork carica invece i modelli una sola volta nel
+processo padre, congela gli oggetti esistenti con gc.freeze() e poi crea i
+worker con fork(): i tensori dei pesi restano pagine condivise copy-on-write
+(nessun worker li modifica), così la memoria di ogni worker cresce solo con le
+attivazioni e le strutture create dopo il fork.
+
+gc.freeze() sposta gli oggetti del padre nella generazione permanente: il
+garbage collector dei worker non li visita più e non ne tocca le intestazioni,
+che altrimenti verrebbero copiate pagina per pagina al primo ciclo di raccolta.
+
+Il padre non esegue richieste: resta in ascolto dei segnali, inoltra l'arresto
+ai worker e riavvia (con un nuovo fork, senza ricaricare i modelli) quelli che
+terminano in modo inatteso.
+"""
+
+import gc
+import os
+import signal
+import socket
+import time
+from typing import Dict, Optional
+
+import uvicorn
+
+from app.services.startup import load_models_before_fork
+
+# Attesa minima tra due riavvii dello stesso worker, contro i crash a ripetizione
+WORKER_RESTART_BACKOFF_S = 1.0
+
+
+class PreforkLauncher:
+    """Supervisore dei worker uvicorn creati con fork() dopo il caricamento dei modelli."""
+
+    def __init__(self, app_path: str, host: str, port: int, workers: int, log_level: str = "info"):
+        """
+        Inizializza il launcher.
+
+        Args:
+            app_path: Applicazione ASGI nel formato "modulo:attributo".
+            host: Indirizzo di ascolto.
+            port: Porta di ascolto.
+            workers: Numero di processi worker.
+            log_level: Livello di log di uvicorn.
+        """
+        self._config = uvicorn.Config(app_path, host=host, port=port, log_level=log_level)
+        self._workers = max(1, workers)
+        self._children: Dict[int, int] = {}  # pid -> indice del worker
+        self._started_at: Dict[int, float] = {}  # indice del worker -> ultimo avvio
+        self._socket: Optional[socket.socket] = None
+        self._should_exit = False
+
+    def run(self) -> None:
+        """Carica i modelli, crea i worker e li supervisiona fino all'arresto."""
+        # Import dell'applicazione e caricamento dei modelli nel padre
+        self._config.load()
+        start = time.perf_counter()
+        loaded = load_models_before_fork()
+        print(f"Loaded {len(loaded)} model(s) before fork in {time.perf_counter() - start:.1f}s")
+
+        gc.collect()
+        gc.freeze()
+        print(f"Frozen {gc.get_freeze_count()} objects before fork")
+
+        self._socket = self._config.bind_socket()
+        signal.signal(signal.SIGINT, self._handle_exit)
+        signal.signal(signal.SIGTERM, self._handle_exit)
+        for index in range(self._workers):
+            self._spawn(index)
+        print(f"Started {self._workers} pre-forked workers on {self._config.host}:{self._config.port}")
+
+        while self._children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            index = self._children.pop(pid, None)
+            if index is None or self._should_exit:
+                continue
+            print(f"Worker {index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+            elapsed = time.monotonic() - self._started_at[index]
+            if elapsed < WORKER_RESTART_BACKOFF_S:
+                time.sleep(WORKER_RESTART_BACKOFF_S - elapsed)
+            if not self._should_exit:
+                self._spawn(index)
+
+        self._socket.close()
+        print("All workers stopped")
+
+    def _spawn(self, index: int) -> None:
+        """
+        Crea un worker con fork() e avvia uvicorn sul socket condiviso.
+
+        Args:
+            index: Indice del worker (per log e riavvii).
+        """
+        self._started_at[index] = time.monotonic()
+        pid = os.fork()
+        if pid:
+            self._children[pid] = index
+            return
+
+        # Processo worker: ripristina i segnali (uvicorn installa i propri) e serve le richieste
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        exit_code = 0
+        try:
+            uvicorn.Server(self._config).run(sockets=[self._socket])
+        except BaseException as e:
+            print(f"Worker {index} failed: {e}")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def _handle_exit(self, signum: int, frame) -> None:
+        """Inoltra il segnale di arresto a tutti i worker."""
+        self._should_exit = True
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+def run_prefork(app_path: str, host: str, port: int, workers: int, log_level: str = "info") -> None:
+    """
+    Avvia il server con worker pre-fork che condividono i modelli caricati.
+
+    Args:
+        app_path: Applicazione ASGI nel formato "modulo:attributo".
+        host: Indirizzo di ascolto.
+        port: Porta di ascolto.
+        workers: Numero di processi worker.
+        log_level: Livello di log di uvicorn.
+    """
+    PreforkLauncher(app_path, host, port, workers, log_level).run()
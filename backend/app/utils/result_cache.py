@@ -0,0 +1,264 @@
+"""
+Cache dei risultati di trascrizione.
+
+Lo stesso audio inviato allo stesso modello con gli stessi parametri produce
+sempre la stessa trascrizione: il risultato viene quindi memorizzato con una
+chiave che combina l'hash dei bytes audio, il motore (whisper/wav2vec2), il
+nome del modello corrente di ASRModelManager e i parametri di decoding, così un
+cambio di modello non restituisce mai testo non aggiornato.
+
+Il backend è configurabile con RESULT_CACHE_BACKEND: LRU in memoria oppure
+SQLite su disco (persistente tra i riavvii). Lo stato della cache per la
+richiesta corrente ("hit", "miss", "disabled", oppure "coalesced" se la
+richiesta ha condiviso l'inferenza di una identica in corso) viene esposto
+tramite una ContextVar, letta dai router per popolare l'header X-Cache.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+from app.config import settings
+from app.utils.telemetry import TelemetryRegistry
+
+# Stato della cache per la richiesta corrente, letto dai router
+cache_status_var: ContextVar[Optional[str]] = ContextVar("cache_status", default=None)
+
+
+class ResultCacheBackend(ABC):
+    """Interfaccia dei backend di memorizzazione dei risultati."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Leggi un risultato.
+
+        Args:
+            key: Chiave del risultato.
+
+        Returns:
+            Il risultato memorizzato, oppure None.
+        """
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """
+        Memorizza un risultato.
+
+        Args:
+            key: Chiave del risultato.
+            value: Risultato serializzabile in JSON.
+        """
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Svuota la cache."""
+        pass
+
+
+class MemoryResultCache(ResultCacheBackend):
+    """Cache LRU in memoria con numero massimo di voci."""
+
+    def __init__(self, max_entries: int):
+        """
+        Inizializza la cache.
+
+        Args:
+            max_entries: Numero massimo di risultati conservati.
+        """
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteResultCache(ResultCacheBackend):
+    """Cache LRU persistente su SQLite, condivisibile tra processi."""
+
+    def __init__(self, path: str, max_entries: int):
+        """
+        Inizializza la cache creando la tabella se necessario.
+
+        Args:
+            path: Percorso del database SQLite.
+            max_entries: Numero massimo di risultati conservati.
+        """
+        self._path = path
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_accessed_at ON results (accessed_at)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Apri una connessione al database, con commit e chiusura all'uscita."""
+        conn = sqlite3.connect(self._path, timeout=5.0)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, accessed_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time())
+            )
+            conn.execute(
+                "DELETE FROM results WHERE key NOT IN "
+                "(SELECT key FROM results ORDER BY accessed_at DESC LIMIT ?)",
+                (self._max_entries,)
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM results")
+
+
+class TranscriptionResultCache:
+    """
+    Cache singleton dei risultati di trascrizione.
+
+    Seleziona il backend da Settings, costruisce le chiavi e registra le
+    metriche di hit/miss nel registro di telemetria.
+    """
+
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(TranscriptionResultCache, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        """Inizializza la cache (solo una volta)."""
+        if not self._initialized:
+            backend = settings.RESULT_CACHE_BACKEND.lower()
+            if backend == "memory":
+                self._backend: Optional[ResultCacheBackend] = MemoryResultCache(settings.RESULT_CACHE_MAX_ENTRIES)
+            elif backend == "sqlite":
+                path = settings.RESULT_CACHE_SQLITE_PATH or os.path.join(
+                    tempfile.gettempdir(), "speech-to-text-results.sqlite3"
+                )
+                self._backend = SQLiteResultCache(path, settings.RESULT_CACHE_MAX_ENTRIES)
+            elif backend == "none":
+                self._backend = None
+            else:
+                raise ValueError(f"Backend della cache non supportato: '{settings.RESULT_CACHE_BACKEND}'")
+            print(f"Result cache backend: {backend}")
+            TranscriptionResultCache._initialized = True
+
+    @property
+    def enabled(self) -> bool:
+        """True se la cache è attiva."""
+        return self._backend is not None
+
+    @staticmethod
+    def build_key(audio_bytes: bytes, engine: str, model_name: str, params: Dict[str, Any]) -> str:
+        """
+        Costruisci la chiave di un risultato.
+
+        Args:
+            audio_bytes: Bytes audio originali.
+            engine: Motore ASR ("whisper" o "wav2vec2").
+            model_name: Nome del modello corrente.
+            params: Parametri che influenzano la trascrizione.
+
+        Returns:
+            Digest SHA-256 esadecimale della combinazione.
+        """
+        audio_hash = hashlib.sha256(audio_bytes).hexdigest()
+        payload = json.dumps([audio_hash, engine, model_name, params], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def get(self, key: str, engine: str) -> Optional[Dict[str, Any]]:
+        """
+        Cerca un risultato e aggiorna lo stato della richiesta corrente.
+
+        La lettura dal backend (per SQLite anche l'attesa del lock del file)
+        avviene in un thread, fuori dall'event loop.
+
+        Args:
+            key: Chiave costruita con build_key.
+            engine: Motore ASR, usato come prefisso delle metriche.
+
+        Returns:
+            Il risultato memorizzato, oppure None.
+        """
+        if not self.enabled:
+            cache_status_var.set("disabled")
+            return None
+        try:
+            value = await asyncio.to_thread(self._backend.get, key)
+        except Exception as e:
+            print(f"Result cache read failed: {e}")
+            value = None
+        # Impostata qui e non nel thread, che ha una copia del contesto
+        status = "hit" if value is not None else "miss"
+        cache_status_var.set(status)
+        TelemetryRegistry().counter(f"{engine}_result_cache_{status}").inc()
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        """
+        Memorizza un risultato in un thread (gli errori del backend non interrompono la richiesta).
+
+        Args:
+            key: Chiave costruita con build_key.
+            value: Risultato serializzabile in JSON.
+        """
+        if not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(self._backend.set, key, value)
+        except Exception as e:
+            print(f"Result cache write failed: {e}")
+
+    def clear(self) -> None:
+        """Svuota la cache."""
+        if self.enabled:
+            self._backend.clear()
@@ -0,0 +1,75 @@
+"""
+Coalescenza delle richieste identiche in corso (single-flight).
+
+Se arrivano più richieste con la stessa chiave (stesso audio, modello e
+parametri) mentre la prima è ancora in esecuzione, solo la prima esegue
+l'inferenza: le altre attendono lo stesso task condiviso e ricevono lo
+stesso risultato (o la stessa eccezione).
+
+L'esecuzione condivisa gira in un task proprio, che ogni richiesta attende
+tramite asyncio.shield: la cancellazione di una richiesta (anche della prima)
+interrompe solo la sua attesa, mai il risultato delle altre.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from app.utils.telemetry import TelemetryRegistry
+
+
+class SingleFlight:
+    """
+    Gruppo single-flight per le coroutine identificate da una chiave.
+
+    Le metriche "{prefix}_singleflight_executed" e
+    "{prefix}_singleflight_coalesced" contano le esecuzioni reali e le
+    richieste servite dal risultato di un'altra.
+    """
+
+    def __init__(self, metrics_prefix: str):
+        """
+        Inizializza il gruppo.
+
+        Args:
+            metrics_prefix: Prefisso delle metriche (es. "whisper").
+        """
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        telemetry = TelemetryRegistry()
+        self._executed = telemetry.counter(f"{metrics_prefix}_singleflight_executed")
+        self._coalesced = telemetry.counter(f"{metrics_prefix}_singleflight_coalesced")
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Esegui func, oppure attendi l'esecuzione già in corso con la stessa chiave.
+
+        Args:
+            key: Chiave che identifica richieste equivalenti.
+            func: Factory della coroutine da eseguire.
+
+        Returns:
+            Tupla contenente (risultato, True se la richiesta è stata coalescata).
+        """
+        task = self._in_flight.get(key)
+        coalesced = task is not None
+        if coalesced:
+            self._coalesced.inc()
+        else:
+            task = asyncio.create_task(func())
+            self._in_flight[key] = task
+            self._executed.inc()
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task), coalesced
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        """
+        Rimuovi l'esecuzione terminata dal gruppo.
+
+        Args:
+            key: Chiave dell'esecuzione.
+            task: Task terminato.
+        """
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Segna l'eccezione come letta anche se nessuna richiesta attende più il task
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,66 @@
+"""
+Protocollo WebSocket comune agli endpoint di trascrizione in streaming.
+
+Il client invia chunk audio come messaggi binari (di default PCM int16 a 16kHz
+mono) e può inviare messaggi di testo JSON:
+- {"type": "config", "format": "pcm16" | "f32" | "webm" | ..., "sample_rate": 16000}
+  prima dell'audio, per cambiare formato;
+- {"type": "end"} per chiudere lo stream e ricevere la trascrizione finale.
+
+Il server risponde con messaggi JSON {"type": "partial" | "final" | "error", ...}:
+"text" è l'ipotesi corrente, "stable_text" la parte che non cambierà più.
+"""
+
+import json
+from typing import Any, Callable
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+
+async def serve_streaming_session(websocket: WebSocket, create_session: Callable[..., Any]) -> None:
+    """
+    Gestisci una connessione di streaming inoltrando l'audio a una sessione.
+
+    Args:
+        websocket: Connessione WebSocket con il client.
+        create_session: Factory della sessione, chiamata con audio_format e
+            sample_rate; la sessione deve esporre push(chunk), finish() e close().
+    """
+    await websocket.accept()
+    session = None
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            if message.get("text") is not None:
+                data = json.loads(message["text"])
+                if data.get("type") == "config" and session is None:
+                    session = create_session(
+                        audio_format=data.get("format", "pcm16"),
+                        sample_rate=int(data.get("sample_rate", 16000))
+                    )
+                    print(f"Streaming session configured: {data}")
+                elif data.get("type") == "end":
+                    if session is not None:
+                        await websocket.send_json(await session.finish())
+                    await websocket.close()
+                    break
+                continue
+
+            if message.get("bytes"):
+                if session is None:
+                    session = create_session()
+                update = await session.push(message["bytes"])
+                if update is not None:
+                    await websocket.send_json(update)
+    except WebSocketDisconnect:
+        print("Streaming client disconnected")
+    except Exception as e:
+        await websocket.send_json({"type": "error", "detail": f"Errore durante la trascrizione: {str(e)}"})
+        await websocket.close(code=1011)
+    finally:
+        if session is not None:
+            session.close()
@@ -0,0 +1,164 @@
+"""
+Metriche di runtime del backend (contatori e istogrammi).
+
+Raccoglie in memoria le statistiche operative dei servizi (dimensioni dei batch,
+tempi di attesa in coda, ecc.) per poterle consultare tramite /health/metrics
+e regolare le impostazioni. Le metriche possono essere aggiornate sia
+dall'event loop sia dai thread del pool di inferenza.
+"""
+
+import bisect
+import threading
+from typing import Dict, Any, List, Optional, Sequence
+
+
+class Counter:
+    """Contatore monotono thread-safe."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        """
+        Incrementa il contatore.
+
+        Args:
+            amount: Quantità da aggiungere.
+        """
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> int:
+        """Valore attuale del contatore."""
+        return self._value
+
+    def snapshot(self) -> int:
+        """Restituisce il valore attuale."""
+        return self._value
+
+
+class Histogram:
+    """
+    Istogramma thread-safe a bucket fissi.
+
+    Ogni bucket conta le osservazioni minori o uguali al proprio limite
+    superiore (le), più un bucket finale "+Inf".
+    """
+
+    def __init__(self, name: str, buckets: Sequence[float]):
+        self.name = name
+        self._bounds: List[float] = sorted(buckets)
+        self._counts: List[int] = [0] * (len(self._bounds) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._min: Optional[float] = None
+        self._max: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """
+        Registra una osservazione.
+
+        Args:
+            value: Valore osservato.
+        """
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += value
+            self._min = value if self._min is None else min(self._min, value)
+            self._max = value if self._max is None else max(self._max, value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Restituisce lo stato dell'istogramma.
+
+        Returns:
+            Dizionario con count, sum, mean, min, max e conteggi per bucket.
+        """
+        with self._lock:
+            buckets = {str(bound): count for bound, count in zip(self._bounds, self._counts)}
+            buckets["+Inf"] = self._counts[-1]
+            return {
+                "count": self._count,
+                "sum": self._sum,
+                "mean": self._sum / self._count if self._count else 0.0,
+                "min": self._min,
+                "max": self._max,
+                "buckets": buckets
+            }
+
+
+class TelemetryRegistry:
+    """
+    Registro singleton di tutte le metriche di runtime.
+
+    Le metriche vengono create alla prima richiesta e riutilizzate in seguito,
+    così ogni modulo può ottenerle per nome senza coordinarsi con gli altri.
+    """
+
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(TelemetryRegistry, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        """Inizializza il registro (solo una volta)."""
+        if not self._initialized:
+            self._counters: Dict[str, Counter] = {}
+            self._histograms: Dict[str, Histogram] = {}
+            self._lock = threading.Lock()
+            TelemetryRegistry._initialized = True
+
+    def counter(self, name: str) -> Counter:
+        """
+        Ottieni (o crea) un contatore.
+
+        Args:
+            name: Nome del contatore.
+
+        Returns:
+            Il contatore richiesto.
+        """
+        with self._lock:
+            if name not in self._counters:
+                self._counters[name] = Counter(name)
+            return self._counters[name]
+
+    def histogram(self, name: str, buckets: Sequence[float]) -> Histogram:
+        """
+        Ottieni (o crea) un istogramma.
+
+        Args:
+            name: Nome dell'istogramma.
+            buckets: Limiti superiori dei bucket (usati solo alla creazione).
+
+        Returns:
+            L'istogramma richiesto.
+        """
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(name, buckets)
+            return self._histograms[name]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Restituisce lo stato di tutte le metriche registrate.
+
+        Returns:
+            Dizionario con le sezioni "counters" e "histograms".
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = dict(self._histograms)
+        return {
+            "counters": {name: counter.snapshot() for name, counter in counters.items()},
+            "histograms": {name: histogram.snapshot() for name, histogram in histograms.items()}
+        }
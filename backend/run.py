@@ -1,15 +1,34 @@
 #!/usr/bin/env python3
 """
 Script di avvio per il backend Speech-to-Text
+
+Con un solo worker avvia uvicorn come di consueto. Con più worker usa il
+launcher pre-fork (modelli caricati una volta nel processo padre e condivisi
+copy-on-write dai worker), oppure i worker standard di uvicorn con --no-prefork.
 """
+import argparse
+import os
+
 import uvicorn
 from app.config import settings
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "app.main:app",
-        host=settings.HOST,
-        port=settings.PORT,
-        reload=settings.DEBUG,
-        log_level="info"
-    )
+    parser = argparse.ArgumentParser(description="Avvio del backend Speech-to-Text")
+    parser.add_argument("--workers", type=int, default=settings.WORKERS, help="Numero di processi worker")
+    parser.add_argument("--no-prefork", dest="prefork", action="store_false", default=settings.PREFORK_ENABLED,
+                        help="Con più worker usa i worker di uvicorn (ognuno carica i propri modelli)")
+    args = parser.parse_args()
+
+    if args.workers > 1 and args.prefork and hasattr(os, "fork"):
+        from app.utils.prefork import run_prefork
+
+        run_prefork("app.main:app", settings.HOST, settings.PORT, args.workers, log_level="info")
+    else:
+        uvicorn.run(
+            "app.main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            reload=settings.DEBUG and args.workers == 1,
+            workers=args.workers,
+            log_level="info"
+        )
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark dei backend di decodifica audio per formato.
+
+Per ogni formato (clip sintetiche codificate con PyAV, oppure file passati con
+--files) misura il tempo di decodifica a float32 16kHz mono di ciascun backend
+di app.utils.audio_utils: PyAV in-process, pipe FFmpeg stdin/stdout e la
+conversione storica con file temporanei.
+
+Uso (dalla cartella scripts):
+    python benchmark_audio_decoding.py --duration 10 --repeat 20
+    python benchmark_audio_decoding.py --files ../audio/a.webm ../audio/b.mp3
+"""
+
+import argparse
+import io
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.utils import audio_utils  # noqa: E402
+
+# (container, codec) delle clip sintetiche
+SYNTHETIC_FORMATS = {
+    "webm": ("webm", "libopus"),
+    "ogg": ("ogg", "libopus"),
+    "mp3": ("mp3", "mp3"),
+    "m4a": ("mp4", "aac"),
+    "flac": ("flac", "flac"),
+    "wav": ("wav", "pcm_s16le"),
+}
+
+
+def encode_clip(duration_s: float, container: str, codec: str, sr: int = 44100) -> bytes:
+    """Codifica un tono sintetico con PyAV nel formato richiesto."""
+    import av
+
+    t = np.arange(int(duration_s * sr)) / sr
+    pcm = (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    bio = io.BytesIO()
+    with av.open(bio, "w", format=container) as output:
+        stream = output.add_stream(codec, rate=48000 if codec == "libopus" else sr)
+        stream.layout = "mono"
+        frame = av.AudioFrame.from_ndarray(pcm.reshape(1, -1), format="flt", layout="mono")
+        frame.sample_rate = sr
+        resampler = av.AudioResampler(format=stream.format.name, layout="mono", rate=stream.rate)
+        for resampled in resampler.resample(frame):
+            for packet in stream.encode(resampled):
+                output.mux(packet)
+        for packet in stream.encode(None):
+            output.mux(packet)
+    return bio.getvalue()
+
+
+def time_backend(name: str, audio_bytes: bytes, input_format: str, repeat: int) -> List[float]:
+    """Misura i tempi (ms) di decodifica di un backend."""
+    decoder = audio_utils.AUDIO_DECODER_BACKENDS[name]
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decoder(audio_bytes, input_format)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Confronto dei backend di decodifica audio")
+    parser.add_argument("--files", nargs="+", help="File audio da usare al posto delle clip sintetiche")
+    parser.add_argument("--duration", type=float, default=10.0, help="Durata delle clip sintetiche in secondi")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--backends", nargs="+", default=list(audio_utils.AUDIO_DECODER_BACKENDS))
+    args = parser.parse_args()
+
+    clips: Dict[str, bytes] = {}
+    if args.files:
+        for path in args.files:
+            clips[Path(path).name] = Path(path).read_bytes()
+    else:
+        for label, (container, codec) in SYNTHETIC_FORMATS.items():
+            try:
+                clips[label] = encode_clip(args.duration, container, codec)
+            except Exception as e:
+                print(f"⚠️  {label}: impossibile generare la clip ({e})")
+
+    print(f"{'formato':<16}" + "".join(f"{name:>22}" for name in args.backends))
+    for label, audio_bytes in clips.items():
+        input_format = audio_utils.detect_audio_format(audio_bytes)
+        cells = []
+        for name in args.backends:
+            try:
+                timings = time_backend(name, audio_bytes, input_format, args.repeat)
+                cells.append(f"{statistics.median(timings):8.1f} ms (p50)")
+            except Exception as e:
+                print(f"   🔴 {label}/{name}: {str(e)[:100]}")
+                cells.append("errore")
+        print(f"{label:<16}" + "".join(f"{cell:>22}" for cell in cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark del batching delle richieste concorrenti (Whisper e Wav2Vec2).
+
+Invia N richieste concorrenti di audio brevi a /<modello>/transcribe-with-metrics,
+misura il throughput complessivo e riassume il dettaglio delle latenze restituito
+dal backend (attesa in coda, dimensione del batch, tempi di decoding).
+Confrontando le esecuzioni con batching attivo e disattivato
+(WHISPER_BATCHING_ENABLED / WAV2VEC2_BATCHING_ENABLED) si misura il guadagno su CPU.
+
+Uso:
+    python benchmark_batching.py --model whisper --concurrency 8 --duration 5
+"""
+
+import argparse
+import io
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import numpy as np
+import requests
+import soundfile as sf
+
+BACKEND_URL = "http://127.0.0.1:8000"
+
+
+def build_clip(duration_s: float, seed: int, sr: int = 16000) -> bytes:
+    """Genera un WAV sintetico diverso per ogni richiesta."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration_s * sr)) / sr
+    pcm = 0.3 * np.sin(2 * np.pi * rng.uniform(150, 400) * t) + 0.02 * rng.standard_normal(len(t))
+    bio = io.BytesIO()
+    sf.write(bio, pcm.astype(np.float32), sr, format="WAV")
+    return bio.getvalue()
+
+
+def send(model: str, clip: bytes) -> Dict[str, Any]:
+    """Invia una singola richiesta e restituisce la risposta con la latenza client."""
+    start = time.perf_counter()
+    response = requests.post(
+        f"{BACKEND_URL}/{model}/transcribe-with-metrics",
+        files={"file": ("clip.wav", clip, "audio/wav")},
+        timeout=600
+    )
+    response.raise_for_status()
+    result = response.json()
+    result["client_latency_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def summarize(values: List[float]) -> str:
+    """Formatta media, p50 e massimo di una serie di valori."""
+    if not values:
+        return "n/d"
+    return f"mean={statistics.mean(values):.1f} p50={statistics.median(values):.1f} max={max(values):.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput delle richieste concorrenti")
+    parser.add_argument("--model", default="whisper", choices=["whisper", "wav2vec2"])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--duration", type=float, default=5.0, help="Durata di ogni clip in secondi")
+    args = parser.parse_args()
+
+    results = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for round_idx in range(args.rounds):
+            clips = [build_clip(args.duration, round_idx * args.concurrency + i) for i in range(args.concurrency)]
+            results.extend(pool.map(lambda clip: send(args.model, clip), clips))
+    elapsed = time.perf_counter() - start
+
+    audio_seconds = len(results) * args.duration
+    print(f"🚀 {args.model}: {len(results)} richieste in {elapsed:.2f}s")
+    print(f"   throughput: {len(results) / elapsed:.2f} req/s, {audio_seconds / elapsed:.2f}s audio/s")
+    print(f"   latenza client (ms): {summarize([r['client_latency_ms'] for r in results])}")
+
+    breakdowns = [r.get("latency_breakdown") for r in results if r.get("latency_breakdown")]
+    if breakdowns:
+        print("📊 Dettaglio latenze lato server (ms):")
+        for key in ("queue_wait_ms", "mel_ms", "language_detection_ms", "decode_ms", "single_request_ms", "total_ms"):
+            values = [b[key] for b in breakdowns if key in b]
+            if values:
+                print(f"   {key:<22} {summarize(values)}")
+        batch_sizes = [b["batch_size"] for b in breakdowns if "batch_size" in b]
+        if batch_sizes:
+            print(f"   batch_size             mean={statistics.mean(batch_sizes):.2f} max={max(batch_sizes)}")
+        paths = [b.get("path") for b in breakdowns]
+        print(f"   percorsi: batched={paths.count('batched')} single={paths.count('single')}")
+
+    # Istogrammi dello scheduler esposti dal backend
+    metrics = requests.get(f"{BACKEND_URL}/health/metrics", timeout=10).json()
+    for name in (f"{args.model}_batch_size", f"{args.model}_queue_wait_ms"):
+        histogram = metrics.get("histograms", {}).get(name)
+        if histogram:
+            print(f"   {name}: count={histogram['count']} mean={histogram['mean']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark della memoria di picco di Wav2Vec2: inferenza completa vs a chunk.
+
+Per ogni durata e modalità avvia un processo separato (così il picco di RSS
+misurato con getrusage è solo quello dell'esecuzione), trascrive audio sintetico
+direttamente con Wav2Vec2Service e registra RSS di picco e tempo. I risultati
+vengono salvati in CSV e, se matplotlib è installato, in un grafico RSS/durata.
+
+Uso (dalla cartella scripts):
+    python benchmark_chunked_memory.py --durations 30 60 120 300 --output chunked_memory
+"""
+
+import argparse
+import csv
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+
+def run_child(mode: str, duration: float) -> None:
+    """Esegue una singola misura e stampa il risultato in JSON su stdout."""
+    sys.path.insert(0, str(BACKEND_DIR))
+    import numpy as np
+    from app.services.wav2vec_service import Wav2Vec2Service
+
+    service = Wav2Vec2Service()
+    service._load_model()
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    rng = np.random.default_rng(0)
+    pcm = (0.1 * rng.standard_normal(int(duration * 16000))).astype(np.float32)
+
+    start = time.perf_counter()
+    if mode == "chunked":
+        service._transcribe_chunked_sync(pcm)
+    else:
+        service._forward_batch_sync([pcm])
+    elapsed = time.perf_counter() - start
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        "mode": mode,
+        "duration_s": duration,
+        "peak_rss_mb": peak_kb / 1024,
+        "inference_rss_mb": (peak_kb - baseline_kb) / 1024,
+        "elapsed_s": elapsed
+    }))
+
+
+def plot(rows, output: Path) -> None:
+    """Salva il grafico RSS di picco / durata audio, se matplotlib è disponibile."""
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("⚠️  matplotlib non installato: grafico non generato")
+        return
+
+    fig, ax = plt.subplots(figsize=(7, 4))
+    for mode in ("full", "chunked"):
+        points = [(r["duration_s"], r["peak_rss_mb"]) for r in rows if r["mode"] == mode and "peak_rss_mb" in r]
+        if points:
+            ax.plot(*zip(*points), marker="o", label=mode)
+    ax.set_xlabel("Durata audio (s)")
+    ax.set_ylabel("RSS di picco (MB)")
+    ax.set_title("Wav2Vec2: memoria di picco per modalità")
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(output.with_suffix(".png"))
+    print(f"📈 Grafico salvato in: {output.with_suffix('.png')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RSS di picco Wav2Vec2: completo vs chunk")
+    parser.add_argument("--durations", type=float, nargs="+", default=[30, 60, 120, 300, 600])
+    parser.add_argument("--modes", nargs="+", default=["full", "chunked"], choices=["full", "chunked"])
+    parser.add_argument("--output", default="chunked_memory", help="Prefisso dei file di output")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    parser.add_argument("--duration", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.mode, args.duration)
+        return
+
+    rows = []
+    for duration in args.durations:
+        for mode in args.modes:
+            print(f"⏱️  {mode} - {duration:.0f}s ...")
+            proc = subprocess.run(
+                [sys.executable, __file__, "--child", "--mode", mode, "--duration", str(duration)],
+                capture_output=True, text=True, cwd=BACKEND_DIR, env={**os.environ, "PYTHONUNBUFFERED": "1"}
+            )
+            lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+            if proc.returncode != 0 or not lines:
+                # Tipicamente OOM della modalità completa sugli audio più lunghi
+                print(f"  🔴 fallito (exit {proc.returncode}): {proc.stderr.strip().splitlines()[-1:]}")
+                rows.append({"mode": mode, "duration_s": duration, "error": f"exit {proc.returncode}"})
+                continue
+            row = json.loads(lines[-1])
+            print(f"  🟢 picco {row['peak_rss_mb']:.0f} MB (+{row['inference_rss_mb']:.0f} MB), {row['elapsed_s']:.1f}s")
+            rows.append(row)
+
+    output = Path(args.output)
+    with open(output.with_suffix(".csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["mode", "duration_s", "peak_rss_mb", "inference_rss_mb", "elapsed_s", "error"])
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"💾 Risultati salvati in: {output.with_suffix('.csv')}")
+    plot(rows, output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Benchmark dell'avvio a freddo: caricamento dalla sorgente vs snapshot.
+
+Per ogni modalità avvia processi separati (uno per worker simulato, in
+parallelo come i worker di uvicorn) che caricano il modello dalla sorgente
+originale (from_pretrained / whisper.load_model) oppure dallo snapshot
+safetensors mappato in memoria, ed eseguono una prima inferenza su audio
+sintetico. Registra tempo di caricamento, tempo della prima inferenza (che con
+lo snapshot include la lettura lazy delle pagine), RSS dopo il caricamento e
+RSS di picco. Lo snapshot viene creato se non esiste.
+
+Il primo giro di ogni modalità viene scartato, così entrambe le modalità
+partono con i file già nella page cache (e l'eventuale download è escluso).
+
+Uso (dalla cartella scripts):
+    python benchmark_cold_start.py --engine wav2vec2 --model facebook --workers 1 4
+    python benchmark_cold_start.py --engine whisper --model small --runs 5
+"""
+
+import argparse
+import csv
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+MODES = ["pretrained", "snapshot"]
+
+
+def resolve_checkpoint(engine: str, model: str) -> str:
+    """Risolvi la chiave del modello nel nome del checkpoint tramite ASRModelManager."""
+    from app.models.model_manager import ASRModelManager, ModelSize
+
+    manager = ASRModelManager()
+    if engine == "wav2vec2":
+        return manager.get_wav2vec2_model_name(model)
+    return manager.get_whisper_model_name(ModelSize(model))
+
+
+def get_service(engine: str):
+    """Crea il servizio del motore, usato per il caricamento dalla sorgente."""
+    from app.services.wav2vec_service import Wav2Vec2Service
+    from app.services.whisper_service import WhisperService
+
+    return Wav2Vec2Service() if engine == "wav2vec2" else WhisperService()
+
+
+def run_child(engine: str, checkpoint: str, mode: str) -> None:
+    """Esegue una singola misura e stampa il risultato in JSON su stdout."""
+    sys.path.insert(0, str(BACKEND_DIR))
+    import torch
+    from app.models.model_registry import get_process_rss
+    from app.models.model_snapshot import load_snapshot
+
+    service = get_service(engine)
+    start = time.perf_counter()
+    if mode == "snapshot":
+        components = load_snapshot(engine, checkpoint, service.device)
+    else:
+        components = service._load_pretrained_components(checkpoint)
+    load_s = time.perf_counter() - start
+    load_rss = get_process_rss() or 0
+
+    model = components["model"]
+    start = time.perf_counter()
+    with torch.inference_mode():
+        if engine == "wav2vec2":
+            model(torch.zeros(1, 16000, device=service.device))
+        else:
+            mel = torch.zeros(1, model.dims.n_mels, 3000, device=service.device)
+            tokens = torch.tensor([[50258]], device=service.device)
+            model.logits(tokens, model.embed_audio(mel))
+    first_inference_s = time.perf_counter() - start
+
+    print(json.dumps({
+        "load_s": load_s,
+        "first_inference_s": first_inference_s,
+        "load_rss_mb": load_rss / 1024 ** 2,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }))
+
+
+def build_snapshot(engine: str, checkpoint: str) -> None:
+    """Crea lo snapshot del modello se non esiste."""
+    sys.path.insert(0, str(BACKEND_DIR))
+    from app.models.model_snapshot import has_snapshot, save_snapshot
+
+    if has_snapshot(engine, checkpoint):
+        print(f"📁 Snapshot già presente per '{checkpoint}'")
+        return
+    print(f"📦 Creazione dello snapshot per '{checkpoint}'...")
+    save_snapshot(engine, checkpoint, get_service(engine)._load_pretrained_components(checkpoint))
+
+
+def run_workers(engine: str, checkpoint: str, mode: str, workers: int):
+    """Avvia workers processi in parallelo e restituisce le loro misure e il tempo totale."""
+    start = time.perf_counter()
+    procs = [
+        subprocess.Popen(
+            [sys.executable, __file__, "--child", "--engine", engine, "--checkpoint", checkpoint, "--mode", mode],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, cwd=BACKEND_DIR,
+            env={**os.environ, "PYTHONUNBUFFERED": "1"}
+        )
+        for _ in range(workers)
+    ]
+    results = []
+    for proc in procs:
+        stdout, stderr = proc.communicate()
+        lines = [line for line in stdout.splitlines() if line.startswith("{")]
+        if proc.returncode != 0 or not lines:
+            raise RuntimeError(f"worker fallito (exit {proc.returncode}): {stderr.strip().splitlines()[-1:]}")
+        results.append(json.loads(lines[-1]))
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Avvio a freddo: sorgente vs snapshot")
+    parser.add_argument("--engine", choices=["wav2vec2", "whisper"], default="wav2vec2")
+    parser.add_argument("--model", help="Chiave del modello (es. facebook, small); default: modello attuale")
+    parser.add_argument("--checkpoint", help="Nome del checkpoint (sostituisce --model, es. percorso locale)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4], help="Processi avviati in parallelo")
+    parser.add_argument("--runs", type=int, default=3, help="Ripetizioni misurate per configurazione")
+    parser.add_argument("--output", default="cold_start", help="Prefisso del file CSV di output")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    checkpoint = args.checkpoint
+    if checkpoint is None:
+        from app.models.model_manager import ASRModelManager
+
+        manager = ASRModelManager()
+        default_model = (
+            manager.get_current_wav2vec2_model() if args.engine == "wav2vec2"
+            else manager.get_current_whisper_model().value
+        )
+        checkpoint = resolve_checkpoint(args.engine, args.model or default_model)
+
+    if args.child:
+        run_child(args.engine, checkpoint, args.mode)
+        return
+
+    build_snapshot(args.engine, checkpoint)
+
+    rows = []
+    for workers in args.workers:
+        for mode in MODES:
+            print(f"⏱️  {mode} - {workers} worker ...")
+            run_workers(args.engine, checkpoint, mode, workers)
+            runs = [run_workers(args.engine, checkpoint, mode, workers) for _ in range(args.runs)]
+            measures = [result for results, _ in runs for result in results]
+            row = {
+                "engine": args.engine,
+                "checkpoint": checkpoint,
+                "mode": mode,
+                "workers": workers,
+                "wall_s": statistics.median(wall for _, wall in runs),
+                "load_s": statistics.median(m["load_s"] for m in measures),
+                "first_inference_s": statistics.median(m["first_inference_s"] for m in measures),
+                "load_rss_mb": statistics.median(m["load_rss_mb"] for m in measures),
+                "peak_rss_mb": statistics.median(m["peak_rss_mb"] for m in measures)
+            }
+            print(f"  🟢 load {row['load_s']:.2f}s, prima inferenza {row['first_inference_s']:.2f}s, "
+                  f"RSS {row['load_rss_mb']:.0f} MB (picco {row['peak_rss_mb']:.0f} MB), "
+                  f"tutti i worker pronti in {row['wall_s']:.2f}s")
+            rows.append(row)
+
+    output = Path(args.output).with_suffix(".csv")
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"💾 Risultati salvati in: {output.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark delle disposizioni degli slot CPU (CPU_SLOTS) per ogni modello.
+
+Per ogni motore confronta le disposizioni 1×N (un'inferenza alla volta con
+tutti i core), 2×N/2 e N×1 (un core per inferenza), più la configurazione di
+default senza slot (thread di torch di default con la stessa concorrenza di
+N×1, cioè il caso di oversubscription). Ogni disposizione gira in un processo
+separato, con le impostazioni passate come variabili d'ambiente, che invia
+richieste concorrenti di audio sintetico direttamente al pool di inferenza
+(senza cache, micro-batching né HTTP) e misura throughput e latenze.
+
+Uso (dalla cartella scripts):
+    python benchmark_cpu_slots.py --engines wav2vec2 whisper --duration 5 --requests 32
+    python benchmark_cpu_slots.py --engines wav2vec2 --executor workers
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+SYNC_METHODS = {"wav2vec2": "_forward_batch_sync", "whisper": "_decode_batch_sync"}
+
+
+def build_layouts(cores: int) -> List[Dict]:
+    """Disposizioni da confrontare: default (senza slot), 1×N, 2×N/2, N×1."""
+    layouts = [{"name": "default", "slots": 0, "concurrency": cores}]
+    for slots in sorted({1, min(2, cores), cores}):
+        layouts.append({"name": f"{slots}x{cores // slots}", "slots": slots, "concurrency": slots})
+    return layouts
+
+
+async def run_requests(engine: str, requests: int, concurrency: int, duration_s: float) -> Dict:
+    """Invia le richieste al pool di inferenza del servizio e misura le latenze."""
+    from app.services.wav2vec_service import Wav2Vec2Service
+    from app.services.whisper_service import WhisperService
+
+    service = Wav2Vec2Service() if engine == "wav2vec2" else WhisperService()
+    rng = np.random.default_rng(0)
+    pcms = [(0.1 * rng.standard_normal(int(duration_s * 16000))).astype(np.float32) for _ in range(requests)]
+
+    async def infer(pcm: np.ndarray) -> float:
+        start = time.perf_counter()
+        await service._run_sync(engine, SYNC_METHODS[engine], [pcm], None)
+        return (time.perf_counter() - start) * 1000
+
+    # Warm-up: carica il modello in ogni processo (o slot) prima della misura
+    await asyncio.gather(*(infer(pcms[0]) for _ in range(concurrency)))
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(pcm: np.ndarray) -> float:
+        async with semaphore:
+            return await infer(pcm)
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(limited(pcm) for pcm in pcms))
+    elapsed = time.perf_counter() - start
+    return {
+        "wall_s": elapsed,
+        "requests_per_s": requests / elapsed,
+        "audio_s_per_s": requests * duration_s / elapsed,
+        "latency_p50_ms": statistics.median(latencies),
+        "latency_max_ms": max(latencies)
+    }
+
+
+def run_child(args) -> None:
+    """Esegue una disposizione nel processo corrente e stampa il risultato in JSON su stdout."""
+    sys.path.insert(0, str(BACKEND_DIR))
+    from app.utils.inference_executor import InferenceExecutor
+
+    result = asyncio.run(run_requests(args.engine, args.requests, args.concurrency, args.duration))
+    InferenceExecutor().shutdown(wait=False)
+    print(json.dumps(result))
+
+
+def run_layout(engine: str, layout: Dict, args) -> Dict:
+    """Avvia il processo di misura di una disposizione con le relative impostazioni."""
+    env = {
+        **os.environ,
+        "PYTHONUNBUFFERED": "1",
+        "PRELOAD_MODELS": "[]",
+        "RESULT_CACHE_BACKEND": "none",
+        "INFERENCE_EXECUTOR": args.executor,
+        "CPU_SLOTS": str(layout["slots"]),
+        # Senza slot la concorrenza è limitata solo dalla dimensione del pool
+        "INFERENCE_WORKERS": str(layout["concurrency"]),
+        f"{engine.upper()}_MAX_CONCURRENCY": str(layout["concurrency"]),
+        f"{engine.upper()}_WORKER_PROCESSES": str(layout["concurrency"]),
+    }
+    proc = subprocess.run(
+        [sys.executable, __file__, "--child", "--engine", engine, "--concurrency", str(layout["concurrency"]),
+         "--requests", str(args.requests), "--duration", str(args.duration)],
+        capture_output=True, text=True, cwd=BACKEND_DIR, env=env
+    )
+    lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+    if proc.returncode != 0 or not lines:
+        raise RuntimeError(f"misura fallita (exit {proc.returncode}): {proc.stderr.strip().splitlines()[-1:]}")
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput per disposizione degli slot CPU")
+    parser.add_argument("--engines", nargs="+", default=["wav2vec2", "whisper"], choices=["wav2vec2", "whisper"])
+    parser.add_argument("--executor", default="process", choices=["process", "workers", "thread"],
+                        help="INFERENCE_EXECUTOR usato (l'affinità richiede process o workers)")
+    parser.add_argument("--requests", type=int, default=32, help="Richieste per disposizione")
+    parser.add_argument("--duration", type=float, default=5.0, help="Durata di ogni audio in secondi")
+    parser.add_argument("--output", default="cpu_slots", help="Prefisso del file CSV di output")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--engine", help=argparse.SUPPRESS)
+    parser.add_argument("--concurrency", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    from app.utils.cpu_slots import get_available_cores
+
+    cores = len(get_available_cores())
+    rows = []
+    for engine in args.engines:
+        for layout in build_layouts(cores):
+            print(f"⏱️  {engine} - {layout['name']} ({layout['concurrency']} richieste concorrenti)...")
+            result = run_layout(engine, layout, args)
+            row = {"engine": engine, "layout": layout["name"], "slots": layout["slots"],
+                   "concurrency": layout["concurrency"], **result}
+            print(f"  🟢 {row['requests_per_s']:.2f} req/s, {row['audio_s_per_s']:.1f}s audio/s, "
+                  f"latenza p50 {row['latency_p50_ms']:.0f} ms (max {row['latency_max_ms']:.0f} ms)")
+            rows.append(row)
+
+    output = Path(args.output).with_suffix(".csv")
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"💾 Risultati salvati in: {output.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
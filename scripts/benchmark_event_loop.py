@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Verifica che l'event loop del backend resti reattivo durante una trascrizione lunga.
+
+Invia una trascrizione Whisper (o Wav2Vec2) di un audio lungo e, nel frattempo,
+interroga ripetutamente /health/status misurandone la latenza. Con l'inferenza
+eseguita sul pool dedicato, gli health check devono restare sotto pochi ms.
+
+Uso:
+    python benchmark_event_loop.py [--model whisper] [--audio file.wav] [--max-latency-ms 50]
+"""
+
+import argparse
+import io
+import statistics
+import sys
+import threading
+import time
+
+import numpy as np
+import requests
+import soundfile as sf
+
+BACKEND_URL = "http://127.0.0.1:8000"
+
+
+def build_synthetic_audio(duration_s: float, sr: int = 16000) -> bytes:
+    """Genera un WAV sintetico (tono + rumore) della durata richiesta."""
+    t = np.arange(int(duration_s * sr)) / sr
+    pcm = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.05 * np.random.randn(len(t))
+    bio = io.BytesIO()
+    sf.write(bio, pcm.astype(np.float32), sr, format="WAV")
+    return bio.getvalue()
+
+
+def run_transcription(model: str, audio_bytes: bytes, outcome: dict):
+    """Esegue la trascrizione lunga in un thread separato."""
+    start = time.perf_counter()
+    try:
+        response = requests.post(
+            f"{BACKEND_URL}/{model}/transcribe",
+            files={"file": ("long.wav", audio_bytes, "audio/wav")},
+            timeout=600
+        )
+        outcome["status"] = response.status_code
+    except Exception as e:
+        outcome["error"] = str(e)
+    outcome["duration"] = time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latenza di /health/status durante una trascrizione")
+    parser.add_argument("--model", default="whisper", choices=["whisper", "wav2vec2"])
+    parser.add_argument("--audio", help="File audio da trascrivere (default: 30s sintetici)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Durata audio sintetico in secondi")
+    parser.add_argument("--interval-ms", type=float, default=50.0, help="Intervallo tra gli health check")
+    parser.add_argument("--max-latency-ms", type=float, default=50.0, help="Soglia massima accettata (p95)")
+    args = parser.parse_args()
+
+    if args.audio:
+        with open(args.audio, "rb") as f:
+            audio_bytes = f.read()
+    else:
+        audio_bytes = build_synthetic_audio(args.duration)
+
+    session = requests.Session()
+    session.get(f"{BACKEND_URL}/health/status", timeout=5)  # warm-up connessione
+
+    outcome = {}
+    worker = threading.Thread(target=run_transcription, args=(args.model, audio_bytes, outcome))
+    worker.start()
+
+    # Lascia partire la trascrizione prima di misurare
+    time.sleep(0.5)
+
+    latencies = []
+    while worker.is_alive():
+        start = time.perf_counter()
+        session.get(f"{BACKEND_URL}/health/status", timeout=30)
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(args.interval_ms / 1000)
+    worker.join()
+
+    print(f"🎙️  Trascrizione {args.model}: {outcome}")
+    if not latencies:
+        print("⚠️  La trascrizione è terminata prima di poter misurare gli health check")
+        sys.exit(1)
+
+    latencies.sort()
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+    print(f"📊 Health check durante l'inferenza: n={len(latencies)}")
+    print(f"   p50={statistics.median(latencies):.1f}ms  p95={p95:.1f}ms  max={latencies[-1]:.1f}ms")
+
+    if p95 > args.max_latency_ms:
+        print(f"❌ p95 oltre la soglia di {args.max_latency_ms:.0f}ms: l'event loop è bloccato")
+        sys.exit(1)
+    print("✅ L'event loop resta reattivo durante l'inferenza")
+
+
+if __name__ == "__main__":
+    main()
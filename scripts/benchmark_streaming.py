@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark della trascrizione in streaming via WebSocket.
+
+Invia un file audio (o audio sintetico) all'endpoint /<modello>/stream a
+velocità reale, a chunk PCM int16 16kHz, e misura:
+- time-to-first-word: tempo dall'inizio dello stream al primo risultato
+  parziale con testo non vuoto (lato client e lato server);
+- latenza finale: tempo dall'invio di {"type": "end"} alla trascrizione finale;
+- numero e intervallo dei risultati parziali.
+
+Uso:
+    python benchmark_streaming.py --model wav2vec2 --file ../audio/esempio.wav --runs 3
+    python benchmark_streaming.py --model whisper --file ../audio/esempio.wav --runs 3
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import soundfile as sf
+import websockets
+
+BACKEND_WS_URL = "ws://127.0.0.1:8000"
+
+
+def load_pcm16(path: Optional[str], duration_s: float) -> bytes:
+    """Carica un file audio come PCM int16 16kHz mono (o genera audio sintetico)."""
+    if path is None:
+        rng = np.random.default_rng(0)
+        t = np.arange(int(duration_s * 16000)) / 16000
+        pcm = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.02 * rng.standard_normal(len(t))
+    else:
+        pcm, sr = sf.read(path, dtype="float32", always_2d=True)
+        pcm = pcm.mean(axis=1)
+        if sr != 16000:
+            # Ricampionamento lineare: sufficiente per un benchmark di latenza
+            target_len = int(len(pcm) * 16000 / sr)
+            pcm = np.interp(np.linspace(0, len(pcm) - 1, target_len), np.arange(len(pcm)), pcm)
+    return (np.clip(pcm, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+
+
+async def stream_once(model: str, audio: bytes, chunk_ms: int, speed: float) -> Dict[str, Any]:
+    """Esegue uno stream completo e restituisce le misure di latenza."""
+    chunk_bytes = int(16000 * chunk_ms / 1000) * 2
+    partials: List[float] = []
+    first_word_client: Optional[float] = None
+    first_word_server: Optional[float] = None
+
+    async with websockets.connect(f"{BACKEND_WS_URL}/{model}/stream", max_size=None) as ws:
+        await ws.send(json.dumps({"type": "config", "format": "pcm16", "sample_rate": 16000}))
+        start = time.perf_counter()
+
+        async def receive_until_final() -> Dict[str, Any]:
+            nonlocal first_word_client, first_word_server
+            while True:
+                message = json.loads(await ws.recv())
+                now = time.perf_counter() - start
+                if message["type"] == "error":
+                    raise RuntimeError(message["detail"])
+                if message["text"] and first_word_client is None:
+                    first_word_client = now * 1000
+                    first_word_server = message.get("time_to_first_word_ms")
+                if message["type"] == "final":
+                    return message
+                partials.append(now)
+
+        receiver = asyncio.create_task(receive_until_final())
+        for offset in range(0, len(audio), chunk_bytes):
+            await ws.send(audio[offset:offset + chunk_bytes])
+            await asyncio.sleep(chunk_ms / 1000 / speed)
+
+        end_sent = time.perf_counter()
+        await ws.send(json.dumps({"type": "end"}))
+        final = await receiver
+        final_latency = (time.perf_counter() - end_sent) * 1000
+
+    intervals = [b - a for a, b in zip(partials, partials[1:])]
+    return {
+        "time_to_first_word_ms": first_word_client,
+        "server_time_to_first_word_ms": first_word_server,
+        "final_latency_ms": final_latency,
+        "partials": len(partials),
+        "partial_interval_ms": statistics.mean(intervals) * 1000 if intervals else None,
+        "text": final["text"]
+    }
+
+
+def summarize(values: List[Optional[float]]) -> str:
+    """Formatta media, p50 e massimo ignorando i valori mancanti."""
+    values = [v for v in values if v is not None]
+    if not values:
+        return "n/d"
+    return f"mean={statistics.mean(values):.0f} p50={statistics.median(values):.0f} max={max(values):.0f}"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Time-to-first-word della trascrizione in streaming")
+    parser.add_argument("--model", default="wav2vec2", choices=["wav2vec2", "whisper"])
+    parser.add_argument("--file", help="File audio da inviare (default: audio sintetico)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Durata dell'audio sintetico in secondi")
+    parser.add_argument("--chunk-ms", type=int, default=100)
+    parser.add_argument("--speed", type=float, default=1.0, help="Velocità di invio rispetto al tempo reale")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    audio = load_pcm16(args.file, args.duration)
+    results = []
+    for run in range(args.runs):
+        result = await stream_once(args.model, audio, args.chunk_ms, args.speed)
+        print(f"🎙️  run {run + 1}: TTFW {result['time_to_first_word_ms'] or 0:.0f} ms, "
+              f"finale {result['final_latency_ms']:.0f} ms, {result['partials']} parziali")
+        results.append(result)
+
+    print(f"📊 {args.model} streaming ({len(audio) / 32000:.1f}s audio, chunk {args.chunk_ms} ms):")
+    print(f"   time-to-first-word client (ms): {summarize([r['time_to_first_word_ms'] for r in results])}")
+    print(f"   time-to-first-word server (ms): {summarize([r['server_time_to_first_word_ms'] for r in results])}")
+    print(f"   latenza finale (ms):            {summarize([r['final_latency_ms'] for r in results])}")
+    print(f"   intervallo parziali (ms):       {summarize([r['partial_interval_ms'] for r in results])}")
+    print(f"📝 Trascrizione finale: {results[-1]['text'][:120]}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Benchmark dell'esecuzione compilata di Wav2Vec2 con bucket di lunghezza.
+
+Per ogni modalità di WAV2VEC2_COMPILE_MODE ("none", "torchscript",
+"compile") lo stesso modello viene compilato su tutti i bucket (come nel
+warm-up all'avvio) e usato per trascrivere una sequenza di richieste di durata
+casuale tra --min-s e --max-s, a batch di --batch-size audio, con lo stesso
+percorso di Wav2Vec2Service._forward_batch_sync. Per ogni modalità vengono
+riportati tempo di compilazione, latenza media e p95 per batch, throughput,
+speedup rispetto a "none", accordo delle trascrizioni con "none", frazione di
+padding ed esecuzioni non compilate; per ogni grafo bucket, tempo di
+compilazione, riusi e padding.
+
+Le dimensioni di batch compilate seguono --batch-size (al posto di
+WAV2VEC2_BATCH_MAX_SIZE); --random-model usa un modello piccolo
+inizializzato a caso, come l'autotuning, per provare lo script senza scaricare
+modelli.
+
+Uso (dalla cartella scripts):
+    python benchmark_wav2vec2_compile.py --model facebook --requests 40
+    python benchmark_wav2vec2_compile.py --modes none torchscript compile --buckets 2 5 10 --max-s 10 --batch-size 4
+"""
+
+import argparse
+import csv
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import torch
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.config import settings  # noqa: E402
+from app.models.model_compile import COMPILE_MODES, BucketedWav2Vec2ForCTC, compile_wav2vec2_components  # noqa: E402
+from app.services.autotune import build_random_components  # noqa: E402
+from app.services.wav2vec_service import Wav2Vec2Service  # noqa: E402
+
+
+def load_base_components(model: str, random_model: bool) -> Dict[str, Any]:
+    """Carica il modello non compilato dal servizio (snapshot o Hugging Face), oppure uno casuale."""
+    if random_model:
+        return build_random_components("wav2vec2")
+    service = Wav2Vec2Service()
+    variant_name = service.model_manager.get_wav2vec2_variant_name(model)
+    return service.model_manager.load_model_components(
+        "wav2vec2", variant_name, service.device, service._load_pretrained_components
+    )
+
+
+def run_batch(components: Dict[str, Any], pcms: List[np.ndarray]) -> List[str]:
+    """Trascrivi un batch come Wav2Vec2Service._forward_batch_sync (senza post-processing)."""
+    model, processor = components["model"], components["processor"]
+    inputs = processor(
+        pcms, sampling_rate=16000, return_tensors="pt", padding=True, do_normalize=True, return_attention_mask=True
+    )
+    model_inputs = {"input_values": inputs["input_values"]}
+    if processor.feature_extractor.return_attention_mask:
+        model_inputs["attention_mask"] = inputs["attention_mask"]
+    with torch.no_grad():
+        logits = model(**model_inputs).logits
+    lengths = model._get_feat_extract_output_lengths(torch.tensor([len(pcm) for pcm in pcms]))
+    predicted_ids = torch.argmax(logits, dim=-1)
+    return [processor.decode(ids[:int(length)]) for ids, length in zip(predicted_ids, lengths)]
+
+
+def evaluate_mode(base: Dict[str, Any], mode: str, batches: List[List[np.ndarray]]) -> Dict[str, Any]:
+    """
+    Compila il modello in una modalità e trascrivi tutte le richieste.
+
+    Args:
+        base: Componenti del modello non compilato.
+        mode: Modalità di WAV2VEC2_COMPILE_MODE.
+        batches: Richieste raggruppate in batch.
+
+    Returns:
+        Dizionario con misure, trascrizioni e statistiche dei grafi.
+    """
+    settings.WAV2VEC2_COMPILE_MODE = mode
+    components = compile_wav2vec2_components(base)
+    model = components["model"]
+    compile_s = model.compile_buckets() if isinstance(model, BucketedWav2Vec2ForCTC) else 0.0
+    # Un batch a vuoto anche senza compilazione, per allocazioni e kernel
+    run_batch(components, batches[0])
+
+    latencies, texts = [], []
+    start = time.perf_counter()
+    for pcms in batches:
+        batch_start = time.perf_counter()
+        texts.extend(run_batch(components, pcms))
+        latencies.append(time.perf_counter() - batch_start)
+    elapsed = time.perf_counter() - start
+
+    audio_s = sum(len(pcm) for pcms in batches for pcm in pcms) / 16000
+    stats = model.compile_stats() if isinstance(model, BucketedWav2Vec2ForCTC) else None
+    return {
+        "mode": mode,
+        "compile_s": round(compile_s, 2),
+        "latency_mean_s": round(statistics.mean(latencies), 4),
+        "latency_p95_s": round(float(np.percentile(latencies, 95)), 4),
+        "throughput": round(audio_s / elapsed, 2),
+        "padding_waste": stats["padding_waste"] if stats else 0.0,
+        "fallbacks": stats["fallbacks"] if stats else 0,
+        "texts": texts,
+        "graphs": stats["graphs"] if stats else []
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wav2Vec2 compilato con bucket di lunghezza a confronto con l'eager")
+    parser.add_argument("--model", default="facebook", help="Chiave del modello, anche con precisione (es. facebook@int8)")
+    parser.add_argument("--modes", nargs="+", default=["none", "torchscript"], choices=list(COMPILE_MODES))
+    parser.add_argument("--buckets", nargs="+", type=float, help="Bucket in secondi (default: WAV2VEC2_COMPILE_BUCKETS_S)")
+    parser.add_argument("--requests", type=int, default=40, help="Numero di richieste")
+    parser.add_argument("--min-s", type=float, default=0.5, help="Durata minima delle richieste (secondi)")
+    parser.add_argument("--max-s", type=float, default=15.0, help="Durata massima delle richieste (secondi)")
+    parser.add_argument("--batch-size", type=int, default=1, help="Audio per forward pass")
+    parser.add_argument("--random-model", action="store_true", help="Usa un modello piccolo inizializzato a caso")
+    parser.add_argument("--output", default="wav2vec2_compile", help="Prefisso del file CSV di output")
+    args = parser.parse_args()
+
+    if args.buckets:
+        settings.WAV2VEC2_COMPILE_BUCKETS_S = args.buckets
+    settings.WAV2VEC2_BATCH_MAX_SIZE = args.batch_size
+    settings.WAV2VEC2_BATCHING_ENABLED = args.batch_size > 1
+
+    rng = np.random.default_rng(0)
+    pcms = [
+        (0.05 * rng.standard_normal(int(rng.uniform(args.min_s, args.max_s) * 16000))).astype(np.float32)
+        for _ in range(args.requests)
+    ]
+    batches = [pcms[i:i + args.batch_size] for i in range(0, len(pcms), args.batch_size)]
+
+    print(f"📦 Caricamento del modello {'casuale' if args.random_model else args.model}...")
+    base = load_base_components(args.model, args.random_model)
+    print(f"🎧 {len(pcms)} richieste tra {args.min_s:g}s e {args.max_s:g}s, batch da {args.batch_size}, "
+          f"bucket {settings.WAV2VEC2_COMPILE_BUCKETS_S}")
+
+    results: List[Dict[str, Any]] = []
+    # L'eager per primo: è il riferimento di speedup e trascrizioni
+    for mode in sorted(dict.fromkeys(args.modes), key=lambda m: m != "none"):
+        print(f"⏱️  {mode}...")
+        result = evaluate_mode(base, mode, batches)
+        results.append(result)
+        print(f"  🟢 compilazione {result['compile_s']:.1f}s, latenza {result['latency_mean_s'] * 1000:.1f} ms "
+              f"(p95 {result['latency_p95_s'] * 1000:.1f} ms), {result['throughput']:.1f} s audio/s, "
+              f"padding {result['padding_waste']:.1%}, non compilate {result['fallbacks']}")
+        for graph in result["graphs"]:
+            waste = f"{graph['padding_waste']:.1%}" if graph["padding_waste"] is not None else "-"
+            print(f"     batch {graph['batch_size']} x {graph['bucket_s']:>5g}s: compilazione "
+                  f"{graph['compile_s']:.2f}s, {graph['hits']} riusi, padding {waste}")
+
+    baseline = results[0] if results[0]["mode"] == "none" else None
+    rows = []
+    for result in results:
+        row = {key: value for key, value in result.items() if key not in ("texts", "graphs")}
+        row["speedup"] = round(result["throughput"] / baseline["throughput"], 2) if baseline else None
+        row["same_text"] = (
+            round(sum(a == b for a, b in zip(result["texts"], baseline["texts"])) / len(pcms), 4) if baseline else None
+        )
+        row["hits"] = sum(graph["hits"] for graph in result["graphs"])
+        rows.append(row)
+
+    if baseline:
+        print("\n📊 Rispetto all'esecuzione non compilata")
+        for row in rows[1:]:
+            print(f"  {row['mode']:<12} speedup {row['speedup']:.2f}x, trascrizioni uguali {row['same_text']:.1%}")
+
+    output = Path(args.output).with_suffix(".csv")
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"💾 Risultati salvati in: {output.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
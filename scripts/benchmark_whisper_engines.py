@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Benchmark affiancato dei motori Whisper: openai-whisper e faster-whisper (CTranslate2).
+
+Per ogni dimensione, motore e precisione il modello viene caricato dal servizio
+del motore (come con WHISPER_ENGINE), riscaldato e misurato sul set di
+riferimento in tre modalità:
+    - sequenziale: una richiesta alla volta con il percorso per singola
+      richiesta (latenza, real-time factor, WER e CER);
+    - concorrente: --concurrency richieste in parallelo sullo stesso modello;
+    - batch: gli audio fino a 30 secondi decodificati a gruppi di
+      WHISPER_BATCH_MAX_SIZE con il decoding batch del servizio (gli audio
+      che richiedono il percorso singolo vengono ritrascritti così).
+Il throughput è in secondi di audio trascritti per secondo; lo speedup è
+rispetto a openai-whisper fp32 della stessa dimensione.
+
+Il set di riferimento è lo stesso di report_wav2vec2_quantization.py.
+
+Uso (dalla cartella scripts):
+    python benchmark_whisper_engines.py --sizes tiny base --concurrency 4
+    python benchmark_whisper_engines.py --sizes small --variants whisper:fp32 faster-whisper:int8
+"""
+
+import argparse
+import csv
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+from whisper.audio import N_SAMPLES
+
+from report_wav2vec2_quantization import BACKEND_DIR, load_reference_set
+
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.config import settings  # noqa: E402
+from app.dependencies import WHISPER_ENGINES, create_whisper_service  # noqa: E402
+from app.models.model_precision import get_variant_name  # noqa: E402
+from app.models.model_registry import ModelRegistry  # noqa: E402
+from app.services.whisper_service import WhisperService  # noqa: E402
+from app.utils.metrics import calculate_cer, calculate_wer  # noqa: E402
+
+DEFAULT_VARIANTS = ["whisper:fp32", "whisper:int8", "faster-whisper:fp32", "faster-whisper:int8"]
+
+
+def timed(func, *args) -> float:
+    """Esegui func e restituisci la durata in secondi."""
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def measure_throughput(func, pcms: List[np.ndarray], concurrency: int = 1) -> float:
+    """
+    Trascrivi tutti gli audio e restituisci i secondi di audio elaborati al secondo.
+
+    Args:
+        func: Funzione che trascrive un audio.
+        pcms: Audio float32 mono a 16kHz.
+        concurrency: Richieste in parallelo.
+
+    Returns:
+        Throughput in secondi di audio per secondo.
+    """
+    def run_all() -> None:
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(func, pcms))
+        else:
+            for pcm in pcms:
+                func(pcm)
+
+    return sum(len(pcm) for pcm in pcms) / 16000 / timed(run_all)
+
+
+def transcribe_batched(service: WhisperService, pcms: List[np.ndarray], checkpoint: str) -> None:
+    """Trascrivi gli audio come il micro-batching del servizio: a gruppi, con fallback al percorso singolo."""
+    short = [pcm for pcm in pcms if len(pcm) <= N_SAMPLES]
+    for pcm in pcms:
+        if len(pcm) > N_SAMPLES:
+            service._transcribe_pcm_sync(pcm, checkpoint)
+    for start in range(0, len(short), settings.WHISPER_BATCH_MAX_SIZE):
+        batch = short[start:start + settings.WHISPER_BATCH_MAX_SIZE]
+        for pcm, outcome in zip(batch, service._decode_batch_sync(batch, checkpoint)):
+            if outcome is None:
+                service._transcribe_pcm_sync(pcm, checkpoint)
+
+
+def evaluate_engine(service: WhisperService, checkpoint: str, audios: Dict[Path, tuple],
+                    repeat: int, concurrency: int) -> Dict:
+    """
+    Misura latenza, accuratezza e throughput di un motore su una variante.
+
+    Args:
+        service: Servizio Whisper del motore.
+        checkpoint: Checkpoint della variante (es. "small@int8").
+        audios: Dizionario percorso -> (audio a 16kHz, testo di riferimento).
+        repeat: Esecuzioni per file in modalità sequenziale; il tempo considerato è il minimo.
+        concurrency: Richieste in parallelo in modalità concorrente.
+
+    Returns:
+        Riga di risultati della variante.
+    """
+    load_start = time.perf_counter()
+    handle = service._acquire_checkpoint(checkpoint)
+    load_s = time.perf_counter() - load_start
+    try:
+        service._warm_up_sync(checkpoint)
+        memory_mb = next(
+            entry["memory_mb"] for entry in ModelRegistry().status()["models"]
+            if entry["engine"] == service.ENGINE and entry["name"] == handle.name
+        )
+        pcms = [pcm for pcm, _ in audios.values()]
+        latencies, rtfs, wers, cers = [], [], [], []
+        for pcm, reference in audios.values():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                text = service._transcribe_pcm_sync(pcm, checkpoint)
+                timings.append(time.perf_counter() - start)
+            latencies.append(min(timings))
+            rtfs.append(min(timings) / (len(pcm) / 16000))
+            wers.append(calculate_wer(reference, text))
+            cers.append(calculate_cer(reference, text))
+
+        def transcribe(pcm: np.ndarray) -> str:
+            return service._transcribe_pcm_sync(pcm, checkpoint)
+
+        audio_s = sum(len(pcm) for pcm in pcms) / 16000
+        return {
+            "load_s": round(load_s, 2),
+            "memory_mb": memory_mb,
+            "latency_mean_s": round(statistics.mean(latencies), 3),
+            "rtf": round(statistics.mean(rtfs), 4),
+            "wer": round(statistics.mean(wers), 4),
+            "cer": round(statistics.mean(cers), 4),
+            "throughput_sequential": round(measure_throughput(transcribe, pcms), 2),
+            "throughput_concurrent": round(measure_throughput(transcribe, pcms, concurrency), 2),
+            "throughput_batched": round(audio_s / timed(transcribe_batched, service, pcms, checkpoint), 2)
+        }
+    finally:
+        handle.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput e accuratezza dei motori Whisper a confronto")
+    parser.add_argument("--sizes", nargs="+", default=["tiny", "base", "small"],
+                        choices=["tiny", "base", "small", "medium", "large"])
+    parser.add_argument("--variants", nargs="+", default=DEFAULT_VARIANTS,
+                        help='Coppie "motore:precisione" (es. faster-whisper:int8)')
+    parser.add_argument("--audio-dir", default=str(BACKEND_DIR / "audio"), help="Cartella dei file audio")
+    parser.add_argument("--references", help='File JSON {"nome_file": "testo di riferimento"}')
+    parser.add_argument("--repeat", type=int, default=3, help="Esecuzioni per file (si considera il minimo)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Richieste in parallelo in modalità concorrente")
+    parser.add_argument("--output", default="whisper_engines", help="Prefisso del file CSV di output")
+    args = parser.parse_args()
+
+    variants = [tuple(variant.split(":", 1)) for variant in args.variants]
+    unknown = [engine for engine, _ in variants if engine not in WHISPER_ENGINES]
+    if unknown:
+        print(f"❌ Motori non supportati: {', '.join(unknown)} (disponibili: {', '.join(WHISPER_ENGINES)})")
+        sys.exit(1)
+
+    reference_set = load_reference_set(Path(args.audio_dir), args.references)
+    if not reference_set:
+        print("❌ Nessun file audio del set di riferimento trovato")
+        sys.exit(1)
+
+    services = {engine: create_whisper_service(engine) for engine in dict.fromkeys(e for e, _ in variants)}
+    first_service = next(iter(services.values()))
+    print(f"🎧 Decodifica di {len(reference_set)} file audio...")
+    audios = {
+        path: (first_service._prepare_audio_sync(path.read_bytes()), text) for path, text in reference_set.items()
+    }
+
+    rows: List[Dict] = []
+    for size in args.sizes:
+        baseline = None
+        # openai-whisper fp32 per primo: è il riferimento dello speedup
+        for engine, precision in sorted(variants, key=lambda v: v != ("whisper", "fp32")):
+            checkpoint = get_variant_name(size, precision)
+            print(f"⏱️  {engine} {checkpoint}...")
+            try:
+                result = evaluate_engine(services[engine], checkpoint, audios, args.repeat, args.concurrency)
+            except Exception as e:
+                print(f"  ⚠️  {engine} {checkpoint} non disponibile: {e}")
+                continue
+            row = {"size": size, "engine": engine, "precision": precision, **result}
+            if (engine, precision) == ("whisper", "fp32"):
+                baseline = row
+            for mode in ("sequential", "concurrent", "batched"):
+                key = f"throughput_{mode}"
+                row[f"speedup_{mode}"] = round(row[key] / baseline[key], 2) if baseline else None
+            print(f"  🟢 RTF {row['rtf']:.3f}, WER {row['wer']:.3f}, {row['memory_mb']:.0f} MB, throughput "
+                  f"{row['throughput_sequential']:.1f} / {row['throughput_concurrent']:.1f} / "
+                  f"{row['throughput_batched']:.1f} s/s (sequenziale / x{args.concurrency} / batch)")
+            rows.append(row)
+
+    if not rows:
+        print("❌ Nessuna variante misurata")
+        sys.exit(1)
+
+    print("\n📊 Speedup rispetto a openai-whisper fp32")
+    print(f"  {'variante':<32} {'sequenziale':>12} {'concorrente':>12} {'batch':>8} {'WER':>7}")
+    for row in rows:
+        label = f"{row['engine']} {get_variant_name(row['size'], row['precision'])}"
+        speedups = [row[f"speedup_{mode}"] for mode in ("sequential", "concurrent", "batched")]
+        formatted = [f"{s:.2f}x" if s is not None else "-" for s in speedups]
+        print(f"  {label:<32} {formatted[0]:>12} {formatted[1]:>12} {formatted[2]:>8} {row['wer']:>7.3f}")
+
+    output = Path(args.output).with_suffix(".csv")
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"💾 Risultati salvati in: {output.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
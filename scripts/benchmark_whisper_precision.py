@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark delle varianti di precisione di Whisper (fp32, int8, bf16) per dimensione.
+
+Per ogni dimensione e precisione il modello viene caricato dal servizio (le
+varianti sono costruite dal fp32 e salvate come snapshot alla prima
+esecuzione), riscaldato e usato per trascrivere il set di riferimento con il
+percorso standard per singola richiesta. Per ogni variante vengono riportati
+latenza media (minimo su --repeat esecuzioni per file), real-time factor,
+speedup rispetto al fp32 della stessa dimensione, WER e CER con la variazione
+rispetto al fp32 e memoria del modello.
+
+Il set di riferimento è lo stesso di report_wav2vec2_quantization.py.
+
+Uso (dalla cartella scripts):
+    python benchmark_whisper_precision.py --sizes tiny base small --repeat 3
+    python benchmark_whisper_precision.py --sizes small --precisions fp32 bf16 --audio-dir ./ref --references ./ref/testi.json
+"""
+
+import argparse
+import csv
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from report_wav2vec2_quantization import BACKEND_DIR, load_reference_set
+
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.models.model_precision import MODEL_PRECISIONS, get_variant_name  # noqa: E402
+from app.models.model_registry import ModelRegistry  # noqa: E402
+from app.services.whisper_service import WhisperService  # noqa: E402
+from app.utils.metrics import calculate_cer, calculate_wer  # noqa: E402
+
+
+def evaluate_variant(service: WhisperService, checkpoint: str, audios: Dict[Path, tuple], repeat: int) -> Dict:
+    """
+    Trascrivi il set di riferimento con una variante e riassumi latenza e accuratezza.
+
+    Args:
+        service: Servizio Whisper.
+        checkpoint: Checkpoint della variante (es. "small@int8").
+        audios: Dizionario percorso -> (audio a 16kHz, testo di riferimento).
+        repeat: Esecuzioni per file; il tempo considerato è il minimo.
+
+    Returns:
+        Riga di risultati della variante (medie sui file).
+    """
+    load_start = time.perf_counter()
+    handle = service._acquire_checkpoint(checkpoint)
+    load_s = time.perf_counter() - load_start
+    try:
+        service._warm_up_sync(checkpoint)
+        memory_mb = next(
+            entry["memory_mb"] for entry in ModelRegistry().status()["models"] if entry["name"] == handle.name
+        )
+        latencies, rtfs, wers, cers = [], [], [], []
+        for path, (pcm, reference) in audios.items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                text = service._transcribe_pcm_sync(pcm, checkpoint)
+                timings.append(time.perf_counter() - start)
+            latencies.append(min(timings))
+            rtfs.append(min(timings) / (len(pcm) / 16000))
+            wers.append(calculate_wer(reference, text))
+            cers.append(calculate_cer(reference, text))
+        return {
+            "checkpoint": checkpoint,
+            "load_s": round(load_s, 2),
+            "memory_mb": memory_mb,
+            "latency_mean_s": round(statistics.mean(latencies), 3),
+            "rtf": round(statistics.mean(rtfs), 4),
+            "wer": round(statistics.mean(wers), 4),
+            "cer": round(statistics.mean(cers), 4)
+        }
+    finally:
+        handle.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latenza e WER delle varianti di precisione di Whisper")
+    parser.add_argument("--sizes", nargs="+", default=["tiny", "base", "small"],
+                        choices=["tiny", "base", "small", "medium", "large"])
+    parser.add_argument("--precisions", nargs="+", default=list(MODEL_PRECISIONS["whisper"]),
+                        choices=list(MODEL_PRECISIONS["whisper"]))
+    parser.add_argument("--audio-dir", default=str(BACKEND_DIR / "audio"), help="Cartella dei file audio")
+    parser.add_argument("--references", help='File JSON {"nome_file": "testo di riferimento"}')
+    parser.add_argument("--repeat", type=int, default=3, help="Esecuzioni per file (si considera il minimo)")
+    parser.add_argument("--output", default="whisper_precision", help="Prefisso del file CSV di output")
+    args = parser.parse_args()
+
+    reference_set = load_reference_set(Path(args.audio_dir), args.references)
+    if not reference_set:
+        print("❌ Nessun file audio del set di riferimento trovato")
+        sys.exit(1)
+
+    service = WhisperService()
+    print(f"🎧 Decodifica di {len(reference_set)} file audio...")
+    audios = {path: (service._prepare_audio_sync(path.read_bytes()), text) for path, text in reference_set.items()}
+
+    rows: List[Dict] = []
+    for size in args.sizes:
+        baseline = None
+        # Il fp32 per primo: è il riferimento di speedup e variazione del WER
+        for precision in sorted(args.precisions, key=lambda p: p != "fp32"):
+            checkpoint = get_variant_name(size, precision)
+            print(f"⏱️  whisper {checkpoint}...")
+            row = {"size": size, "precision": precision, **evaluate_variant(service, checkpoint, audios, args.repeat)}
+            if precision == "fp32":
+                baseline = row
+            row["speedup"] = round(baseline["rtf"] / row["rtf"], 2) if baseline else None
+            row["wer_delta"] = round(row["wer"] - baseline["wer"], 4) if baseline else None
+            comparison = f" ({row['speedup']:.2f}x, WER {row['wer_delta']:+.3f} vs fp32)" if baseline else ""
+            print(f"  🟢 latenza {row['latency_mean_s']:.2f}s, RTF {row['rtf']:.3f}, WER {row['wer']:.3f}, "
+                  f"{row['memory_mb']:.0f} MB{comparison}")
+            rows.append(row)
+
+    output = Path(args.output).with_suffix(".csv")
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"💾 Risultati salvati in: {output.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
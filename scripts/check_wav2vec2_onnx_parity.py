@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Verifica di parità tra Wav2Vec2 in PyTorch e la sua variante ONNX Runtime.
+
+Su modelli Wav2Vec2 piccoli inizializzati a caso (con attention mask e
+feature estratte con layer norm, come XLSR-53, e senza attention mask con
+group norm, come wav2vec2-base) il modello viene esportato con
+app.models.model_onnx e i due backend vengono confrontati sugli stessi batch
+paddati di audio sintetici di varie durate: differenza massima dei logits sui
+frame validi, accordo dei token predetti, trascrizioni decodificate e tempi di
+inferenza. Lo script termina con codice 1 se una differenza supera --atol.
+
+Uso (dalla cartella scripts):
+    python check_wav2vec2_onnx_parity.py
+    python check_wav2vec2_onnx_parity.py --durations 0.5 3 10 --batch-sizes 1 4 --atol 1e-3
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import torch
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.models.model_onnx import (  # noqa: E402
+    export_wav2vec2_onnx, is_onnx_runtime_available, load_onnx_components
+)
+from app.services.autotune import build_random_components  # noqa: E402
+
+
+def build_group_norm_components() -> Dict[str, Any]:
+    """Modello casuale con feature estratte con group norm e senza attention mask."""
+    from transformers import Wav2Vec2Config, Wav2Vec2ForCTC
+
+    components = build_random_components("wav2vec2")
+    components["processor"].feature_extractor.return_attention_mask = False
+    config = Wav2Vec2Config(**{
+        **components["model"].config.to_dict(), "feat_extract_norm": "group", "do_stable_layer_norm": False
+    })
+    torch.manual_seed(0)
+    components["model"] = Wav2Vec2ForCTC(config).eval()
+    return components
+
+
+def run_backend(components: Dict[str, Any], pcms: List[np.ndarray]) -> Dict[str, Any]:
+    """
+    Esegui un batch come Wav2Vec2Service._forward_batch_sync.
+
+    Returns:
+        Dizionario con logits, lunghezze in frame, trascrizioni e tempo di inferenza.
+    """
+    model, processor = components["model"], components["processor"]
+    inputs = processor(
+        pcms, sampling_rate=16000, return_tensors="pt", padding=True, do_normalize=True, return_attention_mask=True
+    )
+    model_inputs = {"input_values": inputs["input_values"]}
+    if processor.feature_extractor.return_attention_mask:
+        model_inputs["attention_mask"] = inputs["attention_mask"]
+    with torch.no_grad():
+        start = time.perf_counter()
+        logits = model(**model_inputs).logits
+        elapsed = time.perf_counter() - start
+    lengths = model._get_feat_extract_output_lengths(torch.tensor([len(pcm) for pcm in pcms]))
+    predicted_ids = torch.argmax(logits, dim=-1)
+    texts = [processor.decode(ids[:int(length)]) for ids, length in zip(predicted_ids, lengths)]
+    return {"logits": logits, "lengths": lengths, "texts": texts, "time_s": elapsed}
+
+
+def check_model(label: str, components: Dict[str, Any], durations: List[float],
+                batch_sizes: List[int], atol: float) -> bool:
+    """
+    Esporta un modello e confronta i due backend su tutte le combinazioni di durata e batch.
+
+    Returns:
+        True se tutte le differenze sono entro la tolleranza.
+    """
+    print(f"\n🧪 {label}")
+    with tempfile.TemporaryDirectory() as tmp:
+        export_dir = export_wav2vec2_onnx(components, Path(tmp) / "model@onnx")
+        onnx_components = load_onnx_components(export_dir)
+
+        rng = np.random.default_rng(0)
+        passed = True
+        print(f"  {'durata':>7} {'batch':>6} {'max |Δ|':>10} {'token =':>8} {'testi =':>8} "
+              f"{'torch':>8} {'onnx':>8}")
+        for duration in durations:
+            for batch_size in batch_sizes:
+                # Durate diverse nello stesso batch: il padding deve dare gli stessi logits validi
+                pcms = [
+                    (rng.standard_normal(int(duration * 16000 * (1 - 0.2 * i / batch_size))) * 0.1).astype(np.float32)
+                    for i in range(batch_size)
+                ]
+                reference = run_backend(components, pcms)
+                candidate = run_backend(onnx_components, pcms)
+                if not torch.equal(reference["lengths"], candidate["lengths"]):
+                    print(f"  ❌ lunghezze in frame diverse: {reference['lengths']} vs {candidate['lengths']}")
+                    passed = False
+                    continue
+                max_diff, same_tokens, total_tokens = 0.0, 0, 0
+                for i, length in enumerate(reference["lengths"].tolist()):
+                    ref_logits, onnx_logits = reference["logits"][i, :length], candidate["logits"][i, :length]
+                    max_diff = max(max_diff, (ref_logits - onnx_logits).abs().max().item())
+                    same_tokens += (ref_logits.argmax(-1) == onnx_logits.argmax(-1)).sum().item()
+                    total_tokens += length
+                same_texts = sum(a == b for a, b in zip(reference["texts"], candidate["texts"]))
+                status = "🟢" if max_diff <= atol else "❌"
+                passed = passed and max_diff <= atol
+                print(f"  {duration:>6.1f}s {batch_size:>6} {max_diff:>10.2e} {same_tokens / total_tokens:>8.1%} "
+                      f"{same_texts:>4}/{batch_size:<3} {reference['time_s']:>7.3f}s {candidate['time_s']:>7.3f}s "
+                      f"{status}")
+        return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parità tra Wav2Vec2 in PyTorch e in ONNX Runtime")
+    parser.add_argument("--durations", nargs="+", type=float, default=[0.5, 2.0, 7.5],
+                        help="Durate degli audio sintetici (secondi)")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 3])
+    parser.add_argument("--atol", type=float, default=1e-3, help="Differenza massima ammessa tra i logits")
+    args = parser.parse_args()
+
+    if not is_onnx_runtime_available():
+        print("❌ ONNX Runtime non installato: pip install onnxruntime onnx")
+        sys.exit(1)
+
+    models = {
+        "layer norm + attention mask (come XLSR-53)": build_random_components("wav2vec2"),
+        "group norm senza attention mask (come wav2vec2-base)": build_group_norm_components()
+    }
+    results = [check_model(label, components, args.durations, args.batch_sizes, args.atol)
+               for label, components in models.items()]
+    if not all(results):
+        print("\n❌ Parità non verificata")
+        sys.exit(1)
+    print("\n✅ Parità verificata su tutti i modelli")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Misura della memoria per worker: launcher pre-fork vs worker uvicorn.
+
+Per ogni modalità avvia run.py con N worker su una porta dedicata, attende la
+readiness (/health/ready) e la stabilizzazione della memoria, invia
+facoltativamente alcune trascrizioni (così nei worker sono allocate anche le
+attivazioni) e legge /proc/<pid>/smaps_rollup di ogni processo:
+
+- USS (Private_Clean + Private_Dirty): memoria esclusiva del worker, liberata
+  se il worker termina. Con il pre-fork non include i pesi condivisi.
+- PSS: memoria proporzionale (le pagine condivise divise tra i processi); la
+  somma dei PSS è la memoria effettivamente occupata dal gruppo di processi.
+- RSS: include per intero le pagine condivise, quindi sovrastima il totale.
+
+Solo Linux. Uso (dalla cartella scripts):
+    python measure_worker_memory.py --workers 4 --requests 8
+"""
+
+import argparse
+import csv
+import io
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import requests
+import soundfile as sf
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+SMAPS_FIELDS = ["Rss", "Pss", "Private_Clean", "Private_Dirty", "Shared_Clean", "Shared_Dirty"]
+
+
+def read_smaps_rollup(pid: int) -> Dict[str, float]:
+    """Leggi i campi di memoria (in MB) da /proc/<pid>/smaps_rollup."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in SMAPS_FIELDS:
+                values[key] = int(rest.split()[0]) / 1024
+    values["Uss"] = values["Private_Clean"] + values["Private_Dirty"]
+    return values
+
+
+def find_children(parent_pid: int) -> List[int]:
+    """Trova i processi figli diretti di parent_pid leggendo /proc."""
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Il nome del processo può contenere spazi: i campi seguono la ")" finale
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{entry}/cmdline") as f:
+                cmdline = f.read()
+        except (OSError, IndexError, ValueError):
+            continue
+        # Il resource tracker di multiprocessing non è un worker
+        if ppid == parent_pid and "resource_tracker" not in cmdline:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def build_synthetic_audio(duration_s: float, sr: int = 16000) -> bytes:
+    """Genera un WAV sintetico (tono + rumore) della durata richiesta."""
+    t = np.arange(int(duration_s * sr)) / sr
+    pcm = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.05 * np.random.randn(len(t))
+    bio = io.BytesIO()
+    sf.write(bio, pcm.astype(np.float32), sr, format="WAV")
+    return bio.getvalue()
+
+
+def wait_until_stable(base_url: str, pids_of, timeout_s: float) -> None:
+    """Attendi la readiness e che la memoria totale dei worker smetta di crescere."""
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base_url}/health/ready", timeout=2).status_code == 200:
+                break
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    else:
+        raise TimeoutError("il server non è diventato pronto in tempo")
+
+    previous = None
+    while time.time() < deadline:
+        total = sum(read_smaps_rollup(pid)["Pss"] for pid in pids_of())
+        if previous is not None and abs(total - previous) < 0.01 * previous:
+            return
+        previous = total
+        time.sleep(3)
+    raise TimeoutError("la memoria dei worker non si è stabilizzata in tempo")
+
+
+def measure(mode: str, args) -> List[Dict]:
+    """Avvia il server nella modalità indicata e misura la memoria di ogni processo."""
+    base_url = f"http://127.0.0.1:{args.port}"
+    command = [sys.executable, "run.py", "--workers", str(args.workers)]
+    if mode == "uvicorn":
+        command.append("--no-prefork")
+    env = {**os.environ, "HOST": "127.0.0.1", "PORT": str(args.port), "DEBUG": "false", "PYTHONUNBUFFERED": "1"}
+    log = open(f"{args.output}_{mode}.log", "w")
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        print(f"⏳ {mode}: avvio di {args.workers} worker (pid {server.pid})...")
+        wait_until_stable(base_url, lambda: [server.pid] + find_children(server.pid), args.timeout)
+
+        if args.requests:
+            audio = build_synthetic_audio(args.audio_duration)
+            for _ in range(args.requests):
+                response = requests.post(
+                    f"{base_url}{args.endpoint}",
+                    files={"file": ("audio.wav", audio, "audio/wav")}, timeout=600
+                )
+                response.raise_for_status()
+            time.sleep(2)
+
+        rows = []
+        for role, pids in (("parent", [server.pid]), ("worker", find_children(server.pid))):
+            for pid in pids:
+                rows.append({"mode": mode, "role": role, "pid": pid, **read_smaps_rollup(pid)})
+        return rows
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="USS/PSS per worker: pre-fork vs uvicorn")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--modes", nargs="+", default=["prefork", "uvicorn"], choices=["prefork", "uvicorn"])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--requests", type=int, default=0, help="Trascrizioni inviate prima della misura")
+    parser.add_argument("--endpoint", default="/wav2vec2/transcribe")
+    parser.add_argument("--audio-duration", type=float, default=5.0)
+    parser.add_argument("--timeout", type=float, default=900.0, help="Attesa massima di readiness (s)")
+    parser.add_argument("--output", default="worker_memory", help="Prefisso dei file di output")
+    args = parser.parse_args()
+    args.output = str(Path(args.output).resolve())
+
+    rows = []
+    for mode in args.modes:
+        mode_rows = measure(mode, args)
+        rows.extend(mode_rows)
+        print(f"  {'ruolo':<7} {'pid':>7} {'USS MB':>9} {'PSS MB':>9} {'RSS MB':>9} {'condivisa MB':>13}")
+        for row in mode_rows:
+            shared = row["Shared_Clean"] + row["Shared_Dirty"]
+            print(f"  {row['role']:<7} {row['pid']:>7} {row['Uss']:>9.0f} {row['Pss']:>9.0f} {row['Rss']:>9.0f} {shared:>13.0f}")
+        workers = [row for row in mode_rows if row["role"] == "worker"]
+        print(f"  🟢 {mode}: USS medio per worker {sum(r['Uss'] for r in workers) / max(1, len(workers)):.0f} MB, "
+              f"memoria totale (somma PSS) {sum(r['Pss'] for r in mode_rows):.0f} MB")
+
+    output = Path(args.output).with_suffix(".csv")
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["mode", "role", "pid", "Uss"] + SMAPS_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"💾 Risultati salvati in: {output}")
+
+
+if __name__ == "__main__":
+    main()
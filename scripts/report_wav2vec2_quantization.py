@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Report di accuratezza e latenza della variante int8 di Wav2Vec2 rispetto al fp32.
+
+Per ogni precisione il modello viene caricato dal servizio (la variante int8 è
+costruita dal fp32 e salvata come snapshot alla prima esecuzione), riscaldato
+e usato per trascrivere i file del set di riferimento con lo stesso percorso
+delle richieste reali (chunking per gli audio lunghi). Per ogni file vengono
+misurati WER, CER e real-time factor (tempo di inferenza / durata dell'audio,
+minimo su --repeat esecuzioni); il riepilogo riporta anche lo speedup, la
+memoria del modello e la differenza tra le trascrizioni int8 e fp32.
+
+Il set di riferimento di default sono i file di ../backend/audio con i testi
+di evaluate_models_simple.py; con --references si usa un file JSON
+{"nome_file": "testo di riferimento"} (percorsi relativi a --audio-dir).
+
+Uso (dalla cartella scripts):
+    python report_wav2vec2_quantization.py --model facebook --repeat 3
+    python report_wav2vec2_quantization.py --audio-dir ./ref --references ./ref/testi.json
+"""
+
+import argparse
+import csv
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.config import settings  # noqa: E402
+from app.models.model_precision import get_variant_name  # noqa: E402
+from app.models.model_registry import ModelRegistry  # noqa: E402
+from app.services.wav2vec_service import Wav2Vec2Service  # noqa: E402
+from app.utils.metrics import calculate_cer, calculate_wer  # noqa: E402
+
+
+def load_reference_set(audio_dir: Path, references_file: str = None) -> Dict[Path, str]:
+    """
+    Carica i file audio del set di riferimento con i relativi testi.
+
+    Args:
+        audio_dir: Cartella dei file audio.
+        references_file: File JSON {"nome_file": "testo"}. Se None, usa i testi di evaluate_models_simple.
+
+    Returns:
+        Dizionario percorso audio -> testo di riferimento (solo file esistenti).
+    """
+    if references_file:
+        with open(references_file) as f:
+            references = json.load(f)
+    else:
+        from evaluate_models_simple import REFERENCE_TEXTS
+
+        references = REFERENCE_TEXTS
+    reference_set = {audio_dir / name: text for name, text in references.items() if (audio_dir / name).is_file()}
+    missing = len(references) - len(reference_set)
+    if missing:
+        print(f"⚠️  {missing} file del set di riferimento non trovati in {audio_dir}")
+    return reference_set
+
+
+def transcribe(service: Wav2Vec2Service, pcm, checkpoint: str) -> str:
+    """Trascrivi un audio come una richiesta reale (a chunk se lungo), senza cache né micro-batching."""
+    if settings.WAV2VEC2_CHUNKING_ENABLED and len(pcm) > settings.WAV2VEC2_CHUNKING_MIN_DURATION_S * 16000:
+        return service._transcribe_chunked_sync(pcm, checkpoint)
+    return service._forward_batch_sync([pcm], checkpoint)[0]
+
+
+def evaluate_precision(service: Wav2Vec2Service, model: str, precision: str,
+                       audios: Dict[Path, tuple], repeat: int) -> List[Dict]:
+    """
+    Trascrivi il set di riferimento con una precisione del modello.
+
+    Args:
+        service: Servizio Wav2Vec2.
+        model: Chiave del modello (es. "facebook").
+        precision: Precisione ("fp32" o "int8").
+        audios: Dizionario percorso -> (audio a 16kHz, testo di riferimento).
+        repeat: Esecuzioni per file; il tempo riportato è il minimo.
+
+    Returns:
+        Una riga di risultati per file.
+    """
+    checkpoint = get_variant_name(model, precision)
+    handle = service._acquire_checkpoint(checkpoint)
+    try:
+        service._warm_up_sync(checkpoint)
+        memory_mb = next(
+            entry["memory_mb"] for entry in ModelRegistry().status()["models"] if entry["name"] == handle.name
+        )
+        rows = []
+        for path, (pcm, reference) in audios.items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                text = transcribe(service, pcm, checkpoint)
+                timings.append(time.perf_counter() - start)
+            duration_s = len(pcm) / 16000
+            rows.append({
+                "file": path.name,
+                "precision": precision,
+                "duration_s": round(duration_s, 2),
+                "inference_s": round(min(timings), 4),
+                "rtf": round(min(timings) / duration_s, 4),
+                "wer": round(calculate_wer(reference, text), 4),
+                "cer": round(calculate_cer(reference, text), 4),
+                "memory_mb": memory_mb,
+                "text": text
+            })
+            print(f"  {path.name:<16} {precision}: WER={rows[-1]['wer']:.3f} CER={rows[-1]['cer']:.3f} "
+                  f"RTF={rows[-1]['rtf']:.3f}")
+        return rows
+    finally:
+        handle.release()
+
+
+def print_summary(rows: List[Dict], precisions: List[str]) -> None:
+    """Stampa WER, CER e RTF medi per precisione con speedup e differenze rispetto al fp32."""
+    print("\n📊 Riepilogo")
+    print(f"  {'precisione':<10} {'WER':>7} {'CER':>7} {'RTF':>7} {'speedup':>8} {'memoria':>10} {'Δ vs fp32':>10}")
+    by_precision = {p: [row for row in rows if row["precision"] == p] for p in precisions}
+    baseline = by_precision.get("fp32")
+    baseline_rtf = statistics.mean(row["rtf"] for row in baseline) if baseline else None
+    for precision, group in by_precision.items():
+        rtf = statistics.mean(row["rtf"] for row in group)
+        speedup = f"{baseline_rtf / rtf:.2f}x" if baseline_rtf else "-"
+        # WER della trascrizione rispetto a quella fp32 dello stesso file
+        drift = (f"{statistics.mean(calculate_wer(ref['text'], row['text']) for ref, row in zip(baseline, group)):.3f}"
+                 if baseline else "-")
+        print(f"  {precision:<10} {statistics.mean(row['wer'] for row in group):>7.3f} "
+              f"{statistics.mean(row['cer'] for row in group):>7.3f} {rtf:>7.3f} {speedup:>8} "
+              f"{group[0]['memory_mb']:>7.1f} MB {drift:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuratezza e latenza di Wav2Vec2 int8 rispetto al fp32")
+    parser.add_argument("--model", default="facebook", help="Chiave del modello Wav2Vec2")
+    parser.add_argument("--precisions", nargs="+", default=["fp32", "int8"], choices=["fp32", "int8"])
+    parser.add_argument("--audio-dir", default=str(BACKEND_DIR / "audio"), help="Cartella dei file audio")
+    parser.add_argument("--references", help='File JSON {"nome_file": "testo di riferimento"}')
+    parser.add_argument("--repeat", type=int, default=3, help="Esecuzioni per file (si riporta il minimo)")
+    parser.add_argument("--output", default="wav2vec2_quantization", help="Prefisso del file CSV di output")
+    args = parser.parse_args()
+
+    reference_set = load_reference_set(Path(args.audio_dir), args.references)
+    if not reference_set:
+        print("❌ Nessun file audio del set di riferimento trovato")
+        sys.exit(1)
+
+    service = Wav2Vec2Service()
+    print(f"🎧 Decodifica di {len(reference_set)} file audio...")
+    audios = {path: (service._prepare_audio_sync(path.read_bytes()), text) for path, text in reference_set.items()}
+
+    rows = []
+    for precision in args.precisions:
+        print(f"⏱️  {args.model} in {precision}...")
+        rows.extend(evaluate_precision(service, args.model, precision, audios, args.repeat))
+    print_summary(rows, args.precisions)
+
+    output = Path(args.output).with_suffix(".csv")
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"💾 Risultati salvati in: {output.resolve()}")
+
+
+if __name__ == "__main__":
+    main()